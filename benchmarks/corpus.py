@@ -0,0 +1,225 @@
+# 文件: benchmarks/corpus.py
+
+# 基准测试用的合成语料生成器。
+# 所有内容都由固定种子的随机数生成，同样的 scale 每次生成的文件完全相同，
+# 因此不同版本之间的测试结果可以直接比较。
+#
+#   text.pdf        纯文字PDF (中英文混排)
+#   scanned.pdf     扫描件风格: 每页一张整页 JPEG
+#   tree/           多层文件夹，混合 PDF / PNG / JPEG
+#   patent.pdf      带标准页眉的专利五书
+#   images/         独立图片: 照片风格 JPEG、界面截图 PNG、透明背景的图标 PNG (用于比较图片编码格式)
+
+import io
+import os
+import json
+import random
+import shutil
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageDraw, ImageFilter
+
+CORPUS_VERSION = 2
+# scale=1 时各语料的规模；其他 scale 按比例放大或缩小
+BASE_SIZES = {
+    "text_pages": 200,
+    "scanned_pages": 30,
+    "tree_depth": 3,
+    "tree_breadth": 3,
+    "tree_files_per_dir": 4,
+    "patent_description_pages": 20,
+    "images_per_kind": 4,
+}
+A4_WIDTH, A4_HEIGHT = fitz.paper_size("a4")
+WORDS = ["PDF", "toolbox", "benchmark", "页面", "文档", "压缩", "拆分", "合并", "装置", "方法",
+         "system", "method", "layer", "signal", "所述", "其特征在于", "实施例", "图像", "数据", "模块"]
+
+
+def _sentence(rng, n_words):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+def _save(doc, path):
+    # 去掉创建时间等元数据，保证同样的输入生成逐字节相同的文件
+    doc.set_metadata({})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+
+def _scan_image(rng, width, height, lines):
+    """模拟扫描页: 略带噪点的灰白底色 + 若干行深色“文字”色块"""
+    img = Image.new("L", (width, height), 235)
+    draw = ImageDraw.Draw(img)
+    for _ in range(width * height // 400):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.point((x, y), fill=rng.randint(180, 255))
+    y = height // 12
+    for _ in range(lines):
+        x = width // 10
+        while x < width * 9 // 10:
+            w = rng.randint(width // 60, width // 15)
+            draw.rectangle((x, y, min(x + w, width * 9 // 10), y + height // 90), fill=rng.randint(20, 80))
+            x += w + width // 80
+        y += height // 40
+        if y > height * 11 // 12:
+            break
+    return img
+
+
+def make_text_pdf(path, pages, seed=1):
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=A4_WIDTH, height=A4_HEIGHT)
+        page.insert_text((72, 60), f"第 {i + 1} 页", fontname="china-s", fontsize=10)
+        text = "\n".join(_sentence(rng, rng.randint(6, 14)) for _ in range(40))
+        page.insert_textbox(fitz.Rect(72, 80, A4_WIDTH - 72, A4_HEIGHT - 72), text, fontname="china-s", fontsize=10)
+    _save(doc, path)
+
+def make_scanned_pdf(path, pages, seed=2, dpi=150):
+    rng = random.Random(seed)
+    width, height = int(A4_WIDTH / 72 * dpi), int(A4_HEIGHT / 72 * dpi)
+    doc = fitz.open()
+    for _ in range(pages):
+        img = _scan_image(rng, width, height, lines=rng.randint(20, 35))
+        buf = io.BytesIO()
+        img.convert("RGB").save(buf, "JPEG", quality=85)
+        page = doc.new_page(width=A4_WIDTH, height=A4_HEIGHT)
+        page.insert_image(page.rect, stream=buf.getvalue())
+    _save(doc, path)
+
+def make_image_tree(root, depth, breadth, files_per_dir, seed=3):
+    """多层文件夹，每层 breadth 个子文件夹，每个文件夹 files_per_dir 个 PDF / PNG / JPEG 文件"""
+    rng = random.Random(seed)
+
+    def fill(folder, level):
+        os.makedirs(folder, exist_ok=True)
+        for i in range(files_per_dir):
+            kind = rng.choice(["pdf", "png", "jpg"])
+            name = os.path.join(folder, f"文件{i + 1}.{kind}")
+            if kind == "pdf":
+                make_text_pdf(name, rng.randint(1, 4), seed=rng.randrange(1 << 30))
+            else:
+                img = _scan_image(rng, rng.randint(600, 1400), rng.randint(600, 1400), lines=12).convert("RGB")
+                img.save(name, "PNG" if kind == "png" else "JPEG", **({} if kind == "png" else {"quality": 85}))
+        if level < depth:
+            for j in range(breadth):
+                fill(os.path.join(folder, f"第{j + 1}章"), level + 1)
+
+    fill(root, 1)
+
+def make_patent_pdf(path, description_pages, claims=12, seed=4):
+    """按 说明书摘要 / 摘要附图 / 权利要求书 / 说明书 / 说明书附图 的顺序生成专利文件，页眉位于页面顶部"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+
+    def page(header, body):
+        p = doc.new_page(width=A4_WIDTH, height=A4_HEIGHT)
+        p.insert_text((A4_WIDTH / 2 - 40, 50), header, fontname="china-s", fontsize=14)
+        p.insert_textbox(fitz.Rect(72, 110, A4_WIDTH - 72, A4_HEIGHT - 72), body, fontname="china-s", fontsize=11)
+
+    page("说明书摘要", _sentence(rng, 60))
+    page("摘要附图", "图1")
+    claim_lines = [f"{n}. 根据权利要求{max(1, n - 1)}所述的装置，{_sentence(rng, 12)}。" for n in range(1, claims + 1)]
+    per_page = 6
+    for start in range(0, claims, per_page):
+        page("权利要求书", "\n".join(claim_lines[start:start + per_page]) + f"\n{start // per_page + 1}")
+    for i in range(description_pages):
+        page("说明书", "\n".join(f"[{i * 10 + k + 1:04d}] {_sentence(rng, 14)}" for k in range(10)))
+    for i in range(max(1, description_pages // 5)):
+        page("说明书附图", f"图{i + 2}")
+    _save(doc, path)
+
+
+def _photo_image(rng, width, height):
+    """照片风格: 渐变底色上叠加大量模糊的彩色椭圆和噪点，颜色数与真实照片相当"""
+    img = Image.new("RGB", (width, height))
+    top, bottom = [rng.randrange(256) for _ in range(3)], [rng.randrange(256) for _ in range(3)]
+    draw = ImageDraw.Draw(img)
+    for y in range(height):
+        t = y / max(1, height - 1)
+        draw.line((0, y, width, y), fill=tuple(int(a + (b - a) * t) for a, b in zip(top, bottom)))
+    for _ in range(60):
+        x, y, r = rng.randrange(width), rng.randrange(height), rng.randint(width // 40, width // 6)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    img = img.filter(ImageFilter.GaussianBlur(6))
+    for _ in range(width * height // 50):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r, g, b = img.getpixel((x, y))
+        d = rng.randint(-20, 20)
+        img.putpixel((x, y), (max(0, min(255, r + d)), max(0, min(255, g + d)), max(0, min(255, b + d))))
+    return img
+
+def _screenshot_image(rng, width, height):
+    """界面截图风格: 纯色背景、工具栏、按钮和几行文字"""
+    img = Image.new("RGB", (width, height), (246, 247, 249))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, width, 40), fill=(64, 158, 255))
+    for i in range(6):
+        draw.rounded_rectangle((20 + i * 110, 60, 110 + i * 110, 90), radius=6, fill=(255, 255, 255), outline=(220, 223, 230))
+        draw.text((32 + i * 110, 68), f"Button {i + 1}", fill=(48, 49, 51))
+    y = 120
+    while y < height - 30:
+        draw.text((24, y), _sentence(rng, rng.randint(6, 12)).encode("ascii", "ignore").decode() or "text",
+                  fill=(96, 98, 102))
+        y += 22
+    return img
+
+def _logo_image(rng, size):
+    """透明背景的图标: 几个彩色圆形和文字"""
+    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    for _ in range(3):
+        x, y, r = rng.randrange(size), rng.randrange(size), rng.randint(size // 8, size // 3)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)) + (rng.randint(160, 255),))
+    draw.text((size // 4, size // 2), "LOGO", fill=(30, 30, 30, 255))
+    return img
+
+def make_image_set(root, per_kind, seed=5):
+    """每类 per_kind 张: photo_*.jpg / screenshot_*.png / logo_*.png"""
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    for i in range(per_kind):
+        _photo_image(rng, rng.randint(1200, 2000), rng.randint(900, 1400)).save(
+            os.path.join(root, f"photo_{i + 1}.jpg"), "JPEG", quality=92)
+        _screenshot_image(rng, rng.randint(1000, 1600), rng.randint(700, 1000)).save(
+            os.path.join(root, f"screenshot_{i + 1}.png"))
+        _logo_image(rng, rng.choice([256, 512])).save(os.path.join(root, f"logo_{i + 1}.png"))
+
+
+def corpus_sizes(scale):
+    return {key: max(1, round(value * scale)) if key != "tree_depth" else value
+            for key, value in BASE_SIZES.items()}
+
+def generate_corpus(corpus_dir, scale=1.0, force=False):
+    """
+    生成 (或复用) 测试语料，返回各语料路径。
+    corpus_dir/manifest.json 记录生成参数，参数相同时直接复用已有文件。
+    """
+    sizes = corpus_sizes(scale)
+    manifest_path = os.path.join(corpus_dir, "manifest.json")
+    paths = {
+        "text_pdf": os.path.join(corpus_dir, "text.pdf"),
+        "scanned_pdf": os.path.join(corpus_dir, "scanned.pdf"),
+        "tree": os.path.join(corpus_dir, "tree"),
+        "patent_pdf": os.path.join(corpus_dir, "patent.pdf"),
+        "images": os.path.join(corpus_dir, "images"),
+    }
+    manifest = {"version": CORPUS_VERSION, "scale": scale, "sizes": sizes}
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            if json.load(f) == manifest and all(os.path.exists(p) for p in paths.values()):
+                return paths
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    print(f"正在生成测试语料 (scale={scale}) -> {corpus_dir}")
+    make_text_pdf(paths["text_pdf"], sizes["text_pages"])
+    make_scanned_pdf(paths["scanned_pdf"], sizes["scanned_pages"])
+    if os.path.isdir(paths["tree"]):
+        shutil.rmtree(paths["tree"])
+    make_image_tree(paths["tree"], sizes["tree_depth"], sizes["tree_breadth"], sizes["tree_files_per_dir"])
+    make_patent_pdf(paths["patent_pdf"], sizes["patent_description_pages"])
+    if os.path.isdir(paths["images"]):
+        shutil.rmtree(paths["images"])
+    make_image_set(paths["images"], sizes["images_per_kind"])
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return paths
@@ -0,0 +1,302 @@
+# 文件: benchmarks/run.py (性能基准测试)
+#
+# 用法:
+#   python -m benchmarks.run                                  # 生成/复用语料并运行全部用例
+#   python -m benchmarks.run --scale 0.2 --repeat 1           # 小规模快速检查
+#   python -m benchmarks.run -o new.json --compare old.json   # 与上次结果对比
+#   python -m benchmarks.run --only split_text patent_split   # 只运行部分用例
+#   python -m benchmarks.run --codecs                         # 只比较图片输出格式 x 速度档位 (结果写入 codec_results.json)
+#   python -m benchmarks.run --only dossier_chained dossier_pipeline   # 分三次运行 与 内存流水线 对比
+#
+# 每个用例的每次运行都在一个新的子进程中执行，峰值内存 (RSS) 互不影响。
+# 结果写入 JSON: 墙钟时间、页/秒、峰值 RSS、输出大小，可在不同版本之间比较。
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import statistics
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+from benchmarks.corpus import generate_corpus  # noqa: E402
+
+DEFAULT_CORPUS_DIR = os.path.join(PROJECT_DIR, "benchmarks", "corpus")
+DEFAULT_RESULTS = os.path.join(PROJECT_DIR, "benchmarks", "results.json")
+# --codecs 的结果单独保存，不覆盖用作对比基准的 results.json
+DEFAULT_CODEC_RESULTS = os.path.join(PROJECT_DIR, "benchmarks", "codec_results.json")
+# 与上次结果相比，耗时变化超过此比例时在对比表中标出
+REGRESSION_THRESHOLD = 0.10
+
+
+def peak_rss_bytes():
+    """当前进程的峰值常驻内存 (字节)"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize
+
+def path_size(path):
+    """文件的大小，或文件夹内所有文件的总大小"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+# --- 用例: 名称 -> (所需语料, 任务函数) ---
+# 任务函数签名: (语料路径, 输出路径, progress) -> 输出位置 (文件或文件夹)
+
+def _case_merge_tree(src, out, progress):
+    from core.pdf_merger import merge_files
+    target = os.path.join(out, "merged.pdf")
+    merge_files(src, target, resize_images=False, progress=progress)
+    return target
+
+def _case_merge_tree_a4(src, out, progress):
+    from core.pdf_merger import merge_files
+    target = os.path.join(out, "merged.pdf")
+    merge_files(src, target, resize_images=True, progress=progress)
+    return target
+
+def _case_compress_scanned(src, out, progress):
+    from core.pdf_compressor import compress_path
+    compress_path(src, out, 96, 65, 65, 1920, False, progress=progress)
+    return out
+
+def _case_compress_tree(src, out, progress):
+    from core.pdf_compressor import compress_path
+    compress_path(src, out, 96, 65, 65, 1920, False, progress=progress)
+    return out
+
+def _case_split_text(src, out, progress):
+    import fitz
+    from core.pdf_splitter import split_pdf_task
+    with fitz.open(src) as doc:
+        third = len(doc) // 3
+    # 三等分输出三个文件
+    spec = f"1-{third};{third + 1}-{2 * third};{2 * third + 1}-" if third else "1-"
+    split_pdf_task(src, spec, os.path.join(out, "part.pdf"), progress=progress)
+    return out
+
+def _case_split_scanned(src, out, progress):
+    from core.pdf_splitter import split_pdf_task
+    split_pdf_task(src, "1-", os.path.join(out, "all.pdf"), progress=progress)
+    return out
+
+def _case_patent_split(src, out, progress):
+    from core.patent_splitter import split_patent_pdf
+    split_patent_pdf(src, out, use_cache=False, progress=progress)
+    return out
+
+# 合并 -> 压缩 -> 拆分 (每份不超过 DOSSIER_PART_MB): 分三次运行 (写出并重新解析中间文件) 与内存流水线对比
+DOSSIER_PART_MB = 2
+
+def _case_dossier_chained(src, out, progress):
+    from core.pdf_merger import merge_files
+    from core.pdf_compressor import compress_path
+    from core.pdf_splitter import split_pdf_by_mode
+    merged, compressed = os.path.join(out, "merged.pdf"), os.path.join(out, "compressed")
+    merge_files(src, merged, progress=progress)
+    compress_path(merged, compressed, 96, 65, 65, 1920, False, progress=progress)
+    parts = os.path.join(out, "parts")
+    os.makedirs(parts)
+    split_pdf_by_mode(os.path.join(compressed, "merged.pdf"), "size", DOSSIER_PART_MB,
+                      os.path.join(parts, "dossier.pdf"), progress=progress)
+    return parts
+
+def _case_dossier_pipeline(src, out, progress):
+    from core.pipeline import run_pipeline
+    parts = os.path.join(out, "parts")
+    run_pipeline(src, os.path.join(parts, "dossier.pdf"),
+                 {"merge": {}, "compress": {"dpi": 96, "quality": 65}, "split": {"mode": "size", "value": DOSSIER_PART_MB}},
+                 progress=progress)
+    return parts
+
+CASES = {
+    "merge_tree": ("tree", _case_merge_tree),
+    "merge_tree_a4": ("tree", _case_merge_tree_a4),
+    "compress_scanned": ("scanned_pdf", _case_compress_scanned),
+    "compress_tree": ("tree", _case_compress_tree),
+    "split_text": ("text_pdf", _case_split_text),
+    "split_scanned": ("scanned_pdf", _case_split_scanned),
+    "patent_split": ("patent_pdf", _case_patent_split),
+    "dossier_chained": ("tree", _case_dossier_chained),
+    "dossier_pipeline": ("tree", _case_dossier_pipeline),
+}
+
+
+def run_case_once(name, source, work_dir):
+    """在子进程中执行: 运行一次用例，返回本次的测量结果"""
+    from core.progress import ProgressReporter, JOB_FINISHED
+    finished = []
+    progress = ProgressReporter(log=False, callback=lambda e: finished.append(e) if e.kind == JOB_FINISHED else None)
+    out = os.path.join(work_dir, name)
+    shutil.rmtree(out, ignore_errors=True)
+    os.makedirs(out)
+    # 任务日志不参与计时输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        target = CASES[name][1](source, out, progress)
+        wall = time.perf_counter() - start
+    pages = finished[-1].pages_done if finished else 0
+    result = {"wall_s": wall, "pages": pages, "peak_rss_bytes": peak_rss_bytes(),
+              "output_bytes": path_size(target) if os.path.exists(target) else 0}
+    shutil.rmtree(out, ignore_errors=True)
+    return result
+
+def run_case(name, source, work_dir, repeat):
+    """重复运行 repeat 次，每次一个新的子进程；取耗时中位数"""
+    runs = []
+    context = multiprocessing.get_context("spawn")
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            runs.append(pool.submit(run_case_once, name, source, work_dir).result())
+    wall = statistics.median(r["wall_s"] for r in runs)
+    pages = runs[-1]["pages"]
+    return {
+        "wall_s": round(wall, 4),
+        "wall_s_min": round(min(r["wall_s"] for r in runs), 4),
+        "pages": pages,
+        "pages_per_s": round(pages / wall, 2) if wall > 0 else None,
+        "peak_rss_mb": round(max(r["peak_rss_bytes"] for r in runs) / 1024 / 1024, 1),
+        "output_bytes": runs[-1]["output_bytes"],
+        "runs": [round(r["wall_s"], 4) for r in runs],
+    }
+
+
+def run_image_codecs(images_dir, repeat, quality=75):
+    """
+    每种输出格式 x 速度档位把语料中的图片各压缩一遍，返回并打印每张图片的平均输出大小和耗时 (取中位数)。
+    按图片类型 (文件名前缀: photo / screenshot / logo) 分别统计。
+    """
+    from core.pdf_compressor import IMAGE_FORMATS, EFFORT_PRESETS, compress_image
+    from core.progress import ProgressReporter
+    images = sorted(os.path.join(images_dir, f) for f in os.listdir(images_dir))
+    kinds = sorted({os.path.basename(p).split("_")[0] for p in images})
+    out_dir = os.path.join(images_dir, "_codec_work")
+    results = {}
+    print(f"\n{'格式/档位':<26}{'KB/张':>9}{'毫秒/张':>9}" + "".join(f"{k + ' KB':>15}" for k in kinds))
+    for fmt in IMAGE_FORMATS:
+        for effort in EFFORT_PRESETS:
+            per_image = {}
+            for path in images:
+                times, size = [], 0
+                for _ in range(repeat):
+                    shutil.rmtree(out_dir, ignore_errors=True)
+                    os.makedirs(out_dir)
+                    progress = ProgressReporter(log=False)
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        start = time.perf_counter()
+                        compress_image(path, os.path.join(out_dir, "out"), quality, False, 0, progress,
+                                       image_format=fmt, effort=effort)
+                        times.append(time.perf_counter() - start)
+                    size = path_size(out_dir)
+                per_image[os.path.basename(path)] = {"bytes": size, "ms": statistics.median(times) * 1000}
+            by_kind = {k: statistics.mean(r["bytes"] for name, r in per_image.items() if name.startswith(k + "_"))
+                       for k in kinds}
+            row = {"bytes_per_image": round(statistics.mean(r["bytes"] for r in per_image.values())),
+                   "ms_per_image": round(statistics.mean(r["ms"] for r in per_image.values()), 2),
+                   "bytes_by_kind": {k: round(v) for k, v in by_kind.items()},
+                   "images": per_image}
+            results[f"{fmt}/{effort}"] = row
+            print(f"{fmt + '/' + effort:<28}{row['bytes_per_image'] / 1024:>9.1f}{row['ms_per_image']:>10.1f}"
+                  + "".join(f"{by_kind[k] / 1024:>16.1f}" for k in kinds))
+    shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+
+def compare_results(current, baseline):
+    """打印与基准结果的对比表，返回耗时变慢超过阈值的用例名列表"""
+    regressions = []
+    print(f"\n{'用例':<18}{'耗时(秒)':>8}{'基准':>10}{'变化':>9}{'峰值内存MB':>12}{'基准':>8}{'输出大小':>12}{'基准':>12}")
+    for name, result in current["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            print(f"{name:<20}{result['wall_s']:>12.3f}{'(无)':>10}")
+            continue
+        change = (result["wall_s"] - base["wall_s"]) / base["wall_s"] if base["wall_s"] else 0.0
+        flag = " ⚠️" if change > REGRESSION_THRESHOLD else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<20}{result['wall_s']:>12.3f}{base['wall_s']:>10.3f}{change * 100:>+8.1f}%"
+              f"{result['peak_rss_mb']:>12.1f}{base['peak_rss_mb']:>10.1f}"
+              f"{result['output_bytes']:>14}{base['output_bytes']:>14}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF 工具箱性能基准测试")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_DIR, help="语料目录 (不存在时自动生成)")
+    parser.add_argument("--scale", type=float, default=1.0, help="语料规模倍数 (默认 1.0)")
+    parser.add_argument("--regenerate", action="store_true", help="强制重新生成语料")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例运行次数 (默认 3)")
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="只运行指定用例")
+    parser.add_argument("-o", "--output", help="结果JSON路径 (默认 benchmarks/results.json，--codecs 时为 benchmarks/codec_results.json)")
+    parser.add_argument("--compare", help="与之前的结果JSON对比")
+    parser.add_argument("--codecs", action="store_true", help="只运行图片输出格式 x 速度档位的对比")
+    args = parser.parse_args(argv)
+    args.output = args.output or (DEFAULT_CODEC_RESULTS if args.codecs else DEFAULT_RESULTS)
+
+    corpus = generate_corpus(args.corpus, args.scale, force=args.regenerate)
+    work_dir = os.path.join(args.corpus, "_work")
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "cases": {},
+    }
+    if args.codecs:
+        results["image_codecs"] = run_image_codecs(corpus["images"], max(1, args.repeat))
+    for name in [] if args.codecs else args.only or CASES:
+        source = corpus[CASES[name][0]]
+        print(f"运行 {name} ...", end="", flush=True)
+        result = run_case(name, source, work_dir, max(1, args.repeat))
+        results["cases"][name] = result
+        print(f" {result['wall_s']:.3f} 秒 | {result['pages_per_s'] or 0:.1f} 页/秒 | "
+              f"峰值 {result['peak_rss_mb']:.1f} MB | 输出 {result['output_bytes'] / 1024:.1f} KB")
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare_results(results, json.load(f))
+        if regressions:
+            print(f"\n以下用例耗时增加超过 {REGRESSION_THRESHOLD:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
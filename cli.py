@@ -0,0 +1,455 @@
+# 文件: cli.py (命令行入口，无需图形界面)
+#
+# 示例:
+#   python cli.py merge  ./资料 -o ./资料_merged.pdf --resize-a4
+#   python cli.py compress ./扫描件 -o ./压缩结果 --dpi 96 --pdf-quality 65
+#   python cli.py compress ./扫描信函 --mode mrc --dpi 100  # 分层压缩: 文字清晰，体积更小
+#   python cli.py compress ./扫描件 --pdf-quality 20 --check ssim --raise-quality  # 抽查质量，不合格时提高整个文件的质量
+#   python cli.py compress ./网站图片 --img-format auto --effort balanced   # 照片转 WebP，截图转无损 WebP
+#   python cli.py compress ./混合文档 --min-saving 20   # 体积减小不足 20% 的PDF直接输出原文件
+#   python cli.py compress //nas/扫描件 -o ./压缩结果 --read-ahead-mb 512   # 网络共享: 后台多预读几个文件
+#   python cli.py split  a.pdf --range "1-3,5;8-"
+#   python cli.py split  a.pdf --max-mb 10
+#   python cli.py pipeline ./案卷 -o ./上传/案卷.pdf --compress --max-mb 10   # 合并、压缩后按 10 MB 拆分
+#   python cli.py patent-split 专利.pdf -o ./专利
+#   python cli.py startup-check
+#   python cli.py serve --output-root /srv/pdf_out --input-root /mnt/share   # HTTP/JSON 任务服务器
+#   python cli.py server-check                     # 在本机临时启动服务器并端到端检查各类任务
+#   python cli.py watch ./收件箱 --action merge --save   # 监视文件夹，新文件写完后自动合并/压缩
+#   python cli.py catalog //nas/扫描件 --list        # 增量刷新并查看元数据目录 (页数/尺寸/类型/加密)
+#   python cli.py --trace split a.pdf --every 10   # 输出各阶段耗时表和 Chrome trace 文件
+#
+# 本文件及其导入的 core/ 模块都不依赖 PyQt5，可在无显示器的服务器或计划任务中运行。
+# 各功能的后端模块只在对应子命令真正执行时才导入，保证启动足够快。
+
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+
+# 启动预算: 从启动解释器到导入全部后端模块的耗时上限 (毫秒)
+STARTUP_BUDGET_MS = 1000
+TASK_MODULES = ["core.pdf_merger", "core.pdf_compressor", "core.pdf_splitter", "core.pipeline",
+                "core.patent_splitter", "core.pdf_to_image"]
+READ_AHEAD_HELP = ("按处理顺序后台预读后面几个文件的内存上限 (MB)，输出异步写盘；输入在网络共享上时可调大，"
+                   "0 表示关闭 (默认 128，或环境变量 PDF_TOOLBOX_READ_AHEAD_MB)")
+
+
+def run_merge(args):
+    from core.pdf_merger import merge_files
+    output = args.output or os.path.join(args.folder, f"{os.path.basename(os.path.abspath(args.folder))}_merged.pdf")
+    return _status(merge_files(args.folder, output, resize_images=args.resize_a4, **_read_ahead(args)))
+
+
+def _status(ok):
+    """任务函数的结果 -> 进程退出码 (失败为 1，供计划任务和脚本判断)"""
+    return 0 if ok else 1
+
+
+def _read_ahead(args):
+    """--read-ahead-mb 未指定时使用任务函数的默认值"""
+    return {} if args.read_ahead_mb is None else {"read_ahead_mb": args.read_ahead_mb}
+
+
+def run_compress(args):
+    from core.pdf_compressor import compress_path, default_output_dir
+    output = args.output or default_output_dir(args.input)
+    guard = None
+    if args.check:
+        from core.quality_guard import QualityGuard
+        guard = QualityGuard(args.check, threshold=args.min_score, sample_pages=args.check_pages,
+                             retry=args.raise_quality)
+    return _status(compress_path(
+        args.input, output, args.dpi, args.pdf_quality, args.img_quality, args.max_size, args.grayscale,
+        pdf_mode=args.mode, quality_guard=guard, image_format=args.img_format, effort=args.effort,
+        min_saving=None if args.force else args.min_saving / 100, **_read_ahead(args)))
+
+
+def _split_mode(args):
+    """--range / --every / --bookmarks / --max-mb -> (拆分模式, 参数)；都未指定时返回 (None, None)"""
+    if args.every:
+        return "count", args.every
+    if args.bookmarks:
+        return "bookmark", None
+    if args.max_mb:
+        return "size", args.max_mb
+    if args.range:
+        return "range", args.range
+    return None, None
+
+
+def run_split(args):
+    from core.pdf_splitter import split_pdf_by_mode
+    mode, value = _split_mode(args)
+    return _status(split_pdf_by_mode(args.input, mode, value, output_path=args.output))
+
+
+def run_pipeline(args):
+    from core.pipeline import run_pipeline as run, default_output_path
+    stages = {}
+    if os.path.isdir(args.input):
+        stages["merge"] = {"resize_images": args.resize_a4}
+    if args.compress:
+        guard = None
+        if args.check:
+            from core.quality_guard import QualityGuard
+            guard = QualityGuard(args.check, retry=args.raise_quality)
+        stages["compress"] = {"pdf_mode": args.mode, "dpi": args.dpi, "quality": args.pdf_quality,
+                              "to_grayscale": args.grayscale, "quality_guard": guard}
+    mode, value = _split_mode(args)
+    if mode:
+        stages["split"] = {"mode": mode, "value": value}
+    return _status(run(args.input, args.output or default_output_path(args.input), stages))
+
+
+def run_patent_split(args):
+    from core.patent_splitter import split_patent_pdf
+    output = args.output or os.path.splitext(os.path.abspath(args.input))[0]
+    return _status(split_patent_pdf(args.input, output, use_cache=not args.no_cache))
+
+
+def run_to_images(args):
+    from core.pdf_to_image import export_pdf_images, DEFAULT_WORKERS
+    output = args.output or os.path.splitext(os.path.abspath(args.input))[0] + "_图片"
+    return _status(export_pdf_images(args.input, output, fmt=args.format, dpi=args.dpi, page_range_str=args.range or "",
+                                     quality=args.quality, to_grayscale=args.grayscale,
+                                     workers=args.workers or DEFAULT_WORKERS))
+
+
+def run_startup_check(args):
+    """在全新的子进程中测量导入全部后端模块的耗时，并确认没有导入 PyQt5。"""
+    code = ("import sys, cli; " + "; ".join(f"import {m}" for m in TASK_MODULES) +
+            "; sys.exit(3 if 'PyQt5' in sys.modules else 0)")
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", code], cwd=project_dir)
+        timings.append((time.perf_counter() - start) * 1000)
+        if proc.returncode == 3:
+            print("[失败] 后端模块导入了 PyQt5。")
+            return 1
+        if proc.returncode != 0:
+            print(f"[失败] 导入后端模块出错 (退出码 {proc.returncode})。")
+            return 1
+    best = min(timings)
+    print(f"启动耗时: 最快 {best:.0f} ms / 平均 {sum(timings) / len(timings):.0f} ms (预算 {args.budget_ms} ms)")
+    if best > args.budget_ms:
+        print("[失败] 启动耗时超出预算。")
+        return 1
+    print("[成功] 启动耗时在预算之内，且未导入 PyQt5。")
+    return 0
+
+
+def run_serve(args):
+    from core.job_server import create_server, shutdown_server, DEFAULT_WORKERS
+    from core.memory_budget import get_memory_budget, MB
+    if args.memory_mb:
+        get_memory_budget().max_bytes = int(args.memory_mb * MB)
+    httpd = create_server(args.output_root, host=args.host, port=args.port, verbose=args.verbose,
+                          workers=args.workers or DEFAULT_WORKERS, max_queued=args.max_queued,
+                          input_roots=args.input_root, timeout=args.timeout)
+    host, port = httpd.server_address[:2]
+    print(f"任务服务器已启动: http://{host}:{port}  (并发 {httpd.job_server.workers} 个任务，"
+          f"最多排队 {args.max_queued} 个)")
+    print(f"输出根目录: {httpd.job_server.output_root}")
+    if args.input_root:
+        print(f"允许的输入目录: {', '.join(httpd.job_server.input_roots)}")
+    print(get_memory_budget().describe())
+    print("按 Ctrl+C 停止。")
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    # 作为系统服务运行时 (如 systemd) 通过 SIGTERM 停止，与 Ctrl+C 一样先取消运行中的任务再退出
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在停止服务器...")
+    finally:
+        shutdown_server(httpd)
+
+
+def run_watch(args):
+    from core import watch_folder
+    settings = watch_folder.load_folder_settings(args.folder)
+    overrides = {"action": args.action, "output": args.output and os.path.abspath(args.output), "dpi": args.dpi,
+                 "pdf_quality": args.pdf_quality, "pdf_mode": args.mode, "img_quality": args.img_quality,
+                 "img_format": args.img_format, "effort": args.effort, "max_size": args.max_size,
+                 "min_saving": args.min_saving,
+                 "grayscale": args.grayscale, "resize_a4": args.resize_a4, "settle_seconds": args.settle,
+                 "debounce_seconds": args.debounce, "max_batch": args.max_batch, "poll_interval": args.interval}
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+    if args.save:
+        watch_folder.save_folder_settings(args.folder, settings)
+        print(f"已保存该文件夹的设置: {watch_folder.settings_path()}")
+    watcher = watch_folder.FolderWatcher(args.folder, settings, use_inotify=not args.poll)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        print("\n已停止监视。")
+        print(f"[监视] {watcher.describe()}")
+
+
+def run_catalog(args):
+    from core.catalog import get_catalog, KIND_NAMES
+    catalog = get_catalog()
+    stats = catalog.refresh(args.folder, verify_files=not args.quick,
+                            on_file=lambda path: print(f"   读取: {os.path.relpath(path, args.folder)}"))
+    print(f"[元数据目录] 列出 {stats['dirs_listed']} 个目录，沿用 {stats['dirs_reused']} 个；"
+          f"读取 {stats['files_inspected']} 个文件，沿用 {stats['files_reused']} 个，移除 {stats['removed']} 条，"
+          f"耗时 {stats['seconds']:.2f} 秒")
+    if args.list:
+        for entry in catalog.entries_under(args.folder):
+            flags = " [加密]" if entry.encrypted else ""
+            print(f"   {os.path.relpath(entry.path, args.folder)} | {entry.page_count or 0} 页 | "
+                  f"{entry.size / 1024:.0f} KB | {KIND_NAMES.get(entry.kind, entry.kind)}{flags}")
+    print(f"[元数据目录] {catalog.describe(args.folder)}")
+    print(f"   数据库: {catalog.db_path}")
+
+
+def run_server_check(args):
+    """在临时目录中生成小型测试文件，启动一个本机服务器，通过客户端把各类任务跑一遍。"""
+    import tempfile
+    import threading
+    from benchmarks.corpus import make_text_pdf, make_scanned_pdf, make_patent_pdf, make_image_tree
+    from core.job_server import create_server, shutdown_server
+    from core.job_client import JobClient, JobServerError
+
+    failures = []
+    def check(ok, message):
+        print(f"{'[成功]' if ok else '[失败]'} {message}")
+        if not ok:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory(prefix="pdf_toolbox_server_") as tmp:
+        inputs = os.path.join(tmp, "inputs")
+        os.makedirs(inputs)
+        text_pdf, scanned_pdf, patent_pdf = (os.path.join(inputs, name) for name in ("text.pdf", "scanned.pdf", "patent.pdf"))
+        tree = os.path.join(inputs, "tree")
+        make_text_pdf(text_pdf, 12)
+        make_scanned_pdf(scanned_pdf, 6)
+        make_patent_pdf(patent_pdf, 4)
+        make_image_tree(tree, depth=2, breadth=2, files_per_dir=2)
+
+        # 单个并发槽位 + 很小的排队上限，便于检查排队、取消和 429
+        httpd = create_server(os.path.join(tmp, "outputs"), port=0, workers=1, max_queued=2, input_roots=[inputs])
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        client = JobClient(f"http://127.0.0.1:{httpd.server_address[1]}")
+        try:
+            check(client.health()["status"] == "ok", "健康检查")
+            jobs = {
+                "merge": client.submit("merge", {"folder": tree, "resize_a4": True}),
+            }
+            client.wait(jobs["merge"]["id"], timeout=args.timeout)
+            slow = client.submit("compress", {"input": scanned_pdf, "dpi": 150})
+            while client.status(slow["id"])["status"] == "queued":
+                time.sleep(0.05)
+            jobs["split"] = client.submit("split", {"input": text_pdf, "every": 5})
+            jobs["patent-split"] = client.submit("patent-split", {"input": patent_pdf, "no_cache": True})
+            try:
+                client.submit("split", {"input": text_pdf, "range": "1-3"})
+                check(False, "排队已满时返回 429")
+            except JobServerError as e:
+                check(e.status == 429, "排队已满时返回 429")
+            cancelled = client.cancel(jobs.pop("patent-split")["id"])
+            check(cancelled["status"] == "cancelled", "取消排队中的任务")
+            jobs["patent-split"] = client.submit("patent-split", {"input": patent_pdf, "no_cache": True})
+            jobs["compress"] = slow
+            for name, job in jobs.items():
+                result = client.wait(job["id"], timeout=args.timeout)
+                check(result["status"] == "finished" and result["files"],
+                      f"{name}: {result['status']}，输出 {len(result['files'])} 个文件 {result['error'] or ''}".rstrip())
+            pipeline = client.submit("pipeline", {"input": tree, "merge": {"resize_a4": True}, "compress": {"dpi": 72},
+                                                  "split": {"every": 3}})
+            result = client.wait(pipeline["id"], timeout=args.timeout)
+            check(result["status"] == "finished" and len(result["files"]) > 1,
+                  f"pipeline: {result['status']}，输出 {len(result['files'])} 个文件 {result['error'] or ''}".rstrip())
+            progress = client.progress(jobs["split"]["id"])
+            check(progress["event"] and progress["event"]["fraction"] == 1.0, f"进度接口: {progress['description']}")
+            check("已完成" in client.log(jobs["compress"]["id"])["text"], "日志接口")
+            for job_type, params, expected in [("nope", {}, 400), ("split", {"input": "relative.pdf", "every": 2}, 400),
+                                               ("split", {"input": os.path.abspath(__file__), "every": 2}, 400),
+                                               ("split", {"input": text_pdf, "every": "x"}, 400),
+                                               ("pipeline", {"input": tree, "compress": True}, 400)]:
+                try:
+                    client.submit(job_type, params)
+                    check(False, f"无效请求 {job_type} {params} 被拒绝")
+                except JobServerError as e:
+                    check(e.status == expected, f"无效请求被拒绝 ({e})")
+            try:
+                client.status("no-such-job")
+                check(False, "不存在的任务返回 404")
+            except JobServerError as e:
+                check(e.status == 404, "不存在的任务返回 404")
+        finally:
+            shutdown_server(httpd)
+
+    print("\n[成功] 任务服务器检查全部通过。" if not failures else f"\n[失败] {len(failures)} 项检查未通过。")
+    return 1 if failures else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pdf-toolbox", description="PDF 工具箱命令行版 (无需图形界面)")
+    parser.add_argument("--trace", action="store_true",
+                        help="记录各阶段耗时，结束时输出汇总表并写出 Chrome trace 文件 (也可设置环境变量 PDF_TOOLBOX_TRACE=1)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("merge", help="合并文件夹中的PDF和图片")
+    p.add_argument("folder", help="输入文件夹")
+    p.add_argument("-o", "--output", help="输出PDF路径 (默认: 文件夹内 <文件夹名>_merged.pdf)")
+    p.add_argument("--resize-a4", action="store_true", help="将图片统一调整为A4页面尺寸")
+    p.add_argument("--read-ahead-mb", type=int, help=READ_AHEAD_HELP)
+    p.set_defaults(func=run_merge)
+
+    p = sub.add_parser("compress", help="压缩PDF和图片 (单个文件或整个文件夹)")
+    p.add_argument("input", help="输入文件或文件夹")
+    p.add_argument("-o", "--output", help="输出文件夹 (默认: 单个文件为同目录下的“压缩结果”，文件夹为同级的 <文件夹名>_压缩结果)")
+    p.add_argument("--dpi", type=int, default=96, help="PDF渲染DPI (默认 96)")
+    p.add_argument("--pdf-quality", type=int, default=65, help="PDF内部图片JPEG质量 (默认 65)")
+    p.add_argument("--img-quality", type=int, default=65, help="独立图片JPEG质量 (默认 65)")
+    p.add_argument("--max-size", type=int, default=1920, help="图片最长边像素，0 表示不缩放 (默认 1920)")
+    p.add_argument("--grayscale", action="store_true", help="强制转为灰度")
+    p.add_argument("--mode", choices=["render", "mrc"], default="render",
+                   help="PDF压缩方式: render 整页渲染为JPEG；mrc 分层压缩 (300 DPI 文字掩码 + 低分辨率背景，适合扫描的信函/表格)")
+    p.add_argument("--img-format", choices=["jpeg", "webp", "webp-lossless", "png", "auto"], default="jpeg",
+                   help="独立图片的输出格式；auto 按内容选择: 照片用 WebP，截图/图表用无损 WebP (默认 jpeg)")
+    p.add_argument("--effort", choices=["fast", "balanced", "max"], default="max",
+                   help="图片编码速度档位: fast 最快，max 体积最小 (默认 max)")
+    p.add_argument("--check", choices=["ssim", "psnr"], help="抽查压缩质量: 比较压缩前后的位图并逐个文件报告")
+    p.add_argument("--min-score", type=float, help="质量阈值 (默认 SSIM 0.93 / PSNR 22 dB，PSNR 只计有内容的区域)")
+    p.add_argument("--check-pages", type=int, default=4, help="每个PDF最多抽查的页数 (默认 4)")
+    p.add_argument("--raise-quality", action="store_true", help="抽查不合格时提高JPEG质量，重新编码整个文件")
+    p.add_argument("--min-saving", type=float, default=10,
+                   help="PDF体积至少减小的百分比，不足时输出原文件 (预计不足时直接跳过压缩，默认 10；--grayscale 时不适用)")
+    p.add_argument("--force", action="store_true", help="总是输出压缩结果，即使体积没有减小")
+    p.add_argument("--read-ahead-mb", type=int, help=READ_AHEAD_HELP)
+    p.set_defaults(func=run_compress)
+
+    p = sub.add_parser("split", help="按页码范围、页数、书签或文件大小拆分PDF")
+    p.add_argument("input", help="输入PDF")
+    mode = p.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--range", help="页码范围，如 \"1-3,5;8-\" (';' 分隔多个输出文件)")
+    mode.add_argument("--every", type=int, help="每 N 页一个文件")
+    mode.add_argument("--bookmarks", action="store_true", help="每个一级书签一个文件")
+    mode.add_argument("--max-mb", type=float, help="每个文件的大小上限 (MB)")
+    p.add_argument("-o", "--output", help="输出文件路径 (默认在源文件目录自动命名)")
+    p.set_defaults(func=run_split)
+
+    p = sub.add_parser("pipeline", help="合并 -> 压缩 -> 拆分 一次完成，阶段之间不写中间文件")
+    p.add_argument("input", help="输入文件夹 (先合并) 或PDF文件")
+    p.add_argument("-o", "--output", help="输出PDF路径，拆分时为输出文件名前缀 (默认: 与输入同级的 <输入名>_processed.pdf)")
+    p.add_argument("--resize-a4", action="store_true", help="合并: 将图片统一调整为A4页面尺寸")
+    p.add_argument("--compress", action="store_true", help="压缩合并结果 (或输入的PDF)")
+    p.add_argument("--dpi", type=int, default=96, help="压缩: PDF渲染DPI (默认 96)")
+    p.add_argument("--pdf-quality", type=int, default=65, help="压缩: JPEG质量 (默认 65)")
+    p.add_argument("--mode", choices=["render", "mrc"], default="render", help="压缩: PDF压缩方式 (默认 render)")
+    p.add_argument("--grayscale", action="store_true", help="压缩: 强制转为灰度")
+    p.add_argument("--check", choices=["ssim", "psnr"], help="压缩: 抽查压缩质量")
+    p.add_argument("--raise-quality", action="store_true", help="压缩: 抽查不合格时提高JPEG质量，重新编码整个文件")
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument("--range", help="拆分: 页码范围，如 \"1-3;4-\"")
+    mode.add_argument("--every", type=int, help="拆分: 每 N 页一个文件")
+    mode.add_argument("--bookmarks", action="store_true", help="拆分: 每个一级书签一个文件")
+    mode.add_argument("--max-mb", type=float, help="拆分: 每个文件的大小上限 (MB)")
+    p.set_defaults(func=run_pipeline)
+
+    p = sub.add_parser("patent-split", help="按页眉分割专利五书")
+    p.add_argument("input", help="专利PDF文件")
+    p.add_argument("-o", "--output", help="输出文件夹 (默认: 与源文件同名的文件夹)")
+    p.add_argument("--no-cache", action="store_true", help="不使用页面分类缓存")
+    p.set_defaults(func=run_patent_split)
+
+    p = sub.add_parser("to-images", help="将PDF页面导出为图片")
+    p.add_argument("input", help="输入PDF")
+    p.add_argument("-o", "--output", help="输出文件夹 (默认: <原文件名>_图片)")
+    p.add_argument("--format", choices=["png", "jpeg", "webp"], default="png")
+    p.add_argument("--dpi", type=int, default=150)
+    p.add_argument("--range", help="页码范围，留空表示全部页面")
+    p.add_argument("--quality", type=int, default=85, help="JPEG / WebP 质量")
+    p.add_argument("--grayscale", action="store_true")
+    p.add_argument("--workers", type=int, help="并行进程数")
+    p.set_defaults(func=run_to_images)
+
+    p = sub.add_parser("serve", help="以 HTTP/JSON 任务服务器方式运行 (合并/压缩/拆分/专利分割/流水线)")
+    p.add_argument("--output-root", required=True, help="任务输出根目录，每个任务一个子文件夹")
+    p.add_argument("--input-root", action="append", help="只允许处理此目录下的输入 (可重复指定)")
+    p.add_argument("--host", default="127.0.0.1", help="监听地址 (默认只允许本机访问)")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--workers", type=int, default=None, help="同时运行的任务数 (每个任务一个工作进程)")
+    p.add_argument("--max-queued", type=int, default=50, help="最多排队的任务数，超出时返回 429")
+    p.add_argument("--timeout", type=float, default=0, help="单个任务的超时秒数，0 表示不限制")
+    p.add_argument("--memory-mb", type=float, help="同时运行的任务估算内存峰值之和的上限 (默认: 物理内存的 60%%)")
+    p.add_argument("--verbose", action="store_true", help="输出每个 HTTP 请求")
+    p.set_defaults(func=run_serve)
+
+    p = sub.add_parser("watch", help="监视文件夹，新文件写入完成后自动批量压缩或合并")
+    p.add_argument("folder", help="监视的文件夹 (如扫描仪的共享收件箱)")
+    p.add_argument("--action", choices=["compress", "merge"], help="对每批新文件执行的操作 (默认 compress)")
+    p.add_argument("-o", "--output", help="输出文件夹 (默认: 监视文件夹内的“已处理”)")
+    p.add_argument("--dpi", type=int, help="压缩: PDF渲染DPI")
+    p.add_argument("--pdf-quality", type=int, help="压缩: PDF内部图片JPEG质量")
+    p.add_argument("--mode", choices=["render", "mrc"], help="压缩: PDF压缩方式 (默认 render)")
+    p.add_argument("--img-format", choices=["jpeg", "webp", "webp-lossless", "png", "auto"], help="压缩: 图片输出格式 (默认 jpeg)")
+    p.add_argument("--effort", choices=["fast", "balanced", "max"], help="压缩: 图片编码速度档位 (默认 max)")
+    p.add_argument("--img-quality", type=int, help="压缩: 独立图片JPEG质量")
+    p.add_argument("--max-size", type=int, help="压缩: 图片最长边像素，0 表示不缩放")
+    p.add_argument("--min-saving", type=float, help="压缩: PDF体积至少减小的百分比，不足时输出原文件 (默认 10)")
+    p.add_argument("--grayscale", action="store_true", default=None, help="压缩: 强制转为灰度")
+    p.add_argument("--no-grayscale", dest="grayscale", action="store_false", help="压缩: 不转为灰度 (覆盖已保存的设置)")
+    p.add_argument("--resize-a4", action="store_true", default=None, help="合并: 将图片统一调整为A4页面尺寸")
+    p.add_argument("--no-resize-a4", dest="resize_a4", action="store_false", help="合并: 不调整图片尺寸 (覆盖已保存的设置)")
+    p.add_argument("--settle", type=float, help="文件大小和修改时间保持不变多少秒后视为写入完成 (默认 5)")
+    p.add_argument("--debounce", type=float, help="最后一个新文件到达后再等待多少秒开始处理 (默认 10)")
+    p.add_argument("--max-batch", type=int, help="每批最多处理的文件数 (默认 50)")
+    p.add_argument("--interval", type=float, help="轮询间隔秒数 (默认 2)")
+    p.add_argument("--poll", action="store_true", help="不使用 inotify，只按间隔轮询 (网络共享上需要)")
+    p.add_argument("--save", action="store_true", help="把本次的设置保存为该文件夹的默认设置")
+    p.add_argument("--once", action="store_true", help="只处理当前已写入完成的文件，然后退出 (适合计划任务)")
+    p.set_defaults(func=run_watch)
+
+    p = sub.add_parser("catalog", help="增量刷新并查看文件夹的元数据目录 (供合并/压缩规划和进度估算使用)")
+    p.add_argument("folder", help="要登记的文件夹 (如网络共享上的资料目录)")
+    p.add_argument("--quick", action="store_true", help="目录未变化时不再逐个检查文件的修改时间")
+    p.add_argument("--list", action="store_true", help="列出每个文件的页数、大小和类型")
+    p.set_defaults(func=run_catalog)
+
+    p = sub.add_parser("server-check", help="在本机临时启动任务服务器，端到端检查各类任务")
+    p.add_argument("--timeout", type=float, default=120, help="每个任务的最长等待秒数")
+    p.set_defaults(func=run_server_check)
+
+    p = sub.add_parser("startup-check", help="测量命令行启动耗时并检查是否超出预算")
+    p.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=run_startup_check)
+    return parser
+
+
+COMMANDS = ("merge", "compress", "split", "pipeline", "patent-split", "to-images", "serve", "server-check", "watch", "catalog",
+            "startup-check")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from core import tracing
+    if args.trace:
+        tracing.set_enabled(True)
+    tracing.start_collecting(args.command)
+    try:
+        return args.func(args) or 0
+    finally:
+        collector = tracing.stop_collecting()
+        tracing.finish_and_report(collector)
+        if collector:
+            from core.doc_cache import get_document_cache
+            print(f"   {get_document_cache().describe()}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
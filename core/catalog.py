@@ -0,0 +1,384 @@
+# 文件: core/catalog.py
+
+# 输入文件目录的持久化元数据目录 (SQLite)。
+# 合并、压缩等功能反复处理网络共享上的同一批文件夹时，不必每次都重新列目录、打开每个PDF:
+#   - files: 路径、大小、修改时间、内容哈希、页数、页面尺寸、类型 (文字/扫描图片/混合/图片文件)、是否加密
+#   - dirs:  每个目录的修改时间及其子目录/文件列表；目录修改时间不变 (没有增删改名) 时直接使用记录的列表
+# 刷新是增量的: 只有大小或修改时间变化的文件才会被重新打开。
+# 数据库位于 ~/.pdf_toolbox/catalog/catalog.sqlite3，可用环境变量 PDF_TOOLBOX_CATALOG=0 关闭。
+
+import io
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from core.paths import app_data_dir
+
+CATALOG_ENV = "PDF_TOOLBOX_CATALOG"
+SCHEMA_VERSION = 1
+PDF_EXTENSIONS = ['.pdf']
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+# 超过此大小的文件不一次读入内存，分块计算哈希后再按路径打开
+READ_WHOLE_LIMIT = 256 * 1024 * 1024
+HASH_CHUNK = 1024 * 1024
+
+# 文件类型
+KIND_TEXT, KIND_IMAGE, KIND_MIXED, KIND_EMPTY = "text", "image", "mixed", "empty"
+KIND_IMAGE_FILE, KIND_LOCKED, KIND_UNREADABLE = "image-file", "locked", "unreadable"
+KIND_NAMES = {KIND_TEXT: "文字", KIND_IMAGE: "扫描图片", KIND_MIXED: "混合", KIND_EMPTY: "空白",
+              KIND_IMAGE_FILE: "图片文件", KIND_LOCKED: "需要密码", KIND_UNREADABLE: "无法读取"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT,
+    page_count INTEGER,
+    page_sizes TEXT,
+    kind TEXT,
+    encrypted INTEGER NOT NULL DEFAULT 0,
+    scanned_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL,
+    scanned_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+"""
+
+
+def is_enabled():
+    return os.environ.get(CATALOG_ENV, "1") not in ("", "0")
+
+
+class CatalogEntry:
+    """一个文件的元数据 (page_sizes 为 [(宽, 高), ...]，PDF 单位为点，图片文件为像素)"""
+    __slots__ = ("path", "size", "mtime_ns", "hash", "page_count", "page_sizes", "kind", "encrypted")
+
+    def __init__(self, path, size, mtime_ns, hash=None, page_count=None, page_sizes=None, kind=None, encrypted=False):
+        self.path, self.size, self.mtime_ns, self.hash = path, size, mtime_ns, hash
+        self.page_count, self.page_sizes, self.kind, self.encrypted = page_count, page_sizes or [], kind, bool(encrypted)
+
+    @classmethod
+    def from_row(cls, row):
+        path, size, mtime_ns, digest, page_count, page_sizes, kind, encrypted = row
+        return cls(path, size, mtime_ns, digest, page_count,
+                   [tuple(s) for s in json.loads(page_sizes)] if page_sizes else [], kind, encrypted)
+
+
+def _classify(doc):
+    """按每页有无字体/图片判断: 全部有文字为 text，没有文字只有图片为 image"""
+    with_text = with_images = 0
+    for page in doc:
+        has_text = bool(page.get_fonts())
+        with_text += has_text
+        with_images += (not has_text) and bool(page.get_images())
+    if with_text == len(doc) and with_text:
+        return KIND_TEXT
+    if with_images == len(doc) and with_images:
+        return KIND_IMAGE
+    return KIND_MIXED if with_text or with_images else KIND_EMPTY
+
+
+def inspect_file(path, st=None):
+    """打开文件读取元数据 (只读取一次文件内容，同时计算哈希)，返回 CatalogEntry"""
+    import fitz  # PyMuPDF
+    st = st or os.stat(path)
+    ext = os.path.splitext(path)[1].lower()
+    entry = CatalogEntry(os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    try:
+        if ext in IMAGE_EXTENSIONS:
+            from PIL import Image
+            with open(path, "rb") as f:
+                data = f.read()
+            entry.hash = hashlib.sha1(data).hexdigest()
+            with Image.open(io.BytesIO(data)) as img:
+                entry.page_count, entry.page_sizes, entry.kind = 1, [img.size], KIND_IMAGE_FILE
+            return entry
+        if st.st_size <= READ_WHOLE_LIMIT:
+            with open(path, "rb") as f:
+                data = f.read()
+            entry.hash = hashlib.sha1(data).hexdigest()
+            doc = fitz.open("pdf", data)
+        else:
+            h = hashlib.sha1()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                    h.update(chunk)
+            entry.hash = h.hexdigest()
+            doc = fitz.open(path)
+        with doc:
+            entry.encrypted = bool(doc.is_encrypted or doc.needs_pass)
+            entry.page_count = len(doc)
+            if doc.needs_pass:
+                entry.kind = KIND_LOCKED
+            else:
+                entry.page_sizes = [(page.rect.width, page.rect.height) for page in doc]
+                entry.kind = _classify(doc)
+    except Exception:
+        entry.kind = KIND_UNREADABLE
+    return entry
+
+
+class Catalog:
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(app_data_dir("catalog"), "catalog.sqlite3")
+        self._lock = threading.RLock()
+        # 任务线程和界面线程共用一个连接 (由锁保护)；工作进程各自打开自己的连接
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # 格式变化时丢弃旧数据，重新扫描即可
+            self._conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS dirs;")
+            self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    # --- 查询 ---
+    def lookup(self, path, verify=True):
+        """
+        返回文件的 CatalogEntry；verify=True 时先比较当前的大小和修改时间，
+        不一致 (或未登记) 时重新读取并更新目录。
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute("SELECT path, size, mtime_ns, hash, page_count, page_sizes, kind, encrypted "
+                                     "FROM files WHERE path=?", (path,)).fetchone()
+        entry = CatalogEntry.from_row(row) if row else None
+        if not verify and entry is not None:
+            return entry
+        st = os.stat(path)
+        if entry is not None and (entry.size, entry.mtime_ns) == (st.st_size, st.st_mtime_ns):
+            return entry
+        entry = inspect_file(path, st)
+        with self._lock:
+            self._store(entry)
+            self._conn.commit()
+        return entry
+
+    def page_count(self, path):
+        return self.lookup(path).page_count or 0
+
+    def entries_under(self, root):
+        """目录中已登记的全部文件 (按路径排序)，不访问文件系统"""
+        root = os.path.abspath(root)
+        prefix = root.rstrip(os.sep) + os.sep
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size, mtime_ns, hash, page_count, page_sizes, kind, encrypted FROM files "
+                "WHERE path=? OR substr(path, 1, ?)=? ORDER BY path", (root, len(prefix), prefix)).fetchall()
+        return [CatalogEntry.from_row(row) for row in rows]
+
+    def snapshot(self, root, extensions=None):
+        """
+        只读的快速查询: 不打开任何文件，也不修改目录，返回目录树 (或单个文件) 的 CatalogEntry 列表 (按路径排序)。
+        目录修改时间与记录一致时使用记录的列表，否则重新列出该目录；未登记或已变化的文件只有 stat 得到的
+        大小和修改时间 (page_count 为 None)。用于界面线程、请求处理中的预览和内存估算，目录未预热时也不会卡住。
+        """
+        root = os.path.abspath(root)
+        if os.path.isfile(root):
+            return [self._snapshot_file(root)]
+        entries, pending = [], [root]
+        while pending:
+            current = pending.pop()
+            try:
+                dir_mtime = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            with self._lock:
+                row = self._conn.execute("SELECT mtime_ns FROM dirs WHERE path=?", (current,)).fetchone()
+                if row and row[0] == dir_mtime:
+                    pending.extend(r[0] for r in self._conn.execute("SELECT path FROM dirs WHERE parent=?", (current,)))
+                    entries.extend(CatalogEntry.from_row(r) for r in self._conn.execute(
+                        "SELECT path, size, mtime_ns, hash, page_count, page_sizes, kind, encrypted FROM files "
+                        "WHERE dir=?", (current,)))
+                    continue
+            try:
+                with os.scandir(current) as it:
+                    children = list(it)
+            except OSError:
+                continue
+            for child in children:
+                if child.is_dir(follow_symlinks=False):
+                    pending.append(child.path)
+                elif os.path.splitext(child.name)[1].lower() in PDF_EXTENSIONS + IMAGE_EXTENSIONS:
+                    try:
+                        entries.append(self._snapshot_file(child.path, child.stat()))
+                    except OSError:
+                        pass
+        return sorted((e for e in entries if extensions is None or os.path.splitext(e.path)[1].lower() in extensions),
+                      key=lambda e: e.path)
+
+    def _snapshot_file(self, path, st=None):
+        """已登记且未变化时为记录的元数据，否则为只有大小的条目 (图片文件的类型由扩展名判断)"""
+        st = st or os.stat(path)
+        with self._lock:
+            row = self._conn.execute("SELECT path, size, mtime_ns, hash, page_count, page_sizes, kind, encrypted "
+                                     "FROM files WHERE path=?", (path,)).fetchone()
+        if row and (row[1], row[2]) == (st.st_size, st.st_mtime_ns):
+            return CatalogEntry.from_row(row)
+        kind = KIND_IMAGE_FILE if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS else None
+        return CatalogEntry(path, st.st_size, st.st_mtime_ns, kind=kind)
+
+    def list_files(self, root, extensions=None, verify_files=False):
+        """刷新目录后返回其中的文件路径 (可按扩展名过滤)，用于代替 os.walk"""
+        if os.path.isfile(root):
+            return [os.path.abspath(root)]
+        self.refresh(root, verify_files=verify_files)
+        return [e.path for e in self.entries_under(root)
+                if extensions is None or os.path.splitext(e.path)[1].lower() in extensions]
+
+    # --- 增量刷新 ---
+    def refresh(self, root, verify_files=True, on_file=None):
+        """
+        增量刷新一个目录树，返回统计字典。
+          - 目录修改时间与记录一致时使用记录的子项列表，不重新列目录
+          - verify_files=True 时逐个比较文件的大小/修改时间 (可发现原地改写的文件)；
+            False 时只要目录未变就完全信任记录，刷新一个未变的目录树只需每个目录一次 stat
+          - on_file(path) 在打开新文件或已变化的文件前回调 (用于显示进度)
+        """
+        root = os.path.abspath(root)
+        stats = {"dirs_listed": 0, "dirs_reused": 0, "files_inspected": 0, "files_reused": 0, "removed": 0}
+        started = time.time()
+        pending = [(root, None)]
+        while pending:
+            current, parent = pending.pop()
+            try:
+                dir_mtime = os.stat(current).st_mtime_ns
+            except OSError:
+                self._forget_dir(current, stats)
+                continue
+            with self._lock:
+                row = self._conn.execute("SELECT mtime_ns FROM dirs WHERE path=?", (current,)).fetchone()
+            if row and row[0] == dir_mtime:
+                stats["dirs_reused"] += 1
+                with self._lock:
+                    subdirs = [r[0] for r in self._conn.execute("SELECT path FROM dirs WHERE parent=?", (current,))]
+                    known = {r[0]: (r[1], r[2]) for r in self._conn.execute(
+                        "SELECT path, size, mtime_ns FROM files WHERE dir=?", (current,))}
+                files = list(known)
+            else:
+                stats["dirs_listed"] += 1
+                subdirs, files = self._list_dir(current, stats)
+                known = None
+            for sub in subdirs:
+                pending.append((sub, current))
+            self._refresh_files(current, files, known, verify_files, on_file, stats)
+            with self._lock:
+                self._conn.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime_ns, scanned_at) VALUES (?, ?, ?, ?)",
+                                   (current, parent, dir_mtime, time.time()))
+                self._conn.commit()
+        stats["seconds"] = time.time() - started
+        return stats
+
+    def _list_dir(self, current, stats):
+        """列出目录，同时清理记录中已不存在的子目录和文件"""
+        subdirs, files = [], []
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in PDF_EXTENSIONS + IMAGE_EXTENSIONS:
+                        files.append(entry.path)
+        except OSError:
+            pass
+        with self._lock:
+            for (old,) in self._conn.execute("SELECT path FROM dirs WHERE parent=?", (current,)).fetchall():
+                if old not in subdirs:
+                    self._forget_dir(old, stats)
+            present = set(files)
+            stale = [p for (p,) in self._conn.execute("SELECT path FROM files WHERE dir=?", (current,)) if p not in present]
+            self._conn.executemany("DELETE FROM files WHERE path=?", [(p,) for p in stale])
+        stats["removed"] += len(stale)
+        return subdirs, files
+
+    def _refresh_files(self, current, files, known, verify_files, on_file, stats):
+        if known is None:
+            with self._lock:
+                known = {r[0]: (r[1], r[2]) for r in self._conn.execute(
+                    "SELECT path, size, mtime_ns FROM files WHERE dir=?", (current,))}
+        for path in files:
+            if path in known and not verify_files:
+                stats["files_reused"] += 1
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                with self._lock:
+                    self._conn.execute("DELETE FROM files WHERE path=?", (path,))
+                stats["removed"] += 1
+                continue
+            if known.get(path) == (st.st_size, st.st_mtime_ns):
+                stats["files_reused"] += 1
+                continue
+            if on_file:
+                on_file(path)
+            entry = inspect_file(path, st)
+            stats["files_inspected"] += 1
+            with self._lock:
+                self._store(entry)
+
+    def _forget_dir(self, path, stats=None):
+        """删除一个目录及其下所有记录"""
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM files WHERE dir=? OR substr(dir, 1, ?)=?",
+                                         (path, len(prefix), prefix)).rowcount
+            self._conn.execute("DELETE FROM dirs WHERE path=? OR substr(path, 1, ?)=?", (path, len(prefix), prefix))
+        if stats is not None:
+            stats["removed"] += removed
+
+    def _store(self, entry):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files (path, dir, size, mtime_ns, hash, page_count, page_sizes, kind, encrypted, scanned_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (entry.path, os.path.dirname(entry.path), entry.size, entry.mtime_ns, entry.hash, entry.page_count,
+             json.dumps(entry.page_sizes), entry.kind, int(entry.encrypted), time.time()))
+
+    # --- 汇总 ---
+    def summary(self, root):
+        """目录树的汇总 (只查询数据库)"""
+        entries = self.entries_under(root)
+        kinds = {}
+        for e in entries:
+            kinds[e.kind] = kinds.get(e.kind, 0) + 1
+        return {"files": len(entries),
+                "pdfs": sum(1 for e in entries if e.kind != KIND_IMAGE_FILE),
+                "images": kinds.get(KIND_IMAGE_FILE, 0),
+                "pages": sum(e.page_count or 0 for e in entries),
+                "bytes": sum(e.size for e in entries),
+                "encrypted": sum(1 for e in entries if e.encrypted),
+                "kinds": kinds}
+
+    def describe(self, root):
+        s = self.summary(root)
+        kinds = "，".join(f"{KIND_NAMES.get(k, k)} {n}" for k, n in sorted(s["kinds"].items(), key=lambda kv: -kv[1]))
+        return (f"{s['files']} 个文件 ({s['pdfs']} 个PDF，{s['images']} 张图片) | {s['pages']} 页 | "
+                f"{s['bytes'] / 1024 / 1024:.1f} MB | 加密 {s['encrypted']} 个" + (f" | {kinds}" if kinds else ""))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_catalog = None
+_default_lock = threading.Lock()
+
+def get_catalog():
+    """进程内唯一的元数据目录 (关闭持久化时使用内存数据库，调用方式不变，只是不跨次运行保留)"""
+    global _default_catalog
+    with _default_lock:
+        if _default_catalog is None:
+            _default_catalog = Catalog() if is_enabled() else Catalog(":memory:")
+        return _default_catalog
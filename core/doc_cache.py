@@ -0,0 +1,207 @@
+# 文件: core/doc_cache.py
+
+# 进程内共享的文档缓存 (LRU，按内存大小限制)。
+# 同一个文件在合并 -> 拆分 -> 压缩 等多个功能之间、以及同一功能的多个步骤之间只解析一次:
+#   - 元数据: 页数、页面尺寸、每页图片 xref、书签、页眉文字样本
+#   - 已打开的文档句柄 (可选): 从内存中的文件内容打开，不占用文件锁，借出期间其他任务不会共用
+# 缓存键为 (绝对路径, 文件大小, 修改时间)，文件被改写后旧条目自然失效。
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import fitz  # PyMuPDF
+
+from core.tracing import span
+
+DEFAULT_MAX_BYTES = int(os.environ.get("PDF_TOOLBOX_DOC_CACHE_MB", "256")) * 1024 * 1024
+# 超过缓存容量此比例的文件不保留句柄，直接按路径打开
+MAX_HANDLE_FRACTION = 0.25
+
+
+def file_key(path):
+    """(绝对路径, 大小, 修改时间)；文件不存在时抛出 OSError"""
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+class DocumentInfo:
+    """一个PDF文件的元数据。header_samples 按页眉高度阈值懒加载。"""
+    def __init__(self, key, doc):
+        self.path, self.file_size, self.mtime_ns = key
+        self.page_count = len(doc)
+        self.page_sizes = [(page.rect.width, page.rect.height) for page in doc]
+        self.image_xrefs = [[img[0] for img in doc.get_page_images(i)] for i in range(self.page_count)]
+        self.toc = doc.get_toc(simple=True)
+        self.header_samples = {}
+
+    def approx_bytes(self):
+        size = 256 + self.page_count * 64 + sum(len(x) for x in self.image_xrefs) * 8 + len(self.toc) * 96
+        for samples in self.header_samples.values():
+            size += sum(len(s) * 4 + 48 for s in samples)
+        return size
+
+
+def header_sample(page, header_y_threshold):
+    """页面顶部 header_y_threshold 以内的文字 (去掉空白)，按字符顶端判断，与 pdfplumber 的 top 含义一致"""
+    chars = []
+    for block in page.get_text("rawdict", clip=fitz.Rect(0, 0, page.rect.width, header_y_threshold))["blocks"]:
+        for line in block.get("lines", []):
+            for span_ in line["spans"]:
+                chars.extend(c["c"] for c in span_["chars"] if c["bbox"][1] < header_y_threshold)
+    return "".join(chars).replace(" ", "").replace("\n", "")
+
+
+class DocumentCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, keep_handles=True):
+        self.max_bytes = max_bytes
+        self.keep_handles = keep_handles
+        self._infos = OrderedDict()     # key -> DocumentInfo
+        self._handles = OrderedDict()   # key -> 空闲的已打开文档
+        self._lock = threading.RLock()
+        self.hits = self.misses = 0
+        self.handle_hits = self.handle_misses = 0
+
+    # --- 文档句柄 ---
+    @contextmanager
+    def open(self, path, data=None):
+        """
+        借出一个已打开的文档 (with 块结束后归还)。
+        缓存中有空闲句柄时直接复用，否则新打开；调用方不应修改借出的文档。
+        data 为已经读入内存的文件内容 (如预读)，新打开时直接使用，不再读取文件。
+        """
+        key = file_key(path)
+        with self._lock:
+            doc = self._handles.pop(key, None)
+            if doc is not None:
+                self.handle_hits += 1
+            else:
+                self.handle_misses += 1
+        if doc is None:
+            doc = self._open_new(key, data)
+        try:
+            yield doc
+        finally:
+            self._return_handle(key, doc)
+
+    def _cacheable(self, key):
+        return self.keep_handles and key[1] <= self.max_bytes * MAX_HANDLE_FRACTION
+
+    def _open_new(self, key, data=None):
+        with span("open", file=os.path.basename(key[0])):
+            if data is not None:
+                return fitz.open("pdf", data)
+            if self._cacheable(key):
+                # 从内存打开，不会在 Windows 上锁住文件 (用户仍可覆盖或删除原文件)
+                with open(key[0], "rb") as f:
+                    return fitz.open("pdf", f.read())
+            return fitz.open(key[0])
+
+    def _return_handle(self, key, doc):
+        if doc.is_closed:
+            return
+        if not self._cacheable(key):
+            doc.close()
+            return
+        with self._lock:
+            if key in self._handles:
+                doc.close()  # 已经有另一个空闲句柄
+                return
+            self._handles[key] = doc
+            self._evict()
+
+    # --- 元数据 ---
+    def info(self, path):
+        """返回文件的 DocumentInfo (页数、页面尺寸、图片 xref、书签)"""
+        key = file_key(path)
+        with self._lock:
+            info = self._infos.get(key)
+            if info is not None:
+                self._infos.move_to_end(key)
+                self.hits += 1
+                return info
+            self.misses += 1
+        with self.open(path) as doc:
+            info = DocumentInfo(key, doc)
+        with self._lock:
+            self._infos[key] = info
+            self._evict()
+        return info
+
+    def page_count(self, path):
+        return self.info(path).page_count
+
+    def header_samples(self, path, header_y_threshold=100):
+        """每页页眉区域的文字样本列表 (用 PyMuPDF 提取，比逐字符解析快得多)"""
+        info = self.info(path)
+        samples = info.header_samples.get(header_y_threshold)
+        if samples is not None:
+            with self._lock:
+                self.hits += 1
+            return samples
+        with self._lock:
+            self.misses += 1
+        with self.open(path) as doc, span("header_samples", pages=len(doc)):
+            samples = [header_sample(page, header_y_threshold) for page in doc]
+        with self._lock:
+            info.header_samples[header_y_threshold] = samples
+            self._evict()
+        return samples
+
+    # --- 容量与统计 ---
+    def _used_bytes(self):
+        return (sum(info.approx_bytes() for info in self._infos.values())
+                + sum(key[1] for key in self._handles))
+
+    def _evict(self):
+        """超出容量时先淘汰最久未用的句柄，再淘汰元数据"""
+        while self._handles and self._used_bytes() > self.max_bytes:
+            _, doc = self._handles.popitem(last=False)
+            doc.close()
+        while len(self._infos) > 1 and self._used_bytes() > self.max_bytes:
+            self._infos.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            for doc in self._handles.values():
+                doc.close()
+            self._handles.clear()
+            self._infos.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            handle_lookups = self.handle_hits + self.handle_misses
+            return {
+                "documents": len(self._infos),
+                "open_handles": len(self._handles),
+                "used_bytes": self._used_bytes(),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "handle_hits": self.handle_hits, "handle_misses": self.handle_misses,
+                "handle_hit_rate": self.handle_hits / handle_lookups if handle_lookups else 0.0,
+            }
+
+    def describe(self):
+        return describe_stats(self.stats())
+
+
+def describe_stats(s):
+    """把 stats() 的结果格式化为一行说明 (也用于显示工作进程传回的统计)"""
+    return (f"文档缓存: {s['documents']} 个文件 / {s['open_handles']} 个句柄 | "
+            f"{s['used_bytes'] / 1024 / 1024:.1f}/{s['max_bytes'] / 1024 / 1024:.0f} MB | "
+            f"元数据命中率 {s['hit_rate']:.0%} | 句柄命中率 {s['handle_hit_rate']:.0%}")
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_document_cache():
+    """进程内唯一的文档缓存"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DocumentCache()
+        return _default_cache
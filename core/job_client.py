@@ -0,0 +1,86 @@
+# 文件: core/job_client.py
+
+# 任务服务器 (core/job_server.py) 的客户端，只依赖标准库。
+#
+#     client = JobClient("http://127.0.0.1:8765")
+#     job = client.submit("split", {"input": "/share/a.pdf", "every": 10})
+#     job = client.wait(job["id"], on_log=print)
+#     print(job["status"], job["files"])
+
+import json
+import time
+import urllib.error
+import urllib.request
+
+from core.job_server import DEFAULT_HOST, DEFAULT_PORT, FINISHED, FAILED, CANCELLED
+
+
+class JobServerError(Exception):
+    """服务器返回了错误 (status 为 HTTP 状态码)"""
+    def __init__(self, status, message):
+        super().__init__(f"[{status}] {message}")
+        self.status = status
+        self.message = message
+
+
+class JobClient:
+    def __init__(self, base_url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method, path, data=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8") if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8")).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise JobServerError(e.code, message) from None
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def submit(self, job_type, params, priority=1):
+        return self._request("POST", "/jobs", {"type": job_type, "params": params, "priority": priority})
+
+    def jobs(self):
+        return self._request("GET", "/jobs")["jobs"]
+
+    def status(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def progress(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}/progress")
+
+    def log(self, job_id, offset=0):
+        return self._request("GET", f"/jobs/{job_id}/log?offset={offset}")
+
+    def cancel(self, job_id):
+        return self._request("DELETE", f"/jobs/{job_id}")
+
+    def wait(self, job_id, poll_interval=0.2, timeout=None, on_log=None, on_progress=None):
+        """
+        轮询直到任务结束，返回最终状态。
+        on_log(text) 接收新增的日志，on_progress(progress) 接收进度接口的返回值。
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        offset = 0
+        while True:
+            job = self.status(job_id)
+            if on_log:
+                chunk = self.log(job_id, offset)
+                offset = chunk["offset"]
+                if chunk["text"]:
+                    on_log(chunk["text"])
+            if on_progress:
+                on_progress(self.progress(job_id))
+            if job["status"] in (FINISHED, FAILED, CANCELLED):
+                return job
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"等待任务 {job_id} 超时。")
+            time.sleep(poll_interval)
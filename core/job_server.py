@@ -0,0 +1,501 @@
+# 文件: core/job_server.py
+
+# 任务服务器: 把 合并 / 压缩 / 拆分 / 专利分割 / 流水线 以 HTTP/JSON 接口提供给局域网内的其他人使用，
+# 重活集中在一台机器上完成。只依赖标准库，不导入 PyQt5。
+#
+#   POST   /jobs                  提交任务 {"type": "split", "params": {...}, "priority": 1}
+#   GET    /jobs                  所有任务的状态
+#   GET    /jobs/<id>             任务状态、错误信息、输出文件 (相对于输出根目录的路径)
+#   GET    /jobs/<id>/progress    最近一次进度事件
+#   GET    /jobs/<id>/log?offset=N  从 offset 开始的日志文本
+#   DELETE /jobs/<id>             取消排队中或运行中的任务
+#   GET    /health                服务器状态
+#
+# 每个任务由现有的任务函数在工作进程中执行 (core.process_runner)，
+# 输出写入 <输出根目录>/<任务编号>/；排队任务数超过上限时返回 429。
+# 任务开始前经过内存准入 (core.memory_budget)，估算的内存峰值放不下时留在队列中等待。
+
+import os
+import re
+import json
+import time
+import heapq
+import itertools
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from core import process_runner
+from core.memory_budget import get_memory_budget, estimate_task
+from core.progress import describe_progress
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUED = 50
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+# 每个任务保留的日志上限 (字符)，超出后丢弃最早的部分
+LOG_LIMIT = 1_000_000
+# 最多保留的已结束任务数 (之后最早结束的任务从列表中移除，输出文件不受影响)
+MAX_FINISHED_JOBS = 1000
+# 队列头部的任务因内存不足而等待时，每隔多少秒重新检查一次
+MEMORY_RETRY_SECONDS = 1.0
+
+QUEUED, RUNNING, FINISHED, FAILED, CANCELLED = "queued", "running", "finished", "failed", "cancelled"
+
+
+class JobRequestError(ValueError):
+    """提交的任务参数无效 (返回 400)"""
+
+
+# --- 任务类型: 参数校验并转换为 (任务函数, 关键字参数) ---
+
+def _require(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        raise JobRequestError(f"缺少参数 '{name}'。")
+    return value
+
+def _build_merge(params, output_dir):
+    from core.pdf_merger import merge_files
+    folder = params["folder"]
+    output = os.path.join(output_dir, f"{os.path.basename(os.path.abspath(folder))}_merged.pdf")
+    return merge_files, {"root_folder": folder, "output_filepath": output,
+                         "resize_images": bool(params.get("resize_a4", False)), **_read_ahead(params)}
+
+def _build_compress(params, output_dir):
+    from core.pdf_compressor import compress_path
+    image_format, effort = _image_options(params)
+    return compress_path, {"input_path": params["input"], "output_path": output_dir,
+                           "dpi": int(params.get("dpi", 96)),
+                           "pdf_quality": int(params.get("pdf_quality", 65)),
+                           "img_quality": int(params.get("img_quality", 65)),
+                           "max_size": int(params.get("max_size", 1920)),
+                           "to_grayscale": bool(params.get("grayscale", False)),
+                           "pdf_mode": _pdf_mode(params),
+                           "quality_guard": _quality_guard(params),
+                           "image_format": image_format, "effort": effort,
+                           "min_saving": None if params.get("force") else float(params.get("min_saving", 10)) / 100,
+                           **_read_ahead(params)}
+
+def _read_ahead(params):
+    """参数 read_ahead_mb: 预读的内存上限 (MB)，未指定时使用任务函数的默认值"""
+    return {} if params.get("read_ahead_mb") is None else {"read_ahead_mb": int(params["read_ahead_mb"])}
+
+def _quality_guard(params):
+    """参数 check 为 ssim/psnr 时启用质量抽查 (min_score、check_pages、raise_quality 可选)"""
+    if not params.get("check"):
+        return None
+    from core.quality_guard import QualityGuard
+    min_score = params.get("min_score")
+    return QualityGuard(params["check"], threshold=None if min_score is None else float(min_score),
+                        sample_pages=int(params.get("check_pages", 4)), retry=bool(params.get("raise_quality", False)))
+
+def _pdf_mode(params):
+    from core.pdf_compressor import PDF_MODES
+    mode = params.get("mode", "render")
+    if mode not in PDF_MODES:
+        raise JobRequestError(f"未知的压缩方式: {mode!r} (可选: {', '.join(PDF_MODES)})")
+    return mode
+
+def _image_options(params):
+    """独立图片的输出格式 (img_format) 和编码档位 (effort)"""
+    from core.pdf_compressor import IMAGE_FORMATS, EFFORT_PRESETS
+    image_format, effort = params.get("img_format", "jpeg"), params.get("effort", "max")
+    if image_format not in IMAGE_FORMATS:
+        raise JobRequestError(f"未知的图片格式: {image_format!r} (可选: {', '.join(IMAGE_FORMATS)})")
+    if effort not in EFFORT_PRESETS:
+        raise JobRequestError(f"未知的编码档位: {effort!r} (可选: {', '.join(EFFORT_PRESETS)})")
+    return image_format, effort
+
+def _split_mode(params):
+    """拆分方式: every / bookmarks / max_mb / range 之一"""
+    if params.get("every"):
+        return "count", int(params["every"])
+    if params.get("bookmarks"):
+        return "bookmark", None
+    if params.get("max_mb"):
+        return "size", float(params["max_mb"])
+    return "range", _require(params, "range")
+
+def _build_split(params, output_dir):
+    from core.pdf_splitter import split_pdf_by_mode
+    mode, value = _split_mode(params)
+    output = os.path.join(output_dir, os.path.basename(params["input"]))
+    return split_pdf_by_mode, {"input_path": params["input"], "mode": mode, "value": value, "output_path": output}
+
+def _build_patent_split(params, output_dir):
+    from core.patent_splitter import split_patent_pdf
+    return split_patent_pdf, {"input_pdf_path": params["input"], "output_dir": output_dir,
+                              "use_cache": not params.get("no_cache", False)}
+
+def _stage_params(params, name):
+    """流水线阶段的参数: 省略或 false 表示不执行该阶段，true 表示全部使用默认值"""
+    value = params.get(name)
+    if value is None or value is False:
+        return None
+    if value is True:
+        return {}
+    if not isinstance(value, dict):
+        raise JobRequestError(f"参数 '{name}' 应为 true 或对象: {value!r}")
+    return value
+
+def _build_pipeline(params, output_dir):
+    """
+    合并 -> 压缩 -> 拆分 流水线，各阶段的参数与对应任务类型相同:
+    {"input": ..., "merge": {"resize_a4": true}, "compress": {"dpi": 96, "mode": "mrc"}, "split": {"max_mb": 10}}
+    """
+    from core.pipeline import run_pipeline, plan_pipeline
+    stages = {}
+    merge = _stage_params(params, "merge")
+    if merge is not None:
+        stages["merge"] = {"resize_images": bool(merge.get("resize_a4", False))}
+    compress = _stage_params(params, "compress")
+    if compress is not None:
+        stages["compress"] = {"pdf_mode": _pdf_mode(compress), "dpi": int(compress.get("dpi", 96)),
+                              "quality": int(compress.get("pdf_quality", 65)),
+                              "to_grayscale": bool(compress.get("grayscale", False)),
+                              "quality_guard": _quality_guard(compress)}
+    split = _stage_params(params, "split")
+    if split is not None:
+        mode, value = _split_mode(split)
+        stages["split"] = {"mode": mode, "value": value}
+    plan_pipeline(params["input"], stages)
+    name = os.path.splitext(os.path.basename(os.path.abspath(params["input"])))[0]
+    return run_pipeline, {"input_path": params["input"], "output_path": os.path.join(output_dir, f"{name}.pdf"),
+                          "stages": stages}
+
+# 任务类型 -> (必须是已存在路径的参数, 构造函数)
+JOB_TYPES = {
+    "merge": ("folder", _build_merge),
+    "compress": ("input", _build_compress),
+    "split": ("input", _build_split),
+    "patent-split": ("input", _build_patent_split),
+    "pipeline": ("input", _build_pipeline),
+}
+
+
+class ServerJob:
+    def __init__(self, job_id, job_type, params, priority):
+        self.id = job_id
+        self.type = job_type
+        self.params = params
+        self.priority = priority
+        self.status = QUEUED
+        self.error = None
+        self.files = []
+        self.progress = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.memory_estimate = 0
+        self.waiting_for_memory = False
+        self._log = []
+        self._log_size = 0
+        self._log_dropped = 0
+        self._lock = threading.Lock()
+
+    def append_log(self, text):
+        with self._lock:
+            self._log.append(text)
+            self._log_size += len(text)
+            while self._log_size > LOG_LIMIT and len(self._log) > 1:
+                dropped = self._log.pop(0)
+                self._log_size -= len(dropped)
+                self._log_dropped += len(dropped)
+
+    def read_log(self, offset=0):
+        """返回 (文本, 下一次读取的 offset)；offset 是从任务开始算起的字符位置"""
+        with self._lock:
+            text = "".join(self._log)
+            start = max(0, offset - self._log_dropped)
+            return text[start:], self._log_dropped + len(text)
+
+    def to_dict(self):
+        data = {
+            "id": self.id, "type": self.type, "params": self.params, "priority": self.priority,
+            "status": self.status, "error": self.error, "files": self.files,
+            "submitted_at": self.submitted_at, "started_at": self.started_at, "finished_at": self.finished_at,
+            "memory_estimate": self.memory_estimate, "waiting_for_memory": self.waiting_for_memory,
+        }
+        if self.progress is not None:
+            data["fraction"] = self.progress.fraction
+        return data
+
+    def progress_dict(self):
+        if self.progress is None:
+            return {"id": self.id, "status": self.status, "event": None, "description": ""}
+        return {"id": self.id, "status": self.status, "event": self.progress.to_dict(),
+                "description": describe_progress(self.progress)}
+
+
+class JobServer:
+    """
+    任务调度部分 (与 HTTP 无关，可以单独使用)。
+    workers 个调度线程各自从优先级队列中取任务，交给工作进程执行。
+    """
+    def __init__(self, output_root, workers=DEFAULT_WORKERS, max_queued=DEFAULT_MAX_QUEUED,
+                 input_roots=None, timeout=0):
+        self.output_root = os.path.abspath(output_root)
+        os.makedirs(self.output_root, exist_ok=True)
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.input_roots = [os.path.realpath(p) for p in (input_roots or [])]
+        self.timeout = timeout
+        self.jobs = {}
+        self._pending = []
+        self._order = itertools.count()
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._threads = []
+        process_runner.set_max_idle_workers(self.workers)
+
+    # --- 提交与查询 ---
+    def _check_input(self, path):
+        if not isinstance(path, str) or not os.path.isabs(path):
+            raise JobRequestError(f"输入路径必须是服务器上的绝对路径: {path!r}")
+        real = os.path.realpath(path)
+        if self.input_roots and not any(os.path.commonpath([real, root]) == root for root in self.input_roots):
+            raise JobRequestError(f"输入路径不在允许的目录中: {path}")
+        if not os.path.exists(real):
+            raise JobRequestError(f"输入路径不存在: {path}")
+
+    def submit(self, job_type, params, priority=1):
+        if job_type not in JOB_TYPES:
+            raise JobRequestError(f"未知的任务类型 '{job_type}'。可选: {', '.join(JOB_TYPES)}")
+        if not isinstance(params, dict):
+            raise JobRequestError("params 必须是一个对象。")
+        input_key, build = JOB_TYPES[job_type]
+        self._check_input(_require(params, input_key))
+        try:
+            # 先试着构造一次任务参数 (不会执行任务)，尽早发现数值格式等错误
+            func, kwargs = build(params, self.output_root)
+        except (TypeError, ValueError) as e:
+            raise JobRequestError(f"参数无效: {e}") from None
+        memory_estimate = estimate_task(func, kwargs)
+        with self._cond:
+            if self.queued_count() >= self.max_queued:
+                return None
+            job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self._ids)}"
+            job = ServerJob(job_id, job_type, params, int(priority))
+            job.memory_estimate = memory_estimate
+            self.jobs[job_id] = job
+            heapq.heappush(self._pending, (job.priority, next(self._order), job))
+            self._prune_finished()
+            self._cond.notify()
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def queued_count(self):
+        return sum(1 for job in self.jobs.values() if job.status == QUEUED)
+
+    def running_count(self):
+        return sum(1 for job in self.jobs.values() if job.status == RUNNING)
+
+    def cancel(self, job):
+        with self._cond:
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                return True
+            if job.status == RUNNING:
+                job.cancel_event.set()
+                return True
+            return False
+
+    def _prune_finished(self):
+        finished = [job for job in self.jobs.values() if job.status in (FINISHED, FAILED, CANCELLED)]
+        for job in sorted(finished, key=lambda j: j.finished_at)[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.id]
+
+    # --- 执行 ---
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run_loop, name=f"job-server-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """停止调度，取消运行中的任务"""
+        with self._cond:
+            self._stopping = True
+            for job in self.jobs.values():
+                if job.status == RUNNING:
+                    job.cancel_event.set()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(10)
+
+    def _next_job(self):
+        budget = get_memory_budget()
+        with self._cond:
+            while not self._stopping:
+                while self._pending and self._pending[0][2].status != QUEUED:
+                    heapq.heappop(self._pending)
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                job = self._pending[0][2]
+                if not budget.try_acquire(job.memory_estimate):
+                    # 不让后面的任务插队；系统可用内存的变化没有通知，定时重新检查
+                    job.waiting_for_memory = True
+                    self._cond.wait(MEMORY_RETRY_SECONDS)
+                    continue
+                heapq.heappop(self._pending)
+                job.status = RUNNING
+                job.waiting_for_memory = False
+                job.started_at = time.time()
+                return job
+            return None
+
+    def _run_loop(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._run_job(job)
+
+    def _run_job(self, job):
+        output_dir = os.path.join(self.output_root, job.id)
+
+        def on_progress(event):
+            job.progress = event
+
+        status, error = FINISHED, None
+        try:
+            try:
+                os.makedirs(output_dir, exist_ok=True)
+                # 构造任务参数也可能失败 (参数格式错误、输入文件已被删除等)，同样记为任务失败
+                func, kwargs = JOB_TYPES[job.type][1](job.params, output_dir)
+                process_runner.run_isolated(func, kwargs, on_log=job.append_log, on_progress=on_progress,
+                                            timeout=self.timeout, cancel_event=job.cancel_event)
+            except process_runner.TaskCancelled:
+                status = CANCELLED
+            except process_runner.TaskError as e:
+                status, error = FAILED, f"发生了一个意外错误:\n{e}"
+            except process_runner.TaskCrashed as e:
+                status, error = FAILED, str(e)
+            except Exception as e:
+                status, error = FAILED, f"无法开始任务: {e}"
+            job.files = sorted(os.path.relpath(os.path.join(d, f), self.output_root).replace(os.sep, "/")
+                               for d, _, files in os.walk(output_dir) for f in files)
+            if status == FINISHED and not job.files:
+                # 任务函数遇到输入错误时只打印信息而不抛出异常，以日志最后几行作为错误信息
+                status = FAILED
+                tail = [line for line in job.read_log()[0].splitlines() if line.strip()][-3:]
+                error = "任务没有生成任何输出文件。\n" + "\n".join(tail)
+        except Exception as e:
+            status, error = FAILED, f"整理任务输出时出错: {e}"
+        finally:
+            # 无论任务如何结束都要归还预留的内存并更新状态，否则任务一直停在运行中，后面的任务也等不到内存
+            get_memory_budget().release(job.memory_estimate)
+            with self._cond:
+                job.status, job.error = status, error
+                job.finished_at = time.time()
+                # 释放的内存可能让等待中的任务开始
+                self._cond.notify_all()
+
+    def health(self):
+        return {"status": "ok", "workers": self.workers, "queued": self.queued_count(),
+                "running": self.running_count(), "max_queued": self.max_queued,
+                "memory": get_memory_budget().stats(),
+                "output_root": self.output_root, "job_types": list(JOB_TYPES)}
+
+
+# --- HTTP 接口 ---
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "PDFToolboxJobServer/1.0"
+    JOB_PATH = re.compile(r"^/jobs/([^/]+)(/progress|/log)?$")
+
+    @property
+    def jobs(self):
+        return self.server.job_server
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            print(f"[{self.log_date_time_string()}] {self.address_string()} {fmt % args}")
+
+    def _send(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, {"error": message})
+
+    def _find_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            self._error(404, f"任务不存在: {job_id}")
+        return job
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            return self._send(200, self.jobs.health())
+        if url.path == "/jobs":
+            return self._send(200, {"jobs": [job.to_dict() for job in list(self.jobs.jobs.values())]})
+        match = self.JOB_PATH.match(url.path)
+        if not match:
+            return self._error(404, f"未知的路径: {url.path}")
+        job = self._find_job(match.group(1))
+        if job is None:
+            return
+        if match.group(2) == "/progress":
+            return self._send(200, job.progress_dict())
+        if match.group(2) == "/log":
+            try:
+                offset = int(parse_qs(url.query).get("offset", ["0"])[0])
+            except ValueError:
+                return self._error(400, "offset 必须是整数。")
+            text, next_offset = job.read_log(offset)
+            return self._send(200, {"id": job.id, "status": job.status, "text": text, "offset": next_offset})
+        return self._send(200, job.to_dict())
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/jobs":
+            return self._error(404, f"未知的路径: {self.path}")
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job = self.jobs.submit(request.get("type"), request.get("params", {}), request.get("priority", 1))
+        except (ValueError, AttributeError) as e:
+            # JSON 格式错误也是 ValueError
+            return self._error(400, str(e))
+        if job is None:
+            return self._error(429, f"排队中的任务已达上限 ({self.jobs.max_queued})，请稍后再试。")
+        self._send(202, job.to_dict())
+
+    def do_DELETE(self):
+        match = self.JOB_PATH.match(urlsplit(self.path).path)
+        if not match or match.group(2):
+            return self._error(404, f"未知的路径: {self.path}")
+        job = self._find_job(match.group(1))
+        if job is None:
+            return
+        if not self.jobs.cancel(job):
+            return self._error(409, f"任务已结束 ({job.status})，无法取消。")
+        self._send(202, job.to_dict())
+
+
+def create_server(output_root, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False, **job_server_options):
+    """创建 HTTP 服务器 (port=0 时自动选择空闲端口)，调用 serve_forever() 开始服务"""
+    job_server = JobServer(output_root, **job_server_options)
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.daemon_threads = True
+    httpd.job_server = job_server
+    httpd.verbose = verbose
+    job_server.start()
+    return httpd
+
+def shutdown_server(httpd):
+    httpd.shutdown()
+    httpd.server_close()
+    httpd.job_server.stop()
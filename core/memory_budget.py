@@ -0,0 +1,296 @@
+# 文件: core/memory_budget.py
+
+# 内存准入控制: 任务开始前先估算它的内存峰值，只有总估算值在内存预算之内时才允许开始。
+#
+#   - 渲染类任务 (压缩、转图片) 的峰值主要是页面位图: 宽 x 高 x 通道数 (RGB 为 3，灰度为 1)，
+#     300 DPI 下一张 A3 页面就超过 100 MB；页面尺寸取自元数据目录 (core/catalog.py)，不需要打开文件
+#   - 预算默认为物理内存 (容器中为 cgroup 限制) 的 60%，可用环境变量 PDF_TOOLBOX_MEMORY_BUDGET_MB 指定；
+#     同时不超过此刻系统实际可用的内存，因此机器上其他程序占用变多时会自动少放行任务
+#   - 队列头部的任务放不下时后面的任务也等待 (不插队，大任务不会被饿死)；
+#     没有任何任务运行时总是放行，单个超出预算的任务也能执行
+#   - 多进程渲染 (PDF 转图片) 按当前可用内存决定实际使用的进程数
+
+import os
+import sys
+import math
+import ctypes
+import threading
+
+BUDGET_ENV = "PDF_TOOLBOX_MEMORY_BUDGET_MB"
+DEFAULT_BUDGET_FRACTION = 0.6
+# 无法获取系统内存信息时使用的预算
+FALLBACK_BUDGET = 2 * 1024 ** 3
+# 始终留给操作系统和界面的内存
+RESERVED_FOR_SYSTEM = 256 * 1024 ** 2
+# 一个工作进程 (Python + PyMuPDF) 本身的开销
+BASE_JOB_BYTES = 64 * 1024 ** 2
+# 渲染-重组压缩时，已插入输出文档的 JPEG 数据相对原始位图的比例 (估算值)
+JPEG_RATIO = 0.1
+# 文件夹任务最多检查的 PDF 数 (取最大的几个)，避免估算本身耗时过长
+ESTIMATE_MAX_FILES = 20
+# 元数据目录中还没有页面尺寸的文件 (新文件): PDF 按 A4 页面估算渲染峰值，
+# 图片按解码后约为文件大小的此倍数 (JPEG 约 1:10，再加一份副本) 估算
+FALLBACK_PAGE_SIZE = (595, 842)
+IMAGE_DECODE_FACTOR = 20
+
+MB = 1024 * 1024
+
+
+# --- 系统内存 ---
+
+def _cgroup_limit():
+    """容器 (cgroup v2 / v1) 的内存上限和当前用量，没有限制时返回 None"""
+    for limit_path, usage_path in (("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+                                   ("/sys/fs/cgroup/memory/memory.limit_in_bytes",
+                                    "/sys/fs/cgroup/memory/memory.usage_in_bytes")):
+        try:
+            with open(limit_path) as f:
+                raw = f.read().strip()
+            if raw == "max" or int(raw) >= 1 << 60:
+                return None
+            with open(usage_path) as f:
+                return int(raw), int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+    return None
+
+def system_memory():
+    """(总内存, 当前可用内存) 字节数；无法获取时为 (None, None)"""
+    total = available = None
+    try:
+        if sys.platform.startswith("linux"):
+            values = {}
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    key, _, rest = line.partition(":")
+                    values[key] = int(rest.split()[0]) * 1024
+            total, available = values.get("MemTotal"), values.get("MemAvailable", values.get("MemFree"))
+            cgroup = _cgroup_limit()
+            if cgroup and total and cgroup[0] < total:
+                total, available = cgroup[0], min(available, max(0, cgroup[0] - cgroup[1]))
+        elif sys.platform == "win32":
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                total, available = status.ullTotalPhys, status.ullAvailPhys
+        else:
+            page = os.sysconf("SC_PAGE_SIZE")
+            total = os.sysconf("SC_PHYS_PAGES") * page
+            available = os.sysconf("SC_AVPHYS_PAGES") * page
+    except (OSError, ValueError, AttributeError):
+        return None, None
+    return total, available
+
+
+# --- 内存估算 ---
+
+def page_pixels(width_pt, height_pt, dpi):
+    zoom = dpi / 72.0
+    return math.ceil(width_pt * zoom) * math.ceil(height_pt * zoom)
+
+def render_peak_bytes(width_pt, height_pt, dpi, grayscale=False, copies=2):
+    """渲染一页时同时存在的位图大小: 默认按 PyMuPDF 位图 + 一份 PIL 副本计算"""
+    return page_pixels(width_pt, height_pt, dpi) * (1 if grayscale else 3) * copies
+
+def _entries(path):
+    """
+    任务涉及的文件的元数据。估算在提交任务时进行 (可能在界面线程或请求处理中)，因此只做只读的快速查询:
+    不打开任何文件，目录中未登记的文件只有大小 (见 Catalog.snapshot)
+    """
+    from core.catalog import get_catalog
+    return get_catalog().snapshot(path)
+
+def _largest(entries, kinds):
+    files = [e for e in entries if (e.kind == "image-file") == (kinds == "image")]
+    return sorted(files, key=lambda e: e.size, reverse=True)[:ESTIMATE_MAX_FILES]
+
+def estimate_render_pdf(entry, dpi, grayscale=False, keep_output=True):
+    """渲染-重组一个PDF的内存峰值: 源文档 + 最大一页的位图 + 已插入输出文档的 JPEG 数据"""
+    if not entry.page_sizes:
+        # 尚未读取页面信息: 按 A4 页面计渲染峰值，输出按与源文件同样大小计
+        return int(entry.size * 2 + render_peak_bytes(*FALLBACK_PAGE_SIZE, dpi, grayscale))
+    peak = max(render_peak_bytes(w, h, dpi, grayscale) for w, h in entry.page_sizes)
+    output = 0
+    if keep_output:
+        channels = 1 if grayscale else 3
+        output = sum(page_pixels(w, h, dpi) * channels for w, h in entry.page_sizes) * JPEG_RATIO
+    return int(entry.size + peak + output)
+
+def estimate_image(entry):
+    """解码后的图片 (RGB) 加一份转换/缩放副本"""
+    if not entry.page_sizes:
+        return entry.size * IMAGE_DECODE_FACTOR
+    w, h = entry.page_sizes[0]
+    return int(w * h * 3 * 2)
+
+def estimate_pipeline(entries, stages):
+    """流水线: 合并结果 (或源文档) 与压缩结果在压缩阶段同时留在内存中，渲染峰值取所有页面中最大的一页"""
+    total = sum(e.size for e in entries)
+    peak = total * 2
+    if "merge" in stages:
+        peak += estimate_staging(entries, {}, write_behind=False)
+    if "compress" in stages:
+        compress = stages["compress"] or {}
+        grayscale = compress.get("to_grayscale", False)
+        dpi = compress.get("dpi", 96)
+        if compress.get("pdf_mode") == "mrc":
+            from core.pdf_compressor import MRC_MASK_DPI
+            dpi = max(dpi, MRC_MASK_DPI)
+        sizes = [size for e in entries for size in (e.page_sizes or [FALLBACK_PAGE_SIZE])]
+        channels = 1 if grayscale else 3
+        peak += max([render_peak_bytes(w, h, dpi, grayscale) for w, h in sizes] + [0])
+        peak += sum(page_pixels(w, h, dpi) * channels for w, h in sizes) * JPEG_RATIO
+    return int(peak)
+
+def estimate_staging(entries, kwargs, write_behind=True):
+    """预读 (及异步写回) 的缓冲区: 各自不超过设定的上限，也不超过输入文件的总大小"""
+    from core.read_ahead import DEFAULT_READ_AHEAD_MB, WRITE_BEHIND_MB
+    limit = kwargs.get("read_ahead_mb", DEFAULT_READ_AHEAD_MB) * MB
+    if not limit or len(entries) < 2:
+        return 0
+    total = sum(e.size for e in entries)
+    return min(limit, total) + (min(WRITE_BEHIND_MB * MB, total) if write_behind else 0)
+
+def estimate_task(func, kwargs):
+    """
+    估算一个任务 (任务函数 + 参数，与 Worker / 工作进程使用的相同) 的内存峰值 (字节)。
+    文件大小和页面尺寸取自元数据目录；无法估算时 (如文件无法打开) 只计工作进程本身的开销。
+    """
+    name = getattr(func, "__name__", "")
+    try:
+        if name == "compress_path":
+            entries = _entries(kwargs["input_path"])
+            dpi = kwargs["dpi"]
+            if kwargs.get("pdf_mode") == "mrc":
+                # 分层压缩按文字掩码的分辨率渲染
+                from core.pdf_compressor import MRC_MASK_DPI
+                dpi = max(dpi, MRC_MASK_DPI)
+            # 文件逐个处理，峰值取决于最大的那一个
+            peak = max([estimate_render_pdf(e, dpi, kwargs.get("to_grayscale")) for e in _largest(entries, "pdf")]
+                       + [estimate_image(e) for e in _largest(entries, "image")] + [0])
+            return BASE_JOB_BYTES + peak + estimate_staging(entries, kwargs)
+        if name == "export_pdf_images":
+            from core.pdf_to_image import DEFAULT_WORKERS
+            entry = _entries(kwargs["input_path"])[0]
+            per_worker = worker_render_bytes(entry.page_sizes or [FALLBACK_PAGE_SIZE], kwargs.get("dpi", 150), kwargs.get("to_grayscale"))
+            workers = adaptive_workers(kwargs.get("workers", DEFAULT_WORKERS), per_worker)
+            return BASE_JOB_BYTES + entry.size + workers * per_worker
+        if name == "merge_files":
+            # 合并结果在保存前整个留在内存中
+            entries = _entries(kwargs["root_folder"])
+            total = sum(e.size for e in entries)
+            return (BASE_JOB_BYTES + total * 2 + max([estimate_image(e) for e in _largest(entries, "image")[:1]] + [0])
+                    + estimate_staging(entries, kwargs, write_behind=False))
+        if name == "run_pipeline":
+            return BASE_JOB_BYTES + estimate_pipeline(_entries(kwargs["input_path"]), kwargs["stages"])
+        for key in ("input_path", "input_pdf_path"):
+            if key in kwargs:
+                # 拆分类任务: 源文档 + 输出文档，页面内容不解码
+                return BASE_JOB_BYTES + os.path.getsize(kwargs[key]) * 2
+    except Exception:
+        pass
+    return BASE_JOB_BYTES
+
+def worker_render_bytes(page_sizes, dpi, grayscale=False):
+    """一个渲染进程的内存峰值: 进程开销 + 最大一页的位图"""
+    peak = max([render_peak_bytes(w, h, dpi, grayscale) for w, h in page_sizes] + [0])
+    return BASE_JOB_BYTES // 2 + peak
+
+
+# --- 预算与准入 ---
+
+class MemoryBudget:
+    def __init__(self, max_bytes=None):
+        configured = os.environ.get(BUDGET_ENV)
+        self.max_bytes = max_bytes or (int(float(configured) * MB) if configured else None)
+        self.reserved = 0
+        self.peak_reserved = 0
+        self.admitted = self.deferred = 0
+        self._cond = threading.Condition()
+
+    def limit(self):
+        """配置的预算 (未配置时为物理内存的 DEFAULT_BUDGET_FRACTION)"""
+        if self.max_bytes:
+            return self.max_bytes
+        total, _ = system_memory()
+        return int(total * DEFAULT_BUDGET_FRACTION) if total else FALLBACK_BUDGET
+
+    def headroom(self, exclude=0):
+        """
+        此刻还能放行的字节数: 预算余量与系统实际可用内存中较小的一个。
+        exclude 为调用方 (运行中的任务) 自己已经预留的字节数，不算作被占用。
+        """
+        room = self.limit() - max(0, self.reserved - exclude)
+        _, available = system_memory()
+        if available is not None:
+            room = min(room, available - RESERVED_FOR_SYSTEM)
+        return max(0, room)
+
+    def try_acquire(self, nbytes):
+        """放得下 (或当前没有任何预留) 时预留 nbytes 并返回 True，否则返回 False"""
+        with self._cond:
+            if self.reserved and nbytes > self.headroom():
+                self.deferred += 1
+                return False
+            self.reserved += nbytes
+            self.peak_reserved = max(self.peak_reserved, self.reserved)
+            self.admitted += 1
+            return True
+
+    def acquire(self, nbytes, cancel_event=None, poll_interval=0.5):
+        """等待直到可以预留 nbytes；cancel_event 被 set 时放弃并返回 False"""
+        while not self.try_acquire(nbytes):
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            with self._cond:
+                # 系统可用内存的变化没有通知，因此定时重新检查
+                self._cond.wait(poll_interval)
+        return True
+
+    def release(self, nbytes):
+        with self._cond:
+            self.reserved = max(0, self.reserved - nbytes)
+            self._cond.notify_all()
+
+    def stats(self):
+        total, available = system_memory()
+        with self._cond:
+            return {"limit": self.limit(), "reserved": self.reserved, "peak_reserved": self.peak_reserved,
+                    "total": total, "available": available,
+                    "admitted": self.admitted, "deferred": self.deferred}
+
+    def describe(self):
+        s = self.stats()
+        available = f"{s['available'] / MB:.0f} MB" if s["available"] is not None else "未知"
+        return (f"内存预算: 已预留 {s['reserved'] / MB:.0f}/{s['limit'] / MB:.0f} MB | 系统可用 {available} | "
+                f"放行 {s['admitted']} 次，推迟 {s['deferred']} 次")
+
+
+def adaptive_workers(requested, per_worker_bytes, budget=None, reserved=0):
+    """
+    按当前可用内存减少并行进程数 (至少 1 个)。
+    reserved 为调用方的任务准入时已经预留的字节数 (其中已包含渲染进程的内存)，计算余量时不扣除，
+    否则任务会被自己的预留挤占。
+    """
+    budget = budget or get_memory_budget()
+    if per_worker_bytes <= 0:
+        return max(1, requested)
+    return max(1, min(requested, int(budget.headroom(exclude=reserved) // per_worker_bytes)))
+
+
+_default_budget = None
+_default_lock = threading.Lock()
+
+def get_memory_budget():
+    """进程内唯一的内存预算"""
+    global _default_budget
+    with _default_lock:
+        if _default_budget is None:
+            _default_budget = MemoryBudget()
+        return _default_budget
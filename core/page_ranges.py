@@ -0,0 +1,61 @@
+# 文件: core/page_ranges.py
+
+# 页码范围语言 (物理页码，从1开始):
+#   "5-10"              单个范围
+#   "1-3,5,8-12"        多个范围合并输出为一个文件
+#   "1-3,5,8-12;20-"    分号分隔多个输出文件
+#   "12-" / "-5"        省略起止页表示文件末尾 / 第1页
+
+RANGE_FORMAT_HINT = "请使用 '5-10', '7', '12-', '-5'，多个范围用 ',' 分隔，多个输出文件用 ';' 分隔。"
+
+
+def _parse_range(part, total_pages):
+    part = part.strip()
+    try:
+        if '-' in part:
+            start_str, end_str = part.split('-', 1)
+            start = int(start_str) if start_str.strip() else 1
+            end = int(end_str) if end_str.strip() else total_pages
+        else:
+            start = int(part)
+            end = start
+    except ValueError:
+        raise ValueError(f"无效的页码格式 '{part}'。{RANGE_FORMAT_HINT}") from None
+    if start > end:
+        raise ValueError(f"起始页码 ({start}) 不能大于结束页码 ({end})。")
+    if start < 1 or end > total_pages:
+        raise ValueError(f"页码范围 '{part}' 无效。有效的物理页码范围是 1 到 {total_pages}。")
+    return start, end
+
+
+def parse_page_spec(spec, total_pages):
+    """
+    解析页码范围表达式，返回输出文件分组列表: [[(start, end), ...], ...] (1起、闭区间)。
+    格式错误或越界时抛出 ValueError。
+    """
+    spec = (spec or "").replace('，', ',').replace('；', ';')
+    if not spec.strip():
+        raise ValueError("页码范围不能为空。")
+    groups = []
+    for group_str in spec.split(';'):
+        if not group_str.strip():
+            continue
+        group = []
+        for part in group_str.split(','):
+            if part.strip():
+                group.append(_parse_range(part, total_pages))
+        if group:
+            groups.append(group)
+    if not groups:
+        raise ValueError("页码范围不能为空。")
+    return groups
+
+
+def group_pages(group):
+    """把一组范围展开为0起的页码列表 (保持书写顺序)"""
+    return [p - 1 for start, end in group for p in range(start, end + 1)]
+
+
+def group_label(group):
+    """用于自动命名的范围标签，例如 [(5, 10)] -> '5-10'，[(1, 3), (5, 5)] -> '1-3_5-5'"""
+    return '_'.join(f"{start}-{end}" for start, end in group)
@@ -0,0 +1,145 @@
+# 文件: core/patent_cache.py
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from core.paths import app_data_dir
+
+# 缓存格式版本，分类规则变化时递增，旧缓存会被自动丢弃
+# 2: 页眉改为先按 PyMuPDF 样本判断 (文档缓存)，与 pdfplumber 的结果可能不同
+CACHE_VERSION = 2
+DEFAULT_MAX_ENTRIES = 20000
+
+
+def page_cache_key(doc, page, header_y_threshold):
+    """
+    根据页面内容流计算缓存键 (PyMuPDF 页面对象)。
+    除内容流外，还纳入页面尺寸、旋转、表单XObject和字体名，
+    避免“内容流相同但实际文字不同”的页面互相冲突。
+    """
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}|{header_y_threshold}|{tuple(page.rect)}|{page.rotation}|".encode())
+    h.update(page.read_contents() or b"")
+    for xref, *_ in page.get_xobjects():
+        try:
+            h.update(doc.xref_stream_raw(xref) or b"")
+        except Exception:
+            h.update(str(xref).encode())
+    for font in page.get_fonts():
+        h.update(str(font[3]).encode("utf-8", "replace"))
+    return h.hexdigest()
+
+
+class PatentPageCache:
+    """
+    专利页面分类结果的磁盘缓存。
+    每个条目对应一页: {"category": 页面类型, "claim_nums": 该页识别到的权利要求序号}。
+    超过 max_entries 时按最近最少使用 (LRU) 的顺序淘汰。
+    """
+    def __init__(self, cache_path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_path = cache_path or os.path.join(app_data_dir("cache"), "patent_pages.json")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._dirty = False
+        self._file_mtime = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.cache_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        self._file_mtime = self._current_mtime()
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                # 文件中按从旧到新的顺序保存，直接恢复LRU顺序
+                self._entries = OrderedDict(data.get("entries", []))
+        except (OSError, ValueError):
+            self._entries = OrderedDict()
+
+    def reload_if_changed(self):
+        """缓存文件被其他进程改写或删除后 (如界面与工作进程之间)，重新读取"""
+        with self._lock:
+            if not self._dirty and self._current_mtime() != self._file_mtime:
+                self._entries = OrderedDict()
+                self._load()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._dirty = True
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def save(self):
+        """原子地写回磁盘 (先写临时文件再替换)。"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": CACHE_VERSION, "entries": list(self._entries.items())}
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.cache_path)
+            self._dirty = False
+            self._file_mtime = self._current_mtime()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            self._dirty = False
+            try:
+                os.remove(self.cache_path)
+            except FileNotFoundError:
+                pass
+            self._file_mtime = None
+
+    def stats(self):
+        with self._lock:
+            try:
+                size_bytes = os.path.getsize(self.cache_path)
+            except OSError:
+                size_bytes = 0
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "size_bytes": size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "path": self.cache_path,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    """进程内共享的缓存实例 (GUI面板和后台任务共用)。"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PatentPageCache()
+        return _default_cache
@@ -0,0 +1,185 @@
+# 文件: core/patent_splitter.py
+
+import os
+import re
+import pdfplumber
+
+from core.doc_cache import get_document_cache
+from core.patent_cache import get_default_cache, page_cache_key
+from core.pdf_writer import write_page_groups, print_write_report
+from core.progress import ProgressReporter
+from core.tracing import span
+
+
+# 页面分类关键词
+header_keywords = ["说明书摘要", "摘要附图", "权利要求书", "说明书附图", "说明书"]
+merge_groups = {
+    "说明书摘要": ["说明书摘要", "摘要附图"]
+}
+CLAIM_NUMBER_PATTERN = re.compile(r"\b(\d+)[.\uFF0E](?:[\s\u3000]?)")
+
+def classify_header(header_str):
+    """根据页眉文本判断页面类型"""
+    if header_str.startswith("权利要求书"):
+        return "权利要求书"
+    for key in header_keywords:
+        if key == "权利要求书": continue
+        if header_str.startswith(key):
+            return key
+    return "说明书"
+
+def find_claim_numbers(text):
+    """从一段权利要求书文本中找出所有段落编号 (过滤掉单独成行的页码)"""
+    lines = (text or "").splitlines()
+    filtered_lines = [line.strip() for line in lines if not re.fullmatch(r"\d+", line.strip())]
+    return [int(n) for n in CLAIM_NUMBER_PATTERN.findall(' '.join(filtered_lines) + " ")]
+
+def _page_header_str(page, header_y_threshold):
+    header_texts = [char["text"] for char in page.chars if char["top"] < header_y_threshold]
+    return ''.join(header_texts).replace(" ", "").replace("\n", "")
+
+def extract_header_pages(pdf_path, header_y_threshold=100):
+    """识别每页页眉文本，判断所属类型页面"""
+    keyword_pages = {key: [] for key in header_keywords}
+    claims_pages = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for i, page in enumerate(pdf.pages):
+            category = classify_header(_page_header_str(page, header_y_threshold))
+            if category == "权利要求书":
+                claims_pages.append(i)
+            else:
+                keyword_pages[category].append(i)
+    return keyword_pages, claims_pages
+
+def extract_max_claim_number(pdf_path, claims_pages):
+    """从权利要求书页中提取最大段落编号"""
+    max_num = 0
+    merged_text = ""
+    with pdfplumber.open(pdf_path) as pdf:
+        for p in claims_pages:
+            merged_text += (pdf.pages[p].extract_text() or "") + "\n"
+    nums = find_claim_numbers(merged_text)
+    if nums:
+        max_num = max(nums)
+        print(f"匹配到的所有段落序号: {nums}")
+    else:
+        print("⚠️ 未匹配到任何段落序号")
+    return max_num
+
+def analyze_patent_pages(pdf_path, header_y_threshold=100, cache=None, progress=None):
+    """
+    带缓存的页面分析: 一次完成页面分类和权利要求序号提取。
+    缓存以每页内容流的哈希为键，重复运行时只有发生变化的页面才会重新识别。
+    页眉先用文档缓存中的 PyMuPDF 样本判断，只有样本不以任何关键词开头的页面和权利要求书页
+    才用 pdfplumber 解析 (且 pdfplumber 只在需要时打开)。
+    返回 (keyword_pages, claims_pages, max_claim_num)。
+    """
+    doc_cache = get_document_cache()
+    with span("hash_pages"), doc_cache.open(pdf_path) as doc:
+        keys = [page_cache_key(doc, page, header_y_threshold) for page in doc]
+    entries = [cache.get(k) if cache else None for k in keys]
+    missing = [i for i, entry in enumerate(entries) if entry is None]
+
+    if progress:
+        progress.stage_started("识别页眉", total_pages=len(keys))
+    if cache:
+        print(f"页面分类缓存: 命中 {len(keys) - len(missing)}/{len(keys)} 页，需重新识别 {len(missing)} 页。")
+    if progress and len(keys) > len(missing):
+        progress.page_done(len(keys) - len(missing), log=False)
+    if missing:
+        samples = doc_cache.header_samples(pdf_path, header_y_threshold)
+        pdf = None
+
+        def plumber_page(i):
+            nonlocal pdf
+            if pdf is None:
+                with span("open_pdfplumber"):
+                    pdf = pdfplumber.open(pdf_path)
+            return pdf.pages[i]
+
+        try:
+            for i in missing:
+                with span("classify_header", page=i + 1):
+                    if any(samples[i].startswith(key) for key in header_keywords):
+                        category = classify_header(samples[i])
+                    else:
+                        category = classify_header(_page_header_str(plumber_page(i), header_y_threshold))
+                claim_nums = []
+                if category == "权利要求书":
+                    with span("extract_claims", page=i + 1):
+                        claim_nums = find_claim_numbers(plumber_page(i).extract_text())
+                entries[i] = {"category": category, "claim_nums": claim_nums}
+                if cache: cache.put(keys[i], entries[i])
+                if progress: progress.page_done()
+        finally:
+            if pdf is not None:
+                pdf.close()
+        if cache:
+            with span("cache_save"):
+                cache.save()
+
+    keyword_pages = {key: [] for key in header_keywords}
+    claims_pages, nums = [], []
+    for i, entry in enumerate(entries):
+        if entry["category"] == "权利要求书":
+            claims_pages.append(i)
+            nums.extend(entry["claim_nums"])
+        else:
+            keyword_pages[entry["category"]].append(i)
+    max_claim_num = max(nums) if nums else 0
+    if nums:
+        print(f"匹配到的所有段落序号: {nums}")
+    else:
+        print("⚠️ 未匹配到任何段落序号")
+    return keyword_pages, claims_pages, max_claim_num
+
+def plan_sections(keyword_pages_map, claims_pages, max_claim_num, output_dir):
+    """根据页面映射关系，生成各输出文件及其页码: [(标签, 输出路径, 页码列表), ...]"""
+    sections = []
+    # 合并说明书摘要类
+    for group_name, keys in merge_groups.items():
+        pages_to_merge = sorted(set(p for key in keys for p in keyword_pages_map.get(key, [])))
+        if pages_to_merge:
+            sections.append(("合并PDF", os.path.join(output_dir, f"{group_name}.pdf"), pages_to_merge))
+    # 合并其余类型
+    keys_in_groups = set(k for keys in merge_groups.values() for k in keys)
+    for key, pages in keyword_pages_map.items():
+        if key in keys_in_groups or key == "权利要求书" or not pages: continue
+        sections.append(("合并PDF", os.path.join(output_dir, f"{key}.pdf"), pages))
+    # 合并权利要求书
+    if claims_pages:
+        sections.append(("权利要求书PDF", os.path.join(output_dir, f"权利要求书{max_claim_num}.pdf"), sorted(claims_pages)))
+    return sections
+
+def merge_pages(pdf_path, keyword_pages_map, claims_pages, max_claim_num, output_dir, progress=None):
+    """根据页面映射关系，从同一个源文档一次性生成所有分组PDF，并发写盘"""
+    os.makedirs(output_dir, exist_ok=True)
+    sections = plan_sections(keyword_pages_map, claims_pages, max_claim_num, output_dir)
+    if progress:
+        progress.stage_started("写出文件", total_files=len(sections),
+                               total_pages=sum(len(pages) for _, _, pages in sections))
+    with get_document_cache().open(pdf_path) as source_doc:
+        results = write_page_groups(source_doc, [(path, pages) for _, path, pages in sections], progress=progress)
+    for (label, path, pages), result in zip(sections, results):
+        if label == "权利要求书PDF":
+            print(f"✅ 已输出{label}: {path}（最大序号 {max_claim_num}）")
+        else:
+            print(f"✅ 已输出{label}: {path}（共 {len(pages)} 页）")
+    print_write_report(results)
+
+def split_patent_pdf(input_pdf_path, output_dir, use_cache=True, progress=None):
+    """主调用函数，整合所有步骤；返回是否完成 (读取或写出出错时抛出异常)"""
+    progress = progress or ProgressReporter()
+    if not os.path.isfile(input_pdf_path):
+        print(f"错误: 输入文件不存在 -> '{input_pdf_path}'")
+        return False
+    print(f"\n🔍 正在处理: {os.path.basename(input_pdf_path)}")
+    progress.job_started(total_files=1)
+    cache = get_default_cache() if use_cache else None
+    if cache:
+        cache.reload_if_changed()
+    keyword_pages_map, claims_pages, max_claim_num = analyze_patent_pages(input_pdf_path, cache=cache, progress=progress)
+    merge_pages(input_pdf_path, keyword_pages_map, claims_pages, max_claim_num, output_dir, progress=progress)
+    print("\n🎉 PDF 分组完成！")
+    progress.job_finished()
+    return True
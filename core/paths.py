@@ -0,0 +1,14 @@
+# 文件: core/paths.py
+
+import os
+
+# 可通过环境变量把所有缓存/配置重定向到其他目录 (例如便携版或服务器部署)
+APP_HOME_ENV = "PDF_TOOLBOX_HOME"
+
+
+def app_data_dir(*parts):
+    """返回程序的数据目录 (默认 ~/.pdf_toolbox)，并确保其存在。"""
+    base = os.environ.get(APP_HOME_ENV) or os.path.join(os.path.expanduser("~"), ".pdf_toolbox")
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
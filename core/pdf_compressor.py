@@ -0,0 +1,605 @@
+# 文件: core/pdf_compressor.py
+
+import os
+import io
+import fitz  # PyMuPDF
+import time
+import contextlib
+from PIL import Image, ImageChops, ImageFilter, ImageMath, ImageStat, features
+
+from core.catalog import get_catalog
+from core.progress import ProgressReporter
+from core.read_ahead import StagedIO, DEFAULT_READ_AHEAD_MB
+from core.tracing import span
+
+
+SUPPORTED_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+# 独立图片的输出格式: auto 按图片内容自动选择 (截图/图表用无损 WebP，照片用 WebP)
+IMAGE_FORMATS = ("jpeg", "webp", "webp-lossless", "png", "auto")
+IMAGE_FORMAT_NAMES = {"jpeg": "JPEG", "webp": "WebP", "webp-lossless": "无损 WebP", "png": "PNG"}
+IMAGE_FORMAT_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp", "webp-lossless": ".webp", "png": ".png"}
+# 编码速度档位: fast 最快，max 体积最小 (原来的 optimize + 渐进式 JPEG 即 jpeg/max)
+EFFORT_PRESETS = ("fast", "balanced", "max")
+ENCODER_OPTIONS = {
+    "jpeg": {"fast": {}, "balanced": {"optimize": True}, "max": {"optimize": True, "progressive": True}},
+    "webp": {"fast": {"method": 0}, "balanced": {"method": 4}, "max": {"method": 6}},
+    # 无损 WebP 的 quality 表示压缩力度 (0-100)
+    # (method 0 对截图几乎不压缩，method 6 + quality 100 每张要数秒，因此都不用)
+    "webp-lossless": {"fast": {"lossless": True, "method": 1, "quality": 50},
+                      "balanced": {"lossless": True, "method": 4, "quality": 75},
+                      "max": {"lossless": True, "method": 6, "quality": 90}},
+    "png": {"fast": {"compress_level": 1}, "balanced": {"compress_level": 6}, "max": {"optimize": True}},
+}
+LOSSLESS_FORMATS = ("webp-lossless", "png")
+# auto: 按最近邻缩小到此边长后统计颜色数 (不产生插值出来的新颜色)
+AUTO_SAMPLE_SIDE = 256
+# auto: 颜色数不超过此值的图片视为截图/图表/图标
+AUTO_GRAPHIC_MAX_COLORS = 2048
+
+# PDF 压缩方式: render 为整页渲染为 JPEG；mrc 为分层压缩 (文字掩码 + 背景 + 文字颜色)
+PDF_MODES = ("render", "mrc")
+# 各压缩方式保存输出时的参数
+PDF_SAVE_OPTIONS = {"render": {}, "mrc": {"garbage": 3, "deflate": True}}
+# 保留原文件: 体积至少要减小的比例 (默认 10%)，达不到时输出原文件
+DEFAULT_MIN_SAVING = 0.10
+# 预测: 抽样压缩的页数；页数少于 PREDICT_MIN_PAGES 的文件不预测，直接压缩后比较
+PREDICT_SAMPLE_PAGES = 3
+PREDICT_MIN_PAGES = 8
+# 预测值超过要求的大小此倍数以上才跳过 (留出抽样误差)
+PREDICT_SAFETY = 1.15
+# MRC: 文字掩码 (1 位) 的分辨率；背景使用用户设置的 DPI
+MRC_MASK_DPI = 300
+# MRC: 文字颜色层相对文字掩码的缩小倍数 (300 DPI 时为 50 DPI，颜色不需要细节)
+MRC_FG_FACTOR = 6
+# MRC: 阈值上限，避免浅色底纹被当作文字
+MRC_MAX_THRESHOLD = 200
+# MRC: 文字像素超过此比例 (照片、深色页面) 时该页退回整页 JPEG
+MRC_MAX_TEXT_RATIO = 0.35
+
+# Pillow 10.3 起 ImageMath.eval 更名为 unsafe_eval (表达式都是本模块中的常量)
+_eval = getattr(ImageMath, "unsafe_eval", None) or ImageMath.eval
+
+def default_output_dir(input_path):
+    """
+    默认输出文件夹: 单个文件为同目录下的“压缩结果”；
+    文件夹为同级的 “<文件夹名>_压缩结果” (放在输入文件夹之外，再次运行时不会把上次的结果当作输入)。
+    """
+    input_path = os.path.abspath(input_path)
+    if os.path.isfile(input_path):
+        return os.path.join(os.path.dirname(input_path), "压缩结果")
+    return input_path.rstrip(os.sep) + "_压缩结果"
+
+def get_output_path(input_path, source_base, output_base, new_ext=None):
+    """计算输出文件的完整路径，并确保目录存在。"""
+    relative_path = os.path.relpath(input_path, start=source_base)
+    output_path = os.path.join(output_base, relative_path)
+    if new_ext:
+        base, _ = os.path.splitext(output_path)
+        output_path = base + new_ext
+    output_dir = os.path.dirname(output_path)
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    return output_path
+
+def get_file_size(filepath, unit='mb'):
+    """获取文件大小"""
+    try:
+        size_bytes = os.path.getsize(filepath)
+        if unit.lower() == 'mb': return size_bytes / (1024 * 1024)
+        return size_bytes
+    except FileNotFoundError: return 0
+
+def compress_document_by_rendering(input_doc, dpi, quality, to_grayscale, progress=None, guard=None):
+    """
+    把已打开文档的每一页渲染成图片后重新组合，返回新的内存文档 (由调用方负责保存和关闭)。
+    guard 为 QualityGuard 时抽查部分页面的编码质量 (允许重试时，不合格则提高整个文件的质量)。
+    """
+    progress = progress or ProgressReporter()
+    print(f"   (模式: 渲染-重组, DPI: {dpi}, 质量: {quality})")
+    output_doc = fitz.open()
+    try:
+        # 灰度时直接渲染为单通道位图，内存占用只有 RGB 的三分之一
+        colorspace, mode = (fitz.csGRAY, "L") if to_grayscale else (fitz.csRGB, "RGB")
+        zoom = dpi / 72.0
+        mat = fitz.Matrix(zoom, zoom)
+
+        def render(page):
+            pix = page.get_pixmap(matrix=mat, colorspace=colorspace, alpha=False)
+            return Image.frombytes(mode, [pix.width, pix.height], pix.samples)
+
+        check_pages = _start_guard(guard, len(input_doc), quality)
+        if check_pages and guard.retry:
+            quality = _guarded_quality(guard, check_pages, lambda i: render(input_doc[i]))
+            check_pages = set()
+        for i, page in enumerate(input_doc):
+            with span("render", page=i + 1):
+                img = render(page)
+            with span("encode", page=i + 1):
+                img_bytes = _encode(img, "JPEG", quality=quality, optimize=True)
+            if i in check_pages:
+                with span("quality_check", page=i + 1):
+                    img_bytes = guard.check(img, img_bytes, quality, page=i + 1,
+                                            encode=lambda q: _encode(img, "JPEG", quality=q, optimize=True))
+            with span("insert_image", page=i + 1):
+                img_page_rect = fitz.Rect(0, 0, img.width, img.height)
+                new_page = output_doc.new_page(width=img.width, height=img.height)
+                new_page.insert_image(img_page_rect, stream=img_bytes)
+            progress.page_done()
+        print("   - 所有页面处理完毕")
+        if guard:
+            print(f"   - {guard.describe_file()}")
+    except Exception:
+        output_doc.close()
+        raise
+    return output_doc
+
+def compress_pdf_by_rendering(filepath, output_path, dpi, quality, to_grayscale, progress=None, guard=None,
+                              min_saving=None, staging=None):
+    """
+    通过将PDF每一页渲染成图片，然后重新组合的方式进行极限压缩。
+    guard 为 QualityGuard 时抽查部分页面的编码质量 (允许重试时，不合格则提高整个文件的质量)。
+    min_saving / staging 见 compress_pdf_file。
+    """
+    print(f"-> 开始极限压缩PDF: {os.path.basename(filepath)} | 原始大小: {get_file_size(filepath, 'mb'):.2f} MB")
+    return compress_pdf_file(filepath, output_path, "render", dpi, quality, to_grayscale, progress, guard, min_saving,
+                             staging)
+
+def otsu_threshold(histogram):
+    """大津法: 根据灰度直方图 (256 级) 求使类间方差最大的阈值"""
+    total = sum(histogram)
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    weight_bg = sum_bg = 0
+    best_var, best_t = 0.0, 0
+    for t, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * count
+        diff = sum_bg / weight_bg - (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * diff * diff
+        if var > best_var:
+            best_var, best_t = var, t
+    return best_t
+
+def _color(values):
+    # ImageStat 按通道返回列表，Image.new 需要单个灰度值或 RGB 元组
+    return tuple(int(v) for v in values) if len(values) > 1 else int(values[0])
+
+def _shifted(img, dx, dy):
+    """整图平移 (dx, dy) 像素；移出的部分丢弃，空出的边缘保留原像素 (不会像 ImageChops.offset 那样从对边卷过来)"""
+    w, h = img.size
+    result = img.copy()
+    result.paste(img.crop((max(0, -dx), max(0, -dy), w - max(0, dx), h - max(0, dy))), (max(0, dx), max(0, dy)))
+    return result
+
+def _neighborhood(img, pick, radius=1):
+    """
+    (2*radius+1)² 邻域的逐像素最深/最浅值 (pick 为 ImageChops.darker / lighter)，与 MinFilter / MaxFilter 结果相同
+    (页面边缘按边缘像素延伸)。先横向再纵向逐像素平移比较，比 Pillow 的排序滤镜快一个数量级。
+    """
+    result = img
+    for dx, dy in ((1, 0), (0, 1)):
+        for _ in range(radius):
+            result = pick(pick(result, _shifted(result, dx, dy)), _shifted(result, -dx, -dy))
+    return result
+
+def _masked_mean(img, mask, factor):
+    """
+    缩小 factor 倍，每个块只对 mask 中的像素取平均 (块内没有 mask 像素时为 0)；同时返回块内是否有 mask 像素。
+    先把非 mask 像素置 0 再整块平均，除以块内 mask 像素的比例，纸色不会混进文字颜色。
+    """
+    coverage = mask.convert("L").reduce(factor)
+    total = Image.composite(img, Image.new(img.mode, img.size, 0), mask).reduce(factor)
+    bands = [_eval("convert(t * 255.0 / max(c, 1.0), 'L')", t=band.convert("F"), c=coverage.convert("F"))
+             for band in total.split()]
+    mean = bands[0] if img.mode == "L" else Image.merge(img.mode, bands)
+    return mean, coverage.point(lambda v: 255 if v else 0)
+
+def split_mrc_layers(img, bg_factor):
+    """
+    把按掩码分辨率渲染的页面拆成三层，返回 (文字掩码, 背景, 文字颜色)；不适合分层时返回 None。
+    所有逐像素运算都由 Pillow 的查找表/整图运算完成，不在 Python 中逐像素循环:
+      - 文字掩码: 灰度按大津阈值二值化 (1 位，文字为白)
+      - 背景: 缩小 bg_factor 倍，抹去文字 (填充邻近的底色)，JPEG 不再为文字边缘浪费数据
+      - 文字颜色: 缩小到掩码的 1/MRC_FG_FACTOR，每块只取掩码内像素的平均色，保留印章、签字的颜色
+    """
+    gray = img.convert("L")
+    threshold = min(otsu_threshold(gray.histogram()), MRC_MAX_THRESHOLD)
+    mask = gray.point(lambda v: 255 if v <= threshold else 0, "1")
+    text_ratio = mask.histogram()[255] / (mask.width * mask.height)
+    if threshold == 0 or text_ratio > MRC_MAX_TEXT_RATIO:
+        return None
+    background = img.reduce(bg_factor) if bg_factor > 1 else img.copy()
+    text_small = mask.convert("L").resize(background.size, Image.BOX)
+    text_small = text_small.filter(ImageFilter.BoxBlur(1)).point(lambda v: 255 if v else 0)
+    # 文字位置换成邻近最浅的颜色 (5x5 邻域，相当于两轮 3x3 膨胀)，彩色底纹上也不会留下白边
+    lightest = _neighborhood(background, ImageChops.lighter, radius=2)
+    background = Image.composite(lightest, background, text_small)
+    # 只对文字像素取平均: 细小、浅色的笔画在低分辨率下也不会被纸色冲淡
+    ink_color, has_text = _masked_mean(img, mask, MRC_FG_FACTOR)
+    # 没有文字的块换成整页的中位墨色: 放大显示时文字边缘不会混入纸色，空白区域也几乎不占 JPEG 数据
+    ink = ImageStat.Stat(ink_color, has_text).median
+    foreground = Image.composite(ink_color, Image.new(img.mode, ink_color.size, _color(ink)), has_text)
+    return mask, background, foreground
+
+def _encode(img, fmt, **kwargs):
+    with io.BytesIO() as f:
+        img.save(f, format=fmt, **kwargs)
+        return f.getvalue()
+
+def _start_guard(guard, page_count, quality):
+    """开始检查一个文件，返回要抽查的页码 (0起)"""
+    if guard is None:
+        return set()
+    guard.start_file(quality)
+    return guard.pages_to_check(page_count)
+
+def _guarded_quality(guard, check_pages, reference_for):
+    """
+    允许重试时，在编码整个文件之前先检查全部抽查页 (reference_for(页码) 返回该页编码前的位图)，
+    返回整个文件使用的质量。抽查页因此要多渲染一次，但最多 sample_pages 页。
+    """
+    for i in sorted(check_pages):
+        with span("quality_check", page=i + 1):
+            reference = reference_for(i)
+            current = guard.file_quality()
+            encode = lambda q: _encode(reference, "JPEG", quality=q, optimize=True)
+            guard.check(reference, encode(current), current, page=i + 1, encode=encode)
+    return guard.file_quality()
+
+def compress_document_mrc(input_doc, dpi, quality, to_grayscale, progress=None, guard=None):
+    """
+    分层 (MRC) 压缩已打开的文档，返回新的内存文档 (由调用方负责保存和关闭)。
+    文字保存为高分辨率的 1 位掩码，背景和文字颜色保存为低分辨率 JPEG，三层叠放在原尺寸的页面上。
+    guard 只检查背景层 (JPEG 质量只影响背景和文字颜色，文字掩码是无损的)；允许重试时提高的质量用于整个文件。
+    """
+    progress = progress or ProgressReporter()
+    mask_dpi = max(MRC_MASK_DPI, dpi)
+    bg_factor = max(1, round(mask_dpi / dpi))
+    print(f"   (模式: MRC, 文字 {mask_dpi} DPI, 背景 {mask_dpi / bg_factor:.0f} DPI, "
+          f"文字颜色 {mask_dpi / MRC_FG_FACTOR:.0f} DPI, 质量: {quality})")
+    page_times, layer_bytes, fallback_pages = [], [0, 0, 0], 0
+    output_doc = fitz.open()
+    try:
+        colorspace, mode = (fitz.csGRAY, "L") if to_grayscale else (fitz.csRGB, "RGB")
+
+        def render(page):
+            pix = page.get_pixmap(dpi=mask_dpi, colorspace=colorspace, alpha=False)
+            return Image.frombytes(mode, [pix.width, pix.height], pix.samples)
+
+        def background_of(i):
+            img = render(input_doc[i])
+            layers = split_mrc_layers(img, bg_factor)
+            if layers is not None:
+                return layers[1]
+            return img.reduce(bg_factor) if bg_factor > 1 else img
+
+        check_pages = _start_guard(guard, len(input_doc), quality)
+        if check_pages and guard.retry:
+            quality = _guarded_quality(guard, check_pages, background_of)
+            check_pages = set()
+        for i, page in enumerate(input_doc):
+            started = time.perf_counter()
+            with span("render", page=i + 1):
+                img = render(page)
+            with span("mrc_layers", page=i + 1):
+                layers = split_mrc_layers(img, bg_factor)
+            new_page = output_doc.new_page(width=page.rect.width, height=page.rect.height)
+            with span("encode", page=i + 1):
+                if layers is None:
+                    # 照片或深色页面: 退回整页 JPEG (背景分辨率)
+                    fallback_pages += 1
+                    background = img.reduce(bg_factor) if bg_factor > 1 else img
+                    encoded = [None, _encode(background, "JPEG", quality=quality, optimize=True), None]
+                else:
+                    mask, background, foreground = layers
+                    encoded = [_encode(mask, "PNG", optimize=True),
+                               _encode(background, "JPEG", quality=quality, optimize=True),
+                               _encode(foreground, "JPEG", quality=quality, optimize=True)]
+            if i in check_pages:
+                with span("quality_check", page=i + 1):
+                    encoded[1] = guard.check(background, encoded[1], quality, page=i + 1,
+                                             encode=lambda q: _encode(background, "JPEG", quality=q, optimize=True))
+            with span("insert_image", page=i + 1):
+                new_page.insert_image(new_page.rect, stream=encoded[1])
+                if encoded[0] is not None:
+                    # 文字颜色层以 1 位掩码作为透明度叠在背景上
+                    new_page.insert_image(new_page.rect, stream=encoded[2], mask=encoded[0])
+            for k, data in enumerate(encoded):
+                layer_bytes[k] += len(data or b"")
+            page_times.append(time.perf_counter() - started)
+            progress.page_done()
+        print("   - 所有页面处理完毕")
+        if page_times:
+            slowest = max(range(len(page_times)), key=page_times.__getitem__)
+            print(f"   - MRC: 每页平均 {sum(page_times) / len(page_times) * 1000:.0f} ms "
+                  f"(最慢第 {slowest + 1} 页 {page_times[slowest] * 1000:.0f} ms) | "
+                  f"掩码 {layer_bytes[0] / 1024:.1f} KB, 背景 {layer_bytes[1] / 1024:.1f} KB, "
+                  f"文字颜色 {layer_bytes[2] / 1024:.1f} KB"
+                  + (f" | {fallback_pages} 页不适合分层，按整页图片保存" if fallback_pages else ""))
+        if guard:
+            print(f"   - {guard.describe_file()}")
+    except Exception:
+        output_doc.close()
+        raise
+    return output_doc
+
+def compress_pdf_mrc(filepath, output_path, dpi, quality, to_grayscale, progress=None, guard=None, min_saving=None,
+                     staging=None):
+    """
+    分层 (MRC) 压缩扫描文档: 文字比整页 JPEG 清晰，信函、表格类文档的体积通常小数倍。
+    guard 只检查背景层 (JPEG 质量只影响背景和文字颜色，文字掩码是无损的)。min_saving / staging 见 compress_pdf_file。
+    """
+    print(f"-> 开始分层压缩PDF: {os.path.basename(filepath)} | 原始大小: {get_file_size(filepath, 'mb'):.2f} MB")
+    return compress_pdf_file(filepath, output_path, "mrc", dpi, quality, to_grayscale, progress, guard, min_saving,
+                             staging)
+
+def compress_document(input_doc, pdf_mode, dpi, quality, to_grayscale, progress=None, guard=None):
+    """按 pdf_mode (见 PDF_MODES) 压缩已打开的文档，返回新的内存文档"""
+    compress = compress_document_mrc if pdf_mode == "mrc" else compress_document_by_rendering
+    return compress(input_doc, dpi, quality, to_grayscale, progress, guard)
+
+def predict_compressed_size(input_doc, pdf_mode, dpi, quality, to_grayscale, samples=PREDICT_SAMPLE_PAGES):
+    """
+    只压缩抽样的几页 (首页、末页和中间均匀分布的页)，按页数外推整个文件压缩后的字节数。
+    页数太少 (抽样的开销接近全部压缩) 时返回 None。
+    """
+    from core.quality_guard import sample_indices
+    total = len(input_doc)
+    if total < PREDICT_MIN_PAGES:
+        return None
+    pages = sorted(sample_indices(total, samples))
+    with fitz.open() as sample_doc:
+        for i in pages:
+            sample_doc.insert_pdf(input_doc, from_page=i, to_page=i)
+        # 抽样压缩的日志不输出，避免与正式压缩的日志混在一起
+        with contextlib.redirect_stdout(io.StringIO()):
+            with compress_document(sample_doc, pdf_mode, dpi, quality, to_grayscale, ProgressReporter(log=False)) as compressed:
+                sample_bytes = len(compressed.tobytes(**PDF_SAVE_OPTIONS[pdf_mode]))
+    return int(sample_bytes * total / len(pages))
+
+def saving_ratio(input_bytes, output_bytes):
+    return (input_bytes - output_bytes) / input_bytes if input_bytes else 0.0
+
+def describe_saving(input_bytes, output_bytes):
+    """“体积减小 35%”，变大时为 “约为原文件的 2.4 倍”"""
+    if output_bytes <= input_bytes or not input_bytes:
+        return f"体积减小 {saving_ratio(input_bytes, output_bytes):.0%}"
+    return f"约为原文件的 {output_bytes / input_bytes:.1f} 倍"
+
+def _keep_original(filepath, output_path, progress, input_bytes, staging):
+    with span("keep_original", file=os.path.basename(output_path)):
+        staging.copy(filepath, output_path)
+    progress.file_done(output_path, bytes_out=input_bytes)
+
+def compress_pdf_file(filepath, output_path, pdf_mode, dpi, quality, to_grayscale, progress=None, guard=None,
+                      min_saving=None, staging=None):
+    """
+    按 pdf_mode 压缩一个PDF文件并写出。
+    min_saving 为体积至少要减小的比例 (如 0.1)，None 表示总是输出压缩结果:
+      - 压缩前先抽样预测，明显达不到时不再压缩整个文件 (原生文字PDF压缩后往往反而变大)
+      - 压缩后实际仍达不到时同样不写出压缩结果
+    两种情况都把原文件复制到输出位置。要求转为灰度时不保留原文件 (原文件是彩色的，不符合要求)。
+    staging 为 core.read_ahead.StagedIO 时从预读的内容打开源文件，输出交给写回线程写盘。
+    """
+    progress = progress or ProgressReporter()
+    staging = staging or StagedIO()
+    try:
+        input_bytes = get_file_size(filepath, 'bytes')
+        if min_saving is not None and to_grayscale:
+            print("   - 已要求转为灰度: 即使体积减小不足也输出压缩结果，不保留彩色原文件")
+            min_saving = None
+        threshold = None if min_saving is None else input_bytes * (1 - min_saving)
+        # 源文档从进程内文档缓存借出 (出错时也会归还)
+        with staging.open_document(filepath) as input_doc:
+            progress.file_started(filepath, pages=len(input_doc), bytes_in=input_bytes)
+            if threshold is not None:
+                with span("predict_size", pages=len(input_doc)):
+                    predicted = predict_compressed_size(input_doc, pdf_mode, dpi, quality, to_grayscale)
+                if predicted is not None:
+                    print(f"   - 抽样预测: 压缩后约 {predicted / 1024 / 1024:.2f} MB ({describe_saving(input_bytes, predicted)})")
+                    # 预测有误差: 只有明显达不到要求时才跳过，接近要求的文件仍完整压缩后再比较
+                    if predicted > threshold * PREDICT_SAFETY:
+                        print(f"   - 预计体积减小不足 {min_saving:.0%}，跳过压缩，保留原文件")
+                        _keep_original(filepath, output_path, progress, input_bytes, staging)
+                        return True
+            with compress_document(input_doc, pdf_mode, dpi, quality, to_grayscale, progress, guard) as output_doc:
+                print("   - 正在保存最终文件...")
+                with span("save", file=os.path.basename(output_path)):
+                    data = output_doc.tobytes(**PDF_SAVE_OPTIONS[pdf_mode])
+        if threshold is not None and len(data) > threshold:
+            print(f"   - 压缩后 {len(data) / 1024 / 1024:.2f} MB ({describe_saving(input_bytes, len(data))})，"
+                  f"体积减小不足 {min_saving:.0%}，保留原文件")
+            _keep_original(filepath, output_path, progress, input_bytes, staging)
+            return True
+        staging.write(output_path, data)
+        progress.file_done(output_path, bytes_out=len(data))
+        return True
+    except Exception as e:
+        print(f"\n   [错误] 处理PDF {os.path.basename(filepath)} 时发生严重错误: {e}")
+        progress.file_done(output_path, ok=False)
+        return False
+
+def has_alpha(img):
+    return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+def is_graphic(img):
+    """截图、图表、图标等颜色很少的图片 (照片在缩小的样本中也有上万种颜色)"""
+    sample = img
+    if max(img.size) > AUTO_SAMPLE_SIDE:
+        scale = AUTO_SAMPLE_SIDE / max(img.size)
+        sample = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.NEAREST)
+    return sample.getcolors(AUTO_GRAPHIC_MAX_COLORS) is not None
+
+def choose_image_format(img, image_format):
+    """返回 (实际使用的格式, 说明)；auto 时按内容选择，不支持 WebP 的 Pillow 退回 JPEG/PNG"""
+    webp = features.check("webp")
+    if image_format != "auto":
+        if image_format.startswith("webp") and not webp:
+            fallback = "png" if image_format == "webp-lossless" else "jpeg"
+            return fallback, f"当前 Pillow 不支持 WebP，改用 {IMAGE_FORMAT_NAMES[fallback]}"
+        return image_format, "指定"
+    if is_graphic(img):
+        return ("webp-lossless" if webp else "png"), "自动: 截图/图表"
+    if has_alpha(img):
+        return ("webp" if webp else "png"), "自动: 带透明度"
+    return ("webp" if webp else "jpeg"), "自动: 照片"
+
+def _prepare_for_format(img, image_format):
+    """
+    转换为目标格式支持的模式: WebP/PNG 保留透明度，JPEG 把透明部分铺在白底上。
+    JPEG 与原来相同: 灰度/RGB/CMYK 保持不变，调色板图片转为 RGB。
+    """
+    if has_alpha(img):
+        if image_format != "jpeg":
+            return img.convert("LA" if img.mode == "LA" else "RGBA")
+        rgba = img.convert("RGBA")
+        img = Image.new("RGB", img.size, (255, 255, 255))
+        img.paste(rgba, mask=rgba.getchannel("A"))
+        return img
+    if image_format == "jpeg" and img.mode in ("L", "RGB", "CMYK"):
+        return img
+    return img.convert("L" if img.mode == "L" else "RGB")
+
+def encode_image(img, image_format, quality, effort):
+    """按格式和速度档位编码，返回文件数据"""
+    options = dict(ENCODER_OPTIONS[image_format][effort])
+    if image_format == "jpeg":
+        return _encode(img, "JPEG", quality=quality, subsampling="4:2:0", **options)
+    if image_format == "webp":
+        return _encode(img, "WEBP", quality=quality, **options)
+    if image_format == "webp-lossless":
+        return _encode(img, "WEBP", **options)
+    return _encode(img, "PNG", **options)
+
+def compress_image(filepath, output_path, quality, to_grayscale, max_size, progress=None, guard=None,
+                   image_format="jpeg", effort="max", staging=None):
+    """
+    极限压缩单个图片文件，通过缩放尺寸和降低质量实现 (guard 见 compress_pdf_by_rendering，staging 见 compress_pdf_file)。
+    image_format 见 IMAGE_FORMATS，effort 见 EFFORT_PRESETS；输出文件的扩展名随实际格式改变。
+    """
+    progress = progress or ProgressReporter()
+    staging = staging or StagedIO()
+    try:
+        original_size_mb = get_file_size(filepath, 'mb')
+        print(f"-> 开始极限压缩图片: {os.path.basename(filepath)} | 原始大小: {original_size_mb:.2f} MB")
+        progress.file_started(filepath, pages=1, bytes_in=get_file_size(filepath, 'bytes'))
+        with staging.open_image(filepath) as img:
+            original_dims = img.size
+            with span("decode", file=os.path.basename(filepath)):
+                img.load()
+            fmt, reason = choose_image_format(img, image_format)
+            output_path = os.path.splitext(output_path)[0] + IMAGE_FORMAT_EXTENSIONS[fmt]
+            lossless = fmt in LOSSLESS_FORMATS
+            print(f"   (模式: 图片重编码, 格式: {IMAGE_FORMAT_NAMES[fmt]} ({reason}), 档位: {effort}, "
+                  f"质量: {'无损' if lossless else quality}, 最大尺寸: {max_size or '不限制'}px)")
+            img = _prepare_for_format(img, fmt)
+            if max_size and max_size > 0 and (img.width > max_size or img.height > max_size):
+                with span("resize"):
+                    img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+                print(f"      - 已缩小尺寸: 从 {original_dims[0]}x{original_dims[1]} -> {img.width}x{img.height}")
+            # 与原来一样在缩放之后转灰度 (JPEG 输出与加入其他格式之前逐字节相同)
+            if to_grayscale:
+                img = img.convert("LA" if has_alpha(img) else "L")
+            encode = lambda q: encode_image(img, fmt, q, effort)
+            with span("encode", file=os.path.basename(output_path), format=fmt, effort=effort):
+                data = encode(quality)
+            # 无损格式不需要检查质量
+            if guard and not lossless and guard.should_check_image():
+                guard.start_file(quality)
+                with span("quality_check", file=os.path.basename(output_path)):
+                    data = guard.check(img, data, quality, encode=encode)
+                print(f"      - {guard.describe_file()}")
+            staging.write(output_path, data)
+        progress.page_done()
+        progress.file_done(output_path, bytes_out=len(data))
+        return True
+    except Exception as e:
+        print(f"\n   [错误] 处理图片 {os.path.basename(filepath)} 时发生严重错误: {e}")
+        progress.file_done(output_path, ok=False)
+        return False
+
+def count_pages(filepath):
+    """用于进度统计的页数 (取自元数据目录): PDF为实际页数，图片计为1页，无法打开的PDF计为0页"""
+    if os.path.splitext(filepath)[1].lower() != '.pdf':
+        return 1
+    try:
+        return get_catalog().lookup(filepath, verify=False).page_count or 0
+    except Exception:
+        return 0
+
+def compress_path(input_path, output_path, dpi, pdf_quality, img_quality, max_size, to_grayscale, pdf_mode="render",
+                  quality_guard=None, image_format="jpeg", effort="max", min_saving=DEFAULT_MIN_SAVING,
+                  read_ahead_mb=DEFAULT_READ_AHEAD_MB, progress=None):
+    """
+    新的主调用函数，处理单个文件或整个文件夹 (pdf_mode 见 PDF_MODES)。
+    quality_guard 为 core.quality_guard.QualityGuard 时抽查压缩质量并逐个文件报告。
+    image_format / effort 为独立图片的输出格式和编码速度档位 (见 IMAGE_FORMATS / EFFORT_PRESETS)。
+    min_saving: PDF体积减小不足此比例时输出原文件 (见 compress_pdf_file)，None 表示总是输出压缩结果。
+    read_ahead_mb: 处理多个文件时，后台预读后面文件的内存上限，输出异步写盘 (见 core/read_ahead.py)；0 表示关闭。
+    返回 True 表示所有文件都处理成功。
+    """
+    progress = progress or ProgressReporter()
+    if input_path == output_path:
+        print("错误：输入路径和输出路径不能相同！")
+        return False
+    if not os.path.exists(input_path):
+        print(f"错误: 输入路径不存在 -> '{input_path}'")
+        return False
+    if not os.path.exists(output_path): os.makedirs(output_path)
+
+    files_to_process, source_base_dir = [], ""
+    if os.path.isfile(input_path):
+        files_to_process.append(input_path)
+        source_base_dir = os.path.dirname(input_path)
+    elif os.path.isdir(input_path):
+        source_base_dir = input_path
+        # 文件列表和页数取自元数据目录: 未变化的子目录不重新列出，未变化的文件不重新打开
+        files_to_process = get_catalog().list_files(input_path)
+        # 输出文件夹位于输入文件夹内时，跳过其中上次运行的结果
+        output_prefix = os.path.abspath(output_path).rstrip(os.sep) + os.sep
+        files_to_process = [f for f in files_to_process if not os.path.abspath(f).startswith(output_prefix)]
+    files_to_process = [f for f in files_to_process
+                        if os.path.splitext(f)[1].lower() in ['.pdf'] + SUPPORTED_IMAGE_EXTENSIONS]
+    progress.job_started(total_files=len(files_to_process), total_pages=sum(count_pages(f) for f in files_to_process))
+
+    pdf_count, image_count, success_count = 0, 0, 0
+    # 只有一个文件时没有可以重叠的读写
+    staging = StagedIO(files_to_process if len(files_to_process) > 1 else (), read_ahead_mb)
+    try:
+        for filepath in files_to_process:
+            ext = os.path.splitext(filepath)[1].lower()
+            if ext == '.pdf':
+                pdf_count += 1
+                output_file = get_output_path(filepath, source_base_dir, output_path)
+                compress_pdf = compress_pdf_mrc if pdf_mode == "mrc" else compress_pdf_by_rendering
+                if compress_pdf(filepath, output_file, dpi, pdf_quality, to_grayscale, progress, quality_guard,
+                                min_saving, staging):
+                    success_count += 1
+            elif ext in SUPPORTED_IMAGE_EXTENSIONS:
+                image_count += 1
+                output_file = get_output_path(filepath, source_base_dir, output_path, new_ext=".jpg")
+                if compress_image(filepath, output_file, img_quality, to_grayscale, max_size, progress, quality_guard,
+                                  image_format, effort, staging):
+                    success_count += 1
+    finally:
+        write_errors = staging.close()
+    for failed_path, error in write_errors:
+        print(f"\n   [错误] 写入 {failed_path} 失败: {error}")
+    success_count -= len(write_errors)
+    
+    print("\n" + "="*50)
+    print("所有极限压缩任务已完成！")
+    print(f"总计发现 {pdf_count} 个PDF文件，{image_count} 个图片文件。")
+    print(f"成功处理 {success_count} 个文件。")
+    if quality_guard:
+        print(quality_guard.describe())
+    if staging.describe():
+        print(staging.describe())
+    print(f"结果已保存到: {output_path}")
+    print("="*50)
+    progress.job_finished()
+    return success_count == len(files_to_process)
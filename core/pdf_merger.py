@@ -0,0 +1,217 @@
+# 文件: core/pdf_merger.py
+
+import os
+import re
+import fitz  # PyMuPDF
+
+from core.catalog import get_catalog
+from core.progress import ProgressReporter
+from core.read_ahead import StagedIO, DEFAULT_READ_AHEAD_MB
+from core.tracing import span
+
+
+SUPPORTED_EXTENSIONS = ['.pdf', '.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+A4_PAPER_SIZE = fitz.paper_size("a4")
+
+def natural_sort_key(s):
+    """提供自然排序的键，用于像文件管理器一样排序"""
+    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
+
+def create_resized_image_pdf(image_path, data=None):
+    """【可靠的图片处理函数】创建一个包含单张、居中、A4尺寸图片的内存PDF文档 (data 为预读的图片内容)。"""
+    doc = fitz.open()
+    page = doc.new_page(width=A4_PAPER_SIZE[0], height=A4_PAPER_SIZE[1])
+    try:
+        margin = 36
+        drawable_area = page.rect + (margin, margin, -margin, -margin)
+        # insert_image 默认保持宽高比，在区域内等比缩放并居中
+        if data is not None:
+            page.insert_image(drawable_area, stream=data)
+        else:
+            page.insert_image(drawable_area, filename=image_path)
+    except Exception as e:
+        print(f"    - 警告: 无法处理图片 '{os.path.basename(image_path)}' : {e}")
+        doc.close()
+        return None
+    return doc
+
+def excluded_set(exclude):
+    """exclude 为要跳过的单个文件或文件的集合 (输出文件本身)，返回绝对路径的集合"""
+    if not exclude:
+        return set()
+    if isinstance(exclude, str):
+        exclude = [exclude]
+    return {os.path.abspath(p) for p in exclude}
+
+def process_directory_recursively(current_dir, final_doc, toc, level, config):
+    """
+    【核心递归函数 - 已修正V2】统一处理PDF和图片，确保都能合并。
+    """
+    try:
+        items = os.listdir(current_dir)
+        items.sort(key=natural_sort_key)
+    except OSError as e:
+        print(f"  - 警告: 无法读取目录 '{current_dir}': {e}")
+        return
+
+    for item_name in items:
+        full_path = os.path.join(current_dir, item_name)
+
+        if os.path.abspath(full_path) in config['excluded']:
+            continue
+
+        if os.path.isdir(full_path):
+            pages_before_entering = len(final_doc)
+            print(f"\n进入子文件夹: {os.path.relpath(full_path, config['root_folder'])}")
+            bookmark_to_add = [level, item_name, pages_before_entering + 1]
+            toc.append(bookmark_to_add)
+            process_directory_recursively(full_path, final_doc, toc, level + 1, config)
+            if len(final_doc) == pages_before_entering:
+                print(f"  - (空文件夹 '{item_name}'，已移除书签)")
+                toc.pop()
+        else:
+            ext = os.path.splitext(item_name)[1].lower()
+            if ext in SUPPORTED_EXTENSIONS:
+                print(f"  - 处理中: {item_name}")
+                progress, staging = config['progress'], config['staging']
+                source_doc = None
+                ok = True
+                try:
+                    # 文件可能在列出目录后被删除或无法访问，也按单个文件失败处理
+                    progress.file_started(full_path, bytes_in=os.path.getsize(full_path))
+                    start_page_count = len(final_doc)
+                    
+                    if ext == '.pdf':
+                        # 如果是PDF，从文档缓存借出后直接插入 (不在此处关闭)
+                        with staging.open_document(full_path) as pdf_doc:
+                            if len(pdf_doc) > 0:
+                                with span("insert_pdf", file=item_name, pages=len(pdf_doc)):
+                                    final_doc.insert_pdf(pdf_doc)
+                                print(f"    - 已合并 ({len(pdf_doc)} 页PDF)")
+                    # 如果是图片 (且不是PDF)
+                    elif ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
+                        if config['resize_images']:
+                            # 使用我们现有的函数将图片转为带边距的单页PDF
+                            with span("image_to_a4", file=item_name):
+                                source_doc = create_resized_image_pdf(full_path, staging.read_bytes(full_path))
+                            if source_doc:
+                                with span("insert_pdf", file=item_name, pages=1):
+                                    final_doc.insert_pdf(source_doc)
+                                print("    - 已合并 (1 页图片，已缩放至A4)")
+                        else:
+                            # 不缩放图片，将其尽可能大地插入新页面
+                            with span("insert_image", file=item_name):
+                                page = final_doc.new_page()
+                                with staging.open_image_document(full_path) as img_doc:
+                                    page.insert_image(page.rect, stream=img_doc[0].get_pixmap().tobytes())
+                            print("    - 已合并 (1 页图片，原始比例)")
+                    
+                    # 如果有页面被成功添加，则创建书签
+                    if len(final_doc) > start_page_count:
+                        file_bookmark_title = os.path.splitext(item_name)[0]
+                        toc.append([level, file_bookmark_title, start_page_count + 1])
+                        progress.page_done(len(final_doc) - start_page_count)
+                        
+                except Exception as e:
+                    print(f"    - 严重错误: 处理 '{item_name}' 失败: {e}")
+                    ok = False
+                finally:
+                    if source_doc:
+                        source_doc.close()
+                    progress.file_done(full_path, ok=ok)
+
+
+def count_mergeable_files(root_folder, output_filepath):
+    """统计将被合并的文件数 (用于进度显示，取自元数据目录)；output_filepath 见 excluded_set"""
+    excluded = excluded_set(output_filepath)
+    return sum(1 for path in get_catalog().list_files(root_folder, SUPPORTED_EXTENSIONS)
+               if os.path.abspath(path) not in excluded)
+
+def list_merge_order(root_folder, output_filepath=None):
+    """
+    按合并时的顺序 (自然排序、子文件夹原位展开) 列出将被合并的文件，用于预览和预读；output_filepath 见 excluded_set。
+    文件列表取自元数据目录的只读快速查询 (未变化的目录不重新列出，不打开任何文件)。
+    """
+    excluded = excluded_set(output_filepath)
+    root = os.path.abspath(root_folder)
+    entries = [e.path for e in get_catalog().snapshot(root, SUPPORTED_EXTENSIONS) if e.path not in excluded]
+    # 逐级按名称自然排序、子文件夹原位展开，等价于按各级路径名的自然排序键逐级比较
+    return sorted(entries, key=lambda p: [natural_sort_key(part) for part in os.path.relpath(p, root).split(os.sep)])
+
+def build_merged_document(root_folder, resize_images=False, exclude_path=None, progress=None,
+                          read_ahead_mb=DEFAULT_READ_AHEAD_MB):
+    """
+    把文件夹中的PDF和图片合并为一个内存中的文档 (带书签)，不写盘。
+    exclude_path 为要跳过的文件或文件的集合 (输出文件本身)；没有合并任何页面时返回 None，否则由调用方负责关闭。
+    read_ahead_mb 为按合并顺序后台预读后面文件的内存上限 (见 core/read_ahead.py)，0 表示关闭。
+    """
+    progress = progress or ProgressReporter()
+    final_doc = fitz.open()
+    toc = []
+
+    print(f"开始处理文件夹: {os.path.abspath(root_folder)}")
+    if resize_images:
+        print("模式: 图片将统一为A4页面尺寸。")
+    print("-" * 40)
+
+    # 只有一个结果文件，最后整体保存，不需要异步写回
+    staging = StagedIO(list_merge_order(root_folder, exclude_path) if read_ahead_mb else (), read_ahead_mb,
+                       write_behind=False)
+    config = {
+        'root_folder': root_folder,
+        'excluded': excluded_set(exclude_path),
+        'resize_images': resize_images,
+        'progress': progress,
+        'staging': staging
+    }
+    try:
+        process_directory_recursively(root_folder, final_doc, toc, 1, config)
+        if len(final_doc) == 0:
+            print("\n[错误] 未能合并任何文件。")
+            final_doc.close()
+            return None
+        if toc:
+            with span("set_toc", entries=len(toc)):
+                final_doc.set_toc(toc)
+    except Exception:
+        final_doc.close()
+        raise
+    finally:
+        staging.close()
+    if staging.describe():
+        print(staging.describe())
+    return final_doc
+
+def merge_files(root_folder, output_filepath, resize_images=False, progress=None, read_ahead_mb=DEFAULT_READ_AHEAD_MB):
+    """主函数，负责初始化和调用递归处理 (read_ahead_mb 见 build_merged_document)；返回是否成功写出合并结果"""
+    progress = progress or ProgressReporter()
+    if not os.path.isdir(root_folder):
+        print(f"[错误] 输入路径 '{root_folder}' 不是一个有效的文件夹。")
+        return False
+
+    output_dir = os.path.dirname(output_filepath)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    progress.job_started(total_files=count_mergeable_files(root_folder, output_filepath))
+    final_doc = build_merged_document(root_folder, resize_images, exclude_path=output_filepath, progress=progress,
+                                      read_ahead_mb=read_ahead_mb)
+    if final_doc is None:
+        # 没有可合并的内容也要结束任务，进度显示和监视文件夹据此判断没有生成输出
+        progress.job_finished()
+        return False
+
+    try:
+        print("\n正在生成最终PDF...")
+        with span("save", pages=len(final_doc)):
+            final_doc.save(output_filepath, garbage=4, deflate=True, clean=True)
+
+        print("\n" + "=" * 40)
+        print("[成功] 所有文件已合并完成！")
+        print(f"文件已保存至: {os.path.abspath(output_filepath)}")
+        print(f"总页数: {len(final_doc)}")
+        print("=" * 40)
+        progress.job_finished(bytes_out=os.path.getsize(output_filepath))
+        return True
+    finally:
+        final_doc.close()
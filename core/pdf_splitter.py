@@ -0,0 +1,286 @@
+# 文件: core/pdf_splitter.py
+
+import os
+from contextlib import ExitStack
+
+from core.doc_cache import get_document_cache
+from core.page_ranges import parse_page_spec, group_pages, group_label
+from core.pdf_writer import write_page_groups, print_write_report, DEFAULT_WRITE_WORKERS
+from core.progress import ProgressReporter
+from core.tracing import span
+
+
+def auto_output_path(input_path, label, output_path=None):
+    """按 “原文件名_pages_{范围}.pdf” 规则生成输出路径；指定了 output_path 时沿用其目录和文件名主干。"""
+    if output_path:
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        base_name = os.path.splitext(os.path.basename(output_path))[0]
+    else:
+        output_dir = os.path.dirname(os.path.abspath(input_path))
+        base_name = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, f"{base_name}_pages_{label}.pdf")
+
+def unique_output_paths(outputs):
+    """
+    输出路径重复时 (如范围 "1-3;1-3") 依次改为 “_2”、“_3” 后缀，避免并发写同一个文件。
+    outputs 为 [(输出路径, 页码列表), ...]，返回同样格式的新列表。
+    """
+    planned = {os.path.normcase(os.path.abspath(path)) for path, _ in outputs}
+    used, result = set(), []
+    for path, pages in outputs:
+        base, ext = os.path.splitext(path)
+        candidate, n = path, 2
+        key = os.path.normcase(os.path.abspath(candidate))
+        while key in used or (candidate != path and key in planned):
+            candidate, n = f"{base}_{n}{ext}", n + 1
+            key = os.path.normcase(os.path.abspath(candidate))
+        if candidate != path:
+            print(f"⚠️ 输出文件名重复，改为: {os.path.basename(candidate)}")
+        used.add(key)
+        result.append((candidate, pages))
+    return result
+
+def write_split_outputs(input_doc, outputs, max_workers=DEFAULT_WRITE_WORKERS, progress=None, stage=None):
+    """
+    从已打开的源文档写出多个拆分结果 [(输出路径, 页码列表), ...]，并打印报告。
+    stage 不为空时作为多阶段任务 (流水线) 中的一个阶段报告进度，任务的开始和结束由调用方报告。
+    """
+    progress = progress or ProgressReporter()
+    outputs = unique_output_paths(outputs)
+    total_pages = sum(len(pages) for _, pages in outputs)
+    if stage:
+        progress.stage_started(stage, total_files=len(outputs), total_pages=total_pages)
+    else:
+        progress.job_started(total_files=len(outputs), total_pages=total_pages)
+    try:
+        try:
+            results = write_page_groups(input_doc, outputs, max_workers=max_workers, progress=progress)
+        except Exception as e:
+            print(f"\n[错误] 保存文件时出错: {e}")
+            return []
+        print("\n[成功] PDF拆分完成！")
+        for r in results:
+            print(f"新文件已保存至: {os.path.abspath(r['path'])}")
+        if len(results) > 1:
+            print_write_report(results)
+        return results
+    finally:
+        # 出错时同样结束任务，否则进度一直停在拆分阶段
+        if not stage:
+            progress.job_finished()
+
+def _open_source(input_path):
+    """从进程内文档缓存借出源文档，返回 (ExitStack, 文档)；无法打开时打印原因并返回 None"""
+    if not os.path.isfile(input_path):
+        print(f"错误: 输入文件不存在 -> '{input_path}'")
+        return None
+    # 用完归还 (之后的压缩、转图片等任务可以直接复用)
+    opened = ExitStack()
+    try:
+        input_doc = opened.enter_context(get_document_cache().open(input_path))
+    except Exception as e:
+        print(f"错误: 无法打开或解析PDF文件 '{input_path}'. 文件可能已损坏或受密码保护。\n详细信息: {e}")
+        return None
+    return opened, input_doc
+
+def split_pdf_task(input_path, page_range_str, output_path=None, max_workers=DEFAULT_WRITE_WORKERS, progress=None):
+    """
+    根据指定的物理页码范围拆分一个PDF文件 (GUI适配版)。
+    支持多范围和批量输出，例如 "1-3,5,8-12;20-"：
+    ',' 分隔的范围合并到同一个文件，';' 分隔不同的输出文件。
+    所有输出都来自同一次打开的源文档，并发写盘。返回写出文件的统计信息列表，失败时为空列表。
+    """
+    source = _open_source(input_path)
+    if source is None:
+        return []
+    opened, input_doc = source
+    with opened:
+        print(f"源文件 '{os.path.basename(input_path)}' 共 {len(input_doc)} 页 (物理页数)。")
+        return split_document(input_doc, input_path, "range", page_range_str, output_path,
+                              max_workers=max_workers, progress=progress)
+
+# --- 其他拆分模式: 每N页 / 按一级书签 / 按文件大小上限 ---
+SPLIT_MODES = {
+    "range": "按页码范围",
+    "count": "每N页一个文件",
+    "bookmark": "按一级书签",
+    "size": "按文件大小上限",
+}
+# 每个输出文件/每页的固定开销估算 (文件头、xref表、页面字典等)
+FILE_OVERHEAD_BYTES = 2048
+PAGE_OVERHEAD_BYTES = 400
+SIZE_SAFETY_FACTOR = 0.9
+
+def plan_chunks_by_count(total_pages, pages_per_file):
+    """每 N 页切一块，返回 [(start, end), ...] (1起)"""
+    if pages_per_file < 1:
+        raise ValueError("每个文件的页数必须大于 0。")
+    return [(start, min(start + pages_per_file - 1, total_pages))
+            for start in range(1, total_pages + 1, pages_per_file)]
+
+def plan_chunks_by_bookmarks(doc):
+    """按一级书签切块；第一个书签之前的页面 (封面等) 单独成块"""
+    total_pages = len(doc)
+    starts = sorted(set(page for level, _, page in doc.get_toc(simple=True)
+                        if level == 1 and 1 <= page <= total_pages))
+    if not starts:
+        raise ValueError("该PDF没有可用的一级书签。")
+    if starts[0] != 1:
+        starts.insert(0, 1)
+    return [(start, (starts[i + 1] - 1) if i + 1 < len(starts) else total_pages)
+            for i, start in enumerate(starts)]
+
+def _stream_size(doc, xref):
+    try:
+        return len(doc.xref_stream_raw(xref) or b"") if doc.xref_is_stream(xref) else 0
+    except Exception:
+        return 0
+
+def _font_file_size(doc, font_xref):
+    """沿 FontDescriptor 找到嵌入的字体文件流，返回其压缩后的大小 (未嵌入返回0)"""
+    candidates = [font_xref]
+    kind, value = doc.xref_get_key(font_xref, "DescendantFonts")
+    if kind == "array":
+        candidates += [int(x) for x in value.strip("[]").split() if x.isdigit() and x != "0"][:1]
+    for xref in candidates:
+        kind, value = doc.xref_get_key(xref, "FontDescriptor")
+        if kind != "xref":
+            continue
+        desc_xref = int(value.split()[0])
+        for key in ("FontFile", "FontFile2", "FontFile3"):
+            kind, value = doc.xref_get_key(desc_xref, key)
+            if kind == "xref":
+                return _stream_size(doc, int(value.split()[0]))
+    return 0
+
+def estimate_page_costs(doc):
+    """
+    不做试存，直接根据原始(已压缩)流的长度估算每页的字节数。
+    返回 [(页面自身字节数, {共享资源xref: 字节数}), ...]，
+    共享资源 (图片、字体、表单) 在同一个输出文件中只计一次。
+    """
+    resource_sizes = {}
+    def size_of(xref, getter):
+        if xref not in resource_sizes:
+            resource_sizes[xref] = getter(doc, xref)
+        return resource_sizes[xref]
+
+    costs = []
+    for page in doc:
+        own = PAGE_OVERHEAD_BYTES + sum(_stream_size(doc, x) for x in page.get_contents())
+        resources = {}
+        for img in page.get_images(full=True):
+            for xref in (img[0], img[1]):  # 图片及其 SMask
+                if xref: resources[xref] = size_of(xref, _stream_size)
+        for font in page.get_fonts(full=True):
+            if font[0]: resources[font[0]] = size_of(font[0], _font_file_size)
+        for xobj in page.get_xobjects():
+            resources[xobj[0]] = size_of(xobj[0], _stream_size)
+        costs.append((own, resources))
+    return costs
+
+def plan_chunks_by_size(doc, max_bytes):
+    """
+    按文件大小上限贪心切块。返回 ([(start, end), ...], [每块估算字节数, ...])。
+    单页本身超过上限时仍单独成块，并在日志中提示。
+    """
+    budget = max_bytes * SIZE_SAFETY_FACTOR
+    chunks, estimates = [], []
+    start, current, seen = 1, FILE_OVERHEAD_BYTES, set()
+    for i, (own, resources) in enumerate(estimate_page_costs(doc), start=1):
+        added = own + sum(size for xref, size in resources.items() if xref not in seen)
+        if i > start and current + added > budget:
+            chunks.append((start, i - 1)); estimates.append(current)
+            start, seen = i, set()
+            current = FILE_OVERHEAD_BYTES
+            added = own + sum(resources.values())
+        current += added
+        seen.update(resources)
+        if i == start and current > max_bytes:
+            print(f"⚠️ 第 {i} 页估算约 {current / 1024 / 1024:.2f} MB，单页即超过上限，将单独输出。")
+    chunks.append((start, len(doc))); estimates.append(current)
+    return chunks, estimates
+
+def plan_range_outputs(total_pages, page_range_str, input_path, output_path=None):
+    """按页码范围表达式规划输出 [(输出路径, 页码列表), ...]；表达式无效时抛出 ValueError"""
+    groups = parse_page_spec(page_range_str, total_pages)
+    outputs = []
+    for group in groups:
+        print(f"\n准备提取物理页码 {group_label(group).replace('_', ', ')} 的页面...")
+        if len(groups) == 1 and output_path:
+            path = output_path
+        else:
+            path = auto_output_path(input_path, group_label(group), output_path)
+        outputs.append((path, group_pages(group)))
+    return outputs
+
+def split_document(input_doc, input_path, mode="range", value=None, output_path=None,
+                   max_workers=DEFAULT_WRITE_WORKERS, progress=None, stage=None):
+    """
+    拆分一个已打开的文档 (可以是尚未写盘的内存文档)，mode / value 同 split_pdf_by_mode。
+    input_path 只用于自动命名；stage 见 write_split_outputs。返回写出文件的统计信息列表。
+    """
+    if mode not in SPLIT_MODES:
+        print(f"错误: 未知的拆分模式 '{mode}'。")
+        return []
+    total_pages = len(input_doc)
+    if output_path and not output_path.lower().endswith('.pdf'):
+        output_path += '.pdf'
+    estimates = None
+    try:
+        if mode == "range":
+            outputs = plan_range_outputs(total_pages, value or "", input_path, output_path)
+        else:
+            print(f"拆分模式: {SPLIT_MODES[mode]}")
+            if mode == "count":
+                chunks = plan_chunks_by_count(total_pages, int(value))
+            elif mode == "bookmark":
+                with span("get_toc"):
+                    chunks = plan_chunks_by_bookmarks(input_doc)
+            else:
+                max_bytes = float(value) * 1024 * 1024
+                if max_bytes <= 0:
+                    raise ValueError("文件大小上限必须大于 0。")
+                with span("estimate_sizes", pages=total_pages):
+                    chunks, estimates = plan_chunks_by_size(input_doc, max_bytes)
+            print(f"计划输出 {len(chunks)} 个文件。")
+            outputs = [(auto_output_path(input_path, f"{start}-{end}", output_path), list(range(start - 1, end)))
+                       for start, end in chunks]
+    except (TypeError, ValueError) as e:
+        print(f"错误: {e}")
+        return []
+
+    results = write_split_outputs(input_doc, outputs, max_workers=max_workers, progress=progress, stage=stage)
+
+    if estimates:
+        over = [r for r in results if r["bytes"] > max_bytes]
+        print(f"大小估算: 预计 {sum(estimates) / 1024 / 1024:.2f} MB，"
+              f"实际 {sum(r['bytes'] for r in results) / 1024 / 1024:.2f} MB。")
+        for r in over:
+            print(f"⚠️ {os.path.basename(r['path'])} 实际 {r['bytes'] / 1024 / 1024:.2f} MB，超过上限。")
+    return results
+
+def split_pdf_by_mode(input_path, mode="range", value=None, output_path=None,
+                      max_workers=DEFAULT_WRITE_WORKERS, progress=None):
+    """
+    统一的拆分入口。mode:
+      - "range":    value 为页码范围表达式 (同 split_pdf_task)
+      - "count":    value 为每个文件的页数
+      - "bookmark": 按一级书签，每个书签一个文件
+      - "size":     value 为每个文件的大小上限 (MB)
+    所有模式都只解析一次源文件，输出沿用 “_pages_{start}-{end}” 命名。
+    返回写出文件的统计信息列表，失败时为空列表。
+    """
+    if mode == "range":
+        return split_pdf_task(input_path, value or "", output_path, max_workers=max_workers, progress=progress)
+    if mode not in SPLIT_MODES:
+        print(f"错误: 未知的拆分模式 '{mode}'。")
+        return []
+    source = _open_source(input_path)
+    if source is None:
+        return []
+    opened, input_doc = source
+    with opened:
+        print(f"源文件 '{os.path.basename(input_path)}' 共 {len(input_doc)} 页 (物理页数)。")
+        return split_document(input_doc, input_path, mode, value, output_path, max_workers=max_workers,
+                              progress=progress)
@@ -0,0 +1,157 @@
+# 文件: core/pdf_to_image.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import fitz  # PyMuPDF
+from PIL import Image
+
+from core.doc_cache import get_document_cache
+from core.memory_budget import adaptive_workers, worker_render_bytes, MB
+from core.page_ranges import parse_page_spec, group_pages
+from core.progress import ProgressReporter
+from core import tracing
+from core.tracing import span
+
+
+IMAGE_FORMATS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+# 每个子进程一次领取的页数；在途批次数限制为 进程数 x 2，
+# 因此无论文档多大，内存中同时存在的位图不超过进程数个
+PAGES_PER_BATCH = 4
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def image_output_path(output_dir, base_name, page_index, total_pages, fmt):
+    """输出文件名: 原文件名_page_0001.png (位数随总页数变化，保证按文件名排序即页序)"""
+    width = max(3, len(str(total_pages)))
+    return os.path.join(output_dir, f"{base_name}_page_{page_index + 1:0{width}d}{IMAGE_FORMATS[fmt]}")
+
+
+def render_page_to_file(page, output_path, fmt, dpi, quality, to_grayscale):
+    """渲染单页并立即写盘，返回写出的字节数。位图在函数返回后即可释放。"""
+    zoom = dpi / 72.0
+    colorspace = fitz.csGRAY if to_grayscale else fitz.csRGB
+    with span("render", page=page.number + 1):
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False)
+    with span("encode", page=page.number + 1, format=fmt):
+        if fmt == "png":
+            pix.save(output_path)
+        else:
+            mode = "L" if to_grayscale else "RGB"
+            img = Image.frombytes(mode, [pix.width, pix.height], pix.samples)
+            if fmt == "jpeg":
+                img.save(output_path, "JPEG", quality=quality)
+            else:
+                img.save(output_path, "WEBP", quality=quality, method=4)
+    return os.path.getsize(output_path)
+
+
+def _render_batch(input_path, pages, output_dir, base_name, fmt, dpi, quality, to_grayscale, trace=False):
+    """
+    子进程入口: 打开文档一次，依次渲染一批页面。
+    返回 ([(页码, 字节数), ...], 追踪事件列表或 None)。
+    trace=True 时在子进程内单独收集 span，随结果一起交回主进程合并。
+    """
+    collector = None
+    if trace:
+        tracing.set_enabled(True)
+        collector = tracing.start_collecting("render_batch")
+    results = []
+    try:
+        with span("open", pages=len(pages)):
+            doc = fitz.open(input_path)
+        with doc:
+            total_pages = len(doc)
+            for p in pages:
+                path = image_output_path(output_dir, base_name, p, total_pages, fmt)
+                results.append((p, render_page_to_file(doc[p], path, fmt, dpi, quality, to_grayscale)))
+    finally:
+        if collector:
+            tracing.stop_collecting()
+    return results, (collector.events if collector else None)
+
+
+def export_pdf_images(input_path, output_dir, fmt="png", dpi=150, page_range_str="",
+                      quality=85, to_grayscale=False, workers=DEFAULT_WORKERS, memory_reserved=0, progress=None):
+    """
+    将PDF页面渲染为 PNG / JPEG / WebP 图片。
+    page_range_str 沿用拆分功能的页码语法 ("1-3,5;8-")，留空表示全部页面。
+    workers > 1 时使用多进程并行渲染，按小批次流式分发，内存占用与文档页数无关；
+    实际进程数还受当前可用内存限制 (按最大一页的位图估算每个进程的内存峰值)；
+    memory_reserved 为任务队列放行本任务时已经预留的内存，计算可用内存时不扣除。
+    返回是否成功导出。
+    """
+    progress = progress or ProgressReporter()
+    if fmt not in IMAGE_FORMATS:
+        print(f"错误: 不支持的图片格式 '{fmt}'。可选: {', '.join(IMAGE_FORMATS)}")
+        return False
+    if not os.path.isfile(input_path):
+        print(f"错误: 输入文件不存在 -> '{input_path}'")
+        return False
+    try:
+        total_pages = get_document_cache().page_count(input_path)
+    except Exception as e:
+        print(f"错误: 无法打开或解析PDF文件 '{input_path}'. 文件可能已损坏或受密码保护。\n详细信息: {e}")
+        return False
+
+    try:
+        if page_range_str and page_range_str.strip():
+            pages = [p for group in parse_page_spec(page_range_str, total_pages) for p in group_pages(group)]
+            pages = list(dict.fromkeys(pages))  # 去重并保持顺序
+        else:
+            pages = list(range(total_pages))
+    except ValueError as e:
+        print(f"错误: {e}")
+        return False
+
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    workers = max(1, min(workers, (len(pages) + PAGES_PER_BATCH - 1) // PAGES_PER_BATCH))
+    if workers > 1:
+        page_sizes = get_document_cache().info(input_path).page_sizes
+        per_worker = worker_render_bytes([page_sizes[p] for p in pages], dpi, to_grayscale)
+        allowed = adaptive_workers(workers, per_worker, reserved=memory_reserved)
+        if allowed < workers:
+            print(f"可用内存不足以同时运行 {workers} 个渲染进程 (每个约 {per_worker / MB:.0f} MB)，改为 {allowed} 个。")
+            workers = allowed
+    print(f"源文件 '{os.path.basename(input_path)}' 共 {total_pages} 页，将导出 {len(pages)} 页。")
+    print(f"(格式: {fmt.upper()}, DPI: {dpi}, 质量: {quality}, 进程数: {workers})")
+
+    done, total_bytes = 0, 0
+    progress.job_started(total_files=1, total_pages=len(pages))
+    progress.file_started(input_path, pages=len(pages))
+
+    collector = tracing.current_collector()
+
+    def report(batch_output):
+        nonlocal done, total_bytes
+        batch_results, trace_events = batch_output
+        if collector and trace_events:
+            collector.extend(trace_events)
+        done += len(batch_results)
+        total_bytes += sum(size for _, size in batch_results)
+        progress.page_done(len(batch_results))
+
+    batches = [pages[i:i + PAGES_PER_BATCH] for i in range(0, len(pages), PAGES_PER_BATCH)]
+    args = (output_dir, base_name, fmt, dpi, quality, to_grayscale)
+    if workers == 1:
+        for batch in batches:
+            report(_render_batch(input_path, batch, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending, batch_iter = set(), iter(batches)
+            for batch in batch_iter:
+                pending.add(pool.submit(_render_batch, input_path, batch, *args, collector is not None))
+                if len(pending) >= workers * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished: report(future.result())
+            for future in pending:
+                report(future.result())
+
+    progress.file_done(output_dir, bytes_out=total_bytes)
+    print("\n" + "=" * 50)
+    print("[成功] PDF 转图片完成！")
+    print(f"共导出 {done} 页，总大小 {total_bytes / 1024 / 1024:.2f} MB。")
+    print(f"图片已保存至: {os.path.abspath(output_dir)}")
+    print("=" * 50)
+    progress.job_finished()
+    return True
@@ -0,0 +1,79 @@
+# 文件: core/pdf_writer.py
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz  # PyMuPDF
+
+from core.tracing import span, bind
+
+# 输出时统一使用的保存参数: 清理无用对象、合并重复对象，并压缩所有流
+SAVE_OPTIONS = dict(garbage=4, deflate=True, deflate_images=True, deflate_fonts=True, clean=True)
+DEFAULT_WRITE_WORKERS = 4
+
+
+def _page_runs(pages):
+    """把页码列表拆成连续区间 [(start, end), ...]，以便整段调用 insert_pdf。"""
+    runs = []
+    for p in pages:
+        if runs and p == runs[-1][1] + 1:
+            runs[-1][1] = p
+        else:
+            runs.append([p, p])
+    return runs
+
+
+def _write_bytes(path, data):
+    start = time.perf_counter()
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with span("write", file=os.path.basename(path), bytes=len(data)):
+        with open(path, "wb") as f:
+            f.write(data)
+    return time.perf_counter() - start
+
+
+def write_page_groups(source_doc, outputs, max_workers=DEFAULT_WRITE_WORKERS, progress=None):
+    """
+    从一个已打开的源文档一次性生成多个输出PDF。
+    outputs 为 [(输出路径, 页码列表(0起)), ...]。
+    页面组装和序列化在当前线程依次完成 (MuPDF 文档对象不能跨线程共用)，
+    得到的字节流交给线程池并发写盘。
+    返回每个文件的统计信息列表: path / pages / bytes / build_s / write_s。
+    progress 为 ProgressReporter 时，每个文件序列化完成即报告一次 (页数和输出字节数)。
+    """
+    results, futures = [], []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for path, pages in outputs:
+            start = time.perf_counter()
+            if progress: progress.file_started(path, pages=len(pages))
+            out_doc = fitz.open()
+            try:
+                with span("insert_pdf", file=os.path.basename(path), pages=len(pages)):
+                    for from_page, to_page in _page_runs(list(pages)):
+                        out_doc.insert_pdf(source_doc, from_page=from_page, to_page=to_page)
+                with span("save", file=os.path.basename(path)):
+                    data = out_doc.tobytes(**SAVE_OPTIONS)
+            finally:
+                out_doc.close()
+            result = {"path": path, "pages": len(pages), "bytes": len(data),
+                      "build_s": time.perf_counter() - start, "write_s": 0.0}
+            results.append(result)
+            if progress:
+                progress.page_done(len(pages))
+                progress.file_done(path, bytes_out=len(data))
+            futures.append((result, pool.submit(bind(_write_bytes), path, data)))
+        for result, future in futures:
+            result["write_s"] = future.result()
+    return results
+
+
+def print_write_report(results):
+    """在日志中输出每个文件的大小和耗时"""
+    total_bytes = sum(r["bytes"] for r in results)
+    print(f"\n共输出 {len(results)} 个文件，总大小 {total_bytes / 1024:.1f} KB:")
+    for r in results:
+        print(f"   - {os.path.basename(r['path'])}: {r['pages']} 页 | {r['bytes'] / 1024:.1f} KB"
+              f" | 组装 {r['build_s'] * 1000:.0f} ms | 写入 {r['write_s'] * 1000:.0f} ms")
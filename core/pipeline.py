@@ -0,0 +1,190 @@
+# 文件: core/pipeline.py
+
+# 操作流水线 (不依赖 PyQt5): 把 合并 -> 压缩 -> 拆分 串成一个任务，
+# 各阶段之间直接传递内存中的 PDF 文档，只有最终结果写盘，不再写出中间文件后重新解析。
+#   - 阶段按 merge -> compress -> split 的固定顺序执行，每个阶段都可以省略 (至少保留一个)
+#   - 输入为文件夹时必须包含合并阶段；输入为单个 PDF 时不能合并
+#   - 以拆分结束时输出多个文件 (output_path 为命名前缀，同 split_pdf_by_mode)，否则输出 output_path 一个文件
+#   - 压缩阶段保留合并生成的书签，之后仍可以按一级书签拆分
+
+import os
+import glob
+import time
+from contextlib import ExitStack
+
+from core.doc_cache import get_document_cache
+from core.pdf_writer import SAVE_OPTIONS
+from core.progress import ProgressReporter, format_seconds
+from core.tracing import span
+
+STAGES = ("merge", "compress", "split")
+STAGE_NAMES = {"merge": "合并", "compress": "压缩", "split": "拆分"}
+# 各阶段的参数及默认值
+STAGE_DEFAULTS = {
+    "merge": {"resize_images": False},
+    "compress": {"pdf_mode": "render", "dpi": 96, "quality": 65, "to_grayscale": False, "quality_guard": None},
+    "split": {"mode": "size", "value": 10},
+}
+
+
+def plan_pipeline(input_path, stages):
+    """
+    校验流水线设置。stages 为 {阶段名: 参数字典}，返回按执行顺序排列的 [(阶段名, 完整参数), ...]。
+    设置无效时抛出 ValueError。
+    """
+    from core.pdf_compressor import PDF_MODES
+    from core.pdf_splitter import SPLIT_MODES
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        raise ValueError(f"未知的流水线阶段: {', '.join(unknown)} (可选: {', '.join(STAGES)})")
+    if not stages:
+        raise ValueError("流水线至少需要一个阶段。")
+    if os.path.isdir(input_path):
+        if "merge" not in stages:
+            raise ValueError("输入为文件夹时，流水线必须从合并开始。")
+    elif os.path.isfile(input_path):
+        if not input_path.lower().endswith(".pdf"):
+            raise ValueError("输入文件必须是PDF。")
+        if "merge" in stages:
+            raise ValueError("合并阶段的输入必须是文件夹。")
+    else:
+        raise ValueError(f"输入路径不存在: {input_path}")
+    plan = []
+    for name in STAGES:
+        if name not in stages:
+            continue
+        options = dict(STAGE_DEFAULTS[name])
+        unknown = [key for key in (stages[name] or {}) if key not in options]
+        if unknown:
+            raise ValueError(f"{STAGE_NAMES[name]}阶段不支持参数: {', '.join(unknown)}")
+        options.update(stages[name] or {})
+        plan.append((name, options))
+    options = dict(plan)
+    if "compress" in options and options["compress"]["pdf_mode"] not in PDF_MODES:
+        raise ValueError(f"未知的压缩方式: {options['compress']['pdf_mode']!r} (可选: {', '.join(PDF_MODES)})")
+    if "split" in options and options["split"]["mode"] not in SPLIT_MODES:
+        raise ValueError(f"未知的拆分模式: {options['split']['mode']!r} (可选: {', '.join(SPLIT_MODES)})")
+    return plan
+
+def describe_pipeline(plan):
+    """例如 “合并 → 压缩 → 拆分”"""
+    return " → ".join(STAGE_NAMES[name] for name, _ in plan)
+
+def default_output_path(input_path):
+    """
+    文件夹: 与文件夹同级的 <文件夹名>_processed.pdf (放在输入文件夹之外，再次运行时不会被当作输入合并)；
+    PDF: 同目录下 <文件名>_processed.pdf
+    """
+    return os.path.splitext(os.path.abspath(input_path).rstrip(os.sep))[0] + "_processed.pdf"
+
+def pipeline_outputs(output_path):
+    """流水线会写出的文件中已经存在的: output_path 本身及拆分输出 <文件名主干>_pages_*.pdf"""
+    stem = os.path.splitext(output_path)[0]
+    return [output_path] + glob.glob(glob.escape(stem) + "_pages_*.pdf")
+
+
+def run_pipeline(input_path, output_path, stages, progress=None):
+    """
+    按 stages (见 plan_pipeline) 依次执行各阶段，阶段之间传递内存中的文档。
+    返回输出文件的路径列表；出错时打印原因并返回空列表。
+    """
+    progress = progress or ProgressReporter()
+    try:
+        plan = plan_pipeline(input_path, stages)
+    except ValueError as e:
+        print(f"[错误] {e}")
+        return []
+    if output_path and not output_path.lower().endswith(".pdf"):
+        output_path += ".pdf"
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"流水线: {describe_pipeline(plan)} (阶段之间不写中间文件)")
+    progress.job_started()
+    stage_times, outputs = [], []
+    # doc 为上一阶段交出的文档；owned 表示由流水线创建 (用完关闭)，否则为从文档缓存借出的输入
+    doc, owned = None, False
+    with ExitStack() as opened:
+        try:
+            for name, options in plan:
+                started = time.perf_counter()
+                with span(f"pipeline_{name}"):
+                    if name == "merge":
+                        doc, owned = _merge_stage(input_path, output_path, options, progress), True
+                    else:
+                        if doc is None:
+                            doc, owned = _open_input(input_path, opened), False
+                        if doc is not None and name == "compress":
+                            previous, doc = doc, _compress_stage(doc, input_path, options, progress)
+                            if owned:
+                                # 上一阶段的文档压缩完即可释放，不必留到最后
+                                previous.close()
+                            owned = True
+                        elif doc is not None:
+                            outputs = _split_stage(doc, output_path, options, progress)
+                stage_times.append((name, time.perf_counter() - started))
+                if doc is None or (name == "split" and not outputs):
+                    print(f"\n[错误] 流水线在{STAGE_NAMES[name]}阶段中止。")
+                    # 中止时同样结束任务，否则进度一直停在出错的阶段
+                    progress.job_finished()
+                    return []
+            if plan[-1][0] != "split":
+                print(f"\n正在保存: {output_path}")
+                with span("save", pages=len(doc)):
+                    doc.save(output_path, **SAVE_OPTIONS)
+                outputs = [{"path": output_path, "pages": len(doc), "bytes": os.path.getsize(output_path)}]
+        finally:
+            if owned and doc is not None:
+                doc.close()
+
+    total_bytes = sum(r["bytes"] for r in outputs)
+    print("\n" + "=" * 40)
+    print(f"[成功] 流水线完成，输出 {len(outputs)} 个文件，共 {total_bytes / 1024 / 1024:.2f} MB。")
+    print("各阶段耗时: " + " | ".join(f"{STAGE_NAMES[name]} {format_seconds(seconds)}" for name, seconds in stage_times))
+    print("=" * 40)
+    # 拆分阶段已经按文件报告了输出字节数
+    progress.job_finished(bytes_out=None if plan[-1][0] == "split" else total_bytes)
+    return [r["path"] for r in outputs]
+
+def _open_input(input_path, opened):
+    """从进程内文档缓存借出输入的PDF (流水线结束时归还，不在此关闭)"""
+    try:
+        doc = opened.enter_context(get_document_cache().open(input_path))
+    except Exception as e:
+        print(f"错误: 无法打开或解析PDF文件 '{input_path}'. 文件可能已损坏或受密码保护。\n详细信息: {e}")
+        return None
+    print(f"源文件 '{os.path.basename(input_path)}' 共 {len(doc)} 页。")
+    return doc
+
+def _merge_stage(input_path, output_path, options, progress):
+    from core.pdf_merger import build_merged_document, count_mergeable_files
+    # 输出位于输入文件夹内时，跳过之前运行写出的所有结果 (包括拆分输出)
+    excluded = pipeline_outputs(output_path)
+    progress.stage_started(STAGE_NAMES["merge"], total_files=count_mergeable_files(input_path, excluded))
+    doc = build_merged_document(input_path, options["resize_images"], exclude_path=excluded, progress=progress)
+    if doc is not None:
+        print(f"\n合并结果: {len(doc)} 页 (保留在内存中，交给下一阶段)")
+    return doc
+
+def _compress_stage(doc, input_path, options, progress):
+    """压缩为新的内存文档，并把书签原样带过去 (页数不变)；失败时返回 None"""
+    from core.pdf_compressor import compress_document
+    progress.stage_started(STAGE_NAMES["compress"], total_pages=len(doc))
+    progress.file_started(input_path, pages=len(doc))
+    try:
+        compressed = compress_document(doc, options["pdf_mode"], options["dpi"], options["quality"],
+                                       options["to_grayscale"], progress, options["quality_guard"])
+    except Exception as e:
+        print(f"\n   [错误] 压缩时发生严重错误: {e}")
+        progress.file_done(ok=False)
+        return None
+    toc = doc.get_toc(simple=True)
+    if toc:
+        compressed.set_toc(toc)
+    progress.file_done()
+    return compressed
+
+def _split_stage(doc, output_path, options, progress):
+    from core.pdf_splitter import split_document
+    return split_document(doc, output_path, options["mode"], options["value"], output_path,
+                          progress=progress, stage=STAGE_NAMES["split"])
@@ -0,0 +1,294 @@
+# 文件: core/process_runner.py
+
+# 在独立的工作进程中执行任务函数。
+# MuPDF 在损坏的输入上崩溃、内存耗尽，或 pdfplumber 等纯 Python 代码长时间占用 GIL，
+# 都只影响工作进程，不会拖垮或卡住界面。
+#
+#   - 任务函数及其参数通过管道发送给工作进程 (必须可以 pickle: 模块级函数 + 普通参数)
+#   - 工作进程中的 print 输出、进度事件 (ProgressEvent) 和返回值沿同一管道流式传回
+#   - 进程崩溃、取消或超时时强制结束该进程，调用方收到 TaskCrashed / TaskCancelled / TaskTimeout；
+#     工作进程自成一个进程组 (Windows 上按进程树)，任务创建的进程池子进程、resource_tracker 一并结束
+#   - 正常结束的工作进程会被保留下来复用，省去启动开销，并保留进程内的文档缓存
+
+import io
+import os
+import sys
+import time
+import pickle
+import signal
+import atexit
+import inspect
+import threading
+import traceback
+import multiprocessing
+# 先导入以注册 multiprocessing 自己的退出处理；atexit 按注册的相反顺序执行，
+# 这样下面的 shutdown() 会先结束空闲工作进程，否则退出时会一直等待它们
+import multiprocessing.util  # noqa: F401
+
+from core import tracing
+from core.progress import ProgressReporter
+
+ISOLATE_ENV = "PDF_TOOLBOX_ISOLATE"
+TIMEOUT_ENV = "PDF_TOOLBOX_TASK_TIMEOUT"
+POLL_INTERVAL = 0.1
+# 默认最多保留的空闲工作进程数
+MAX_IDLE_WORKERS = 2
+# 每个工作进程最多执行的任务数，之后换一个新进程 (释放累积的内存碎片)
+MAX_JOBS_PER_WORKER = 20
+
+_enabled = os.environ.get(ISOLATE_ENV, "1") not in ("", "0")
+_default_timeout = float(os.environ.get(TIMEOUT_ENV, "0") or 0)
+_max_idle_workers = MAX_IDLE_WORKERS
+
+
+def is_enabled():
+    return _enabled
+
+def set_enabled(enabled):
+    """开启/关闭进程隔离 (只影响之后开始的任务)"""
+    global _enabled
+    _enabled = bool(enabled)
+
+def default_timeout():
+    """任务超时秒数，0 表示不限制"""
+    return _default_timeout
+
+def set_default_timeout(seconds):
+    global _default_timeout
+    _default_timeout = max(0.0, float(seconds or 0))
+
+def set_max_idle_workers(count):
+    """同时运行多个任务时 (如任务服务器)，让每个并发槽位都能保留一个可复用的工作进程"""
+    global _max_idle_workers
+    _max_idle_workers = max(0, int(count))
+
+
+class TaskError(Exception):
+    """任务函数在工作进程中抛出了异常；str() 为工作进程中的完整 traceback"""
+
+class TaskCrashed(Exception):
+    """工作进程意外退出 (崩溃、被系统杀死等)"""
+
+class TaskTimeout(TaskCrashed):
+    """任务超时，工作进程已被终止"""
+
+class TaskCancelled(Exception):
+    """任务被取消，工作进程已被终止"""
+
+
+# --- 工作进程端 ---
+
+class _PipeWriter(io.TextIOBase):
+    """工作进程的 stdout/stderr: 每次 write 作为一条日志消息发回主进程"""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def write(self, text):
+        if text:
+            self.conn.send(("log", text))
+        return len(text)
+
+    def flush(self):
+        pass
+
+def _picklable(value):
+    try:
+        pickle.dumps(value)
+        return value
+    except Exception:
+        return None
+
+def _worker_main(conn):
+    """工作进程主循环: 逐个接收 (函数, 参数, 是否追踪)，执行并回传结果；收到 None 时退出"""
+    if hasattr(os, "setsid"):
+        # 新会话/进程组: 之后创建的子进程都在组内，终止任务时按组结束，不会留下孤儿进程继续渲染、写文件
+        os.setsid()
+    sys.stdout = sys.stderr = _PipeWriter(conn)
+    from core.doc_cache import get_document_cache
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        func, kwargs, trace = message
+        tracing.set_enabled(trace)
+        kwargs = dict(kwargs)
+        if "progress" not in kwargs and "progress" in inspect.signature(func).parameters:
+            kwargs["progress"] = ProgressReporter(callback=lambda event: conn.send(("progress", event)))
+        tracing.start_collecting(func.__name__)
+        try:
+            outcome = ("done", _picklable(func(**kwargs)))
+        except BaseException:
+            outcome = ("error", traceback.format_exc())
+        finally:
+            tracing.finish_and_report(tracing.stop_collecting())
+        conn.send(("cache_stats", get_document_cache().stats()))
+        conn.send(outcome)
+
+
+# --- 主进程端 ---
+
+class WorkerProcess:
+    """一个工作进程及其管道"""
+    def __init__(self):
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        # 不能设为 daemon: 任务本身可能还会创建进程池 (如 PDF 转图片)
+        self.process = context.Process(target=_worker_main, args=(child_conn,), name="pdf-toolbox-worker")
+        self.process.start()
+        child_conn.close()
+        self.jobs_run = 0
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def exit_code(self):
+        self.process.join(1)
+        return self.process.exitcode
+
+    def stop(self, timeout=2):
+        """正常结束 (空闲时)，超时未退出则强制结束"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+    def _signal_group(self, sig):
+        """向工作进程所在的进程组发送信号 (组内进程都已退出时忽略)"""
+        try:
+            os.killpg(self.process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _kill_tree(self):
+        """Windows: 没有进程组，用 taskkill /T 结束整个进程树"""
+        import subprocess
+        try:
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(self.process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
+        except (OSError, subprocess.SubprocessError):
+            pass
+
+    def kill(self):
+        """
+        强制结束工作进程及其创建的所有子进程 (进程池、resource_tracker)。
+        工作进程已经崩溃退出时，它留下的子进程同样会被结束。
+        """
+        if self.process.pid is None:
+            self.conn.close()
+            return
+        if hasattr(os, "killpg"):
+            # 先 SIGTERM 给整个组留出退出时间，之后仍未退出的进程 SIGKILL
+            self._signal_group(signal.SIGTERM)
+            self.process.join(2)
+            self._signal_group(signal.SIGKILL)
+        elif self.process.is_alive():
+            self._kill_tree()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+_idle = []
+_all_workers = set()
+_pool_lock = threading.Lock()
+_last_cache_stats = None
+
+def _acquire():
+    with _pool_lock:
+        while _idle:
+            worker = _idle.pop()
+            if worker.is_alive():
+                return worker
+            _all_workers.discard(worker)
+        worker = WorkerProcess()
+        _all_workers.add(worker)
+        return worker
+
+def _release(worker):
+    worker.jobs_run += 1
+    with _pool_lock:
+        if worker.is_alive() and worker.jobs_run < MAX_JOBS_PER_WORKER and len(_idle) < _max_idle_workers:
+            _idle.append(worker)
+            return
+        _all_workers.discard(worker)
+    worker.stop()
+
+def _discard(worker):
+    with _pool_lock:
+        _all_workers.discard(worker)
+    worker.kill()
+
+def stop_idle_workers():
+    """结束所有空闲的工作进程 (同时丢弃它们的文档缓存)"""
+    global _last_cache_stats
+    with _pool_lock:
+        idle = list(_idle)
+        _idle.clear()
+        _all_workers.difference_update(idle)
+        _last_cache_stats = None
+    for worker in idle:
+        worker.stop()
+
+@atexit.register
+def shutdown():
+    """结束所有工作进程 (程序退出时自动调用)"""
+    with _pool_lock:
+        workers = list(_all_workers)
+        _all_workers.clear()
+        idle = set(_idle)
+        _idle.clear()
+    for worker in workers:
+        worker.stop() if worker in idle else worker.kill()
+
+def last_cache_stats():
+    """最近一次任务结束时，工作进程中文档缓存的统计 (尚未运行过任务时为 None)"""
+    return _last_cache_stats
+
+def run_isolated(func, kwargs, on_log=None, on_progress=None, timeout=None, cancel_event=None):
+    """
+    在工作进程中执行 func(**kwargs) 并等待结果。
+    on_log(text) / on_progress(event) 在调用线程中被回调；
+    timeout 为秒数 (None 使用全局设置，0 不限制)；cancel_event 被 set 后终止任务。
+    返回 func 的返回值 (无法 pickle 时为 None)。
+    """
+    global _last_cache_stats
+    timeout = default_timeout() if timeout is None else timeout
+    deadline = time.monotonic() + timeout if timeout else None
+    worker = _acquire()
+    try:
+        worker.conn.send((func, kwargs, tracing.is_enabled()))
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise TaskCancelled("任务已取消，工作进程已终止。")
+            if deadline is not None and time.monotonic() > deadline:
+                raise TaskTimeout(f"任务超过 {timeout:g} 秒仍未完成，工作进程已终止。")
+            if not worker.conn.poll(POLL_INTERVAL):
+                if not worker.is_alive():
+                    raise EOFError
+                continue
+            kind, payload = worker.conn.recv()
+            if kind == "log":
+                if on_log: on_log(payload)
+            elif kind == "progress":
+                if on_progress: on_progress(payload)
+            elif kind == "cache_stats":
+                _last_cache_stats = payload
+            else:
+                _release(worker)
+                worker = None
+                if kind == "error":
+                    raise TaskError(payload)
+                return payload
+    except (EOFError, OSError):
+        code = worker.exit_code()
+        raise TaskCrashed(f"任务进程意外退出 (退出码 {code})。\n"
+                          f"可能是输入文件损坏导致 PDF 引擎崩溃，或内存不足。") from None
+    finally:
+        if worker is not None:
+            _discard(worker)
@@ -0,0 +1,253 @@
+# 文件: core/progress.py
+
+# 结构化进度事件。
+# 任务函数通过 ProgressReporter 报告 “任务开始 / 阶段开始 / 文件开始 / 页面完成 / 文件完成 / 任务结束”，
+# 每个事件都是一份完整的进度快照 (已完成页数、文件数、输入输出字节数、速度、剩余时间)。
+# 界面的进度条、命令行和日志中的进度行都由这些事件生成，不再解析 print 的文本。
+
+import os
+import time
+
+JOB_STARTED = "job_started"
+STAGE_STARTED = "stage_started"
+FILE_STARTED = "file_started"
+PAGE_DONE = "page_done"
+FILE_DONE = "file_done"
+JOB_FINISHED = "job_finished"
+
+# 连续两个 PAGE_DONE 事件的最短间隔 (秒)，避免每页都发送一次信号、刷新一次日志
+PAGE_EVENT_INTERVAL = 0.1
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.1f} 秒"
+    return f"{int(seconds // 60)} 分 {int(seconds % 60)} 秒"
+
+def format_bytes(size):
+    if size is None:
+        return "-"
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:.2f} MB"
+    return f"{size / 1024:.1f} KB"
+
+
+class ProgressEvent:
+    """
+    一次进度快照。pages_done / files_done 等计数是当前阶段内的累计值
+    (JOB_FINISHED 事件中为整个任务的总量)；file_* 字段描述当前文件。
+    """
+    __slots__ = ("kind", "stage", "path", "ok",
+                 "pages_done", "total_pages", "files_done", "total_files",
+                 "file_pages_done", "file_pages", "file_bytes_in", "file_bytes_out",
+                 "bytes_in", "bytes_out", "elapsed", "pages_per_second", "eta_seconds")
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @property
+    def fraction(self):
+        """完成比例 (0~1)；总量未知时返回 None，任务结束事件总是 1"""
+        if self.kind == JOB_FINISHED:
+            return 1.0
+        if self.total_pages:
+            return min(1.0, self.pages_done / self.total_pages)
+        if self.total_files:
+            return min(1.0, self.files_done / self.total_files)
+        return None
+
+    def to_dict(self):
+        """转为可 JSON 序列化的字典 (任务服务器的进度接口使用)"""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["fraction"] = self.fraction
+        return data
+
+    def __repr__(self):
+        return f"ProgressEvent({self.kind}, pages={self.pages_done}/{self.total_pages}, files={self.files_done}/{self.total_files})"
+
+
+def describe_progress(event):
+    """进度条旁的一行说明文字，例如 “12/40 页 | 文件 1/3 | 3.2 页/秒 | 剩余约 8.8 秒”"""
+    if event.kind == JOB_FINISHED:
+        parts = [f"已完成 {event.pages_done} 页" if event.pages_done else "已完成"]
+        if event.files_done: parts.append(f"{event.files_done} 个文件")
+        parts.append(f"耗时 {format_seconds(event.elapsed)}")
+        if event.pages_per_second: parts.append(f"{event.pages_per_second:.1f} 页/秒")
+        if event.bytes_out: parts.append(f"输出 {format_bytes(event.bytes_out)}")
+        return " | ".join(parts)
+    parts = [event.stage] if event.stage else []
+    if event.total_pages:
+        parts.append(f"{event.pages_done}/{event.total_pages} 页")
+    elif event.pages_done:
+        parts.append(f"{event.pages_done} 页")
+    if event.total_files and event.total_files > 1:
+        parts.append(f"文件 {min(event.files_done + 1, event.total_files)}/{event.total_files}")
+    if event.pages_per_second:
+        parts.append(f"{event.pages_per_second:.1f} 页/秒")
+    if event.eta_seconds is not None:
+        parts.append(f"剩余约 {format_seconds(event.eta_seconds)}")
+    return " | ".join(parts)
+
+
+def format_log_line(event):
+    """由事件生成日志文本；不需要写日志的事件返回 None"""
+    if event.kind == STAGE_STARTED:
+        total = f" (共 {event.total_pages} 页)" if event.total_pages else ""
+        return f"\n== {event.stage}{total} =="
+    if event.kind == PAGE_DONE:
+        # 总页数未知 (如合并文件夹) 时只更新进度条，不写进度行
+        if event.file_pages:
+            line = f"\r   - 第 {event.file_pages_done}/{event.file_pages} 页"
+        elif event.total_pages:
+            line = f"\r   - 已处理 {event.pages_done}/{event.total_pages} 页"
+        else:
+            return None
+        if event.pages_per_second:
+            line += f" | {event.pages_per_second:.1f} 页/秒"
+        if event.eta_seconds is not None:
+            line += f" | 剩余约 {format_seconds(event.eta_seconds)}"
+        return line
+    if event.kind == FILE_DONE and event.ok and event.file_bytes_out is not None:
+        line = f"   [完成] -> {os.path.basename(event.path or '')}"
+        if event.file_pages:
+            line += f" | {event.file_pages} 页"
+        line += f" | {format_bytes(event.file_bytes_out)}"
+        if event.file_bytes_in:
+            reduction = (event.file_bytes_in - event.file_bytes_out) / event.file_bytes_in * 100
+            line += f" (原 {format_bytes(event.file_bytes_in)}，体积减小 {reduction:.2f}%)"
+        return line
+    if event.kind == JOB_FINISHED:
+        return f"\n[进度] {describe_progress(event)}"
+    return None
+
+
+class ProgressReporter:
+    """
+    任务函数使用的进度报告器 (不依赖 Qt)。
+    callback 接收每个 ProgressEvent (GUI 中为 Worker 的 progress 信号)；
+    log=True 时同时把事件转换成日志文本 print 出来，命令行和日志框看到的进度都来自这里。
+    """
+    def __init__(self, callback=None, log=True, page_interval=PAGE_EVENT_INTERVAL):
+        self.callback = callback
+        self.log = log
+        self.page_interval = page_interval
+        self._job_start = self._stage_start = time.perf_counter()
+        self._stage = None
+        self._pages = self._files = 0
+        self._stage_pages0 = self._stage_files0 = 0
+        self._job_pages = self._job_files = 0
+        self._total_pages = self._total_files = None
+        self._bytes_in = self._bytes_out = 0
+        self._file = None
+        self._last_page_event = 0.0
+        self._line_open = False
+
+    # --- 任务函数调用的接口 ---
+    def job_started(self, total_files=None, total_pages=None, stage=None):
+        self._job_start = time.perf_counter()
+        self._begin_stage(stage, total_files, total_pages)
+        self._emit(JOB_STARTED)
+
+    def stage_started(self, stage, total_files=None, total_pages=None):
+        """进入新阶段 (如 “识别页眉” -> “写出文件”)，页数、文件数、速度从零开始计算"""
+        self._begin_stage(stage, total_files, total_pages)
+        self._emit(STAGE_STARTED)
+
+    def file_started(self, path, pages=None, bytes_in=None):
+        self._file = {"path": path, "pages": pages, "pages_done": 0, "bytes_in": bytes_in, "bytes_out": None}
+        if bytes_in:
+            self._bytes_in += bytes_in
+        self._emit(FILE_STARTED)
+
+    def page_done(self, count=1, log=True):
+        """count 页处理完成。log=False 时只更新进度，不写进度行 (如直接命中缓存的页面)"""
+        self._pages += count
+        if self._file:
+            self._file["pages_done"] += count
+        now = time.perf_counter()
+        file_complete = self._file and self._file["pages"] and self._file["pages_done"] >= self._file["pages"]
+        stage_complete = self._total_pages and self._pages - self._stage_pages0 >= self._total_pages
+        if file_complete or stage_complete or now - self._last_page_event >= self.page_interval:
+            self._last_page_event = now
+            # 整个文件一次报告完 (如拆分时一次写出一个文件) 时，文件完成的日志已经足够，不再写进度行
+            whole_file = bool(self._file and self._file["pages"] and count >= self._file["pages"])
+            self._emit(PAGE_DONE, line_complete=bool(file_complete or stage_complete), quiet=whole_file or not log)
+
+    def file_done(self, path=None, bytes_out=None, ok=True):
+        """
+        一个文件处理结束。失败 (ok=False) 时该文件未报告的页面也计为已完成，
+        保证进度条最终能走到 100%。
+        """
+        if self._file is None:
+            self._file = {"path": path, "pages": None, "pages_done": 0, "bytes_in": None, "bytes_out": None}
+        if self._file["pages"]:
+            self._pages += max(0, self._file["pages"] - self._file["pages_done"])
+        self._file["path"] = path or self._file["path"]
+        self._file["bytes_out"] = bytes_out
+        if bytes_out:
+            self._bytes_out += bytes_out
+        self._files += 1
+        self._emit(FILE_DONE, ok=ok)
+        self._file = None
+
+    def job_finished(self, bytes_out=None):
+        if bytes_out:
+            self._bytes_out += bytes_out
+        self._emit(JOB_FINISHED)
+
+    # --- 内部实现 ---
+    def _begin_stage(self, stage, total_files, total_pages):
+        # 多阶段任务 (同一批页面先识别、再写出) 的总量按各阶段中最大的一个计
+        self._job_pages = max(self._job_pages, self._pages - self._stage_pages0)
+        self._job_files = max(self._job_files, self._files - self._stage_files0)
+        self._stage = stage
+        self._stage_start = time.perf_counter()
+        self._stage_pages0, self._stage_files0 = self._pages, self._files
+        self._total_files, self._total_pages = total_files, total_pages
+        self._file = None
+
+    def _snapshot(self, kind, ok=True):
+        now = time.perf_counter()
+        if kind == JOB_FINISHED:
+            pages_done = max(self._job_pages, self._pages - self._stage_pages0)
+            files_done = max(self._job_files, self._files - self._stage_files0)
+            elapsed = now - self._job_start
+            total_pages = total_files = None
+        else:
+            pages_done, files_done = self._pages - self._stage_pages0, self._files - self._stage_files0
+            elapsed = now - self._stage_start
+            total_pages, total_files = self._total_pages, self._total_files
+        rate = pages_done / elapsed if elapsed > 0 and pages_done else None
+        eta = None
+        if total_pages and rate:
+            eta = max(0.0, (total_pages - pages_done) / rate)
+        elif not total_pages and total_files and files_done and elapsed > 0:
+            eta = max(0.0, (total_files - files_done) * elapsed / files_done)
+        f = self._file or {}
+        return ProgressEvent(
+            kind=kind, stage=self._stage, path=f.get("path"), ok=ok,
+            pages_done=pages_done, total_pages=total_pages, files_done=files_done, total_files=total_files,
+            file_pages_done=f.get("pages_done"), file_pages=f.get("pages"),
+            file_bytes_in=f.get("bytes_in"), file_bytes_out=f.get("bytes_out"),
+            bytes_in=self._bytes_in, bytes_out=self._bytes_out,
+            elapsed=elapsed, pages_per_second=rate, eta_seconds=eta)
+
+    def _emit(self, kind, ok=True, line_complete=False, quiet=False):
+        event = self._snapshot(kind, ok)
+        if self.log and not quiet:
+            line = format_log_line(event)
+            if line is not None:
+                if kind == PAGE_DONE:
+                    # 文件或阶段的最后一页换行收尾，之后的普通日志不会接在进度行后面
+                    print(line, end="\n" if line_complete else "")
+                    self._line_open = not line_complete
+                else:
+                    # 上一行是 '\r' 刷新的进度行时先换行，避免被覆盖
+                    print(("\n" if self._line_open else "") + line)
+                    self._line_open = False
+        if self.callback:
+            self.callback(event)
+        return event
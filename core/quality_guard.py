@@ -0,0 +1,197 @@
+# 文件: core/quality_guard.py
+
+# 有损压缩的质量守卫 (不依赖 PyQt5): 抽查部分页面/图片，把压缩结果与压缩前的位图比较，
+# 计算 SSIM (结构相似度) 或 PSNR (峰值信噪比)，低于阈值时可以提高整个文件的编码质量。
+#   - 开销有上限: 每个PDF最多抽查 sample_pages 页 (首页、末页和中间均匀分布的页)，
+#     图片每 image_stride 张抽查一张；指标在缩小到 METRIC_MAX_SIDE 以内的灰度图上计算
+#   - 逐像素运算全部由 Pillow 的整图运算 (ImageMath / reduce) 完成，不在 Python 中循环
+#   - SSIM 使用 8x8 不重叠窗口 (块 SSIM)，SSIM 和 PSNR 都只对有内容的窗口取平均
+#   - 允许重试时，抽查在编码整个文件之前进行，任一抽查页不合格则整个文件按提高后的质量编码
+#   - 比较的是同一分辨率下 JPEG 编码前后的差异，衡量的是“质量”参数造成的损失，不包括降低 DPI 的损失
+
+import io
+import math
+
+from PIL import Image, ImageMath
+
+METRICS = ("ssim", "psnr")
+# 默认阈值: 96 DPI 的文字页面在 JPEG 质量约 30 以下时低于此值，文字开始难以辨认
+# (实测文字页面 SSIM: 质量 20 约 0.91-0.92，30 约 0.94-0.95；有内容窗口的 PSNR: 质量 20 约 20-23 dB，30 约 22-25 dB)
+DEFAULT_THRESHOLDS = {"ssim": 0.93, "psnr": 22.0}
+DEFAULT_SAMPLE_PAGES = 4
+DEFAULT_IMAGE_STRIDE = 5
+# 重新编码时每次提高的质量，以及质量上限
+QUALITY_STEP = 10
+MAX_QUALITY = 95
+# 计算指标前把图片缩小到的最长边 (像素)
+METRIC_MAX_SIDE = 2048
+SSIM_BLOCK = 8
+# SSIM 的稳定常数 (K1=0.01, K2=0.03，像素范围 255)
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+# 方差之和低于此值的窗口视为空白，不参与平均
+SSIM_FLAT_VARIANCE = 25.0
+# 完全相同时 PSNR 为无穷大，显示和比较时按此值计
+PSNR_MAX = 100.0
+
+# Pillow 10.3 起 ImageMath.eval 更名为 unsafe_eval (表达式都是本模块中的常量)
+_eval = getattr(ImageMath, "unsafe_eval", None) or ImageMath.eval
+
+
+def _prepare(img, size=None):
+    """转为灰度并缩小 (两张图缩放到同一尺寸)"""
+    gray = img.convert("L")
+    if size is None:
+        scale = min(1.0, METRIC_MAX_SIDE / max(gray.size))
+        size = (max(SSIM_BLOCK, round(gray.width * scale)), max(SSIM_BLOCK, round(gray.height * scale)))
+    if gray.size != size:
+        gray = gray.resize(size, Image.BOX)
+    return gray
+
+def _mean(img_f):
+    # 浮点图像不支持 ImageStat，整图 BOX 缩小到 1 像素即为平均值
+    return img_f.resize((1, 1), Image.BOX).getpixel((0, 0))
+
+def _blocks(reference, candidate):
+    """
+    两张图转为灰度、缩放到同一尺寸 (裁掉不足一个窗口的边缘) 后按 8x8 窗口统计。
+    返回 (a, b, 窗口均值 a/b, 窗口方差 a/b, 有内容窗口的权重 0/1)。
+    """
+    a = _prepare(reference)
+    b = _prepare(candidate, a.size)
+    w, h = a.width // SSIM_BLOCK * SSIM_BLOCK, a.height // SSIM_BLOCK * SSIM_BLOCK
+    a, b = a.crop((0, 0, w, h)).convert("F"), b.crop((0, 0, w, h)).convert("F")
+    mu_a, mu_b = a.reduce(SSIM_BLOCK), b.reduce(SSIM_BLOCK)
+    var_a = _eval("aa - ma * ma", aa=_eval("x * x", x=a).reduce(SSIM_BLOCK), ma=mu_a)
+    var_b = _eval("bb - mb * mb", bb=_eval("x * x", x=b).reduce(SSIM_BLOCK), mb=mu_b)
+    # 只统计有内容的窗口: 文档页面大部分是空白，空白窗口几乎没有误差，会掩盖文字的损失
+    weight = _eval("float((va + vb) > t)", va=var_a, vb=var_b, t=SSIM_FLAT_VARIANCE)
+    return a, b, mu_a, mu_b, var_a, var_b, weight
+
+def _content_mean(values, weight):
+    """有内容窗口上的平均值 (整页空白时为全部窗口的平均值)"""
+    covered = _mean(weight)
+    if covered == 0:
+        return _mean(values)
+    return _mean(_eval("v * w", v=values, w=weight)) / covered
+
+def psnr(reference, candidate):
+    """
+    峰值信噪比 (dB)，只在有内容的窗口上计算均方误差。
+    按整页计算时空白占比决定了结果 (文字稀疏的页面在低质量下反而更高，且随质量上下跳动)，不适合作为门槛。
+    """
+    a, b, _, _, _, _, weight = _blocks(reference, candidate)
+    mse = _content_mean(_eval("(x - y) * (x - y)", x=a, y=b).reduce(SSIM_BLOCK), weight)
+    if mse == 0:
+        return PSNR_MAX
+    return min(PSNR_MAX, 10 * math.log10(255 * 255 / mse))
+
+def ssim(reference, candidate):
+    """块 SSIM: 各 8x8 窗口的 SSIM 的平均值 (1 为完全相同)"""
+    a, b, mu_a, mu_b, var_a, var_b, weight = _blocks(reference, candidate)
+    ab = _eval("x * y", x=a, y=b).reduce(SSIM_BLOCK)
+    index = _eval("((2 * ma * mb + c1) * (2 * (ab - ma * mb) + c2)) / ((ma * ma + mb * mb + c1) * (va + vb + c2))",
+                  ma=mu_a, mb=mu_b, ab=ab, va=var_a, vb=var_b, c1=SSIM_C1, c2=SSIM_C2)
+    return _content_mean(index, weight)
+
+def score(metric, reference, candidate):
+    return ssim(reference, candidate) if metric == "ssim" else psnr(reference, candidate)
+
+def sample_indices(count, samples):
+    """从 count 页中均匀抽取至多 samples 页 (包含首页和末页)"""
+    if count <= samples:
+        return set(range(count))
+    if samples <= 1:
+        return {0}
+    return {round(k * (count - 1) / (samples - 1)) for k in range(samples)}
+
+
+class QualityGuard:
+    """
+    质量守卫的设置和统计 (可以传给工作进程)。
+    用法: 每个文件开始时 start_file(quality)，对抽中的页面调用 check()，结束时打印 describe_file()。
+    允许重试时，调用方在编码整个文件之前先检查全部抽查页 (后一页从前一页提高后的质量开始)，
+    再按 file_quality() 编码整个文件，这样提高后的质量作用于所有页面，而不只是抽查到的几页。
+    """
+    def __init__(self, metric="ssim", threshold=None, sample_pages=DEFAULT_SAMPLE_PAGES,
+                 image_stride=DEFAULT_IMAGE_STRIDE, retry=False, max_quality=MAX_QUALITY):
+        if metric not in METRICS:
+            raise ValueError(f"未知的质量指标: {metric!r} (可选: {', '.join(METRICS)})")
+        self.metric = metric
+        self.threshold = DEFAULT_THRESHOLDS[metric] if threshold is None else threshold
+        self.sample_pages = max(1, sample_pages)
+        self.image_stride = max(1, image_stride)
+        self.retry = retry
+        self.max_quality = max_quality
+        self._images_seen = 0
+        self._file = []
+        self._start_quality = None
+        self.checked = self.failed = self.raised_files = 0
+
+    def pages_to_check(self, page_count):
+        return sample_indices(page_count, self.sample_pages)
+
+    def should_check_image(self):
+        """独立图片: 第一张和此后每 image_stride 张抽查一张"""
+        self._images_seen += 1
+        return (self._images_seen - 1) % self.image_stride == 0
+
+    def start_file(self, quality=None):
+        """开始检查一个文件，quality 为该文件原定的编码质量"""
+        self._file = []
+        self._start_quality = quality
+
+    def file_quality(self):
+        """整个文件应使用的质量: 原定质量和各抽查页最终质量中的最大值"""
+        return max([self._start_quality or 0] + [r[4] for r in self._file])
+
+    def passes(self, value):
+        return value >= self.threshold
+
+    def check(self, reference, data, quality, encode, page=None):
+        """
+        比较 reference (编码前的位图) 与 data (按 quality 编码的结果)。
+        不合格且允许重试时，按 QUALITY_STEP 提高质量调用 encode(新质量) 重新编码，直到合格或达到上限。
+        返回最终使用的编码数据。
+        """
+        with Image.open(io.BytesIO(data)) as decoded:
+            value = score(self.metric, reference, decoded)
+        first_value, final_quality = value, quality
+        while self.retry and not self.passes(value) and final_quality < self.max_quality:
+            final_quality = min(self.max_quality, final_quality + QUALITY_STEP)
+            data = encode(final_quality)
+            with Image.open(io.BytesIO(data)) as decoded:
+                value = score(self.metric, reference, decoded)
+        raised_before = self.file_quality() > (self._start_quality or 0)
+        self.checked += 1
+        self.failed += not self.passes(first_value)
+        self._file.append((page, first_value, value, quality, final_quality))
+        self.raised_files += not raised_before and self.file_quality() > (self._start_quality or 0)
+        return data
+
+    def _format(self, value):
+        return f"SSIM {value:.3f}" if self.metric == "ssim" else f"PSNR {value:.1f} dB"
+
+    def describe_file(self):
+        """当前文件的检查结果 (一行)"""
+        if not self._file:
+            return "质量检查: 未抽查"
+        worst = min(self._file, key=lambda r: r[1])
+        failed = [r for r in self._file if not self.passes(r[1])]
+        where = f" (第 {worst[0]} 页)" if worst[0] is not None and len(self._file) > 1 else ""
+        text = (f"质量检查: 抽查 {len(self._file)} 页，最低 {self._format(worst[1])}{where}，"
+                f"阈值 {self._format(self.threshold)}")
+        if not failed:
+            return text + " | 合格"
+        text += f" | 不合格 {len(failed)} 页"
+        start, final = self._start_quality, self.file_quality()
+        if start is not None and final > start:
+            text += (f"，整个文件改用质量 {start}→{final} 编码，抽查页最低 "
+                     f"{self._format(min(r[2] for r in self._file))}")
+        if any(not self.passes(r[2]) for r in failed):
+            text += " | [警告] 仍低于阈值，建议提高质量或DPI"
+        return text
+
+    def describe(self):
+        return (f"质量检查: 共抽查 {self.checked} 页/张，不合格 {self.failed}，提高质量的文件 {self.raised_files} 个"
+                f" ({self.metric.upper()} 阈值 {self.threshold:g})")
@@ -0,0 +1,259 @@
+# 文件: core/read_ahead.py
+
+# 输入预读与异步写回 (不依赖 PyQt5)。
+# 输入在网络共享 (SMB/NFS) 上时，每次打开文件都要等网络读完，这段时间 CPU 空闲；处理时网络又空闲。
+# 这里用一个预读线程按处理顺序提前把后面几个文件整个读入内存，输出交给写回线程写盘，读、算、写互相重叠:
+#   - 预读最多领先 depth 个文件，已读入而未取走的内容总字节数不超过 max_bytes；
+#     超过 max_bytes 的单个文件不预读，处理时按路径直接读取 (与不预读时相同)
+#   - 取走某个文件时，计划中排在它前面而未取走的内容直接丢弃 (如处理时跳过的文件)
+#   - 写回队列同样有字节上限，写满时 write() 等待；写盘失败在 close() 时报告
+#   - 后台线程不打印日志 (任务日志按线程收集)，统计和错误都由调用线程在 close() 时输出
+
+import io
+import os
+import time
+import shutil
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from core.doc_cache import get_document_cache
+from core.tracing import span, bind
+
+READ_AHEAD_ENV = "PDF_TOOLBOX_READ_AHEAD_MB"
+# 预读内容的默认上限 (MB)，0 表示不预读也不异步写回
+DEFAULT_READ_AHEAD_MB = int(os.environ.get(READ_AHEAD_ENV, "128"))
+# 预读最多领先正在处理的文件几个文件
+DEFAULT_READ_AHEAD_FILES = 4
+# 等待写盘的输出的上限
+WRITE_BEHIND_MB = 64
+
+MB = 1024 * 1024
+
+
+class ReadAhead:
+    """按 paths 的顺序在后台线程中预读文件内容，take(path) 取走 (路径按绝对路径匹配，相对路径也能命中)"""
+    def __init__(self, paths, max_bytes=DEFAULT_READ_AHEAD_MB * MB, depth=DEFAULT_READ_AHEAD_FILES):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.max_bytes = max_bytes
+        self.depth = max(1, depth)
+        self._index = {path: i for i, path in enumerate(self.paths)}
+        self._ready = {}        # 序号 -> 已读入的内容
+        self._held = 0          # _ready 中的总字节数
+        self._next = 0          # 预读线程下一个要处理的序号 (之前的都已读完或跳过)
+        self._wanted = 0        # 调用方正在等待或下一个要取的序号，之前的不再需要
+        self._closed = False
+        self._cond = threading.Condition()
+        self.hits = self.misses = 0
+        self.bytes_read = 0
+        self.wait_seconds = 0.0
+        self._thread = threading.Thread(target=bind(self._run), name="read-ahead", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for index, path in enumerate(self.paths):
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = None
+            with self._cond:
+                if size is not None and size <= self.max_bytes:
+                    # 等到领先的文件数和字节数都有余量
+                    while not self._closed and index >= self._wanted and (
+                            index - self._wanted >= self.depth or (self._held and self._held + size > self.max_bytes)):
+                        self._cond.wait()
+                if self._closed:
+                    return
+                skip = size is None or size > self.max_bytes or index < self._wanted
+            data = None
+            if not skip:
+                try:
+                    with span("read_ahead", file=os.path.basename(path), bytes=size):
+                        with open(path, "rb") as f:
+                            data = f.read()
+                except OSError:
+                    data = None  # 处理时按路径重新读取，由调用方报告错误
+            with self._cond:
+                self._next = index + 1
+                if data is not None and index >= self._wanted:
+                    self._ready[index] = data
+                    self._held += len(data)
+                    self.bytes_read += len(data)
+                self._cond.notify_all()
+
+    def take(self, path):
+        """
+        取走 path 的内容 (bytes)，还没读完时等待。
+        不在计划中、超过上限或读取失败时返回 None，调用方按路径直接读取。
+        """
+        index = self._index.get(os.path.abspath(path))
+        if index is None:
+            self.misses += 1
+            return None
+        started = time.perf_counter()
+        with self._cond:
+            self._wanted = max(self._wanted, index)
+            for skipped in [i for i in self._ready if i < index]:
+                self._held -= len(self._ready.pop(skipped))
+            self._cond.notify_all()
+            while self._next <= index and not self._closed and self._thread.is_alive():
+                self._cond.wait()
+            data = self._ready.pop(index, None)
+            if data is not None:
+                self._held -= len(data)
+            self._wanted = max(self._wanted, index + 1)
+            self._cond.notify_all()
+        self.wait_seconds += time.perf_counter() - started
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._ready.clear()
+            self._held = 0
+            self._cond.notify_all()
+        self._thread.join()
+
+
+class WriteBehind:
+    """在后台线程中写出文件；排队中的内容超过 max_bytes 时 write() 等待"""
+    def __init__(self, max_bytes=WRITE_BEHIND_MB * MB):
+        self.max_bytes = max_bytes
+        self._queue = deque()   # (输出路径, 内容 或 None, 复制的源文件 或 None)
+        self._pending = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.errors = []        # [(输出路径, 异常)]
+        self.files = 0
+        self.wait_seconds = 0.0
+        self._thread = threading.Thread(target=bind(self._run), name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                path, data, source = self._queue[0]
+            try:
+                with span("write_behind", file=os.path.basename(path)):
+                    if source is not None:
+                        shutil.copyfile(source, path)
+                    else:
+                        with open(path, "wb") as f:
+                            f.write(data)
+                error = None
+            except Exception as e:
+                error = e
+            with self._cond:
+                self._queue.popleft()
+                self._pending -= len(data) if data is not None else 0
+                if error is None:
+                    self.files += 1
+                else:
+                    self.errors.append((path, error))
+                self._cond.notify_all()
+
+    def _put(self, item, nbytes):
+        started = time.perf_counter()
+        with self._cond:
+            while self._queue and self._pending + nbytes > self.max_bytes:
+                self._cond.wait()
+            self._queue.append(item)
+            self._pending += nbytes
+            self._cond.notify_all()
+        self.wait_seconds += time.perf_counter() - started
+
+    def write(self, path, data):
+        self._put((path, data, None), len(data))
+
+    def copy(self, source, path):
+        self._put((path, None, source), 0)
+
+    def close(self):
+        """等待队列中的文件全部写完"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+
+class StagedIO:
+    """
+    批量任务 (压缩、合并) 的文件读写: 给出处理顺序 paths 时启用预读和异步写回，
+    否则 (或 read_ahead_mb 为 0) 与直接按路径读写完全相同。
+    """
+    def __init__(self, paths=(), read_ahead_mb=DEFAULT_READ_AHEAD_MB, depth=DEFAULT_READ_AHEAD_FILES,
+                 write_behind=True):
+        enabled = bool(paths) and read_ahead_mb > 0
+        self.reader = ReadAhead(paths, read_ahead_mb * MB, depth) if enabled else None
+        self.writer = WriteBehind() if enabled and write_behind else None
+
+    # --- 读取 ---
+    def read_bytes(self, path):
+        """预读好的内容；未预读时返回 None"""
+        return self.reader.take(path) if self.reader else None
+
+    @contextmanager
+    def open_document(self, path):
+        """从文档缓存借出PDF (见 DocumentCache.open)，有预读内容时从内存打开"""
+        with get_document_cache().open(path, data=self.read_bytes(path)) as doc:
+            yield doc
+
+    def open_image(self, path):
+        """PIL 图片 (调用方负责关闭)"""
+        data = self.read_bytes(path)
+        return Image.open(io.BytesIO(data) if data is not None else path)
+
+    def open_image_document(self, path):
+        """把图片作为单页文档打开 (PyMuPDF，调用方负责关闭)"""
+        data = self.read_bytes(path)
+        if data is None:
+            return fitz.open(path)
+        return fitz.open(os.path.splitext(path)[1].lower().lstrip("."), data)
+
+    # --- 写出 ---
+    def write(self, path, data):
+        if self.writer:
+            self.writer.write(path, data)
+        else:
+            with open(path, "wb") as f:
+                f.write(data)
+
+    def copy(self, source, path):
+        if self.writer:
+            self.writer.copy(source, path)
+        else:
+            shutil.copyfile(source, path)
+
+    def close(self):
+        """
+        停止预读，等待所有输出写完。
+        返回写盘失败的 [(输出路径, 异常)] (未启用异步写回时写盘错误直接在 write() 中抛出)。
+        """
+        if self.reader:
+            self.reader.close()
+        if self.writer:
+            self.writer.close()
+            return list(self.writer.errors)
+        return []
+
+    def describe(self):
+        """一行统计 (未启用时为空字符串)"""
+        if not self.reader:
+            return ""
+        r = self.reader
+        text = (f"预读: {r.hits}/{r.hits + r.misses} 个文件从内存读取，共 {r.bytes_read / MB:.1f} MB，"
+                f"等待读取 {r.wait_seconds:.1f} 秒")
+        if self.writer:
+            text += f" | 异步写回: {self.writer.files} 个文件，等待写盘 {self.writer.wait_seconds:.1f} 秒"
+        return text
@@ -0,0 +1,209 @@
+# 文件: core/thumbnail_cache.py
+
+# 页面缩略图的渲染与磁盘缓存 (不依赖 PyQt5)。
+#   - 缓存键: (文件内容哈希, 页码, 尺寸)，文件被改写后内容哈希变化，旧缩略图不再命中；
+#     同一份文件换了位置或名字仍然命中
+#   - 缓存位于 ~/.pdf_toolbox/thumbnails/，总大小超过上限时按最近最少使用 (LRU) 淘汰
+#   - render_thumbnails() 是进程池的入口: 在子进程中读缓存、渲染未命中的页面，只把 PNG 数据交回；
+#     写缓存和维护 LRU 顺序统一由主进程的 ThumbnailCache 完成
+
+import os
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+
+from core.paths import app_data_dir
+
+DEFAULT_MAX_BYTES = int(os.environ.get("PDF_TOOLBOX_THUMB_CACHE_MB", "200")) * 1024 * 1024
+DEFAULT_THUMB_SIZE = 160
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+HASH_CHUNK = 1024 * 1024
+
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+
+def default_cache_dir():
+    return app_data_dir("thumbnails")
+
+
+def file_hash(path):
+    """文件内容的 SHA-1 (同一进程内按 路径/大小/修改时间 记忆，不重复读取)"""
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _hash_lock:
+        digest = _hash_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with _hash_lock:
+            _hash_memo[memo_key] = digest
+    return digest
+
+
+def thumb_name(digest, page_index, size):
+    return f"{digest}_{page_index}_{size}.png"
+
+
+def thumb_path(cache_dir, name):
+    # 按哈希前两位分子目录，避免单个目录中文件过多
+    return os.path.join(cache_dir, name[:2], name)
+
+
+def render_page_png(doc, page_index, size):
+    """把一页渲染为最长边 size 像素的 PNG 数据"""
+    import fitz  # PyMuPDF
+    page = doc[page_index]
+    zoom = size / max(page.rect.width, page.rect.height, 1)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    return pix.tobytes("png")
+
+
+def render_image_png(path, size):
+    from PIL import Image
+    with Image.open(path) as img:
+        img.draft("RGB", (size, size))  # JPEG 可以直接按缩小的尺寸解码，大图也很快
+        img = img.convert("RGB")
+        img.thumbnail((size, size))
+        with io.BytesIO() as f:
+            img.save(f, format="PNG")
+            return f.getvalue()
+
+
+def render_thumbnails(path, pages, size, cache_dir):
+    """
+    进程池入口: 返回 (文件哈希, [(页码, PNG数据 或 None, 是否命中缓存), ...])。
+    图片文件只有第 0 页；无法渲染的页面数据为 None。
+    """
+    digest = file_hash(path)
+    results, missing = [], []
+    for page_index in pages:
+        try:
+            with open(thumb_path(cache_dir, thumb_name(digest, page_index, size)), "rb") as f:
+                results.append((page_index, f.read(), True))
+        except OSError:
+            missing.append(page_index)
+    if not missing:
+        return digest, results
+    if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS:
+        try:
+            data = render_image_png(path, size)
+        except Exception:
+            data = None
+        results.extend((page_index, data, False) for page_index in missing)
+        return digest, results
+    import fitz  # PyMuPDF
+    try:
+        doc = fitz.open(path)
+    except Exception:
+        return digest, results + [(page_index, None, False) for page_index in missing]
+    with doc:
+        for page_index in missing:
+            try:
+                results.append((page_index, render_page_png(doc, page_index, size), False))
+            except Exception:
+                results.append((page_index, None, False))
+    return digest, results
+
+
+class ThumbnailCache:
+    """缩略图的磁盘缓存，总大小超过 max_bytes 时按 LRU 淘汰 (以文件修改时间记录最近使用)"""
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()  # 文件名 -> 字节数，最久未用的在前
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self):
+        found = []
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                if not name.endswith(".png"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+        self._used = sum(self._entries.values())
+
+    def touch(self, digest, page_index, size):
+        """记录一次命中 (子进程直接读取了缓存文件)"""
+        name = thumb_name(digest, page_index, size)
+        with self._lock:
+            self.hits += 1
+            if name in self._entries:
+                self._entries.move_to_end(name)
+        try:
+            os.utime(thumb_path(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def put(self, digest, page_index, size, data):
+        name = thumb_name(digest, page_index, size)
+        path = thumb_path(self.cache_dir, name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[缩略图缓存] 写入失败: {e}")
+            return
+        with self._lock:
+            self.misses += 1
+            self._used += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._entries and self._used > self.max_bytes:
+            name, size = self._entries.popitem(last=False)
+            self._used -= size
+            try:
+                os.remove(thumb_path(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._entries):
+                try:
+                    os.remove(thumb_path(self.cache_dir, name))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._used = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "used_bytes": self._used, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def describe(self):
+        s = self.stats()
+        return (f"缩略图缓存: {s['entries']} 张 | {s['used_bytes'] / 1024 / 1024:.1f}/"
+                f"{s['max_bytes'] / 1024 / 1024:.0f} MB | 命中率 {s['hit_rate']:.0%}")
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_thumbnail_cache():
+    """进程内唯一的缩略图缓存"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ThumbnailCache()
+        return _default_cache
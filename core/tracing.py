@@ -0,0 +1,176 @@
+# 文件: core/tracing.py
+
+# 轻量级的分阶段计时 (trace span)。
+# 任务代码在 打开文件 / 渲染 / 编码 / insert_pdf / set_toc / 保存 等阶段外面包一层 span：
+#
+#     with span("render", page=i):
+#         pix = page.get_pixmap(...)
+#
+# 关闭追踪时 span() 直接返回一个共享的空上下文，几乎没有开销；
+# 开启后 (环境变量 PDF_TOOLBOX_TRACE=1，或界面中勾选) 由 TraceCollector 收集，
+# 任务结束时导出为 Chrome trace JSON (可在 chrome://tracing 或 https://ui.perfetto.dev 打开)，
+# 并在日志中输出各阶段的耗时汇总。
+
+import os
+import json
+import time
+import threading
+import functools
+
+from core.paths import app_data_dir
+
+TRACE_ENV = "PDF_TOOLBOX_TRACE"
+
+_enabled = os.environ.get(TRACE_ENV, "") not in ("", "0")
+_local = threading.local()
+
+
+def is_enabled():
+    return _enabled
+
+def set_enabled(enabled):
+    """在运行时开启/关闭追踪 (只影响之后开始的任务)"""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+class TraceCollector:
+    """收集一个任务的所有 span。可被多个线程同时写入。"""
+    def __init__(self, name):
+        self.name = name
+        self.events = []
+        self.started_us = time.perf_counter_ns() // 1000
+        self.finished_us = None
+        self._lock = threading.Lock()
+
+    def add(self, name, start_us, end_us, args=None, pid=None, tid=None):
+        event = {"name": name, "ph": "X", "ts": start_us, "dur": end_us - start_us,
+                 "pid": pid or os.getpid(), "tid": tid or threading.get_ident()}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def extend(self, events):
+        """合并子进程中收集到的事件"""
+        with self._lock:
+            self.events.extend(events)
+
+    def finish(self):
+        self.finished_us = time.perf_counter_ns() // 1000
+
+    def wall_us(self):
+        return (self.finished_us or time.perf_counter_ns() // 1000) - self.started_us
+
+
+class _Span:
+    __slots__ = ("collector", "name", "args", "start")
+
+    def __init__(self, collector, name, args):
+        self.collector, self.name, self.args = collector, name, args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns() // 1000
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.collector.add(self.name, self.start, time.perf_counter_ns() // 1000, self.args)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc, tb): return False
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **args):
+    """计时一个阶段；当前线程没有正在收集的任务时什么也不做"""
+    if not _enabled:
+        return _NULL_SPAN
+    collector = getattr(_local, "collector", None)
+    if collector is None:
+        return _NULL_SPAN
+    return _Span(collector, name, args)
+
+def current_collector():
+    return getattr(_local, "collector", None) if _enabled else None
+
+def start_collecting(name):
+    """为当前线程开始收集一个任务的 span；追踪未开启时返回 None"""
+    if not _enabled:
+        return None
+    _local.collector = TraceCollector(name)
+    return _local.collector
+
+def stop_collecting():
+    """结束当前线程的收集，返回收集器 (未开启时为 None)"""
+    collector = getattr(_local, "collector", None)
+    _local.collector = None
+    return collector
+
+def bind(func):
+    """
+    让 func 在其他线程 (如线程池) 中执行时，span 仍记入当前线程的任务。
+    追踪未开启时原样返回 func。
+    """
+    collector = current_collector()
+    if collector is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        previous = getattr(_local, "collector", None)
+        _local.collector = collector
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.collector = previous
+    return wrapper
+
+
+def trace_output_path(name):
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+    return os.path.join(app_data_dir("traces"), f"{time.strftime('%Y%m%d_%H%M%S')}_{safe}.json")
+
+def write_chrome_trace(collector, path=None):
+    """导出为 Chrome trace JSON，返回文件路径"""
+    path = path or trace_output_path(collector.name)
+    events = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": collector.name}}]
+    events += sorted(collector.events, key=lambda e: e["ts"])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+    return path
+
+def summarize(collector):
+    """按阶段名汇总: [(名称, 次数, 总耗时ms, 平均ms, 最大ms, 占任务总时长%), ...]，按总耗时降序"""
+    totals = {}
+    for event in collector.events:
+        count, total, longest = totals.get(event["name"], (0, 0, 0))
+        totals[event["name"]] = (count + 1, total + event["dur"], max(longest, event["dur"]))
+    wall = collector.wall_us() or 1
+    rows = [(name, count, total / 1000, total / count / 1000, longest / 1000, total / wall * 100)
+            for name, (count, total, longest) in totals.items()]
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+def print_summary(collector):
+    """在日志中输出各阶段耗时表。并行阶段的耗时会叠加，占比可能超过 100%。"""
+    print(f"\n[性能追踪] {collector.name} | 总耗时 {collector.wall_us() / 1000:.0f} ms")
+    print(f"   {'阶段':<16}{'次数':>6}{'总耗时ms':>10}{'平均ms':>9}{'最大ms':>9}{'占比':>8}")
+    for name, count, total, mean, longest, share in summarize(collector):
+        print(f"   {name:<18}{count:>6}{total:>10.1f}{mean:>9.2f}{longest:>9.2f}{share:>7.1f}%")
+
+def finish_and_report(collector):
+    """结束收集，输出汇总表并写出 trace 文件"""
+    if collector is None:
+        return None
+    collector.finish()
+    print_summary(collector)
+    try:
+        path = write_chrome_trace(collector)
+        print(f"   追踪文件已保存至: {path}")
+        return path
+    except OSError as e:
+        print(f"   [警告] 无法写入追踪文件: {e}")
+        return None
@@ -0,0 +1,443 @@
+# 文件: core/watch_folder.py
+
+# 监视文件夹: 扫描仪把文件放进共享收件箱后，自动批量压缩或合并。
+#
+#   - Linux 上用 inotify 及时得知文件夹变化 (通过 ctypes 调用，无需第三方库)，其他系统或
+#     inotify 不可用时 (如挂载的网络共享) 按固定间隔轮询；两种方式都以重新扫描文件夹为准
+#   - 文件大小和修改时间连续 settle_seconds 秒不变 (PDF 还要求文件末尾有 %%EOF) 才认为写入完成
+#   - 就绪的文件在 debounce_seconds 秒内没有新文件到达 (或达到 max_batch 个) 时作为一批处理，
+#     通过硬链接 (失败时复制) 放进临时目录，交给现有的 compress_path / merge_files
+#   - 已处理的文件记录在 ~/.pdf_toolbox/watch/ 下的状态文件中，大小和修改时间不变就不会再处理；
+#     处理失败的文件间隔一段时间后重试，失败 MAX_ATTEMPTS 次后不再处理 (文件被替换后重新计数)
+#   - 每个文件夹的设置单独保存，下次只需指定文件夹即可
+
+import os
+import sys
+import json
+import time
+import shutil
+import select
+import ctypes
+import ctypes.util
+import hashlib
+import threading
+
+from core import process_runner
+from core.paths import app_data_dir
+from core.progress import FILE_STARTED, FILE_DONE, JOB_FINISHED
+
+WATCH_EXTENSIONS = ['.pdf', '.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+# 扫描仪/拷贝工具写入过程中使用的临时文件
+IGNORED_PREFIXES = (".", "~$")
+IGNORED_SUFFIXES = (".tmp", ".part", ".partial", ".crdownload")
+STAGING_DIR_NAME = ".pdf_toolbox_staging"
+DEFAULT_OUTPUT_DIR_NAME = "已处理"
+# 处理失败的文件最多尝试的次数，第 n 次失败后等待 n * RETRY_DELAY_SECONDS 秒再重试
+MAX_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 60
+
+DEFAULT_SETTINGS = {
+    "action": "compress",        # compress / merge
+    "output": None,              # 默认为 <监视文件夹>/已处理
+    "dpi": 96,
+    "pdf_quality": 65,
+    "pdf_mode": "render",        # render / mrc (分层压缩扫描文档)
+    "img_format": "jpeg",        # jpeg / webp / webp-lossless / png / auto
+    "effort": "max",             # fast / balanced / max
+    "img_quality": 65,
+    "max_size": 1920,
+    "min_saving": 10,            # PDF体积至少减小的百分比，不足时输出原文件；None 表示总是输出压缩结果
+    "grayscale": False,
+    "resize_a4": False,
+    "settle_seconds": 5.0,
+    "debounce_seconds": 10.0,
+    "max_batch": 50,
+    "poll_interval": 2.0,
+}
+
+
+# --- 每个文件夹的设置 ---
+
+def settings_path():
+    return os.path.join(app_data_dir("watch"), "folders.json")
+
+def load_all_settings():
+    try:
+        with open(settings_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_folder_settings(folder):
+    """已保存的设置 (缺少的项使用默认值)"""
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(load_all_settings().get(os.path.abspath(folder), {}))
+    return settings
+
+def save_folder_settings(folder, settings):
+    data = load_all_settings()
+    data[os.path.abspath(folder)] = {k: v for k, v in settings.items() if k in DEFAULT_SETTINGS}
+    tmp_path = settings_path() + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, settings_path())
+
+
+# --- 变化通知: inotify 或轮询 ---
+
+class _PollWaiter:
+    name = "轮询"
+
+    def watch_dirs(self, dirs):
+        pass
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+
+    def close(self):
+        pass
+
+class _InotifyWaiter:
+    """只把 inotify 当作“有变化，该重新扫描了”的信号，不解析具体事件"""
+    name = "inotify"
+    IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO = 0x2, 0x8, 0x40, 0x80
+    IN_CREATE, IN_DELETE = 0x100, 0x200
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.watched = set()
+
+    def watch_dirs(self, dirs):
+        for path in dirs:
+            if path not in self.watched and self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK) >= 0:
+                self.watched.add(path)
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if readable:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+def make_waiter(use_inotify=True):
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            return _InotifyWaiter()
+        except (OSError, AttributeError):
+            pass
+    return _PollWaiter()
+
+
+# --- 文件就绪判断 ---
+
+def _pdf_complete(path):
+    """PDF 文件末尾附近应有 %%EOF；写入中的文件通常还没有"""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 2048))
+            return b"%%EOF" in f.read()
+    except OSError:
+        return False
+
+def _readable(path):
+    # Windows 上仍被扫描软件独占打开的文件无法读取
+    try:
+        with open(path, "rb"):
+            return True
+    except OSError:
+        return False
+
+
+class FolderWatcher:
+    def __init__(self, folder, settings=None, use_inotify=True, state_path=None):
+        self.folder = os.path.abspath(folder)
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings or {})
+        self.output = os.path.abspath(self.settings["output"] or os.path.join(self.folder, DEFAULT_OUTPUT_DIR_NAME))
+        self.staging_root = os.path.join(self.folder, STAGING_DIR_NAME)
+        digest = hashlib.sha1(self.folder.encode("utf-8")).hexdigest()[:12]
+        self.state_path = state_path or os.path.join(app_data_dir("watch"), f"state_{digest}.json")
+        self.waiter = make_waiter(use_inotify)
+        # 相对路径 -> {"size", "mtime_ns", "first_seen", "changed_at", "seen"}
+        self.candidates = {}
+        self.last_activity = time.time()
+        self.processed, self.totals = self._load_state()
+        self.session = {"detected": 0, "processed": 0, "failed": 0, "batches": 0, "pages": 0,
+                        "bytes_in": 0, "bytes_out": 0, "busy_seconds": 0.0, "latency_seconds": 0.0,
+                        "started_at": time.time()}
+
+    # --- 状态文件 ---
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("processed", {}), data.get("totals", {})
+        except (OSError, ValueError):
+            return {}, {}
+
+    def _save_state(self):
+        data = {"folder": self.folder, "processed": self.processed, "totals": self.totals}
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    # --- 扫描 ---
+    def _excluded_dir(self, path):
+        # 默认输出文件夹始终跳过，以免改用其他输出位置后又把以前的结果当作新文件
+        return (path in (self.staging_root, self.output, os.path.join(self.folder, DEFAULT_OUTPUT_DIR_NAME))
+                or os.path.basename(path).startswith("."))
+
+    def _wanted(self, name):
+        lower = name.lower()
+        return (not name.startswith(IGNORED_PREFIXES) and not lower.endswith(IGNORED_SUFFIXES)
+                and os.path.splitext(lower)[1] in WATCH_EXTENSIONS)
+
+    def _record_for(self, rel, size, mtime_ns):
+        """该文件 (大小和修改时间都相同) 上次处理的记录，没有时返回 None"""
+        entry = self.processed.get(rel)
+        if entry is not None and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+            return entry
+        return None
+
+    def _already_processed(self, rel, st):
+        """已成功处理，或失败次数已达上限"""
+        entry = self._record_for(rel, st.st_size, st.st_mtime_ns)
+        return entry is not None and (entry.get("status") != "failed" or entry.get("attempts", 1) >= MAX_ATTEMPTS)
+
+    def scan(self, now=None):
+        """扫描文件夹，更新候选文件的大小/修改时间；返回本次新出现或有变化的文件数"""
+        now = now or time.time()
+        dirs, seen, changes = [], set(), 0
+        for dirpath, dirnames, filenames in os.walk(self.folder):
+            dirnames[:] = [d for d in dirnames if not self._excluded_dir(os.path.join(dirpath, d))]
+            dirs.append(dirpath)
+            for name in filenames:
+                if not self._wanted(name):
+                    continue
+                path = os.path.join(dirpath, name)
+                rel = os.path.relpath(path, self.folder).replace(os.sep, "/")
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if self._already_processed(rel, st):
+                    continue
+                seen.add(rel)
+                entry = self.candidates.get(rel)
+                if entry is None:
+                    # 首次发现时以修改时间作为最近变化时间 (早已写完的文件不必再等待)；
+                    # 网络共享的时钟可能偏快，不晚于当前时间
+                    self.candidates[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "first_seen": now,
+                                            "changed_at": min(now, st.st_mtime), "seen": 1}
+                    self.session["detected"] += 1
+                    changes += 1
+                elif (entry["size"], entry["mtime_ns"]) != (st.st_size, st.st_mtime_ns):
+                    entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns, changed_at=now, seen=1)
+                    changes += 1
+                else:
+                    entry["seen"] += 1
+        for rel in set(self.candidates) - seen:
+            del self.candidates[rel]  # 被删除或移走
+        self.waiter.watch_dirs(dirs)
+        if changes:
+            self.last_activity = now
+        return changes
+
+    def ready_files(self, now=None):
+        """写入已完成的候选文件 (至少观察到两次且 settle_seconds 秒内没有变化；失败待重试的文件还要等到重试时间)"""
+        now = now or time.time()
+        settle = self.settings["settle_seconds"]
+        ready = []
+        for rel, entry in sorted(self.candidates.items()):
+            if entry["seen"] < 2 or now - entry["changed_at"] < settle:
+                continue
+            record = self._record_for(rel, entry["size"], entry["mtime_ns"])
+            if record is not None and record.get("retry_at", 0) > now:
+                continue
+            path = os.path.join(self.folder, rel)
+            if rel.lower().endswith(".pdf") and not _pdf_complete(path):
+                continue
+            if _readable(path):
+                ready.append(rel)
+        return ready
+
+    def due_batch(self, now=None):
+        """到了该处理的时候就返回一批文件，否则返回空列表"""
+        now = now or time.time()
+        ready = self.ready_files(now)
+        if not ready:
+            return []
+        if len(ready) >= self.settings["max_batch"] or now - self.last_activity >= self.settings["debounce_seconds"]:
+            return ready[:self.settings["max_batch"]]
+        return []
+
+    # --- 处理 ---
+    def _stage(self, files, staging):
+        """把这批文件按相对路径放进临时目录 (优先硬链接，不占额外空间)"""
+        for rel in files:
+            target = os.path.join(staging, rel)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            source = os.path.join(self.folder, rel)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+
+    def _task_for(self, staging, batch_name):
+        s = self.settings
+        if s["action"] == "merge":
+            from core.pdf_merger import merge_files
+            name = f"合并_{batch_name}.pdf"
+            return merge_files, {"root_folder": staging, "output_filepath": os.path.join(self.output, name),
+                                 "resize_images": bool(s["resize_a4"])}
+        from core.pdf_compressor import compress_path
+        min_saving = s.get("min_saving", 10)
+        return compress_path, {"input_path": staging, "output_path": self.output, "dpi": s["dpi"],
+                               "pdf_quality": s["pdf_quality"], "img_quality": s["img_quality"],
+                               "max_size": s["max_size"], "to_grayscale": bool(s["grayscale"]),
+                               "pdf_mode": s.get("pdf_mode", "render"),
+                               "image_format": s.get("img_format", "jpeg"), "effort": s.get("effort", "max"),
+                               "min_saving": None if min_saving is None else min_saving / 100}
+
+    def process_batch(self, files):
+        """处理一批文件并记录结果，返回 (成功数, 失败数)"""
+        started = time.time()
+        batch_name = f"{time.strftime('%Y%m%d_%H%M%S')}_{self.totals.get('batches', 0) + 1}"
+        staging = os.path.join(self.staging_root, batch_name)
+        entries = {rel: dict(self.candidates[rel]) for rel in files}
+        print(f"\n[监视] 开始处理 {len(files)} 个文件 ({'合并' if self.settings['action'] == 'merge' else '压缩'})")
+        results = {}
+        finished = []
+        current = [None]
+
+        def on_progress(event):
+            if event.kind == FILE_STARTED:
+                current[0] = os.path.relpath(event.path, staging).replace(os.sep, "/")
+            elif event.kind == FILE_DONE and current[0] is not None:
+                results[current[0]] = bool(event.ok)
+                current[0] = None
+            elif event.kind == JOB_FINISHED:
+                finished.append(event)
+
+        try:
+            self._stage(files, staging)
+            os.makedirs(self.output, exist_ok=True)
+            func, kwargs = self._task_for(staging, batch_name)
+            if process_runner.is_enabled():
+                process_runner.run_isolated(func, kwargs, on_log=lambda text: print(text, end=""),
+                                            on_progress=on_progress)
+            else:
+                from core.progress import ProgressReporter
+                func(progress=ProgressReporter(callback=on_progress), **kwargs)
+            error = None
+        except Exception as e:
+            error = str(e)
+            print(f"\n[监视] 处理失败: {e}")
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        if self.settings["action"] == "merge" and not (finished and finished[-1].bytes_out):
+            error = error or "未生成合并文件"
+        now = time.time()
+        ok_count = failed_count = retry_count = 0
+        for rel in files:
+            ok = error is None and results.get(rel, False)
+            entry = entries[rel]
+            record = {"size": entry["size"], "mtime_ns": entry["mtime_ns"], "at": now, "status": "ok" if ok else "failed"}
+            if not ok:
+                previous = self._record_for(rel, entry["size"], entry["mtime_ns"])
+                record["attempts"] = (previous.get("attempts", 1) + 1
+                                      if previous is not None and previous.get("status") == "failed" else 1)
+                if record["attempts"] < MAX_ATTEMPTS:
+                    # 留在待处理中 (可能是临时的网络或磁盘错误)，稍后重新扫描到时再试
+                    record["retry_at"] = now + RETRY_DELAY_SECONDS * record["attempts"]
+                    retry_count += 1
+            self.processed[rel] = record
+            self.candidates.pop(rel, None)
+            if ok or "retry_at" not in record:
+                self.session["latency_seconds"] += now - entry["first_seen"]
+                self.session["bytes_in"] += entry["size"]
+            ok_count += ok
+            failed_count += not ok and "retry_at" not in record
+        if finished:
+            self.session["pages"] += finished[-1].pages_done or 0
+            self.session["bytes_out"] += finished[-1].bytes_out or 0
+        self.session["processed"] += ok_count
+        self.session["failed"] += failed_count
+        self.session["batches"] += 1
+        self.session["busy_seconds"] += now - started
+        for key, value in (("processed", ok_count), ("failed", failed_count), ("batches", 1)):
+            self.totals[key] = self.totals.get(key, 0) + value
+        self._save_state()
+        print(f"[监视] 本批完成: 成功 {ok_count} 个，失败 {failed_count} 个，"
+              f"稍后重试 {retry_count} 个，耗时 {now - started:.1f} 秒")
+        print(f"[监视] {self.describe()}")
+        return ok_count, failed_count
+
+    # --- 统计 ---
+    def stats(self):
+        s = self.session
+        done = s["processed"] + s["failed"]
+        wall = time.time() - s["started_at"]
+        return dict(s,
+                    pending=len(self.candidates),
+                    ready=len(self.ready_files()),
+                    files_per_minute=done / s["busy_seconds"] * 60 if s["busy_seconds"] else 0.0,
+                    pages_per_second=s["pages"] / s["busy_seconds"] if s["busy_seconds"] else 0.0,
+                    avg_latency_seconds=s["latency_seconds"] / done if done else 0.0,
+                    busy_fraction=s["busy_seconds"] / wall if wall else 0.0,
+                    total_processed=self.totals.get("processed", 0),
+                    total_failed=self.totals.get("failed", 0))
+
+    def describe(self):
+        s = self.stats()
+        return (f"积压 {s['pending']} 个 (就绪 {s['ready']}) | 本次已处理 {s['processed']} 个，失败 {s['failed']} 个，"
+                f"{s['batches']} 批 | {s['files_per_minute']:.1f} 个/分钟，{s['pages_per_second']:.1f} 页/秒 | "
+                f"平均等待 {s['avg_latency_seconds']:.1f} 秒 | 累计处理 {s['total_processed']} 个")
+
+    # --- 主循环 ---
+    def run(self, stop_event=None, once=False):
+        """
+        持续监视，直到 stop_event 被 set (或 Ctrl+C)。
+        once=True 时只处理当前已写入完成的文件后返回 (适合计划任务):
+        真正等待到每个文件都有 settle_seconds 秒的观察时间后再扫描一次，期间仍有变化的文件留给下一次运行。
+        """
+        stop_event = stop_event or threading.Event()
+        print(f"[监视] 文件夹: {self.folder}")
+        print(f"[监视] 输出到: {self.output} | 方式: {self.waiter.name} | 动作: {self.settings['action']}")
+        try:
+            if once:
+                self.scan()
+                # 早已写完的文件 (修改时间足够早) 不必等待；最多等待 settle_seconds 秒
+                settle = self.settings["settle_seconds"]
+                latest = max((entry["changed_at"] for entry in self.candidates.values()), default=0)
+                stop_event.wait(min(settle, max(0.0, latest + settle - time.time())))
+                self.scan()
+                # 不等待新文件到达，只要求文件本身已写入完成
+                self.last_activity = 0
+                while not stop_event.is_set():
+                    batch = self.due_batch()
+                    if not batch:
+                        break
+                    self.process_batch(batch)
+                return
+            while not stop_event.is_set():
+                self.scan()
+                batch = self.due_batch()
+                if batch:
+                    self.process_batch(batch)
+                    continue
+                self.waiter.wait(self.settings["poll_interval"])
+        finally:
+            self.waiter.close()
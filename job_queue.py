@@ -0,0 +1,239 @@
+# 文件: job_queue.py
+
+import time
+import heapq
+import itertools
+import threading
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from utils import flush_gui_logs
+from core.memory_budget import get_memory_budget, estimate_task
+
+# 优先级: 数值越小越先执行
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_NAMES = {PRIORITY_HIGH: "高", PRIORITY_NORMAL: "普通", PRIORITY_LOW: "低"}
+
+# 任务状态
+QUEUED, RUNNING, FINISHED, FAILED, CANCELLED = "queued", "running", "finished", "failed", "cancelled"
+STATE_NAMES = {QUEUED: "排队中", RUNNING: "运行中", FINISHED: "已完成", FAILED: "出错", CANCELLED: "已取消"}
+
+DEFAULT_MAX_CONCURRENT = 1
+# 队列头部的任务因内存不足而等待时，每隔多少毫秒重新检查一次
+MEMORY_RETRY_MS = 1000
+
+
+class Job(QObject):
+    """
+    队列中的一个任务。各面板连接 started / succeeded / failed 信号来更新自己的界面，
+    这些信号总是在主线程中发出。
+    """
+    started = pyqtSignal()
+    succeeded = pyqtSignal()
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name, worker, priority=PRIORITY_NORMAL, owner=None):
+        super().__init__()
+        self.id = next(Job._ids)
+        self.name = name
+        self.worker = worker
+        self.priority = priority
+        self.owner = owner
+        self.state = QUEUED
+        self.error_message = None
+        self.cancel_requested = False
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.thread = None
+        # 内存准入: 估算的内存峰值 (提交后在后台线程中计算，算完之前为 None)、已预留的字节数、是否因内存不足而等待
+        self.memory_estimate = None
+        self.memory_reserved = 0
+        self.waiting_for_memory = False
+
+    def wait_seconds(self):
+        end = self.started_at or self.finished_at or time.time()
+        return end - self.submitted_at
+
+    def run_seconds(self):
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobQueue(QObject):
+    """
+    全局任务队列: 按优先级 (相同优先级按提交顺序) 调度任务，
+    同时运行的任务数不超过 max_concurrent，每个运行中的任务占用一个 QThread。
+    任务开始前还要通过内存准入: 估算的内存峰值放不进内存预算时，该任务及其后的任务继续排队。
+    """
+    jobAdded = pyqtSignal(object)
+    jobChanged = pyqtSignal(object)
+    # 后台线程算出内存估算后发出 (job, 估算字节数)，在主线程中处理
+    _estimated = pyqtSignal(object, object)
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT):
+        super().__init__()
+        self.max_concurrent = max_concurrent
+        self.jobs = []
+        self._pending = []
+        self._running = set()
+        self._order = itertools.count()
+        self._memory_timer = QTimer(self)
+        self._memory_timer.setSingleShot(True)
+        self._memory_timer.timeout.connect(self._start_next)
+        self._estimated.connect(self._on_estimated)
+
+    def submit(self, name, worker, priority=PRIORITY_NORMAL, owner=None):
+        """
+        提交一个 Worker。owner 为提交任务的面板，任务运行期间的 print 输出会送到它的 on_update_text。
+        返回 Job 对象，调用方连接其信号即可得知任务开始和结束。
+        """
+        job = Job(name, worker, priority, owner)
+        worker.log_target = owner
+        self.jobs.append(job)
+        heapq.heappush(self._pending, (priority, next(self._order), job))
+        self.jobAdded.emit(job)
+        # 估算要读元数据目录 (可能在网络共享上)，不在界面线程中进行
+        threading.Thread(target=self._estimate, args=(job,), name="memory-estimate", daemon=True).start()
+        return job
+
+    def _estimate(self, job):
+        """后台线程: 估算任务的内存峰值 (不打印日志，结果通过信号交回主线程)"""
+        try:
+            estimate = estimate_task(job.worker.task_function, job.worker.kwargs)
+        except Exception:
+            estimate = 0
+        self._estimated.emit(job, estimate)
+
+    def _on_estimated(self, job, estimate):
+        job.memory_estimate = estimate
+        if job.state == QUEUED:
+            self.jobChanged.emit(job)
+            self._start_next()
+
+    def cancel(self, job):
+        """
+        取消一个任务。排队中的任务直接移出队列；
+        运行中的任务只有在工作进程中执行时才能取消 (终止该进程)，任务线程结束后状态变为已取消。
+        """
+        if job.state == RUNNING and job.worker.can_cancel() and not job.cancel_requested:
+            job.cancel_requested = True
+            job.worker.cancel()
+            return True
+        if job.state != QUEUED:
+            return False
+        job.state = CANCELLED
+        job.finished_at = time.time()
+        job.worker.deleteLater()
+        self.jobChanged.emit(job)
+        job.cancelled.emit()
+        # 被取消的可能正是因内存不足而挡住队列的任务
+        self._start_next()
+        return True
+
+    def set_priority(self, job, priority):
+        """调整排队中任务的优先级"""
+        if job.state != QUEUED:
+            return
+        job.priority = priority
+        heapq.heappush(self._pending, (priority, next(self._order), job))
+        self.jobChanged.emit(job)
+
+    def set_max_concurrent(self, value):
+        self.max_concurrent = max(1, value)
+        self._start_next()
+
+    def set_memory_budget(self, max_bytes):
+        """修改内存预算 (None 表示自动)，可能因此放行正在等待内存的任务"""
+        get_memory_budget().max_bytes = max_bytes or None
+        self._start_next()
+
+    def pending_count(self):
+        return sum(1 for job in self.jobs if job.state == QUEUED)
+
+    def running_count(self):
+        return len(self._running)
+
+    def _start_next(self):
+        while self._pending and len(self._running) < self.max_concurrent:
+            priority, _, job = self._pending[0]
+            # 已取消或调整过优先级 (堆中留下的旧条目) 的任务直接跳过
+            if job.state != QUEUED or priority != job.priority:
+                heapq.heappop(self._pending)
+                continue
+            if job.memory_estimate is None:
+                # 估算完成后 _on_estimated 会再次调度；后面的任务同样不能插队
+                return
+            if not self._admit(job):
+                # 不让后面的任务插队，等运行中的任务结束或系统内存释放后再试
+                self._memory_timer.start(MEMORY_RETRY_MS)
+                return
+            heapq.heappop(self._pending)
+            self._start(job)
+
+    def _admit(self, job):
+        if not get_memory_budget().try_acquire(job.memory_estimate):
+            if not job.waiting_for_memory:
+                job.waiting_for_memory = True
+                self.jobChanged.emit(job)
+            return False
+        job.memory_reserved = job.memory_estimate
+        job.waiting_for_memory = False
+        return True
+
+    def _start(self, job):
+        job.state = RUNNING
+        job.started_at = time.time()
+        self._running.add(job)
+
+        job.thread = QThread()
+        worker = job.worker
+        worker.memory_reserved = job.memory_reserved
+        worker.moveToThread(job.thread)
+        job.thread.started.connect(worker.run)
+        worker.error.connect(lambda message, job=job: self._on_job_error(job, message))
+        worker.finished.connect(job.thread.quit)
+        worker.finished.connect(worker.deleteLater)
+        job.thread.finished.connect(lambda job=job: self._on_job_finished(job))
+        job.thread.finished.connect(job.thread.deleteLater)
+        self.jobChanged.emit(job)
+        job.started.emit()
+        job.thread.start()
+
+    def _on_job_error(self, job, message):
+        job.error_message = message
+
+    def _on_job_finished(self, job):
+        job.finished_at = time.time()
+        get_memory_budget().release(job.memory_reserved)
+        job.memory_reserved = 0
+        if job.cancel_requested:
+            job.state = CANCELLED
+        else:
+            job.state = FAILED if job.error_message else FINISHED
+        self._running.discard(job)
+        # 先把该任务残留在缓冲区中的日志发送出去，再通知面板任务结束
+        flush_gui_logs()
+        self.jobChanged.emit(job)
+        if job.state == CANCELLED:
+            job.cancelled.emit()
+        elif job.error_message:
+            job.failed.emit(job.error_message)
+        else:
+            job.succeeded.emit()
+        self._start_next()
+
+
+_job_queue = None
+
+def get_job_queue():
+    """进程内唯一的任务队列 (需在创建 QApplication 之后调用)"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
@@ -1,13 +1,25 @@
 # 文件: main.py (已修改为自适应窗口)
+#
+# 不带参数时启动图形界面；带子命令时 (merge / compress / split / patent-split ...)
+# 转交给 cli.py 以无界面方式运行，此时不会导入 PyQt5。
 
+import os
 import sys
-from PyQt5.QtWidgets import QApplication
+import time
+import multiprocessing
 
-from ui_mainwindow import MainWindow
-from ui_styles import MODERN_STYLE
+# 设置该环境变量后，在日志中输出启动到首次绘制窗口的耗时
+STARTUP_TIMING_ENV = "PDF_TOOLBOX_STARTUP_TIMING"
+START_TIME = time.perf_counter()
 
 def main():
     """程序主入口"""
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+
+    from ui_mainwindow import MainWindow
+    from ui_styles import MODERN_STYLE
+
     app = QApplication(sys.argv)
     app.setStyleSheet(MODERN_STYLE)
     
@@ -22,7 +34,20 @@ def main():
     main_window.resize(initial_width, initial_height) # 使用resize而不是setGeometry
     
     main_window.show()
+
+    # 0ms 定时器在事件循环处理完首批绘制事件后触发，近似为“首次绘制”时间点
+    def report_first_paint():
+        main_window.first_paint_ms = (time.perf_counter() - START_TIME) * 1000
+        if os.environ.get(STARTUP_TIMING_ENV):
+            print(f"启动耗时 (到首次绘制窗口): {main_window.first_paint_ms:.0f} ms")
+    QTimer.singleShot(0, report_first_paint)
+
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # 打包成exe后，多进程子进程需要此调用才能正常启动 (PDF转图片等功能使用进程池)
+    multiprocessing.freeze_support()
+    import cli
+    if len(sys.argv) > 1 and sys.argv[1] in cli.COMMANDS + ("-h", "--help", "--trace"):
+        sys.exit(cli.main(sys.argv[1:]))
+    main()
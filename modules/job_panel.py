@@ -0,0 +1,184 @@
+# 文件: modules/job_panel.py
+
+import os
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QSpinBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QComboBox, QCheckBox
+)
+from PyQt5.QtCore import QTimer
+
+from job_queue import (
+    get_job_queue, PRIORITY_NAMES, STATE_NAMES, QUEUED, RUNNING, FINISHED, FAILED, CANCELLED
+)
+from core.doc_cache import get_document_cache, describe_stats
+from core.progress import format_seconds
+from core import tracing, process_runner
+from core.memory_budget import get_memory_budget, MB
+from core.paths import app_data_dir
+
+# ==============================================================================
+# ==                        任务队列面板 (QWidget)                            ==
+# ==============================================================================
+
+class JobsPanelWidget(QWidget):
+    COLUMNS = ["编号", "任务", "优先级", "状态", "排队时间", "运行耗时"]
+
+    def __init__(self):
+        super().__init__()
+        self.queue = get_job_queue()
+        self.rows = {}
+        self.initUI()
+        for job in self.queue.jobs:
+            self.add_job_row(job)
+        self.queue.jobAdded.connect(self.add_job_row)
+        self.queue.jobChanged.connect(self.update_job_row)
+        # 运行中任务的耗时每秒刷新一次
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_running)
+        self.refresh_timer.start(1000)
+
+    def initUI(self):
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, max(1, os.cpu_count() or 1))
+        self.concurrency_spin.setValue(self.queue.max_concurrent)
+        self.trace_check = QCheckBox('记录性能追踪')
+        self.trace_check.setChecked(tracing.is_enabled())
+        self.trace_check.setToolTip(f"之后开始的任务会在日志末尾输出各阶段耗时表，\n"
+                                    f"并在 {app_data_dir('traces')} 写出 Chrome trace 文件 (chrome://tracing 打开)")
+        self.isolate_check = QCheckBox('在独立进程中运行')
+        self.isolate_check.setChecked(process_runner.is_enabled())
+        self.isolate_check.setToolTip("每个任务在单独的工作进程中执行: 损坏的文件导致崩溃或内存耗尽时只会让该任务出错，\n"
+                                      "不会关闭程序；运行中的任务也可以取消。")
+        self.timeout_spin = QSpinBox()
+        self.timeout_spin.setRange(0, 24 * 60)
+        self.timeout_spin.setValue(int(process_runner.default_timeout() // 60))
+        self.timeout_spin.setSpecialValueText('不限')
+        self.timeout_spin.setSuffix(' 分钟')
+        self.timeout_spin.setToolTip("运行超过此时长的任务会被终止 (仅在独立进程中运行时有效)")
+        self.memory_spin = QSpinBox()
+        self.memory_spin.setRange(0, 1024 * 1024)
+        self.memory_spin.setSingleStep(512)
+        self.memory_spin.setValue((get_memory_budget().max_bytes or 0) // MB)
+        self.memory_spin.setSpecialValueText('自动')
+        self.memory_spin.setSuffix(' MB')
+        self.memory_spin.setToolTip("同时运行的任务估算内存峰值之和的上限；估算值放不下时任务继续排队。\n"
+                                    "“自动”为物理内存的 60%，并且不超过系统当前可用的内存。")
+        self.summary_label = QLabel()
+        self.memory_label = QLabel()
+        self.cache_label = QLabel()
+        self.cache_label.setToolTip("在合并、拆分、压缩等功能之间共享的已打开文档和页数/页眉等元数据")
+        self.clear_cache_btn = QPushButton('清空文档缓存')
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.priority_combo = QComboBox()
+        for value, name in PRIORITY_NAMES.items(): self.priority_combo.addItem(name, value)
+        self.priority_btn = QPushButton('设置优先级')
+        self.cancel_btn = QPushButton('取消任务')
+        self.clear_btn = QPushButton('清除已结束')
+
+        main_layout = QVBoxLayout(self)
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(QLabel('同时运行的任务数:')); top_layout.addWidget(self.concurrency_spin)
+        top_layout.addWidget(self.trace_check)
+        top_layout.addWidget(self.isolate_check)
+        top_layout.addWidget(QLabel('超时:')); top_layout.addWidget(self.timeout_spin)
+        top_layout.addWidget(QLabel('内存预算:')); top_layout.addWidget(self.memory_spin)
+        top_layout.addStretch(); top_layout.addWidget(self.summary_label)
+        main_layout.addLayout(top_layout)
+        main_layout.addWidget(self.table)
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.priority_combo); button_layout.addWidget(self.priority_btn)
+        button_layout.addWidget(self.cancel_btn); button_layout.addStretch(); button_layout.addWidget(self.clear_btn)
+        main_layout.addLayout(button_layout)
+        cache_layout = QHBoxLayout()
+        cache_layout.addWidget(self.cache_label); cache_layout.addStretch(); cache_layout.addWidget(self.clear_cache_btn)
+        main_layout.addLayout(cache_layout)
+        main_layout.addWidget(self.memory_label)
+
+        self.concurrency_spin.valueChanged.connect(self.queue.set_max_concurrent)
+        self.trace_check.toggled.connect(tracing.set_enabled)
+        self.isolate_check.toggled.connect(process_runner.set_enabled)
+        self.isolate_check.toggled.connect(self.timeout_spin.setEnabled)
+        self.timeout_spin.setEnabled(process_runner.is_enabled())
+        self.timeout_spin.valueChanged.connect(lambda minutes: process_runner.set_default_timeout(minutes * 60))
+        self.memory_spin.valueChanged.connect(self.set_memory_budget)
+        self.priority_btn.clicked.connect(self.set_selected_priority)
+        self.cancel_btn.clicked.connect(self.cancel_selected)
+        self.clear_btn.clicked.connect(self.clear_finished)
+        self.clear_cache_btn.clicked.connect(self.clear_document_cache)
+        self.update_summary()
+        self.update_cache_label()
+        self.memory_label.setText(get_memory_budget().describe())
+
+    def add_job_row(self, job):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        self.rows[job] = row
+        self.update_job_row(job)
+
+    def update_job_row(self, job):
+        row = self.rows.get(job)
+        if row is None:
+            return
+        state = STATE_NAMES[job.state] + (" (等待内存)" if job.state == QUEUED and job.waiting_for_memory else "")
+        values = [str(job.id), job.name, PRIORITY_NAMES.get(job.priority, str(job.priority)),
+                  state, format_seconds(job.wait_seconds()), format_seconds(job.run_seconds())]
+        for col, value in enumerate(values):
+            item = self.table.item(row, col)
+            if item is None:
+                self.table.setItem(row, col, QTableWidgetItem(value))
+            elif item.text() != value:
+                item.setText(value)
+        if job.state == FAILED and job.error_message:
+            self.table.item(row, 3).setToolTip(job.error_message)
+        elif job.memory_estimate is not None:
+            self.table.item(row, 3).setToolTip(f"估算内存峰值: {job.memory_estimate / MB:.0f} MB")
+        self.update_summary()
+
+    def refresh_running(self):
+        for job in self.rows:
+            if job.state in (QUEUED, RUNNING):
+                self.update_job_row(job)
+        self.update_cache_label()
+        self.memory_label.setText(get_memory_budget().describe())
+
+    def update_cache_label(self):
+        # 进程隔离时文档缓存位于工作进程中，显示其最近一次任务结束时的统计
+        stats = process_runner.last_cache_stats() if process_runner.is_enabled() else None
+        self.cache_label.setText(describe_stats(stats) if stats else get_document_cache().describe())
+
+    def set_memory_budget(self, megabytes):
+        self.queue.set_memory_budget(megabytes * MB)
+        self.memory_label.setText(get_memory_budget().describe())
+
+    def clear_document_cache(self):
+        get_document_cache().clear()
+        process_runner.stop_idle_workers()
+        self.update_cache_label()
+
+    def update_summary(self):
+        self.summary_label.setText(f"运行中 {self.queue.running_count()} 个 | 排队中 {self.queue.pending_count()} 个")
+
+    def selected_jobs(self):
+        selected_rows = {index.row() for index in self.table.selectionModel().selectedRows()}
+        return [job for job, row in self.rows.items() if row in selected_rows]
+
+    def set_selected_priority(self):
+        for job in self.selected_jobs():
+            self.queue.set_priority(job, self.priority_combo.currentData())
+
+    def cancel_selected(self):
+        for job in self.selected_jobs():
+            self.queue.cancel(job)
+
+    def clear_finished(self):
+        """从表格中移除已结束的任务 (不影响队列本身)"""
+        remaining = [job for job in self.rows if job.state not in (FINISHED, FAILED, CANCELLED)]
+        self.table.setRowCount(0)
+        self.rows = {}
+        for job in remaining:
+            self.add_job_row(job)
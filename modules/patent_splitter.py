@@ -1,107 +1,15 @@
 # 文件: modules/patent_splitter.py (最终整合版，包含说明面板)
 
 import os
-import re
-import pdfplumber
-from PyPDF2 import PdfReader, PdfWriter
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel,
-    QFileDialog, QTextEdit, QMessageBox, QFrame
+    QFileDialog, QTextEdit, QMessageBox, QFrame, QCheckBox
 )
-from PyQt5.QtCore import QThread
-
-from utils import Worker
-
-# ==============================================================================
-# ==                       后端核心逻辑 (来自你的脚本)                        ==
-# ==============================================================================
-
-# 页面分类关键词
-header_keywords = ["说明书摘要", "摘要附图", "权利要求书", "说明书附图", "说明书"]
-merge_groups = {
-    "说明书摘要": ["说明书摘要", "摘要附图"]
-}
-
-def extract_header_pages(pdf_path, header_y_threshold=100):
-    """识别每页页眉文本，判断所属类型页面"""
-    keyword_pages = {key: [] for key in header_keywords}
-    claims_pages = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for i, page in enumerate(pdf.pages):
-            header_texts = [char["text"] for char in page.chars if char["top"] < header_y_threshold]
-            header_str = ''.join(header_texts).replace(" ", "").replace("\n", "")
-            if header_str.startswith("权利要求书"):
-                claims_pages.append(i)
-            else:
-                matched = False
-                for key in header_keywords:
-                    if key == "权利要求书": continue
-                    if header_str.startswith(key):
-                        keyword_pages[key].append(i)
-                        matched = True
-                        break
-                if not matched:
-                    keyword_pages["说明书"].append(i)
-    return keyword_pages, claims_pages
-
-def extract_max_claim_number(pdf_path, claims_pages):
-    """从权利要求书页中提取最大段落编号"""
-    max_num = 0
-    pattern = re.compile(r"\b(\d+)[.\uFF0E](?:[\s\u3000]?)")
-    merged_text = ""
-    with pdfplumber.open(pdf_path) as pdf:
-        for p in claims_pages:
-            page = pdf.pages[p]
-            text = page.extract_text() or ""
-            lines = text.splitlines()
-            filtered_lines = [line.strip() for line in lines if not re.fullmatch(r"\d+", line.strip())]
-            merged_text += ' '.join(filtered_lines) + " "
-    nums = [int(n) for n in pattern.findall(merged_text)]
-    if nums:
-        max_num = max(nums)
-        print(f"匹配到的所有段落序号: {nums}")
-    else:
-        print("⚠️ 未匹配到任何段落序号")
-    return max_num
-
-def merge_pages(pdf_path, keyword_pages_map, claims_pages, max_claim_num, output_dir):
-    """根据页面映射关系，将页面写入不同的PDF文件"""
-    reader = PdfReader(pdf_path)
-    os.makedirs(output_dir, exist_ok=True)
-    # 合并说明书摘要类
-    for group_name, keys in merge_groups.items():
-        pages_to_merge = sorted(set(p for key in keys for p in keyword_pages_map.get(key, [])))
-        if pages_to_merge:
-            writer = PdfWriter()
-            for p in pages_to_merge: writer.add_page(reader.pages[p])
-            out_path = os.path.join(output_dir, f"{group_name}.pdf")
-            with open(out_path, "wb") as f: writer.write(f)
-            print(f"✅ 已输出合并PDF: {out_path}（共 {len(pages_to_merge)} 页）")
-    # 合并其余类型
-    keys_in_groups = set(k for keys in merge_groups.values() for k in keys)
-    for key, pages in keyword_pages_map.items():
-        if key in keys_in_groups or key == "权利要求书" or not pages: continue
-        writer = PdfWriter()
-        for p in pages: writer.add_page(reader.pages[p])
-        out_path = os.path.join(output_dir, f"{key}.pdf")
-        with open(out_path, "wb") as f: writer.write(f)
-        print(f"✅ 已输出合并PDF: {out_path}（共 {len(pages)} 页）")
-    # 合并权利要求书
-    if claims_pages:
-        writer = PdfWriter()
-        for p in sorted(claims_pages): writer.add_page(reader.pages[p])
-        out_path = os.path.join(output_dir, f"权利要求书{max_claim_num}.pdf")
-        with open(out_path, "wb") as f: writer.write(f)
-        print(f"✅ 已输出权利要求书PDF: {out_path}（最大序号 {max_claim_num}）")
-
-def split_patent_pdf(input_pdf_path, output_dir):
-    """主调用函数，整合所有步骤"""
-    print(f"\n🔍 正在处理: {os.path.basename(input_pdf_path)}")
-    keyword_pages_map, claims_pages = extract_header_pages(input_pdf_path)
-    max_claim_num = extract_max_claim_number(input_pdf_path, claims_pages)
-    merge_pages(input_pdf_path, keyword_pages_map, claims_pages, max_claim_num, output_dir)
-    print("\n🎉 PDF 分组完成！")
 
+from utils import Worker, LogConsole, ProgressPanel
+from job_queue import get_job_queue, QUEUED
+from core.patent_splitter import split_patent_pdf
+from core.patent_cache import get_default_cache
 
 # ==============================================================================
 # ==                  专利五书分割功能的UI面板 (QWidget)                      ==
@@ -117,8 +25,7 @@ class PatentSplitterWidget(QWidget):
         self.initUI()
 
     def on_update_text(self, text):
-        self.log_console.moveCursor(self.log_console.textCursor().End)
-        self.log_console.insertPlainText(text)
+        self.log_console.append_text(text)
 
     def initUI(self):
         # --- 1. 创建UI控件 ---
@@ -130,8 +37,12 @@ class PatentSplitterWidget(QWidget):
         self.output_path_edit.setReadOnly(True)
         self.split_btn = QPushButton('开始分割')
         self.split_btn.setObjectName("MergeButton")
-        self.log_console = QTextEdit()
-        self.log_console.setReadOnly(True)
+        self.use_cache_check = QCheckBox('使用页面分类缓存 (重复分割时只识别有变化的页面)')
+        self.use_cache_check.setChecked(True)
+        self.cache_info_label = QLabel()
+        self.clear_cache_btn = QPushButton('清空缓存')
+        self.log_console = LogConsole()
+        self.progress_panel = ProgressPanel()
 
         self.info_panel = QTextEdit()
         self.info_panel.setReadOnly(True)
@@ -154,6 +65,7 @@ class PatentSplitterWidget(QWidget):
                 <li>本工具强依赖于对PDF页眉文本的识别，请确保PDF是文本可选的，而非扫描图片。</li>
                 <li>非标准的页眉格式可能会导致分割失败或不准确。</li>
                 <li>分割后的“权利要求书.pdf”会自动附上识别到的最大权利要求项编号。</li>
+                <li>每页的识别结果会缓存到本地，再次分割同一文件（例如只调整了附图页）时会快很多；如结果异常可点击“清空缓存”。</li>
                 <li>只能上传pdf文件，并且上传之前将附图的位置调整成在两页以内，因为超过2页在专利系统可能通过不了</li>
             </ul>
         """)
@@ -170,8 +82,16 @@ class PatentSplitterWidget(QWidget):
         output_layout.addWidget(self.output_path_edit)
         
         main_layout.addLayout(input_layout)
+        cache_layout = QHBoxLayout()
+        cache_layout.addWidget(self.use_cache_check)
+        cache_layout.addStretch()
+        cache_layout.addWidget(self.cache_info_label)
+        cache_layout.addWidget(self.clear_cache_btn)
+
         main_layout.addLayout(output_layout)
+        main_layout.addLayout(cache_layout)
         main_layout.addWidget(self.split_btn)
+        main_layout.addWidget(self.progress_panel)
 
         separator = QFrame()
         separator.setFrameShape(QFrame.HLine)
@@ -201,6 +121,25 @@ class PatentSplitterWidget(QWidget):
         # --- 3. 连接信号 ---
         self.input_browse_btn.clicked.connect(self.select_input_file)
         self.split_btn.clicked.connect(self.start_split_process)
+        self.clear_cache_btn.clicked.connect(self.clear_cache)
+        self.update_cache_info()
+
+    def update_cache_info(self):
+        # 任务可能在工作进程中运行并更新了缓存文件
+        get_default_cache().reload_if_changed()
+        stats = get_default_cache().stats()
+        self.cache_info_label.setText(
+            f"缓存: {stats['entries']}/{stats['max_entries']} 页 | {stats['size_bytes'] / 1024:.1f} KB"
+        )
+        self.cache_info_label.setToolTip(
+            f"缓存文件: {stats['path']}\n本次运行命中 {stats['hits']} 次，未命中 {stats['misses']} 次"
+        )
+
+    def clear_cache(self):
+        reply = QMessageBox.question(self, "清空缓存", "确定要清空专利页面分类缓存吗？")
+        if reply == QMessageBox.Yes:
+            get_default_cache().clear()
+            self.update_cache_info()
 
     def select_input_file(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "选择一个专利PDF文件", "", "PDF Files (*.pdf)")
@@ -218,31 +157,37 @@ class PatentSplitterWidget(QWidget):
             return
         
         self.log_console.clear()
+        
+        self.progress_panel.reset()
         self.set_controls_enabled(False)
 
-        self.thread = QThread()
-        self.worker = self.worker_class(input_pdf_path=input_file, output_dir=output_dir)
-        self.worker.moveToThread(self.thread)
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-        self.worker.error.connect(self.on_split_error)
-        self.thread.finished.connect(self.on_split_finished)
-        self.thread.start()
+        worker = self.worker_class(input_pdf_path=input_file, output_dir=output_dir,
+                                   use_cache=self.use_cache_check.isChecked())
+        worker.progress.connect(self.progress_panel.handle_event)
+        self.job = get_job_queue().submit(f"专利分割: {os.path.basename(input_file)}", worker, owner=self)
+        self.job.succeeded.connect(self.on_split_finished)
+        self.job.failed.connect(self.on_split_error)
+        self.job.cancelled.connect(lambda: self.set_controls_enabled(True))
+        if self.job.state == QUEUED:
+            # 前面还有其他任务在运行，先显示排队状态
+            self.split_btn.setText("排队中...")
+            self.job.started.connect(lambda: self.split_btn.setText("正在分割..."))
 
     def set_controls_enabled(self, enabled):
         self.input_path_edit.setEnabled(enabled)
         self.input_browse_btn.setEnabled(enabled)
         self.split_btn.setEnabled(enabled)
+        self.use_cache_check.setEnabled(enabled)
+        self.clear_cache_btn.setEnabled(enabled)
         self.split_btn.setText("开始分割" if enabled else "正在分割...")
 
     def on_split_finished(self):
-        print("\nGUI: 任务已完成。")
+        self.on_update_text("\nGUI: 任务已完成。\n")
         self.set_controls_enabled(True)
+        self.update_cache_info()
         QMessageBox.information(self, "完成", "专利PDF分割已成功完成！")
 
     def on_split_error(self, error_message):
-        print(f"\nGUI: 任务发生错误。")
+        self.on_update_text("\nGUI: 任务发生错误。\n")
         self.set_controls_enabled(True)
         QMessageBox.critical(self, "错误", error_message)
\ No newline at end of file
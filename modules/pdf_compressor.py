@@ -1,133 +1,16 @@
 # 文件: modules/pdf_compressor.py (最终整合版 - 已优化输出逻辑)
 
 import os
-import fitz  # PyMuPDF
-from PIL import Image
-import io
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel,
     QFileDialog, QTextEdit, QMessageBox, QFrame, QSpinBox, QComboBox, QCheckBox,
-    QGridLayout
+    QGridLayout, QDoubleSpinBox
 )
-from PyQt5.QtCore import QThread
 
-from utils import Worker
-
-# ==============================================================================
-# ==                       后端核心逻辑 (来自你的脚本)                        ==
-# ==============================================================================
-
-SUPPORTED_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
-
-def get_output_path(input_path, source_base, output_base, new_ext=None):
-    """计算输出文件的完整路径，并确保目录存在。"""
-    relative_path = os.path.relpath(input_path, start=source_base)
-    output_path = os.path.join(output_base, relative_path)
-    if new_ext:
-        base, _ = os.path.splitext(output_path)
-        output_path = base + new_ext
-    output_dir = os.path.dirname(output_path)
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    return output_path
-
-def get_file_size(filepath, unit='mb'):
-    """获取文件大小"""
-    try:
-        size_bytes = os.path.getsize(filepath)
-        if unit.lower() == 'mb': return size_bytes / (1024 * 1024)
-        return size_bytes
-    except FileNotFoundError: return 0
-
-def compress_pdf_by_rendering(filepath, output_path, dpi, quality, to_grayscale):
-    """通过将PDF每一页渲染成图片，然后重新组合的方式进行极限压缩。"""
-    try:
-        original_size_mb = get_file_size(filepath, 'mb')
-        print(f"-> 开始极限压缩PDF: {os.path.basename(filepath)} | 原始大小: {original_size_mb:.2f} MB")
-        print(f"   (模式: 渲染-重组, DPI: {dpi}, 质量: {quality})")
-        output_doc, input_doc = fitz.open(), fitz.open(filepath)
-        for i, page in enumerate(input_doc):
-            print(f"\r   - 正在处理第 {i + 1}/{len(input_doc)} 页...", end="")
-            zoom = dpi / 72.0
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            if to_grayscale: img = img.convert("L")
-            with io.BytesIO() as f:
-                img.save(f, format="JPEG", quality=quality, optimize=True)
-                img_bytes = f.getvalue()
-            img_page_rect = fitz.Rect(0, 0, pix.width, pix.height)
-            new_page = output_doc.new_page(width=pix.width, height=pix.height)
-            new_page.insert_image(img_page_rect, stream=img_bytes)
-        print("\n   - 所有页面处理完毕，正在保存最终文件...")
-        output_doc.save(output_path)
-        input_doc.close(); output_doc.close()
-        compressed_size_mb = get_file_size(output_path, 'mb')
-        reduction = (original_size_mb - compressed_size_mb) / original_size_mb * 100 if original_size_mb > 0 else 0
-        print(f"   [成功] -> {os.path.basename(output_path)} | 压缩后大小: {compressed_size_mb:.2f} MB | 体积减小: {reduction:.2f}%")
-        return True
-    except Exception as e:
-        print(f"\n   [错误] 处理PDF {os.path.basename(filepath)} 时发生严重错误: {e}")
-        return False
-
-def compress_image(filepath, output_path, quality, to_grayscale, max_size):
-    """极限压缩单个图片文件，通过缩放尺寸和降低质量实现。"""
-    try:
-        original_size_mb = get_file_size(filepath, 'mb')
-        print(f"-> 开始极限压缩图片: {os.path.basename(filepath)} | 原始大小: {original_size_mb:.2f} MB")
-        print(f"   (模式: 图片重编码, 质量: {quality}, 最大尺寸: {max_size or '不限制'}px)")
-        with Image.open(filepath) as img:
-            original_dims = img.size
-            if img.mode in ("RGBA", "P", "LA"): img = img.convert("RGB")
-            if max_size and max_size > 0 and (img.width > max_size or img.height > max_size):
-                img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-                print(f"      - 已缩小尺寸: 从 {original_dims[0]}x{original_dims[1]} -> {img.width}x{img.height}")
-            if to_grayscale: img = img.convert("L")
-            img.save(output_path, "JPEG", quality=quality, optimize=True, progressive=True, subsampling="4:2:0")
-        compressed_size_mb = get_file_size(output_path, 'mb')
-        reduction = (original_size_mb - compressed_size_mb) / original_size_mb * 100 if original_size_mb > 0 else 0
-        print(f"   [成功] -> {os.path.basename(output_path)} | 压缩后大小: {compressed_size_mb:.2f} MB | 体积减小: {reduction:.2f}%")
-        return True
-    except Exception as e:
-        print(f"\n   [错误] 处理图片 {os.path.basename(filepath)} 时发生严重错误: {e}")
-        return False
-
-def compress_path(input_path, output_path, dpi, pdf_quality, img_quality, max_size, to_grayscale):
-    """新的主调用函数，处理单个文件或整个文件夹"""
-    if input_path == output_path:
-        print("错误：输入路径和输出路径不能相同！")
-        return
-    if not os.path.exists(output_path): os.makedirs(output_path)
-
-    files_to_process, source_base_dir = [], ""
-    if os.path.isfile(input_path):
-        files_to_process.append(input_path)
-        source_base_dir = os.path.dirname(input_path)
-    elif os.path.isdir(input_path):
-        source_base_dir = input_path
-        for dirpath, _, filenames in os.walk(input_path):
-            for filename in filenames: files_to_process.append(os.path.join(dirpath, filename))
-    
-    pdf_count, image_count, success_count = 0, 0, 0
-    for filepath in files_to_process:
-        ext = os.path.splitext(filepath)[1].lower()
-        if ext == '.pdf':
-            pdf_count += 1
-            output_file = get_output_path(filepath, source_base_dir, output_path)
-            if compress_pdf_by_rendering(filepath, output_file, dpi, pdf_quality, to_grayscale):
-                success_count += 1
-        elif ext in SUPPORTED_IMAGE_EXTENSIONS:
-            image_count += 1
-            output_file = get_output_path(filepath, source_base_dir, output_path, new_ext=".jpg")
-            if compress_image(filepath, output_file, img_quality, to_grayscale, max_size):
-                success_count += 1
-    
-    print("\n" + "="*50)
-    print("所有极限压缩任务已完成！")
-    print(f"总计发现 {pdf_count} 个PDF文件，{image_count} 个图片文件。")
-    print(f"成功处理 {success_count} 个文件。")
-    print(f"结果已保存到: {output_path}")
-    print("="*50)
+from utils import Worker, LogConsole, ProgressPanel
+from job_queue import get_job_queue, QUEUED
+from core.pdf_compressor import compress_path, default_output_dir, PDF_MODES, IMAGE_FORMATS, EFFORT_PRESETS
+from core.quality_guard import QualityGuard, DEFAULT_THRESHOLDS
 
 # ==============================================================================
 # ==                      PDF压缩功能的UI面板 (QWidget)                       ==
@@ -143,8 +26,7 @@ class PdfCompressorWidget(QWidget):
         self.toggle_output_mode(self.auto_output_check.isChecked())
 
     def on_update_text(self, text):
-        self.log_console.moveCursor(self.log_console.textCursor().End)
-        self.log_console.insertPlainText(text)
+        self.log_console.append_text(text)
 
     def initUI(self):
         # --- UI控件 ---
@@ -158,12 +40,27 @@ class PdfCompressorWidget(QWidget):
 
         self.dpi_combo = QComboBox(); self.dpi_combo.addItems(['72 (极限)', '96 (推荐)', '120', '150'])
         self.dpi_combo.setCurrentIndex(1)
+        self.pdf_mode_combo = QComboBox(); self.pdf_mode_combo.addItems(['渲染重组 (整页图片)', '分层压缩 (MRC, 扫描文档)'])
         self.pdf_quality_spin = QSpinBox(); self.pdf_quality_spin.setRange(10, 100); self.pdf_quality_spin.setValue(65)
         self.max_size_spin = QSpinBox(); self.max_size_spin.setRange(0, 8000); self.max_size_spin.setValue(1920); self.max_size_spin.setSuffix(" px")
+        self.img_format_combo = QComboBox()
+        self.img_format_combo.addItems(['JPEG', 'WebP', '无损 WebP', 'PNG', '自动 (照片→WebP，截图→无损 WebP)'])
+        self.effort_combo = QComboBox(); self.effort_combo.addItems(['快速', '均衡', '最小体积'])
+        self.effort_combo.setCurrentIndex(2)
         self.img_quality_spin = QSpinBox(); self.img_quality_spin.setRange(10, 100); self.img_quality_spin.setValue(65)
         self.grayscale_check = QCheckBox('强制转为灰度 (终极压缩)')
+        self.keep_original_check = QCheckBox('PDF体积减小不足时输出原文件 (转为灰度时不适用)')
+        self.keep_original_check.setChecked(True)
+        self.min_saving_spin = QSpinBox(); self.min_saving_spin.setRange(0, 90); self.min_saving_spin.setValue(10)
+        self.min_saving_spin.setPrefix("至少减小 "); self.min_saving_spin.setSuffix("%")
+        self.guard_check = QCheckBox('质量检查 (每个PDF抽查几页，计算压缩前后的 SSIM)')
+        self.min_ssim_spin = QDoubleSpinBox(); self.min_ssim_spin.setRange(0.5, 0.999); self.min_ssim_spin.setSingleStep(0.01)
+        self.min_ssim_spin.setDecimals(3); self.min_ssim_spin.setValue(DEFAULT_THRESHOLDS["ssim"]); self.min_ssim_spin.setPrefix("SSIM ≥ ")
+        self.guard_retry_check = QCheckBox('不合格时提高整个文件的质量')
+        self.guard_retry_check.setChecked(True)
         self.compress_btn = QPushButton('开始压缩'); self.compress_btn.setObjectName("MergeButton")
-        self.log_console = QTextEdit(); self.log_console.setReadOnly(True)
+        self.log_console = LogConsole()
+        self.progress_panel = ProgressPanel()
         self.info_panel = QTextEdit(); self.info_panel.setReadOnly(True)
         self.info_panel.setHtml("""
             <h2 style='color: #409EFF;'>功能说明</h2>
@@ -176,14 +73,34 @@ class PdfCompressorWidget(QWidget):
                 <li><b>PDF渲染DPI：</b>将PDF每一页转换为图片时的分辨率(每英寸点数)。
                 值越低，文件越小，但文字可能越模糊。<b>96 DPI</b> 是屏幕阅读的推荐平衡点。</li>
                 
+                <li><b>PDF压缩方式：</b><b>渲染重组</b>把整页保存为一张JPEG；
+                <b>分层压缩 (MRC)</b> 把页面拆成 300 DPI 的黑白文字层和按上面DPI保存的低分辨率背景层，
+                扫描的信函、表格文字更清晰，体积通常小数倍 (每页处理稍慢，照片页面会自动按整页图片保存)。</li>
+
                 <li><b>PDF图片质量：</b>重组PDF时，内部图片的JPEG压缩质量 (10-100)。
                 <b>65</b> 是一个比较激进的压缩值，效果显著。</li>
                 
                 <li><b>图片最长边像素：</b>压缩独立的图片文件时，将其最长边缩放到此像素值。
                 <b>0</b> 表示不缩放尺寸。<b>1920px (全高清)</b> 适合绝大多数屏幕查看场景。</li>
                 
-                <li><b>图片质量：</b>压缩独立图片时的JPEG质量。</li>
+                <li><b>图片质量：</b>压缩独立图片时的JPEG/WebP质量 (无损格式忽略此项)。</li>
+
+                <li><b>图片格式：</b>独立图片的输出格式。<b>WebP</b> 通常只有同等质量JPEG的一半左右；
+                <b>无损 WebP</b> 适合截图和图表；<b>自动</b> 逐张判断图片内容: 颜色很少的截图/图表/图标用无损 WebP，
+                照片用 WebP，并保留透明背景 (JPEG 不支持透明，透明部分会铺成白色)。</li>
+
+                <li><b>编码档位：</b><b>快速</b>编码最快，适合大批量；<b>最小体积</b>多花时间换更小的文件
+                (JPEG 为原来的渐进式+优化编码)。各档位的实际对比可运行 <code>python -m benchmarks.run --codecs</code>。</li>
                 
+                <li><b>质量检查：</b>每个PDF抽查首页、末页和中间的几页 (图片每5张抽查1张)，
+                比较JPEG编码前后的 <b>SSIM</b> (结构相似度，1 为完全相同) 并在日志中逐个文件报告。
+                低于阈值时可自动提高质量 (先抽查再编码，提高后的质量用于整个文件)，避免为了体积把质量设得过低导致文字无法辨认。
+                <b>0.93</b> 大致对应 96 DPI 下质量 30 左右的文字页面。</li>
+
+                <li><b>体积减小不足时输出原文件：</b>文字型PDF、已经压缩过的PDF渲染成图片后往往反而变大。
+                页数较多的PDF先抽样压缩几页预估结果，预计达不到设定的减小比例时直接跳过，不再花时间整份压缩；
+                压缩完成后再核对一次实际体积，不足时同样把原文件复制到输出位置，日志中会注明“保留原文件”。</li>
+
                 <li><b>强制灰度：</b>将所有PDF页面和图片都转换为黑白灰度图。
                 这是终极压缩手段，可获得最大压缩率，但会丢失所有色彩信息。</li>
             </ul>
@@ -210,9 +127,20 @@ class PdfCompressorWidget(QWidget):
         settings_layout.addWidget(QLabel('PDF图片质量:'), 0, 2); settings_layout.addWidget(self.pdf_quality_spin, 0, 3)
         settings_layout.addWidget(QLabel('图片最长边像素:'), 1, 0); settings_layout.addWidget(self.max_size_spin, 1, 1)
         settings_layout.addWidget(QLabel('图片质量:'), 1, 2); settings_layout.addWidget(self.img_quality_spin, 1, 3)
+        settings_layout.addWidget(QLabel('PDF压缩方式:'), 2, 0); settings_layout.addWidget(self.pdf_mode_combo, 2, 1)
+        settings_layout.addWidget(QLabel('图片格式:'), 3, 0); settings_layout.addWidget(self.img_format_combo, 3, 1)
+        settings_layout.addWidget(QLabel('编码档位:'), 3, 2); settings_layout.addWidget(self.effort_combo, 3, 3)
         main_layout.addLayout(settings_layout)
         main_layout.addWidget(self.grayscale_check)
+        saving_layout = QHBoxLayout()
+        saving_layout.addWidget(self.keep_original_check); saving_layout.addWidget(self.min_saving_spin); saving_layout.addStretch()
+        main_layout.addLayout(saving_layout)
+        guard_layout = QHBoxLayout()
+        guard_layout.addWidget(self.guard_check); guard_layout.addWidget(self.min_ssim_spin)
+        guard_layout.addWidget(self.guard_retry_check); guard_layout.addStretch()
+        main_layout.addLayout(guard_layout)
         main_layout.addWidget(self.compress_btn)
+        main_layout.addWidget(self.progress_panel)
         
         separator = QFrame(); separator.setFrameShape(QFrame.HLine); separator.setFrameShadow(QFrame.Sunken); separator.setStyleSheet("background-color: #4C566A;")
         main_layout.addWidget(separator)
@@ -231,6 +159,15 @@ class PdfCompressorWidget(QWidget):
         self.output_folder_btn.clicked.connect(self.select_output_folder)
         self.compress_btn.clicked.connect(self.start_compress_process)
         self.auto_output_check.toggled.connect(self.toggle_output_mode)
+        self.guard_check.toggled.connect(self.update_guard_controls)
+        self.keep_original_check.toggled.connect(self.update_guard_controls)
+        self.update_guard_controls()
+
+    def update_guard_controls(self):
+        enabled = self.guard_check.isChecked() and self.guard_check.isEnabled()
+        self.min_ssim_spin.setEnabled(enabled)
+        self.guard_retry_check.setEnabled(enabled)
+        self.min_saving_spin.setEnabled(self.keep_original_check.isChecked() and self.keep_original_check.isEnabled())
 
     def toggle_output_mode(self, checked):
         if checked:
@@ -245,12 +182,8 @@ class PdfCompressorWidget(QWidget):
     def update_auto_output_path(self):
         input_path = self.input_path_edit.text()
         if input_path and os.path.exists(input_path):
-            if os.path.isfile(input_path):
-                base_dir = os.path.dirname(input_path)
-            else: # isdir
-                base_dir = input_path
-            output_dir = os.path.join(base_dir, "压缩结果")
-            self.output_path_edit.setText(output_dir)
+            # 文件夹的结果放在同级的 “<文件夹名>_压缩结果”，不放进输入文件夹里
+            self.output_path_edit.setText(default_output_dir(input_path))
         else:
             self.output_path_edit.clear()
 
@@ -281,39 +214,48 @@ class PdfCompressorWidget(QWidget):
             QMessageBox.warning(self, "路径错误", "请选择输出文件夹！"); return
 
         self.log_console.clear()
+
+        self.progress_panel.reset()
         self.set_controls_enabled(False)
-        self.thread = QThread()
-        self.worker = self.worker_class(
+        worker = self.worker_class(
             input_path=input_path, output_path=output_path,
             dpi=int(self.dpi_combo.currentText().split(' ')[0]),
             pdf_quality=self.pdf_quality_spin.value(),
             img_quality=self.img_quality_spin.value(),
             max_size=self.max_size_spin.value(),
-            to_grayscale=self.grayscale_check.isChecked()
+            to_grayscale=self.grayscale_check.isChecked(),
+            pdf_mode=PDF_MODES[self.pdf_mode_combo.currentIndex()],
+            image_format=IMAGE_FORMATS[self.img_format_combo.currentIndex()],
+            effort=EFFORT_PRESETS[self.effort_combo.currentIndex()],
+            min_saving=self.min_saving_spin.value() / 100 if self.keep_original_check.isChecked() else None,
+            quality_guard=QualityGuard("ssim", threshold=self.min_ssim_spin.value(),
+                                       retry=self.guard_retry_check.isChecked()) if self.guard_check.isChecked() else None
         )
-        self.worker.moveToThread(self.thread)
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-        self.worker.error.connect(self.on_compress_error)
-        self.thread.finished.connect(self.on_compress_finished)
-        self.thread.start()
+        worker.progress.connect(self.progress_panel.handle_event)
+        self.job = get_job_queue().submit(f"PDF 压缩: {os.path.basename(input_path)}", worker, owner=self)
+        self.job.succeeded.connect(self.on_compress_finished)
+        self.job.failed.connect(self.on_compress_error)
+        self.job.cancelled.connect(lambda: self.set_controls_enabled(True))
+        if self.job.state == QUEUED:
+            # 前面还有其他任务在运行，先显示排队状态
+            self.compress_btn.setText("排队中...")
+            self.job.started.connect(lambda: self.compress_btn.setText("正在压缩..."))
 
     def set_controls_enabled(self, enabled):
         for w in [self.input_path_edit, self.input_file_btn, self.input_folder_btn,
-                  self.output_path_edit, self.output_folder_btn, self.dpi_combo,
-                  self.pdf_quality_spin, self.max_size_spin, self.img_quality_spin,
-                  self.grayscale_check, self.compress_btn]:
+                  self.output_path_edit, self.output_folder_btn, self.dpi_combo, self.pdf_mode_combo,
+                  self.pdf_quality_spin, self.max_size_spin, self.img_quality_spin, self.img_format_combo, self.effort_combo,
+                  self.grayscale_check, self.keep_original_check, self.guard_check, self.compress_btn]:
             w.setEnabled(enabled)
+        self.update_guard_controls()
         self.compress_btn.setText("开始压缩" if enabled else "正在压缩...")
 
     def on_compress_finished(self):
-        print("\nGUI: 任务已完成。")
+        self.on_update_text("\nGUI: 任务已完成。\n")
         self.set_controls_enabled(True)
         QMessageBox.information(self, "完成", "所有文件压缩已成功完成！")
 
     def on_compress_error(self, error_message):
-        print(f"\nGUI: 任务发生错误。")
+        self.on_update_text("\nGUI: 任务发生错误。\n")
         self.set_controls_enabled(True)
         QMessageBox.critical(self, "错误", error_message)
\ No newline at end of file
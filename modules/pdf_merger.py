@@ -1,160 +1,17 @@
 # 文件: modules/pdf_merger.py (最终整合版)
 
 import os
-import re
-import fitz  # PyMuPDF
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel,
     QFileDialog, QCheckBox, QTextEdit, QMessageBox, QFrame
 )
-from PyQt5.QtCore import QThread
+from PyQt5.QtCore import QTimer
 
 # 从项目根目录的utils.py导入工具类
-from utils import Worker
-
-# ==============================================================================
-# ==                       后端核心逻辑 (已修正图片处理)                        ==
-# ==============================================================================
-SUPPORTED_EXTENSIONS = ['.pdf', '.jpg', '.jpeg', '.png', '.bmp', '.tiff']
-A4_PAPER_SIZE = fitz.paper_size("a4")
-
-def natural_sort_key(s):
-    """提供自然排序的键，用于像文件管理器一样排序"""
-    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
-
-def create_resized_image_pdf(image_path):
-    """【可靠的图片处理函数】创建一个包含单张、居中、A4尺寸图片的内存PDF文档。"""
-    doc = fitz.open()
-    page = doc.new_page(width=A4_PAPER_SIZE[0], height=A4_PAPER_SIZE[1])
-    try:
-        with fitz.open(image_path) as img:
-            img_rect = img[0].rect
-            margin = 36
-            drawable_area = page.rect + (margin, margin, -margin, -margin)
-            target_rect = img_rect.fit(drawable_area)
-            page.insert_image(target_rect, filename=image_path)
-    except Exception as e:
-        print(f"    - 警告: 无法处理图片 '{os.path.basename(image_path)}' : {e}")
-        doc.close()
-        return None
-    return doc
-
-def process_directory_recursively(current_dir, final_doc, toc, level, config):
-    """
-    【核心递归函数 - 已修正V2】统一处理PDF和图片，确保都能合并。
-    """
-    try:
-        items = os.listdir(current_dir)
-        items.sort(key=natural_sort_key)
-    except OSError as e:
-        print(f"  - 警告: 无法读取目录 '{current_dir}': {e}")
-        return
-
-    for item_name in items:
-        full_path = os.path.join(current_dir, item_name)
-
-        if os.path.abspath(full_path) == os.path.abspath(config['output_filepath']):
-            continue
-
-        if os.path.isdir(full_path):
-            pages_before_entering = len(final_doc)
-            print(f"\n进入子文件夹: {os.path.relpath(full_path, config['root_folder'])}")
-            bookmark_to_add = [level, item_name, pages_before_entering + 1]
-            toc.append(bookmark_to_add)
-            process_directory_recursively(full_path, final_doc, toc, level + 1, config)
-            if len(final_doc) == pages_before_entering:
-                print(f"  - (空文件夹 '{item_name}'，已移除书签)")
-                toc.pop()
-        else:
-            ext = os.path.splitext(item_name)[1].lower()
-            if ext in SUPPORTED_EXTENSIONS:
-                print(f"  - 处理中: {item_name}")
-                source_doc = None
-                try:
-                    start_page_count = len(final_doc)
-                    
-                    if ext == '.pdf':
-                        # 如果是PDF，直接打开并插入
-                        source_doc = fitz.open(full_path)
-                        if source_doc and len(source_doc) > 0:
-                            final_doc.insert_pdf(source_doc)
-                            print(f"    - 已合并 ({len(source_doc)} 页PDF)")
-                    # 如果是图片 (且不是PDF)
-                    elif ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
-                        if config['resize_images']:
-                            # 使用我们现有的函数将图片转为带边距的单页PDF
-                            source_doc = create_resized_image_pdf(full_path)
-                            if source_doc:
-                                final_doc.insert_pdf(source_doc)
-                                print(f"    - 已合并 (1 页图片，已缩放至A4)")
-                        else:
-                            # 不缩放图片，将其尽可能大地插入新页面
-                            page = final_doc.new_page()
-                            with fitz.open(full_path) as img_doc:
-                                img_rect = img_doc[0].rect
-                                page.insert_image(page.rect, stream=img_doc[0].get_pixmap().tobytes())
-                            print(f"    - 已合并 (1 页图片，原始比例)")
-                    
-                    # 如果有页面被成功添加，则创建书签
-                    if len(final_doc) > start_page_count:
-                        file_bookmark_title = os.path.splitext(item_name)[0]
-                        toc.append([level, file_bookmark_title, start_page_count + 1])
-                        
-                except Exception as e:
-                    print(f"    - 严重错误: 处理 '{item_name}' 失败: {e}")
-                finally:
-                    if source_doc:
-                        source_doc.close()
-
-
-def merge_files(root_folder, output_filepath, resize_images=False):
-    """主函数，负责初始化和调用递归处理"""
-    if not os.path.isdir(root_folder):
-        print(f"[错误] 输入路径 '{root_folder}' 不是一个有效的文件夹。")
-        return
-
-    output_dir = os.path.dirname(output_filepath)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
-
-    final_doc = fitz.open()
-    toc = []
-
-    print(f"开始处理文件夹: {os.path.abspath(root_folder)}")
-    if resize_images:
-        print("模式: 图片将统一为A4页面尺寸。")
-    print("-" * 40)
-
-    config = {
-        'root_folder': root_folder,
-        'output_filepath': output_filepath,
-        'resize_images': resize_images
-    }
-
-    try:
-        process_directory_recursively(root_folder, final_doc, toc, 1, config)
-
-        if len(final_doc) == 0:
-            print("\n[错误] 未能合并任何文件。")
-            final_doc.close()
-            return
-
-        print("\n正在生成最终PDF...")
-        if toc:
-            final_doc.set_toc(toc)
-
-        final_doc.save(output_filepath, garbage=4, deflate=True, clean=True)
-
-        print("\n" + "=" * 40)
-        print("[成功] 所有文件已合并完成！")
-        print(f"文件已保存至: {os.path.abspath(output_filepath)}")
-        print(f"总页数: {len(final_doc)}")
-        print("=" * 40)
-
-    finally:
-        if final_doc:
-            final_doc.close()
-
+from utils import Worker, LogConsole, ProgressPanel
+from job_queue import get_job_queue, QUEUED
+from core.pdf_merger import merge_files, list_merge_order
+from modules.thumbnail_panel import ThumbnailPanel
 
 # ==============================================================================
 # ==                  PDF合并功能的UI面板 (QWidget) - 布局已修改              ==
@@ -172,8 +29,7 @@ class PdfMergerWidget(QWidget):
 
     def on_update_text(self, text):
         """接收日志信号并更新文本框"""
-        self.log_console.moveCursor(self.log_console.textCursor().End)
-        self.log_console.insertPlainText(text)
+        self.log_console.append_text(text)
 
     def initUI(self):
         # 1. --- 创建所有UI控件 ---
@@ -186,8 +42,11 @@ class PdfMergerWidget(QWidget):
         self.resize_checkbox = QCheckBox('将所有图片统一调整为A4页面尺寸')
         self.merge_btn = QPushButton('开始合并')
         self.merge_btn.setObjectName("MergeButton")
-        self.log_console = QTextEdit()
-        self.log_console.setReadOnly(True)
+        self.log_console = LogConsole()
+        self.progress_panel = ProgressPanel()
+        self.preview_panel = ThumbnailPanel()
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
 
         self.info_panel = QTextEdit()
         self.info_panel.setReadOnly(True)
@@ -213,6 +72,7 @@ class PdfMergerWidget(QWidget):
                 <li>空的子文件夹将被自动忽略。</li>
                 <li>默认合并的顺序是文件存在的顺序，如果有特定要求可以给源文件使用数字排序，排序后即按照所需的顺序合并</li>
                 <li>只能处理pdf和图片，如果遇到docx和xlsx需要提前手动转换，不然会忽略</li>
+                <li>选择文件夹后，“页面预览”按合并顺序显示每个文件的第一页，可以在合并前检查顺序和遗漏</li>
             </ul>
         """)
 
@@ -233,6 +93,8 @@ class PdfMergerWidget(QWidget):
         main_layout.addLayout(output_layout)
         main_layout.addWidget(self.resize_checkbox)
         main_layout.addWidget(self.merge_btn)
+        main_layout.addWidget(self.progress_panel)
+        main_layout.addWidget(self.preview_panel, 3)
         
         separator = QFrame()
         separator.setFrameShape(QFrame.HLine)
@@ -257,12 +119,14 @@ class PdfMergerWidget(QWidget):
         bottom_area_layout.addWidget(log_area_widget, 3)
         bottom_area_layout.addWidget(info_area_widget, 2)
         
-        main_layout.addLayout(bottom_area_layout)
+        main_layout.addLayout(bottom_area_layout, 2)
 
         # 3. --- 连接信号与槽 ---
         self.input_browse_btn.clicked.connect(self.select_input_folder)
         self.output_browse_btn.clicked.connect(self.select_output_file)
         self.merge_btn.clicked.connect(self.start_merge_process)
+        self.input_path_edit.textChanged.connect(lambda _: self.preview_timer.start(300))
+        self.preview_timer.timeout.connect(self.load_preview)
 
     # 4. --- 逻辑处理函数 ---
     def start_merge_process(self):
@@ -275,21 +139,22 @@ class PdfMergerWidget(QWidget):
             QMessageBox.warning(self, "路径错误", f"输入文件夹不存在:\n{input_folder}")
             return
         self.log_console.clear()
+        self.progress_panel.reset()
         self.set_controls_enabled(False)
-        self.thread = QThread()
-        self.worker = self.worker_class(
+        worker = self.worker_class(
             root_folder=input_folder,
             output_filepath=output_file,
             resize_images=self.resize_checkbox.isChecked()
         )
-        self.worker.moveToThread(self.thread)
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-        self.worker.error.connect(self.on_merge_error)
-        self.thread.finished.connect(self.on_merge_finished)
-        self.thread.start()
+        worker.progress.connect(self.progress_panel.handle_event)
+        self.job = get_job_queue().submit(f"PDF 合并: {os.path.basename(input_folder)}", worker, owner=self)
+        self.job.succeeded.connect(self.on_merge_finished)
+        self.job.failed.connect(self.on_merge_error)
+        self.job.cancelled.connect(lambda: self.set_controls_enabled(True))
+        if self.job.state == QUEUED:
+            # 前面还有其他任务在运行，先显示排队状态
+            self.merge_btn.setText("排队中...")
+            self.job.started.connect(lambda: self.merge_btn.setText("正在合并..."))
         
     def select_input_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "选择包含PDF和图片的文件夹")
@@ -299,6 +164,15 @@ class PdfMergerWidget(QWidget):
             suggested_output = os.path.join(folder, f"{folder_name}_merged.pdf")
             self.output_path_edit.setText(suggested_output)
 
+    def load_preview(self):
+        """按合并顺序预览文件夹中每个文件的第一页"""
+        folder = self.input_path_edit.text().strip()
+        if not folder or not os.path.isdir(folder):
+            self.preview_panel.clear()
+            return
+        files = list_merge_order(folder, self.output_path_edit.text().strip() or None)
+        self.preview_panel.set_files(files, base_dir=folder)
+
     def select_output_file(self):
         default_path = self.output_path_edit.text() or os.path.expanduser("~")
         file_path, _ = QFileDialog.getSaveFileName(self, "保存合并后的PDF", default_path, "PDF Files (*.pdf)")
@@ -317,11 +191,11 @@ class PdfMergerWidget(QWidget):
         self.merge_btn.setText("开始合并" if enabled else "正在合并...")
 
     def on_merge_finished(self):
-        print("\nGUI: 任务已完成。")
+        self.on_update_text("\nGUI: 任务已完成。\n")
         self.set_controls_enabled(True)
         QMessageBox.information(self, "完成", "PDF合并已成功完成！")
 
     def on_merge_error(self, error_message):
-        print(f"\nGUI: 任务发生错误。")
+        self.on_update_text("\nGUI: 任务发生错误。\n")
         self.set_controls_enabled(True)
         QMessageBox.critical(self, "错误", error_message)
\ No newline at end of file
@@ -0,0 +1,237 @@
+# 文件: modules/pdf_pipeline.py
+
+import os
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel,
+    QFileDialog, QTextEdit, QMessageBox, QFrame, QCheckBox, QComboBox, QSpinBox,
+    QDoubleSpinBox, QGroupBox, QGridLayout
+)
+
+from utils import Worker, LogConsole, ProgressPanel
+from job_queue import get_job_queue, QUEUED
+from core.pdf_compressor import PDF_MODES
+from core.pdf_splitter import SPLIT_MODES
+from core.pipeline import run_pipeline, plan_pipeline, describe_pipeline, default_output_path
+
+# ==============================================================================
+# ==                   合并->压缩->拆分 流水线的UI面板 (QWidget)               ==
+# ==============================================================================
+class PdfPipelineWidget(QWidget):
+    def __init__(self):
+        super().__init__()
+        class PipelineWorker(Worker):
+            def __init__(self, **kwargs): super().__init__(task_function=run_pipeline, **kwargs)
+        self.worker_class = PipelineWorker
+        self.initUI()
+
+    def on_update_text(self, text):
+        self.log_console.append_text(text)
+
+    def initUI(self):
+        # --- UI控件 ---
+        self.input_path_edit = QLineEdit()
+        self.input_folder_btn = QPushButton('选择文件夹...')
+        self.input_file_btn = QPushButton('选择PDF...')
+        self.output_path_edit = QLineEdit()
+        self.output_browse_btn = QPushButton('另存为...')
+        self.auto_output_check = QCheckBox('自动命名 (与输入同级的 <输入名>_processed.pdf)')
+        self.auto_output_check.setChecked(True)
+        self.chain_label = QLabel()
+
+        # 阶段 ①: 合并 (输入为文件夹时执行)
+        self.merge_group = QGroupBox('① 合并文件夹')
+        self.resize_a4_check = QCheckBox('将图片统一调整为A4页面尺寸')
+        merge_layout = QVBoxLayout(self.merge_group); merge_layout.addWidget(self.resize_a4_check)
+
+        # 阶段 ②: 压缩
+        self.compress_group = QGroupBox('② 压缩'); self.compress_group.setCheckable(True)
+        self.pdf_mode_combo = QComboBox(); self.pdf_mode_combo.addItems(['渲染重组 (整页图片)', '分层压缩 (MRC, 扫描文档)'])
+        self.dpi_combo = QComboBox(); self.dpi_combo.addItems(['72 (极限)', '96 (推荐)', '120', '150'])
+        self.dpi_combo.setCurrentIndex(1)
+        self.quality_spin = QSpinBox(); self.quality_spin.setRange(10, 100); self.quality_spin.setValue(65)
+        self.grayscale_check = QCheckBox('强制转为灰度')
+        compress_layout = QGridLayout(self.compress_group)
+        compress_layout.addWidget(QLabel('压缩方式:'), 0, 0); compress_layout.addWidget(self.pdf_mode_combo, 0, 1)
+        compress_layout.addWidget(QLabel('DPI:'), 1, 0); compress_layout.addWidget(self.dpi_combo, 1, 1)
+        compress_layout.addWidget(QLabel('图片质量:'), 2, 0); compress_layout.addWidget(self.quality_spin, 2, 1)
+        compress_layout.addWidget(self.grayscale_check, 3, 0, 1, 2)
+
+        # 阶段 ③: 拆分
+        self.split_group = QGroupBox('③ 拆分'); self.split_group.setCheckable(True)
+        self.split_mode_combo = QComboBox()
+        for mode, label in SPLIT_MODES.items(): self.split_mode_combo.addItem(label, mode)
+        self.split_mode_combo.setCurrentIndex(list(SPLIT_MODES).index("size"))
+        self.page_range_edit = QLineEdit(); self.page_range_edit.setPlaceholderText("例如: 1-3;4-")
+        self.pages_per_file_spin = QSpinBox(); self.pages_per_file_spin.setRange(1, 100000); self.pages_per_file_spin.setValue(10); self.pages_per_file_spin.setSuffix(" 页/文件")
+        self.max_mb_spin = QDoubleSpinBox(); self.max_mb_spin.setRange(0.1, 10000); self.max_mb_spin.setValue(10); self.max_mb_spin.setSuffix(" MB")
+        self.bookmark_hint_label = QLabel('每个一级书签一个文件')
+        split_layout = QVBoxLayout(self.split_group)
+        split_layout.addWidget(self.split_mode_combo)
+        for w in [self.page_range_edit, self.pages_per_file_spin, self.max_mb_spin, self.bookmark_hint_label]:
+            split_layout.addWidget(w)
+        split_layout.addStretch()
+
+        self.run_btn = QPushButton('开始处理'); self.run_btn.setObjectName("MergeButton")
+        self.log_console = LogConsole()
+        self.progress_panel = ProgressPanel()
+        self.info_panel = QTextEdit(); self.info_panel.setReadOnly(True)
+        self.info_panel.setHtml("""
+            <h2 style='color: #409EFF;'>功能说明</h2>
+            <p>把常用的 <b>合并 → 压缩 → 拆分</b> 一次完成 (如整理案卷后按上传大小限制拆分)。
+            各阶段之间直接传递内存中的文档，<b>只有最终结果写入磁盘</b>，
+            不再像分三次操作那样写出完整的中间PDF、再重新打开解析，大文件可以省下大量读写时间。</p>
+            <h3 style='color: #E6A23C;'>组合方式:</h3>
+            <ul>
+                <li><b>输入文件夹:</b> 总是先合并 (规则同“PDF 合并”，子文件夹生成书签)，之后可选压缩、拆分。</li>
+                <li><b>输入PDF:</b> 跳过合并，可选压缩、拆分。</li>
+                <li><b>压缩:</b> 与“PDF 压缩”相同的渲染重组或分层压缩，压缩后保留书签，之后仍可按书签拆分。</li>
+                <li><b>拆分:</b> 与“PDF 拆分”相同的四种方式；勾选拆分时，输出文件名作为前缀，
+                生成如“案卷_pages_1-20.pdf”的多个文件。不拆分时只输出一个文件。</li>
+            </ul>
+            <h3 style='color: #E6A23C;'>注意:</h3>
+            <p>压缩阶段需要同时在内存中保留压缩前后的两份文档，内存占用比单独压缩略高。</p>
+        """)
+
+        # --- 布局 ---
+        main_layout = QVBoxLayout(self)
+        input_layout = QHBoxLayout()
+        input_layout.addWidget(QLabel('输入:')); input_layout.addWidget(self.input_path_edit)
+        input_layout.addWidget(self.input_folder_btn); input_layout.addWidget(self.input_file_btn)
+        main_layout.addLayout(input_layout)
+        stages_layout = QHBoxLayout()
+        for group in [self.merge_group, self.compress_group, self.split_group]:
+            stages_layout.addWidget(group, 1)
+        main_layout.addLayout(stages_layout)
+        main_layout.addWidget(self.chain_label)
+        output_layout = QHBoxLayout()
+        output_layout.addWidget(QLabel('输出文件:')); output_layout.addWidget(self.output_path_edit); output_layout.addWidget(self.output_browse_btn)
+        main_layout.addLayout(output_layout)
+        main_layout.addWidget(self.auto_output_check)
+        main_layout.addWidget(self.run_btn)
+        main_layout.addWidget(self.progress_panel)
+
+        separator = QFrame(); separator.setFrameShape(QFrame.HLine); separator.setFrameShadow(QFrame.Sunken)
+        main_layout.addWidget(separator)
+
+        bottom_layout = QHBoxLayout()
+        log_area_widget = QWidget(); log_layout = QVBoxLayout(log_area_widget); log_layout.setContentsMargins(0,0,0,0)
+        log_layout.addWidget(QLabel('日志输出:')); log_layout.addWidget(self.log_console)
+        info_area_widget = QWidget(); info_layout = QVBoxLayout(info_area_widget); info_layout.setContentsMargins(0,0,0,0)
+        info_layout.addWidget(QLabel('使用说明:')); info_layout.addWidget(self.info_panel)
+        bottom_layout.addWidget(log_area_widget, 3); bottom_layout.addWidget(info_area_widget, 2)
+        main_layout.addLayout(bottom_layout)
+
+        # --- 连接信号 ---
+        self.input_folder_btn.clicked.connect(self.select_input_folder)
+        self.input_file_btn.clicked.connect(self.select_input_file)
+        self.output_browse_btn.clicked.connect(self.select_output_file)
+        self.auto_output_check.toggled.connect(self.update_output_path)
+        self.input_path_edit.textChanged.connect(lambda _: self.update_stages())
+        self.compress_group.toggled.connect(lambda _: self.update_stages())
+        self.split_group.toggled.connect(lambda _: self.update_stages())
+        self.split_mode_combo.currentIndexChanged.connect(self.toggle_split_mode)
+        self.run_btn.clicked.connect(self.start_pipeline)
+        self.toggle_split_mode()
+        self.update_stages()
+
+    def toggle_split_mode(self):
+        mode = self.split_mode_combo.currentData()
+        self.page_range_edit.setVisible(mode == "range")
+        self.pages_per_file_spin.setVisible(mode == "count")
+        self.max_mb_spin.setVisible(mode == "size")
+        self.bookmark_hint_label.setVisible(mode == "bookmark")
+
+    def update_stages(self):
+        """合并阶段只在输入为文件夹时执行；显示当前的流程"""
+        is_folder = os.path.isdir(self.input_path_edit.text().strip())
+        self.merge_group.setEnabled(is_folder)
+        names = [n for n, on in [("合并", is_folder), ("压缩", self.compress_group.isChecked()),
+                                 ("拆分", self.split_group.isChecked())] if on]
+        self.chain_label.setText(f"流程: {' → '.join(names) if names else '(未选择任何阶段)'}")
+        self.update_output_path()
+
+    def update_output_path(self):
+        checked = self.auto_output_check.isChecked()
+        self.output_path_edit.setReadOnly(checked)
+        self.output_browse_btn.setEnabled(not checked)
+        input_path = self.input_path_edit.text().strip()
+        if checked:
+            self.output_path_edit.setText(default_output_path(input_path) if input_path and os.path.exists(input_path) else "")
+
+    def select_input_folder(self):
+        path = QFileDialog.getExistingDirectory(self, "选择文件夹")
+        if path: self.input_path_edit.setText(path)
+
+    def select_input_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择PDF文件", "", "PDF Files (*.pdf)")
+        if path: self.input_path_edit.setText(path)
+
+    def select_output_file(self):
+        path, _ = QFileDialog.getSaveFileName(self, "保存结果", "", "PDF Files (*.pdf)")
+        if path: self.output_path_edit.setText(path)
+
+    def build_stages(self, input_path):
+        """按界面上的设置组装流水线各阶段的参数"""
+        stages = {}
+        if os.path.isdir(input_path):
+            stages["merge"] = {"resize_images": self.resize_a4_check.isChecked()}
+        if self.compress_group.isChecked():
+            stages["compress"] = {"pdf_mode": PDF_MODES[self.pdf_mode_combo.currentIndex()],
+                                  "dpi": int(self.dpi_combo.currentText().split(' ')[0]),
+                                  "quality": self.quality_spin.value(),
+                                  "to_grayscale": self.grayscale_check.isChecked()}
+        if self.split_group.isChecked():
+            mode = self.split_mode_combo.currentData()
+            value = {"range": self.page_range_edit.text().strip(), "count": self.pages_per_file_spin.value(),
+                     "size": self.max_mb_spin.value()}.get(mode)
+            stages["split"] = {"mode": mode, "value": value}
+        return stages
+
+    def start_pipeline(self):
+        input_path = self.input_path_edit.text().strip()
+        output_path = self.output_path_edit.text().strip()
+        if not input_path or not os.path.exists(input_path):
+            QMessageBox.warning(self, "路径错误", "输入源不存在！"); return
+        if not output_path:
+            QMessageBox.warning(self, "路径错误", "请指定输出文件路径！"); return
+        stages = self.build_stages(input_path)
+        if stages.get("split", {}).get("mode") == "range" and not stages["split"]["value"]:
+            QMessageBox.warning(self, "输入错误", "请输入拆分的页面范围！"); return
+        try:
+            plan = plan_pipeline(input_path, stages)
+        except ValueError as e:
+            QMessageBox.warning(self, "设置错误", str(e)); return
+
+        self.log_console.clear()
+
+        self.progress_panel.reset()
+        self.set_controls_enabled(False)
+        worker = self.worker_class(input_path=input_path, output_path=output_path, stages=stages)
+        worker.progress.connect(self.progress_panel.handle_event)
+        self.job = get_job_queue().submit(f"流水线 ({describe_pipeline(plan)}): {os.path.basename(input_path)}",
+                                          worker, owner=self)
+        self.job.succeeded.connect(self.on_pipeline_finished)
+        self.job.failed.connect(self.on_pipeline_error)
+        self.job.cancelled.connect(lambda: self.set_controls_enabled(True))
+        if self.job.state == QUEUED:
+            # 前面还有其他任务在运行，先显示排队状态
+            self.run_btn.setText("排队中...")
+            self.job.started.connect(lambda: self.run_btn.setText("正在处理..."))
+
+    def set_controls_enabled(self, enabled):
+        for w in [self.input_path_edit, self.input_folder_btn, self.input_file_btn, self.compress_group,
+                  self.split_group, self.output_path_edit, self.output_browse_btn, self.auto_output_check, self.run_btn]:
+            w.setEnabled(enabled)
+        self.merge_group.setEnabled(False)
+        if enabled: self.update_stages()
+        self.run_btn.setText("开始处理" if enabled else "正在处理...")
+
+    def on_pipeline_finished(self):
+        self.on_update_text("\nGUI: 任务已完成。\n")
+        self.set_controls_enabled(True)
+        QMessageBox.information(self, "完成", "流水线处理已完成！")
+
+    def on_pipeline_error(self, error_message):
+        self.on_update_text("\nGUI: 任务发生错误。\n")
+        self.set_controls_enabled(True)
+        QMessageBox.critical(self, "错误", error_message)
@@ -1,87 +1,19 @@
 # 文件: modules/pdf_splitter.py
 
 import os
-import sys
-import fitz  # PyMuPDF
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel,
-    QFileDialog, QTextEdit, QMessageBox, QFrame, QCheckBox
+    QFileDialog, QTextEdit, QMessageBox, QFrame, QCheckBox, QComboBox, QSpinBox,
+    QDoubleSpinBox
 )
-from PyQt5.QtCore import QThread
+from PyQt5.QtCore import QTimer
 
-from utils import Worker
-
-# ==============================================================================
-# ==                       后端核心逻辑 (适配GUI版)                           ==
-# ==============================================================================
-
-def split_pdf_task(input_path, page_range_str, output_path=None):
-    """
-    根据指定的物理页码范围拆分一个PDF文件 (GUI适配版)。
-    """
-    if not os.path.isfile(input_path):
-        print(f"错误: 输入文件不存在 -> '{input_path}'")
-        return
-
-    try:
-        input_doc = fitz.open(input_path)
-    except Exception as e:
-        print(f"错误: 无法打开或解析PDF文件 '{input_path}'. 文件可能已损坏或受密码保护。\n详细信息: {e}")
-        return
-
-    total_pages = len(input_doc)
-    print(f"源文件 '{os.path.basename(input_path)}' 共 {total_pages} 页 (物理页数)。")
-
-    try:
-        if not page_range_str.strip():
-            raise ValueError("页码范围不能为空。")
-        
-        if '-' in page_range_str:
-            start_str, end_str = page_range_str.split('-', 1)
-            start = int(start_str) if start_str else 1
-            end = int(end_str) if end_str else total_pages
-        else:
-            start = int(page_range_str)
-            end = start
-
-        if start > end:
-            print(f"错误: 起始页码 ({start}) 不能大于结束页码 ({end})。")
-            input_doc.close()
-            return
-
-        if start < 1 or end > total_pages:
-            print(f"错误: 页码范围 '{page_range_str}' 无效。有效的物理页码范围是 1 到 {total_pages}。")
-            input_doc.close()
-            return
-            
-    except ValueError:
-        print(f"错误: 无效的页码格式 '{page_range_str}'。请使用 '5-10', '7', '12-' 或 '-5' 这样的格式。")
-        input_doc.close()
-        return
-
-    from_page, to_page = start - 1, end - 1
-    print(f"\n准备提取物理页码从 {start} 到 {end} 的页面...")
-    output_doc = fitz.open()
-    output_doc.insert_pdf(input_doc, from_page=from_page, to_page=to_page)
-
-    if not output_path:
-        base_name = os.path.splitext(os.path.basename(input_path))[0]
-        output_dir = os.path.dirname(os.path.abspath(input_path))
-        output_filename = f"{base_name}_pages_{start}-{end}.pdf"
-        output_path = os.path.join(output_dir, output_filename)
-    elif not output_path.lower().endswith('.pdf'):
-        output_path += '.pdf'
-
-    try:
-        output_doc.save(output_path, garbage=4, deflate=True, clean=True)
-        print("\n[成功] PDF拆分完成！")
-        print(f"已提取 {len(output_doc)} 个页面。")
-        print(f"新文件已保存至: {os.path.abspath(output_path)}")
-    except Exception as e:
-        print(f"\n[错误] 保存文件时出错: {e}")
-    finally:
-        input_doc.close()
-        output_doc.close()
+from utils import Worker, LogConsole, ProgressPanel
+from job_queue import get_job_queue, QUEUED
+from core.doc_cache import get_document_cache
+from core.page_ranges import parse_page_spec, group_pages
+from core.pdf_splitter import split_pdf_by_mode, SPLIT_MODES, plan_chunks_by_count, plan_chunks_by_bookmarks
+from modules.thumbnail_panel import ThumbnailPanel
 
 # ==============================================================================
 # ==                      PDF拆分功能的UI面板 (QWidget)                       ==
@@ -90,26 +22,33 @@ class PdfSplitterWidget(QWidget):
     def __init__(self):
         super().__init__()
         class SplitterWorker(Worker):
-            def __init__(self, **kwargs): super().__init__(task_function=split_pdf_task, **kwargs)
+            def __init__(self, **kwargs): super().__init__(task_function=split_pdf_by_mode, **kwargs)
         self.worker_class = SplitterWorker
         self.initUI()
         self.toggle_output_mode(self.auto_output_check.isChecked())
 
     def on_update_text(self, text):
-        self.log_console.moveCursor(self.log_console.textCursor().End)
-        self.log_console.insertPlainText(text)
+        self.log_console.append_text(text)
 
     def initUI(self):
         # --- UI控件 ---
         self.input_path_edit = QLineEdit()
         self.input_browse_btn = QPushButton('选择文件...')
-        self.page_range_edit = QLineEdit(); self.page_range_edit.setPlaceholderText("例如: 5-10, 7, 12-")
+        self.mode_combo = QComboBox()
+        for mode, label in SPLIT_MODES.items(): self.mode_combo.addItem(label, mode)
+        self.page_range_edit = QLineEdit(); self.page_range_edit.setPlaceholderText("例如: 5-10 或 1-3,5,8-12;20-")
+        self.pages_per_file_spin = QSpinBox(); self.pages_per_file_spin.setRange(1, 100000); self.pages_per_file_spin.setValue(10); self.pages_per_file_spin.setSuffix(" 页/文件")
+        self.max_size_spin = QDoubleSpinBox(); self.max_size_spin.setRange(0.1, 10000); self.max_size_spin.setValue(10); self.max_size_spin.setSuffix(" MB")
+        self.bookmark_hint_label = QLabel('每个一级书签输出为一个文件')
         self.output_path_edit = QLineEdit()
         self.output_browse_btn = QPushButton('另存为...')
         self.auto_output_check = QCheckBox('自动命名并保存在源文件目录')
         self.auto_output_check.setChecked(True)
         self.split_btn = QPushButton('开始拆分'); self.split_btn.setObjectName("MergeButton")
-        self.log_console = QTextEdit(); self.log_console.setReadOnly(True)
+        self.log_console = LogConsole()
+        self.progress_panel = ProgressPanel()
+        self.preview_panel = ThumbnailPanel()
+        self.preview_timer = QTimer(self); self.preview_timer.setSingleShot(True)
         self.info_panel = QTextEdit(); self.info_panel.setReadOnly(True)
         self.info_panel.setHtml("""
             <h2 style='color: #409EFF;'>功能说明</h2>
@@ -120,12 +59,23 @@ class PdfSplitterWidget(QWidget):
                 <li><b><code>7</code></b> : 只提取第 7 页。</li>
                 <li><b><code>12-</code></b> : 从第 12 页提取到文件末尾。</li>
                 <li><b><code>-5</code></b> : 从第 1 页提取到第 5 页。</li>
+                <li><b><code>1-3,5,8-12</code></b> : 用逗号连接多个范围，合并输出为一个文件。</li>
+                <li><b><code>1-3;5-10;20-</code></b> : 用分号分隔，一次生成多个文件（源文件只读取一次）。</li>
+            </ul>
+            <h3 style='color: #E6A23C;'>其他拆分模式:</h3>
+            <ul>
+                <li><b>每N页一个文件:</b> 按固定页数切分，最后一个文件可能不足N页。</li>
+                <li><b>按一级书签:</b> 每个一级书签对应一个文件，第一个书签之前的页面单独输出。</li>
+                <li><b>按文件大小上限:</b> 预先估算每页所占字节数，使每个文件尽量不超过上限（如 10 MB 的上传限制）。</li>
             </ul>
             <h3 style='color: #E6A23C;'>输出模式:</h3>
             <ul>
                 <li><b>自动命名(默认):</b> 在源文件同目录下，生成如“原文件名_pages_5-10.pdf”的文件。</li>
-                <li><b>手动指定:</b> 取消勾选后，可自定义输出文件的位置和名称。</li>
+                <li><b>手动指定:</b> 取消勾选后，可自定义输出文件的位置和名称；生成多个文件时，以该名称为前缀自动追加“_pages_范围”。</li>
             </ul>
+            <h3 style='color: #E6A23C;'>页面预览:</h3>
+            <p>选择文件后在“页面预览”中显示各页缩略图。按页码范围、每N页或书签拆分时，同一个输出文件的页面用同一种底色标出，
+            不会被输出的页面显示为灰色，开始拆分前即可确认范围是否正确。</p>
         """)
         
         # --- 布局 ---
@@ -135,7 +85,9 @@ class PdfSplitterWidget(QWidget):
         input_group = QHBoxLayout()
         input_group.addWidget(QLabel('输入PDF:')); input_group.addWidget(self.input_path_edit); input_group.addWidget(self.input_browse_btn)
         range_group = QHBoxLayout()
-        range_group.addWidget(QLabel('页面范围:')); range_group.addWidget(self.page_range_edit)
+        range_group.addWidget(QLabel('拆分方式:')); range_group.addWidget(self.mode_combo)
+        for w in [self.page_range_edit, self.pages_per_file_spin, self.max_size_spin, self.bookmark_hint_label]:
+            range_group.addWidget(w, 1)
         output_group = QHBoxLayout()
         output_group.addWidget(QLabel('输出文件:')); output_group.addWidget(self.output_path_edit); output_group.addWidget(self.output_browse_btn)
         left_layout.addLayout(input_group); left_layout.addLayout(range_group); left_layout.addLayout(output_group)
@@ -144,6 +96,8 @@ class PdfSplitterWidget(QWidget):
         top_layout.addLayout(left_layout)
         top_layout.addWidget(self.split_btn)
         main_layout.addLayout(top_layout)
+        main_layout.addWidget(self.progress_panel)
+        main_layout.addWidget(self.preview_panel, 3)
         
         separator = QFrame(); separator.setFrameShape(QFrame.HLine); separator.setFrameShadow(QFrame.Sunken)
         main_layout.addWidget(separator)
@@ -154,13 +108,57 @@ class PdfSplitterWidget(QWidget):
         info_area_widget = QWidget(); info_layout = QVBoxLayout(info_area_widget); info_layout.setContentsMargins(0,0,0,0)
         info_layout.addWidget(QLabel('使用说明:')); info_layout.addWidget(self.info_panel)
         bottom_layout.addWidget(log_area_widget, 3); bottom_layout.addWidget(info_area_widget, 2)
-        main_layout.addLayout(bottom_layout)
+        main_layout.addLayout(bottom_layout, 2)
 
         # --- 连接信号 ---
         self.input_browse_btn.clicked.connect(self.select_input_file)
         self.output_browse_btn.clicked.connect(self.select_output_file)
         self.auto_output_check.toggled.connect(self.toggle_output_mode)
+        self.mode_combo.currentIndexChanged.connect(self.toggle_split_mode)
         self.split_btn.clicked.connect(self.start_split_process)
+        # 输入路径变化后稍等再加载预览 (手动输入路径时不必每敲一个字都打开文件)
+        self.input_path_edit.textChanged.connect(lambda _: self.preview_timer.start(300))
+        self.preview_timer.timeout.connect(self.load_preview)
+        self.page_range_edit.textChanged.connect(self.update_preview_groups)
+        self.pages_per_file_spin.valueChanged.connect(self.update_preview_groups)
+        self.toggle_split_mode()
+
+    def toggle_split_mode(self):
+        mode = self.mode_combo.currentData()
+        self.page_range_edit.setVisible(mode == "range")
+        self.pages_per_file_spin.setVisible(mode == "count")
+        self.max_size_spin.setVisible(mode == "size")
+        self.bookmark_hint_label.setVisible(mode == "bookmark")
+        self.update_preview_groups()
+
+    def load_preview(self):
+        path = self.input_path_edit.text().strip()
+        if os.path.isfile(path) and path.lower().endswith('.pdf'):
+            self.preview_panel.set_document(path)
+        else:
+            self.preview_panel.clear()
+        self.update_preview_groups()
+
+    def update_preview_groups(self):
+        """在预览中标出按当前设置拆分后每个输出文件包含的页面 (按文件大小拆分需要估算，不标出)"""
+        total = len(self.preview_panel.items)
+        if not total:
+            return
+        mode = self.mode_combo.currentData()
+        try:
+            if mode == "range":
+                groups = [group_pages(g) for g in parse_page_spec(self.page_range_edit.text(), total)]
+            elif mode == "count":
+                groups = [list(range(start - 1, end))
+                          for start, end in plan_chunks_by_count(total, self.pages_per_file_spin.value())]
+            elif mode == "bookmark":
+                with get_document_cache().open(self.preview_panel.items[0][0]) as doc:
+                    groups = [list(range(start - 1, end)) for start, end in plan_chunks_by_bookmarks(doc)]
+            else:
+                groups = None
+        except (ValueError, OSError):
+            groups = None
+        self.preview_panel.set_groups(groups)
 
     def toggle_output_mode(self, checked):
         self.output_path_edit.setReadOnly(checked)
@@ -178,11 +176,19 @@ class PdfSplitterWidget(QWidget):
 
     def start_split_process(self):
         input_path = self.input_path_edit.text().strip()
-        page_range = self.page_range_edit.text().strip()
+        mode = self.mode_combo.currentData()
         if not input_path or not os.path.isfile(input_path):
             QMessageBox.warning(self, "路径错误", "输入文件不存在！"); return
-        if not page_range:
-            QMessageBox.warning(self, "输入错误", "请输入页面范围！"); return
+        if mode == "range":
+            value = self.page_range_edit.text().strip()
+            if not value:
+                QMessageBox.warning(self, "输入错误", "请输入页面范围！"); return
+        elif mode == "count":
+            value = self.pages_per_file_spin.value()
+        elif mode == "size":
+            value = self.max_size_spin.value()
+        else:
+            value = None
         
         output_path = None
         if not self.auto_output_check.isChecked():
@@ -191,21 +197,23 @@ class PdfSplitterWidget(QWidget):
                 QMessageBox.warning(self, "路径错误", "请指定输出文件路径！"); return
 
         self.log_console.clear()
+
+        self.progress_panel.reset()
         self.set_controls_enabled(False)
-        self.thread = QThread()
-        self.worker = self.worker_class(input_path=input_path, page_range_str=page_range, output_path=output_path)
-        self.worker.moveToThread(self.thread)
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-        self.worker.error.connect(self.on_split_error)
-        self.thread.finished.connect(self.on_split_finished)
-        self.thread.start()
+        worker = self.worker_class(input_path=input_path, mode=mode, value=value, output_path=output_path)
+        worker.progress.connect(self.progress_panel.handle_event)
+        self.job = get_job_queue().submit(f"PDF 拆分: {os.path.basename(input_path)}", worker, owner=self)
+        self.job.succeeded.connect(self.on_split_finished)
+        self.job.failed.connect(self.on_split_error)
+        self.job.cancelled.connect(lambda: self.set_controls_enabled(True))
+        if self.job.state == QUEUED:
+            # 前面还有其他任务在运行，先显示排队状态
+            self.split_btn.setText("排队中...")
+            self.job.started.connect(lambda: self.split_btn.setText("正在拆分..."))
 
     def set_controls_enabled(self, enabled):
-        for w in [self.input_path_edit, self.input_browse_btn, self.page_range_edit,
-                  self.output_path_edit, self.output_browse_btn, self.auto_output_check,
+        for w in [self.input_path_edit, self.input_browse_btn, self.mode_combo, self.page_range_edit,
+                  self.pages_per_file_spin, self.max_size_spin, self.output_path_edit, self.output_browse_btn, self.auto_output_check,
                   self.split_btn]:
             w.setEnabled(enabled)
         # 确保手动输出模式的控件状态正确
@@ -213,11 +221,11 @@ class PdfSplitterWidget(QWidget):
         self.split_btn.setText("开始拆分" if enabled else "正在拆分...")
 
     def on_split_finished(self):
-        print("\nGUI: 任务已完成。")
+        self.on_update_text("\nGUI: 任务已完成。\n")
         self.set_controls_enabled(True)
         QMessageBox.information(self, "完成", "PDF文件拆分已成功完成！")
 
     def on_split_error(self, error_message):
-        print(f"\nGUI: 任务发生错误。")
+        self.on_update_text("\nGUI: 任务发生错误。\n")
         self.set_controls_enabled(True)
         QMessageBox.critical(self, "错误", error_message)
\ No newline at end of file
@@ -0,0 +1,178 @@
+# 文件: modules/pdf_to_image.py
+
+import os
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel,
+    QFileDialog, QTextEdit, QMessageBox, QFrame, QSpinBox, QComboBox, QCheckBox,
+    QGridLayout
+)
+
+from utils import Worker, LogConsole, ProgressPanel
+from job_queue import get_job_queue, QUEUED
+from core.pdf_to_image import export_pdf_images, DEFAULT_WORKERS
+
+# ==============================================================================
+# ==                     PDF转图片功能的UI面板 (QWidget)                      ==
+# ==============================================================================
+class PdfToImageWidget(QWidget):
+    def __init__(self):
+        super().__init__()
+        class ExportWorker(Worker):
+            def __init__(self, **kwargs): super().__init__(task_function=export_pdf_images, **kwargs)
+        self.worker_class = ExportWorker
+        self.initUI()
+        self.toggle_output_mode(self.auto_output_check.isChecked())
+
+    def on_update_text(self, text):
+        self.log_console.append_text(text)
+
+    def initUI(self):
+        # --- UI控件 ---
+        self.input_path_edit = QLineEdit()
+        self.input_browse_btn = QPushButton('选择文件...')
+        self.output_path_edit = QLineEdit()
+        self.output_browse_btn = QPushButton('选择输出文件夹...')
+        self.auto_output_check = QCheckBox('在源文件旁创建“原文件名_图片”文件夹')
+        self.auto_output_check.setChecked(True)
+        self.page_range_edit = QLineEdit(); self.page_range_edit.setPlaceholderText("留空表示全部页面，例如: 1-3,5,8-")
+        self.format_combo = QComboBox(); self.format_combo.addItems(['PNG', 'JPEG', 'WebP'])
+        self.dpi_spin = QSpinBox(); self.dpi_spin.setRange(36, 600); self.dpi_spin.setValue(150)
+        self.quality_spin = QSpinBox(); self.quality_spin.setRange(10, 100); self.quality_spin.setValue(85)
+        self.workers_spin = QSpinBox(); self.workers_spin.setRange(1, max(1, os.cpu_count() or 1)); self.workers_spin.setValue(DEFAULT_WORKERS)
+        self.grayscale_check = QCheckBox('输出灰度图')
+        self.export_btn = QPushButton('开始导出'); self.export_btn.setObjectName("MergeButton")
+        self.log_console = LogConsole()
+        self.progress_panel = ProgressPanel()
+        self.info_panel = QTextEdit(); self.info_panel.setReadOnly(True)
+        self.info_panel.setHtml("""
+            <h2 style='color: #409EFF;'>功能说明</h2>
+            <p>本功能将PDF的每一页渲染为一张图片，支持 <b>PNG</b>、<b>JPEG</b> 和 <b>WebP</b> 格式。</p>
+            <h3 style='color: #E6A23C;'>设置说明：</h3>
+            <ul>
+                <li><b>页面范围：</b>与“PDF 拆分”的写法相同，如 <code>1-3,5,8-</code>；留空导出全部页面。</li>
+                <li><b>DPI：</b>150 适合屏幕阅读，300 适合打印。DPI 越高，图片越大、速度越慢。</li>
+                <li><b>质量：</b>仅对 JPEG / WebP 生效；PNG 为无损格式。</li>
+                <li><b>并行进程数：</b>多个进程同时渲染不同页面，大文档可显著提速。</li>
+            </ul>
+            <h3 style='color: #E6A23C;'>注意事项：</h3>
+            <ul>
+                <li>图片命名为“原文件名_page_0001.png”，按文件名排序即为页面顺序。</li>
+                <li>渲染结果边生成边写盘，即使上千页的文档也不会占用大量内存。</li>
+            </ul>
+        """)
+
+        # --- 布局 ---
+        main_layout = QVBoxLayout(self)
+        io_layout = QGridLayout()
+        io_layout.addWidget(QLabel('输入PDF:'), 0, 0); io_layout.addWidget(self.input_path_edit, 0, 1, 1, 3)
+        io_layout.addWidget(self.input_browse_btn, 0, 4)
+        io_layout.addWidget(QLabel('输出到:'), 1, 0); io_layout.addWidget(self.output_path_edit, 1, 1, 1, 3)
+        io_layout.addWidget(self.output_browse_btn, 1, 4)
+        io_layout.addWidget(self.auto_output_check, 2, 1, 1, 3)
+        main_layout.addLayout(io_layout)
+
+        settings_layout = QGridLayout()
+        settings_layout.addWidget(QLabel('页面范围:'), 0, 0); settings_layout.addWidget(self.page_range_edit, 0, 1, 1, 3)
+        settings_layout.addWidget(QLabel('图片格式:'), 1, 0); settings_layout.addWidget(self.format_combo, 1, 1)
+        settings_layout.addWidget(QLabel('DPI:'), 1, 2); settings_layout.addWidget(self.dpi_spin, 1, 3)
+        settings_layout.addWidget(QLabel('图片质量:'), 2, 0); settings_layout.addWidget(self.quality_spin, 2, 1)
+        settings_layout.addWidget(QLabel('并行进程数:'), 2, 2); settings_layout.addWidget(self.workers_spin, 2, 3)
+        main_layout.addLayout(settings_layout)
+        main_layout.addWidget(self.grayscale_check)
+        main_layout.addWidget(self.export_btn)
+        main_layout.addWidget(self.progress_panel)
+
+        separator = QFrame(); separator.setFrameShape(QFrame.HLine); separator.setFrameShadow(QFrame.Sunken); separator.setStyleSheet("background-color: #4C566A;")
+        main_layout.addWidget(separator)
+
+        bottom_layout = QHBoxLayout()
+        log_area_widget = QWidget(); log_layout = QVBoxLayout(log_area_widget); log_layout.setContentsMargins(0,0,0,0)
+        log_layout.addWidget(QLabel('日志输出:')); log_layout.addWidget(self.log_console)
+        info_area_widget = QWidget(); info_layout = QVBoxLayout(info_area_widget); info_layout.setContentsMargins(0,0,0,0)
+        info_layout.addWidget(QLabel('使用说明:')); info_layout.addWidget(self.info_panel)
+        bottom_layout.addWidget(log_area_widget, 3); bottom_layout.addWidget(info_area_widget, 2)
+        main_layout.addLayout(bottom_layout)
+
+        # --- 连接信号 ---
+        self.input_browse_btn.clicked.connect(self.select_input_file)
+        self.output_browse_btn.clicked.connect(self.select_output_folder)
+        self.auto_output_check.toggled.connect(self.toggle_output_mode)
+        self.format_combo.currentTextChanged.connect(lambda text: self.quality_spin.setEnabled(text != 'PNG'))
+        self.quality_spin.setEnabled(False)
+        self.export_btn.clicked.connect(self.start_export_process)
+
+    def toggle_output_mode(self, checked):
+        self.output_path_edit.setReadOnly(checked)
+        self.output_browse_btn.setEnabled(not checked)
+        if checked: self.update_auto_output_path()
+        else: self.output_path_edit.clear()
+
+    def update_auto_output_path(self):
+        input_path = self.input_path_edit.text().strip()
+        if input_path:
+            base_name = os.path.splitext(os.path.basename(input_path))[0]
+            self.output_path_edit.setText(os.path.join(os.path.dirname(input_path), f"{base_name}_图片"))
+        else:
+            self.output_path_edit.clear()
+
+    def select_input_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择PDF文件", "", "PDF Files (*.pdf)")
+        if path:
+            self.input_path_edit.setText(path)
+            if self.auto_output_check.isChecked(): self.update_auto_output_path()
+
+    def select_output_folder(self):
+        path = QFileDialog.getExistingDirectory(self, "选择输出文件夹")
+        if path: self.output_path_edit.setText(path)
+
+    def start_export_process(self):
+        input_path = self.input_path_edit.text().strip()
+        output_dir = self.output_path_edit.text().strip()
+        if not input_path or not os.path.isfile(input_path):
+            QMessageBox.warning(self, "路径错误", "输入文件不存在！"); return
+        if not output_dir:
+            QMessageBox.warning(self, "路径错误", "请选择输出文件夹！"); return
+
+        self.log_console.clear()
+
+        self.progress_panel.reset()
+        self.set_controls_enabled(False)
+        worker = self.worker_class(
+            input_path=input_path, output_dir=output_dir,
+            fmt=self.format_combo.currentText().lower(),
+            dpi=self.dpi_spin.value(),
+            page_range_str=self.page_range_edit.text().strip(),
+            quality=self.quality_spin.value(),
+            to_grayscale=self.grayscale_check.isChecked(),
+            workers=self.workers_spin.value()
+        )
+        worker.progress.connect(self.progress_panel.handle_event)
+        self.job = get_job_queue().submit(f"PDF 转图片: {os.path.basename(input_path)}", worker, owner=self)
+        self.job.succeeded.connect(self.on_export_finished)
+        self.job.failed.connect(self.on_export_error)
+        self.job.cancelled.connect(lambda: self.set_controls_enabled(True))
+        if self.job.state == QUEUED:
+            # 前面还有其他任务在运行，先显示排队状态
+            self.export_btn.setText("排队中...")
+            self.job.started.connect(lambda: self.export_btn.setText("正在导出..."))
+
+    def set_controls_enabled(self, enabled):
+        for w in [self.input_path_edit, self.input_browse_btn, self.output_path_edit,
+                  self.output_browse_btn, self.auto_output_check, self.page_range_edit,
+                  self.format_combo, self.dpi_spin, self.quality_spin, self.workers_spin,
+                  self.grayscale_check, self.export_btn]:
+            w.setEnabled(enabled)
+        if enabled:
+            self.toggle_output_mode(self.auto_output_check.isChecked())
+            self.quality_spin.setEnabled(self.format_combo.currentText() != 'PNG')
+        self.export_btn.setText("开始导出" if enabled else "正在导出...")
+
+    def on_export_finished(self):
+        self.on_update_text("\nGUI: 任务已完成。\n")
+        self.set_controls_enabled(True)
+        QMessageBox.information(self, "完成", "PDF 转图片已成功完成！")
+
+    def on_export_error(self, error_message):
+        self.on_update_text("\nGUI: 任务发生错误。\n")
+        self.set_controls_enabled(True)
+        QMessageBox.critical(self, "错误", error_message)
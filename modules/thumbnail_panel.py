@@ -0,0 +1,269 @@
+# 文件: modules/thumbnail_panel.py
+
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, QListWidgetItem, QListView
+from PyQt5.QtCore import Qt, QSize, QTimer, pyqtSignal
+from PyQt5.QtGui import QPixmap, QIcon, QColor, QBrush
+
+from core.thumbnail_cache import get_thumbnail_cache, render_thumbnails, DEFAULT_THUMB_SIZE
+
+# 渲染缩略图的进程数 / 每批页数 / 同时在途的批次数
+THUMB_WORKERS = 2
+PAGES_PER_BATCH = 8
+MAX_INFLIGHT_BATCHES = THUMB_WORKERS * 2
+# 最多同时持有的缩略图 (离可见区域最远的先换回占位图)，1000 页的文档也不会占用太多内存
+MAX_LOADED_ICONS = 400
+# 滚动停下多少毫秒后再计算可见区域并请求缩略图
+VISIBLE_UPDATE_MS = 60
+# 分组 (拆分后的输出文件) 交替使用的底色
+GROUP_COLORS = [QColor("#E1F3D8"), QColor("#D9ECFF")]
+
+_pool = None
+
+def _get_pool():
+    """所有缩略图面板共用的进程池 (首次使用时启动)"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=THUMB_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def _reset_pool():
+    # 损坏的文件让子进程崩溃后进程池不可再用，换一个新的
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+# ==============================================================================
+# ==                      页面缩略图预览面板 (QWidget)                        ==
+# ==============================================================================
+
+class ThumbnailPanel(QWidget):
+    """
+    缩略图网格: 只为可见区域 (及下一屏) 的页面请求缩略图，在后台进程池中渲染，
+    渲染好一批显示一批；结果保存在磁盘缓存中，再次打开同一文件时直接读取。
+    """
+    batchReady = pyqtSignal(int, object, object)  # 代号, [(行号, 页码)], render_thumbnails 的结果或 None
+
+    def __init__(self, thumb_size=DEFAULT_THUMB_SIZE, parent=None):
+        super().__init__(parent)
+        self.thumb_size = thumb_size
+        self.cache = get_thumbnail_cache()
+        self.items = []          # [(文件路径, 页码), ...]，与列表行一一对应
+        self.generation = 0      # 每次更换内容时递增，丢弃旧内容的渲染结果
+        self._loaded = OrderedDict()
+        self._requested = set()
+        self._wanted = []
+        self._inflight = 0
+        self.initUI()
+
+    def initUI(self):
+        self.title_label = QLabel('页面预览:')
+        self.status_label = QLabel()
+        self.list = QListWidget()
+        self.list.setObjectName("ThumbnailList")
+        self.list.setViewMode(QListView.IconMode)
+        self.list.setIconSize(QSize(self.thumb_size, self.thumb_size))
+        self.list.setGridSize(QSize(self.thumb_size + 24, self.thumb_size + 44))
+        self.list.setUniformItemSizes(True)
+        self.list.setMovement(QListView.Static)
+        self.list.setResizeMode(QListView.Adjust)
+        self.list.setLayoutMode(QListView.Batched)
+        self.list.setSelectionMode(QListWidget.NoSelection)
+        self.list.setWordWrap(True)
+        self.list.setMinimumHeight(self.thumb_size + 60)
+        placeholder = QPixmap(self.thumb_size * 3 // 4, self.thumb_size)
+        placeholder.fill(QColor("#EBEEF5"))
+        self.placeholder_icon = QIcon(placeholder)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        header = QHBoxLayout()
+        header.addWidget(self.title_label); header.addStretch(); header.addWidget(self.status_label)
+        layout.addLayout(header)
+        layout.addWidget(self.list)
+
+        self.visible_timer = QTimer(self)
+        self.visible_timer.setSingleShot(True)
+        self.visible_timer.timeout.connect(self.update_visible)
+        self.list.verticalScrollBar().valueChanged.connect(lambda _: self.visible_timer.start(VISIBLE_UPDATE_MS))
+        self.batchReady.connect(self.on_batch_ready)
+
+    # --- 设置内容 ---
+    def set_document(self, path):
+        """预览一个PDF的所有页面"""
+        from core.doc_cache import get_document_cache
+        try:
+            total = get_document_cache().page_count(path)
+        except Exception as e:
+            self.clear(f"无法打开: {e}")
+            return
+        self.set_items([(path, i, f"第 {i + 1} 页") for i in range(total)])
+
+    def set_files(self, paths, base_dir=None):
+        """预览多个文件 (各自的第一页)，标签为相对路径"""
+        self.set_items([(p, 0, os.path.relpath(p, base_dir) if base_dir else os.path.basename(p)) for p in paths])
+
+    def set_items(self, items):
+        self.generation += 1
+        self.items = [(path, page) for path, page, _ in items]
+        self._loaded.clear()
+        self._requested.clear()
+        self._wanted = []
+        self.list.clear()
+        for _, _, label in items:
+            item = QListWidgetItem(self.placeholder_icon, label)
+            item.setTextAlignment(Qt.AlignHCenter | Qt.AlignTop)
+            self.list.addItem(item)
+        self.list.scrollToTop()
+        self.update_status()
+        self.visible_timer.start(VISIBLE_UPDATE_MS)
+
+    def clear(self, message=""):
+        self.set_items([])
+        self.status_label.setText(message)
+
+    def set_groups(self, groups):
+        """
+        按输出文件给页面着色: groups 为 [[页码, ...], ...] (0起)，None 表示不分组。
+        不属于任何分组的页面显示为灰色 (不会被输出)。
+        """
+        group_of = {}
+        for index, pages in enumerate(groups or []):
+            for page in pages:
+                group_of.setdefault(page, index)
+        for row, (_, page) in enumerate(self.items):
+            item = self.list.item(row)
+            if groups is None:
+                item.setBackground(QBrush()); item.setForeground(QBrush()); item.setToolTip("")
+            elif page in group_of:
+                item.setBackground(GROUP_COLORS[group_of[page] % len(GROUP_COLORS)])
+                item.setForeground(QBrush())
+                item.setToolTip(f"输出到第 {group_of[page] + 1} 个文件")
+            else:
+                item.setBackground(QBrush())
+                item.setForeground(QColor("#C0C4CC"))
+                item.setToolTip("不在所选范围内")
+
+    # --- 按可见区域加载 ---
+    def visible_rows(self):
+        """当前可见的行号，以及随后一屏 (预取)"""
+        if not self.items:
+            return []
+        viewport = self.list.viewport().rect()
+        # 网格按行排列，各项的位置单调递增: 二分查找第一个底边进入可见区域的项
+        # (indexAt 落在项之间的空隙时会返回无效位置)
+        lo, hi = 0, len(self.items)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.list.visualItemRect(self.list.item(mid)).bottom() < viewport.top():
+                lo = mid + 1
+            else:
+                hi = mid
+        rows, row = [], lo
+        while row < len(self.items) and self.list.visualItemRect(self.list.item(row)).top() <= viewport.bottom():
+            rows.append(row)
+            row += 1
+        prefetch = list(range(row, min(len(self.items), row + max(len(rows), 1))))
+        return rows + prefetch
+
+    def update_visible(self):
+        rows = self.visible_rows()
+        # 只保留最新的可见区域: 滚走的页面不再等待渲染
+        self._wanted = [r for r in rows if r not in self._loaded and r not in self._requested]
+        self._visible_center = rows[len(rows) // 2] if rows else 0
+        self.pump()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.visible_timer.start(VISIBLE_UPDATE_MS)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.visible_timer.start(VISIBLE_UPDATE_MS)
+
+    def pump(self):
+        while self._wanted and self._inflight < MAX_INFLIGHT_BATCHES:
+            # 同一文件中相邻的页面组成一批，子进程只打开一次文档
+            path = self.items[self._wanted[0]][0]
+            batch = []
+            while self._wanted and len(batch) < PAGES_PER_BATCH and self.items[self._wanted[0]][0] == path:
+                batch.append(self._wanted.pop(0))
+            self._submit(path, batch)
+
+    def _submit(self, path, rows):
+        pages = [(row, self.items[row][1]) for row in rows]
+        self._requested.update(rows)
+        self._inflight += 1
+        generation = self.generation
+        try:
+            future = _get_pool().submit(render_thumbnails, path, [p for _, p in pages],
+                                        self.thumb_size, self.cache.cache_dir)
+        except (BrokenProcessPool, RuntimeError):
+            _reset_pool()
+            future = _get_pool().submit(render_thumbnails, path, [p for _, p in pages],
+                                        self.thumb_size, self.cache.cache_dir)
+
+        def done(f):
+            # 在进程池的管理线程中调用，通过信号转到主线程处理
+            try:
+                result = f.result()
+            except BrokenProcessPool:
+                _reset_pool()
+                result = None
+            except Exception:
+                result = None
+            self.batchReady.emit(generation, pages, result)
+        future.add_done_callback(done)
+
+    def on_batch_ready(self, generation, pages, result):
+        self._inflight -= 1
+        if generation != self.generation:
+            self.pump()
+            return
+        digest, results = result if result else (None, [])
+        row_of = {page: row for row, page in pages}
+        for page, data, hit in results:
+            row = row_of[page]
+            self._requested.discard(row)
+            if data is None:
+                continue
+            if hit:
+                self.cache.touch(digest, page, self.thumb_size)
+            else:
+                self.cache.put(digest, page, self.thumb_size, data)
+            pixmap = QPixmap()
+            if pixmap.loadFromData(data, "PNG"):
+                self.list.item(row).setIcon(QIcon(pixmap))
+                self._loaded[row] = True
+        for row, _ in pages:
+            # 渲染失败的页面保留占位图，不再重复请求
+            if row in self._requested:
+                self._requested.discard(row)
+                self._loaded[row] = False
+        self._trim_loaded()
+        self.update_status()
+        self.pump()
+
+    def _trim_loaded(self):
+        if len(self._loaded) <= MAX_LOADED_ICONS:
+            return
+        center = getattr(self, "_visible_center", 0)
+        for row in sorted(self._loaded, key=lambda r: abs(r - center), reverse=True)[:len(self._loaded) - MAX_LOADED_ICONS]:
+            del self._loaded[row]
+            self.list.item(row).setIcon(self.placeholder_icon)
+
+    def update_status(self):
+        if not self.items:
+            self.status_label.setText("")
+            return
+        pending = len(self._requested) + len(self._wanted)
+        text = f"共 {len(self.items)} 项" + (f"，正在生成 {pending} 张缩略图..." if pending else "")
+        self.status_label.setText(text)
+        self.status_label.setToolTip(self.cache.describe())
@@ -0,0 +1 @@
+# 文件: tests/__init__.py
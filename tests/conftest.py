@@ -0,0 +1,38 @@
+# 文件: tests/conftest.py
+
+# 在项目根目录运行: python -m pytest -q
+# 所有缓存、配置和元数据目录都重定向到临时目录，不会读写用户的 ~/.pdf_toolbox
+
+import os
+
+import fitz  # PyMuPDF
+import pytest
+
+from core.paths import APP_HOME_ENV
+
+
+@pytest.fixture(scope="session", autouse=True)
+def app_home(tmp_path_factory):
+    home = tmp_path_factory.mktemp("pdf_toolbox_home")
+    old = os.environ.get(APP_HOME_ENV)
+    os.environ[APP_HOME_ENV] = str(home)
+    yield home
+    if old is None:
+        os.environ.pop(APP_HOME_ENV, None)
+    else:
+        os.environ[APP_HOME_ENV] = old
+
+
+def make_pdf(path, pages):
+    """生成每页一行文字的简单 PDF，返回路径 (str)"""
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {i + 1}", fontsize=20)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def page_count(path):
+    with fitz.open(str(path)) as doc:
+        return len(doc)
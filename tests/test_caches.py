@@ -0,0 +1,93 @@
+# 文件: tests/test_caches.py
+
+import json
+import os
+
+import fitz  # PyMuPDF
+
+import core.patent_cache as patent_cache
+from core.doc_cache import DocumentCache
+from core.patent_cache import PatentPageCache, page_cache_key
+
+from tests.conftest import make_pdf
+
+
+def _keys(path):
+    with fitz.open(str(path)) as doc:
+        return [page_cache_key(doc, page, 100) for page in doc]
+
+
+def test_old_cache_version_is_discarded(tmp_path):
+    path = str(tmp_path / "patent_pages.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": patent_cache.CACHE_VERSION - 1, "entries": [["k", {"category": "说明书"}]]}, f)
+    cache = PatentPageCache(path)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_page_key_follows_content_and_version(tmp_path, monkeypatch):
+    a = _keys(make_pdf(tmp_path / "a.pdf", 2))
+    assert a == _keys(make_pdf(tmp_path / "same.pdf", 2))
+    assert a[0] != a[1]  # 两页文字不同
+
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "page 1 (改)", fontsize=20)
+    doc.save(str(tmp_path / "changed.pdf"))
+    doc.close()
+    assert _keys(tmp_path / "changed.pdf")[0] != a[0]
+
+    # 分类规则变化 (版本递增) 后，同一页面的键也随之变化
+    monkeypatch.setattr(patent_cache, "CACHE_VERSION", patent_cache.CACHE_VERSION + 1)
+    assert _keys(tmp_path / "a.pdf") != a
+
+
+def test_reload_picks_up_entries_saved_by_another_process(tmp_path):
+    path = str(tmp_path / "patent_pages.json")
+    reader, writer = PatentPageCache(path), PatentPageCache(path)
+    writer.put("k", {"category": "权利要求书", "claim_nums": [1, 2]})
+    writer.save()
+    assert reader.get("k") is None
+    reader.reload_if_changed()
+    assert reader.get("k") == {"category": "权利要求书", "claim_nums": [1, 2]}
+
+
+def test_lru_eviction(tmp_path):
+    cache = PatentPageCache(str(tmp_path / "patent_pages.json"), max_entries=2)
+    cache.put("a", {}); cache.put("b", {})
+    cache.get("a")
+    cache.put("c", {})
+    assert cache.get("b") is None
+    assert cache.get("a") == {} and cache.get("c") == {}
+
+
+def test_document_cache_sees_rewritten_file(tmp_path):
+    path = tmp_path / "doc.pdf"
+    make_pdf(path, 2)
+    cache = DocumentCache()
+    assert cache.page_count(str(path)) == 2
+    assert cache.page_count(str(path)) == 2
+    assert cache.hits == 1
+
+    make_pdf(tmp_path / "five.pdf", 5)
+    path.write_bytes((tmp_path / "five.pdf").read_bytes())
+    os.utime(path, ns=(10**18, 10**18))
+    assert cache.page_count(str(path)) == 5
+    with cache.open(str(path)) as doc:
+        assert len(doc) == 5
+
+
+def test_patent_analysis_reuses_cached_pages(tmp_path):
+    from benchmarks.corpus import make_patent_pdf
+    from core.patent_splitter import analyze_patent_pages
+
+    source = str(tmp_path / "patent.pdf")
+    make_patent_pdf(source, 4)
+    cache = PatentPageCache(str(tmp_path / "patent_pages.json"))
+    first = analyze_patent_pages(source, cache=cache)
+    assert cache.misses > 0 and cache.hits == 0
+
+    # 另一个进程重新读取磁盘缓存: 所有页面都命中，结果不变
+    reloaded = PatentPageCache(cache.cache_path)
+    assert analyze_patent_pages(source, cache=reloaded) == first
+    assert reloaded.misses == 0 and reloaded.hits == cache.misses
@@ -0,0 +1,108 @@
+# 文件: tests/test_catalog.py
+
+import os
+
+import pytest
+
+import core.catalog as catalog_module
+from core.catalog import Catalog
+
+from tests.conftest import make_pdf
+
+
+def _touch(path, seconds):
+    """把修改时间设为固定值，不依赖文件系统的时间精度"""
+    os.utime(path, ns=(seconds * 1_000_000_000, seconds * 1_000_000_000))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "docs"
+    sub = root / "sub"
+    sub.mkdir(parents=True)
+    make_pdf(root / "a.pdf", 2)
+    make_pdf(sub / "b.pdf", 3)
+    (root / "notes.txt").write_text("不是PDF")
+    _touch(sub, 1_000)
+    _touch(root, 1_000)
+    return root
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    cat = Catalog(str(tmp_path / "catalog.sqlite3"))
+    yield cat
+    cat.close()
+
+
+def test_first_refresh_inspects_every_file(tree, catalog):
+    stats = catalog.refresh(str(tree))
+    assert stats["dirs_listed"] == 2
+    assert stats["files_inspected"] == 2
+    assert [os.path.basename(e.path) for e in catalog.entries_under(str(tree))] == ["a.pdf", "b.pdf"]
+    assert catalog.lookup(str(tree / "sub" / "b.pdf"), verify=False).page_count == 3
+
+
+def test_unchanged_tree_is_not_listed_or_opened_again(tree, catalog):
+    catalog.refresh(str(tree))
+    stats = catalog.refresh(str(tree), verify_files=False)
+    assert stats["dirs_listed"] == 0
+    assert stats["dirs_reused"] == 2
+    assert stats["files_inspected"] == 0
+    assert stats["files_reused"] == 2
+
+
+def test_file_rewritten_in_place_is_inspected_again(tree, catalog, tmp_path):
+    catalog.refresh(str(tree))
+    target = tree / "a.pdf"
+    # 原地改写不会改变目录的修改时间，只有 verify_files=True 才能发现
+    make_pdf(tmp_path / "five.pdf", 5)
+    data = (tmp_path / "five.pdf").read_bytes()
+    with open(target, "wb") as f:
+        f.write(data)
+    _touch(target, 2_000)
+    _touch(tree, 1_000)
+    stats = catalog.refresh(str(tree), verify_files=True)
+    assert stats["dirs_listed"] == 0
+    assert stats["files_inspected"] == 1
+    assert catalog.lookup(str(target), verify=False).page_count == 5
+
+
+def test_added_and_deleted_files_are_picked_up(tree, catalog):
+    catalog.refresh(str(tree))
+    os.remove(tree / "a.pdf")
+    make_pdf(tree / "c.pdf", 1)
+    _touch(tree, 2_000)
+    stats = catalog.refresh(str(tree), verify_files=False)
+    assert stats["dirs_listed"] == 1
+    assert stats["files_inspected"] == 1
+    assert stats["removed"] == 1
+    assert sorted(os.path.basename(e.path) for e in catalog.entries_under(str(tree))) == ["b.pdf", "c.pdf"]
+
+
+def test_removed_subdirectory_is_forgotten(tree, catalog):
+    catalog.refresh(str(tree))
+    os.remove(tree / "sub" / "b.pdf")
+    os.rmdir(tree / "sub")
+    _touch(tree, 2_000)
+    stats = catalog.refresh(str(tree))
+    assert stats["removed"] == 1
+    assert [os.path.basename(e.path) for e in catalog.entries_under(str(tree))] == ["a.pdf"]
+
+
+def test_snapshot_never_opens_files(tree, catalog, monkeypatch):
+    catalog.refresh(str(tree))
+    make_pdf(tree / "new.pdf", 4)
+    _touch(tree, 2_000)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("snapshot 不应打开文件")
+
+    monkeypatch.setattr(catalog_module, "inspect_file", fail)
+    entries = {os.path.basename(e.path): e for e in catalog.snapshot(str(tree))}
+    assert sorted(entries) == ["a.pdf", "b.pdf", "new.pdf"]
+    assert entries["a.pdf"].page_count == 2
+    assert entries["new.pdf"].page_count is None
+    assert entries["new.pdf"].size == os.path.getsize(tree / "new.pdf")
+    # 快照不修改目录记录
+    assert [os.path.basename(e.path) for e in catalog.entries_under(str(tree))] == ["a.pdf", "b.pdf"]
@@ -0,0 +1,47 @@
+# 文件: tests/test_cli.py
+
+import os
+
+import cli
+
+from tests.conftest import make_pdf
+
+
+def test_split_exit_codes(tmp_path):
+    source = make_pdf(tmp_path / "doc.pdf", 12)
+    assert cli.main(["split", str(tmp_path / "missing.pdf"), "--every", "3"]) == 1
+    assert cli.main(["split", source, "--range", "1-30"]) == 1
+    assert cli.main(["split", source, "--every", "3"]) == 0
+    assert os.path.isfile(tmp_path / "doc_pages_10-12.pdf")
+
+
+def test_merge_and_compress_failures_exit_non_zero(tmp_path):
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    assert cli.main(["merge", str(empty)]) == 1
+    assert cli.main(["compress", str(tmp_path / "missing")]) == 1
+    assert cli.main(["to-images", str(tmp_path / "missing.pdf")]) == 1
+
+
+def test_compress_folder_output_is_outside_the_input(tmp_path):
+    folder = tmp_path / "scans"
+    (folder / "sub").mkdir(parents=True)
+    make_pdf(folder / "a.pdf", 1)
+    make_pdf(folder / "sub" / "b.pdf", 1)
+
+    assert cli.main(["compress", str(folder), "--force"]) == 0
+    output = tmp_path / "scans_压缩结果"
+    assert sorted(os.listdir(output)) == ["a.pdf", "sub"]
+    assert sorted(os.listdir(folder)) == ["a.pdf", "sub"]
+
+
+def test_compress_skips_output_folder_inside_the_input(tmp_path):
+    folder = tmp_path / "scans"
+    folder.mkdir()
+    make_pdf(folder / "a.pdf", 1)
+    output = folder / "out"
+
+    for _ in range(2):
+        assert cli.main(["compress", str(folder), "-o", str(output), "--force"]) == 0
+    # 第二次运行不会把上次的结果再压缩一遍 (否则会出现 out/out/a.pdf)
+    assert sorted(os.listdir(output)) == ["a.pdf"]
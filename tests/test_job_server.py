@@ -0,0 +1,82 @@
+# 文件: tests/test_job_server.py
+
+import time
+
+import pytest
+
+from core import job_server
+from core.job_server import JobServer, JobRequestError, FAILED, FINISHED, QUEUED, RUNNING
+from core.memory_budget import get_memory_budget
+
+from tests.conftest import make_pdf
+
+
+def _wait(job, seconds=60):
+    deadline = time.time() + seconds
+    while job.status in (QUEUED, RUNNING) and time.time() < deadline:
+        time.sleep(0.05)
+    return job.status
+
+
+@pytest.fixture
+def server(tmp_path):
+    srv = JobServer(str(tmp_path / "jobs"), workers=1)
+    yield srv
+    srv.stop()
+
+
+def test_submit_rejects_bad_requests(server, tmp_path):
+    with pytest.raises(JobRequestError):
+        server.submit("unknown", {})
+    with pytest.raises(JobRequestError):
+        server.submit("split", {"input": "relative.pdf"})
+    with pytest.raises(JobRequestError):
+        server.submit("split", {"input": str(tmp_path / "missing.pdf")})
+
+
+def test_builder_error_fails_job_and_releases_memory(server, tmp_path, monkeypatch):
+    source = make_pdf(tmp_path / "in.pdf", 2)
+    input_key, build = job_server.JOB_TYPES["split"]
+    calls = []
+
+    def flaky_build(params, output_dir):
+        # 提交时的校验通过，开始执行时再构造就失败 (如输入在排队期间被删除)
+        calls.append(output_dir)
+        if len(calls) > 1:
+            raise OSError("输入文件已被删除")
+        return build(params, output_dir)
+
+    monkeypatch.setitem(job_server.JOB_TYPES, "split", (input_key, flaky_build))
+    budget = get_memory_budget()
+    reserved = budget.stats()["reserved"]
+
+    job = server.submit("split", {"input": source, "every": 1})
+    job.memory_estimate = max(job.memory_estimate, 1024 * 1024)
+    server.start()
+
+    assert _wait(job) == FAILED
+    assert "无法开始任务" in job.error
+    assert "输入文件已被删除" in job.error
+    assert job.finished_at is not None
+    assert budget.stats()["reserved"] == reserved
+
+
+def test_job_without_output_fails_with_log_tail(server, tmp_path):
+    source = tmp_path / "broken.pdf"
+    source.write_bytes(b"%PDF-1.4 not really a pdf")
+    job = server.submit("split", {"input": str(source), "every": 1})
+    server.start()
+
+    assert _wait(job) == FAILED
+    assert job.error.startswith("任务没有生成任何输出文件")
+    assert job.files == []
+
+
+def test_split_job_finishes_with_files(server, tmp_path):
+    source = make_pdf(tmp_path / "in.pdf", 4)
+    job = server.submit("split", {"input": source, "every": 2})
+    server.start()
+
+    assert _wait(job) == FINISHED
+    assert len(job.files) == 2
+    assert all(name.startswith(job.id + "/") for name in job.files)
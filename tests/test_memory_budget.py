@@ -0,0 +1,70 @@
+# 文件: tests/test_memory_budget.py
+
+import pytest
+
+import core.memory_budget as memory_budget
+import core.pdf_to_image as pdf_to_image
+from core.memory_budget import MemoryBudget, adaptive_workers, estimate_task, BASE_JOB_BYTES, MB
+
+from tests.conftest import make_pdf
+
+
+@pytest.fixture
+def plenty_of_memory(monkeypatch):
+    """系统可用内存固定为 64 GB，只有预算本身起作用"""
+    monkeypatch.setattr(memory_budget, "system_memory", lambda: (64 * 1024 * MB, 64 * 1024 * MB))
+
+
+def test_admission_respects_the_budget(plenty_of_memory):
+    budget = MemoryBudget(max_bytes=100 * MB)
+    # 没有任何预留时总是放行，单个超出预算的任务也能执行
+    assert budget.try_acquire(150 * MB)
+    budget.release(150 * MB)
+
+    assert budget.try_acquire(60 * MB)
+    assert not budget.try_acquire(50 * MB)
+    assert budget.try_acquire(40 * MB)
+    assert budget.stats()["deferred"] == 1
+    budget.release(60 * MB)
+    assert budget.try_acquire(50 * MB)
+    assert budget.stats()["reserved"] == 90 * MB
+
+
+def test_headroom_is_capped_by_available_memory(monkeypatch):
+    monkeypatch.setattr(memory_budget, "system_memory", lambda: (8 * 1024 * MB, 356 * MB))
+    budget = MemoryBudget(max_bytes=4 * 1024 * MB)
+    assert budget.headroom() == 100 * MB
+
+
+def test_adaptive_workers_does_not_count_the_callers_reservation(plenty_of_memory):
+    budget = MemoryBudget(max_bytes=100 * MB)
+    assert budget.try_acquire(80 * MB)  # 本任务自己的预留
+    assert adaptive_workers(8, 10 * MB, budget) == 2
+    assert adaptive_workers(8, 10 * MB, budget, reserved=80 * MB) == 8
+
+    assert budget.try_acquire(15 * MB)  # 另一个任务的预留仍然要扣除
+    assert adaptive_workers(8, 10 * MB, budget, reserved=80 * MB) == 8
+    budget.max_bytes = 60 * MB
+    assert adaptive_workers(8, 10 * MB, budget, reserved=80 * MB) == 4
+
+
+def test_export_passes_its_reservation(plenty_of_memory, tmp_path, monkeypatch):
+    source = make_pdf(tmp_path / "doc.pdf", 40)
+    seen = []
+
+    def record(requested, per_worker, budget=None, reserved=0):
+        seen.append(reserved)
+        return 1
+
+    monkeypatch.setattr(pdf_to_image, "adaptive_workers", record)
+    assert pdf_to_image.export_pdf_images(source, str(tmp_path / "img"), dpi=20, workers=4,
+                                          memory_reserved=300 * MB)
+    assert seen == [300 * MB]
+
+
+def test_estimate_for_split_and_unknown_tasks(tmp_path):
+    source = make_pdf(tmp_path / "doc.pdf", 3)
+    from core.pdf_splitter import split_pdf_by_mode
+    size = (tmp_path / "doc.pdf").stat().st_size
+    assert estimate_task(split_pdf_by_mode, {"input_path": source}) == BASE_JOB_BYTES + size * 2
+    assert estimate_task(split_pdf_by_mode, {"input_path": str(tmp_path / "missing.pdf")}) == BASE_JOB_BYTES
@@ -0,0 +1,38 @@
+# 文件: tests/test_page_ranges.py
+
+import pytest
+
+from core.page_ranges import parse_page_spec, group_pages, group_label
+
+
+def test_single_range_and_single_page():
+    assert parse_page_spec("5-10", 20) == [[(5, 10)]]
+    assert parse_page_spec("7", 20) == [[(7, 7)]]
+
+
+def test_open_ended_ranges():
+    assert parse_page_spec("12-", 20) == [[(12, 20)]]
+    assert parse_page_spec("-5", 20) == [[(1, 5)]]
+
+
+def test_commas_join_and_semicolons_split_outputs():
+    assert parse_page_spec("1-3,5,8-12;20-", 25) == [[(1, 3), (5, 5), (8, 12)], [(20, 25)]]
+
+
+def test_full_width_separators_and_blank_parts():
+    assert parse_page_spec(" 1-2， 4 ；6- ;", 8) == [[(1, 2), (4, 4)], [(6, 8)]]
+
+
+@pytest.mark.parametrize("spec", ["", "  ", ";", "abc", "1-x", "5-3", "0-2", "3-21"])
+def test_invalid_specs_raise_value_error(spec):
+    with pytest.raises(ValueError):
+        parse_page_spec(spec, 20)
+
+
+def test_group_pages_keeps_written_order():
+    assert group_pages([(5, 6), (1, 2)]) == [4, 5, 0, 1]
+
+
+def test_group_label():
+    assert group_label([(5, 10)]) == "5-10"
+    assert group_label([(1, 3), (5, 5)]) == "1-3_5-5"
@@ -0,0 +1,51 @@
+# 文件: tests/test_pdf_compressor.py
+
+import fitz  # PyMuPDF
+
+from core.pdf_compressor import compress_pdf_file, saving_ratio
+
+from tests.conftest import make_pdf
+
+
+def _colour_pdf(path, pages):
+    """彩色文字页面: 原生文字很小，渲染为 JPEG 后反而变大"""
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {i + 1}", fontsize=20, color=(0.8, 0.1, 0.1))
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def _image_colorspaces(path):
+    with fitz.open(path) as doc:
+        return {doc.extract_image(page.get_images()[0][0])["colorspace"] for page in doc}
+
+
+def test_saving_ratio():
+    assert saving_ratio(100, 80) == 0.2
+    assert saving_ratio(100, 150) == -0.5
+    assert saving_ratio(0, 10) == 0.0
+
+
+def test_keeps_original_when_saving_is_too_small(tmp_path):
+    source = _colour_pdf(tmp_path / "in.pdf", 2)
+    output = str(tmp_path / "out.pdf")
+    assert compress_pdf_file(source, output, "render", 96, 65, False, min_saving=0.1)
+    assert open(output, "rb").read() == open(source, "rb").read()
+
+
+def test_min_saving_none_always_writes_the_compressed_file(tmp_path):
+    source = make_pdf(tmp_path / "in.pdf", 2)
+    output = str(tmp_path / "out.pdf")
+    assert compress_pdf_file(source, output, "render", 96, 65, False, min_saving=None)
+    assert _image_colorspaces(output) == {3}
+
+
+def test_grayscale_is_never_replaced_by_the_colour_original(tmp_path, capsys):
+    source = _colour_pdf(tmp_path / "in.pdf", 2)
+    output = str(tmp_path / "out.pdf")
+    assert compress_pdf_file(source, output, "render", 96, 65, True, min_saving=0.1)
+    assert open(output, "rb").read() != open(source, "rb").read()
+    assert _image_colorspaces(output) == {1}
+    assert "已要求转为灰度" in capsys.readouterr().out
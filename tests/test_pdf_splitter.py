@@ -0,0 +1,50 @@
+# 文件: tests/test_pdf_splitter.py
+
+import os
+
+import fitz  # PyMuPDF
+
+import core.pdf_splitter as pdf_splitter
+from core.pdf_splitter import split_pdf_by_mode, unique_output_paths
+from core.progress import ProgressReporter, JOB_FINISHED
+
+from tests.conftest import make_pdf, page_count
+
+
+def test_unique_output_paths_adds_suffixes():
+    outputs = [("/out/a.pdf", [0]), ("/out/a.pdf", [1]), ("/out/a_2.pdf", [2]), ("/out/a.pdf", [3])]
+    paths = [path for path, _ in unique_output_paths(outputs)]
+    assert paths == ["/out/a.pdf", "/out/a_3.pdf", "/out/a_2.pdf", "/out/a_4.pdf"]
+
+
+def test_repeated_range_writes_separate_files(tmp_path):
+    source = make_pdf(tmp_path / "doc.pdf", 6)
+    results = split_pdf_by_mode(source, "range", "1-3;1-3")
+    names = sorted(os.path.basename(r["path"]) for r in results)
+    assert names == ["doc_pages_1-3.pdf", "doc_pages_1-3_2.pdf"]
+    assert all(page_count(r["path"]) == 3 for r in results)
+
+
+def test_count_and_bookmark_modes(tmp_path):
+    source = make_pdf(tmp_path / "doc.pdf", 5)
+    assert [r["pages"] for r in split_pdf_by_mode(source, "count", 2)] == [2, 2, 1]
+
+    with fitz.open(source) as doc:
+        doc.set_toc([[1, "第一章", 2], [1, "第二章", 4]])
+        doc.saveIncr()
+    results = split_pdf_by_mode(source, "bookmark", output_path=str(tmp_path / "out" / "part.pdf"))
+    assert [os.path.basename(r["path"]) for r in results] == [
+        "part_pages_1-1.pdf", "part_pages_2-3.pdf", "part_pages_4-5.pdf"]
+
+
+def test_write_error_still_finishes_the_job(tmp_path, monkeypatch):
+    source = make_pdf(tmp_path / "doc.pdf", 4)
+    events = []
+
+    def broken_write(*args, **kwargs):
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(pdf_splitter, "write_page_groups", broken_write)
+    results = split_pdf_by_mode(source, "count", 2, progress=ProgressReporter(events.append, log=False))
+    assert results == []
+    assert events and events[-1].kind == JOB_FINISHED
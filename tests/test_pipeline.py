@@ -0,0 +1,61 @@
+# 文件: tests/test_pipeline.py
+
+import os
+
+import pytest
+
+from core.pipeline import default_output_path, pipeline_outputs, plan_pipeline, run_pipeline
+from core.progress import ProgressReporter, JOB_FINISHED
+
+from tests.conftest import make_pdf, page_count
+
+
+def test_default_output_is_next_to_the_folder(tmp_path):
+    folder = tmp_path / "scans"
+    folder.mkdir()
+    assert default_output_path(str(folder)) == str(tmp_path / "scans_processed.pdf")
+    assert default_output_path(str(folder) + os.sep) == str(tmp_path / "scans_processed.pdf")
+    assert default_output_path(str(tmp_path / "a.pdf")) == str(tmp_path / "a_processed.pdf")
+
+
+def test_pipeline_outputs_include_split_parts(tmp_path):
+    output = tmp_path / "out.pdf"
+    for name in ("out_pages_1-2.pdf", "out_pages_3-4.pdf", "other.pdf", "out.pdf.bak"):
+        (tmp_path / name).write_bytes(b"")
+    found = sorted(os.path.basename(p) for p in pipeline_outputs(str(output)))
+    assert found == ["out.pdf", "out_pages_1-2.pdf", "out_pages_3-4.pdf"]
+
+
+def test_plan_rejects_folder_without_merge(tmp_path):
+    with pytest.raises(ValueError):
+        plan_pipeline(str(tmp_path), {"split": {}})
+
+
+def test_rerun_does_not_merge_previous_outputs(tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    make_pdf(folder / "a.pdf", 1)
+    make_pdf(folder / "b.pdf", 3)
+    output = str(folder / "out.pdf")
+    stages = {"merge": {}, "split": {"mode": "count", "value": 2}}
+
+    first = run_pipeline(str(folder), output, stages)
+    assert first
+    assert sum(page_count(p) for p in first) == 4
+
+    # 输出写在输入文件夹内，再次运行时拆分结果不能被当作输入合并进来
+    second = run_pipeline(str(folder), output, stages)
+    assert sorted(second) == sorted(first)
+    assert sum(page_count(p) for p in second) == 4
+
+
+def test_aborted_pipeline_finishes_the_job(tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    make_pdf(folder / "a.pdf", 3)
+    events = []
+    stages = {"merge": {}, "split": {"mode": "range", "value": "5-9"}}
+    outputs = run_pipeline(str(folder), str(tmp_path / "out.pdf"), stages,
+                           progress=ProgressReporter(events.append, log=False))
+    assert outputs == []
+    assert events[-1].kind == JOB_FINISHED
@@ -0,0 +1,93 @@
+# 文件: tests/test_quality_guard.py
+
+import io
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageDraw
+
+from core.pdf_compressor import compress_document_by_rendering
+from core.quality_guard import QualityGuard, sample_indices, ssim, psnr, PSNR_MAX
+
+from tests.conftest import make_pdf
+
+
+def _text_image():
+    img = Image.new("RGB", (400, 300), "white")
+    draw = ImageDraw.Draw(img)
+    for row in range(12):
+        draw.text((10, 10 + row * 22), "Quality guard sample text 0123456789", fill="black")
+    return img
+
+
+def _jpeg(img, quality):
+    with io.BytesIO() as f:
+        img.save(f, "JPEG", quality=quality)
+        return f.getvalue()
+
+
+def _decoded(data):
+    with Image.open(io.BytesIO(data)) as img:
+        return img.convert("RGB")
+
+
+def test_metrics_order_by_quality():
+    img = _text_image()
+    assert ssim(img, img) > 0.999
+    assert psnr(img, img) == PSNR_MAX
+    low, high = _decoded(_jpeg(img, 5)), _decoded(_jpeg(img, 90))
+    assert ssim(img, low) < ssim(img, high)
+    assert psnr(img, low) < psnr(img, high)
+
+
+def test_sample_indices_cover_first_and_last():
+    assert sample_indices(3, 4) == {0, 1, 2}
+    assert sample_indices(100, 4) == {0, 33, 66, 99}
+    assert sample_indices(100, 1) == {0}
+
+
+def test_check_without_retry_only_reports():
+    img = _text_image()
+    guard = QualityGuard("ssim", threshold=0.999)
+    guard.start_file(10)
+    data = _jpeg(img, 10)
+    assert guard.check(img, data, 10, encode=lambda q: _jpeg(img, q)) == data
+    assert guard.failed == 1 and guard.raised_files == 0
+    assert guard.file_quality() == 10
+    assert "不合格 1 页" in guard.describe_file()
+
+
+def test_retry_raises_quality_for_the_file():
+    img = _text_image()
+    guard = QualityGuard("psnr", threshold=30, retry=True)
+    guard.start_file(10)
+    encoded = []
+
+    def encode(q):
+        encoded.append(q)
+        return _jpeg(img, q)
+
+    data = guard.check(img, encode(10), 10, encode=encode)
+    assert encoded[0] == 10 and len(encoded) > 1
+    assert encoded == sorted(encoded)
+    assert guard.file_quality() == encoded[-1] > 10
+    assert psnr(img, _decoded(data)) >= 30 or guard.file_quality() == guard.max_quality
+    assert guard.raised_files == 1
+    assert f"整个文件改用质量 10→{guard.file_quality()} 编码" in guard.describe_file()
+
+
+def test_raised_quality_applies_to_every_page(tmp_path):
+    source = make_pdf(tmp_path / "doc.pdf", 6)
+    guard = QualityGuard("ssim", threshold=0.999, sample_pages=2, retry=True)
+    with fitz.open(source) as doc:
+        output = compress_document_by_rendering(doc, 96, 10, False, guard=guard)
+    with output:
+        tables = []
+        for page in output:
+            xref = page.get_images()[0][0]
+            with Image.open(io.BytesIO(output.extract_image(xref)["image"])) as img:
+                tables.append(img.quantization)
+    assert guard.file_quality() > 10
+    # 未抽查的页面同样按提高后的质量编码
+    assert all(table == tables[0] for table in tables)
+    with Image.open(io.BytesIO(_jpeg(_text_image(), 10))) as reference:
+        assert tables[0] != reference.quantization
@@ -0,0 +1,97 @@
+# 文件: tests/test_read_ahead.py
+
+import os
+
+import core.pdf_merger as pdf_merger
+from core.read_ahead import ReadAhead, WriteBehind, StagedIO
+
+from tests.conftest import make_pdf, page_count
+
+
+def _files(folder, count, size=1000):
+    folder.mkdir(exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = folder / f"f{i}.bin"
+        path.write_bytes(bytes([i]) * size)
+        paths.append(str(path))
+    return paths
+
+
+def test_take_returns_contents_in_order(tmp_path):
+    paths = _files(tmp_path / "in", 5)
+    reader = ReadAhead(paths, max_bytes=10_000, depth=2)
+    try:
+        for i, path in enumerate(paths):
+            assert reader.take(path) == bytes([i]) * 1000
+    finally:
+        reader.close()
+    assert (reader.hits, reader.misses) == (5, 0)
+
+
+def test_relative_paths_match_the_plan(tmp_path, monkeypatch):
+    paths = _files(tmp_path / "in", 3)
+    monkeypatch.chdir(tmp_path)
+    reader = ReadAhead(paths)
+    try:
+        assert reader.take(os.path.join("in", "f0.bin")) == bytes([0]) * 1000
+        assert reader.take(os.path.join("in", "f2.bin")) == bytes([2]) * 1000
+    finally:
+        reader.close()
+    assert reader.hits == 2
+
+
+def test_unplanned_and_oversized_files_are_misses(tmp_path):
+    paths = _files(tmp_path / "in", 2)
+    big = tmp_path / "big.bin"
+    big.write_bytes(b"x" * 5000)
+    reader = ReadAhead(paths + [str(big)], max_bytes=2000)
+    try:
+        assert reader.take(str(tmp_path / "other.bin")) is None
+        assert reader.take(paths[1]) == bytes([1]) * 1000
+        assert reader.take(str(big)) is None
+    finally:
+        reader.close()
+    assert (reader.hits, reader.misses) == (1, 2)
+
+
+def test_write_behind_writes_and_reports_errors(tmp_path):
+    writer = WriteBehind(max_bytes=100)
+    writer.write(str(tmp_path / "a.bin"), b"a" * 80)
+    writer.write(str(tmp_path / "b.bin"), b"b" * 80)
+    writer.copy(str(tmp_path / "a.bin"), str(tmp_path / "c.bin"))
+    writer.write(str(tmp_path / "missing" / "d.bin"), b"d")
+    writer.close()
+    assert (tmp_path / "b.bin").read_bytes() == b"b" * 80
+    assert (tmp_path / "c.bin").read_bytes() == b"a" * 80
+    assert writer.files == 3
+    assert [os.path.basename(path) for path, _ in writer.errors] == ["d.bin"]
+
+
+def test_staged_io_disabled_without_a_plan(tmp_path):
+    staging = StagedIO()
+    assert staging.reader is None and staging.writer is None
+    assert StagedIO([str(tmp_path / "a")], read_ahead_mb=0).reader is None
+    staging.write(str(tmp_path / "a.bin"), b"data")
+    assert staging.close() == [] and staging.describe() == ""
+    assert (tmp_path / "a.bin").read_bytes() == b"data"
+
+
+def test_merge_of_relative_folder_reads_ahead(tmp_path, monkeypatch):
+    tree = tmp_path / "tree"
+    (tree / "sub").mkdir(parents=True)
+    for name in ("a1.pdf", "a2.pdf", "sub/b1.pdf", "sub/b2.pdf"):
+        make_pdf(tree / name, 2)
+    created = []
+
+    class RecordingStagedIO(StagedIO):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(pdf_merger, "StagedIO", RecordingStagedIO)
+    monkeypatch.chdir(tmp_path)
+    assert pdf_merger.merge_files("tree", "merged.pdf")
+    assert page_count(tmp_path / "merged.pdf") == 8
+    reader = created[0].reader
+    assert reader.hits == 4 and reader.misses == 0
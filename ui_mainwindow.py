@@ -1,17 +1,25 @@
 # 文件: ui_mainwindow.py
 
 import sys
+import importlib
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QHBoxLayout, QLabel, QListWidget, QStackedWidget
 )
 
-# 导入所有功能模块和通用工具
-from modules.pdf_merger import PdfMergerWidget
-from modules.patent_splitter import PatentSplitterWidget
-from modules.pdf_compressor import PdfCompressorWidget
-from modules.pdf_splitter import PdfSplitterWidget
 from utils import Stream
 
+# 功能模块注册表: (菜单名称, 模块路径, 面板类名)
+# 模块只在其页面第一次被选中时才导入和构建，避免启动时加载 fitz / pdfplumber / PIL 等重量级依赖
+MODULE_REGISTRY = [
+    ("PDF 合并", "modules.pdf_merger", "PdfMergerWidget"),
+    ("专利五书分割", "modules.patent_splitter", "PatentSplitterWidget"),
+    ("PDF 拆分", "modules.pdf_splitter", "PdfSplitterWidget"),
+    ("PDF 压缩", "modules.pdf_compressor", "PdfCompressorWidget"),
+    ("合并→压缩→拆分", "modules.pdf_pipeline", "PdfPipelineWidget"),
+    ("PDF 转图片", "modules.pdf_to_image", "PdfToImageWidget"),
+    ("任务队列", "modules.job_panel", "JobsPanelWidget"),
+]
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -41,11 +49,10 @@ class MainWindow(QMainWindow):
         self.stacked_widget = QStackedWidget()
         main_layout.addWidget(self.stacked_widget, 4) # 设置伸缩比例为4
 
-        # 3. 添加所有功能模块到窗口中
-        self.add_module("PDF 合并", PdfMergerWidget())
-        self.add_module("专利五书分割", PatentSplitterWidget())
-        self.add_module("PDF 拆分", PdfSplitterWidget())
-        self.add_module("PDF 压缩", PdfCompressorWidget())
+        # 3. 注册所有功能模块 (此时只添加菜单项和空白占位页)
+        self.module_specs = {}
+        for name, module_path, class_name in MODULE_REGISTRY:
+            self.register_module(name, module_path, class_name)
         
         # 4. 连接菜单点击事件，并设置默认显示第一个功能
         self.menu_widget.currentRowChanged.connect(self.change_page)
@@ -56,6 +63,29 @@ class MainWindow(QMainWindow):
         self.menu_widget.addItem(name)
         self.stacked_widget.addWidget(widget)
 
+    def register_module(self, name, module_path, class_name):
+        """按名称注册一个模块，先放入占位页，等页面第一次被选中时再导入和构建"""
+        placeholder = QWidget()
+        self.module_specs[placeholder] = (module_path, class_name)
+        self.add_module(name, placeholder)
+
+    def ensure_module_loaded(self, index):
+        """如果该页仍是占位页，则导入对应模块、构建面板并替换占位页"""
+        current_widget = self.stacked_widget.widget(index)
+        spec = self.module_specs.pop(current_widget, None)
+        if spec is None:
+            return current_widget
+        module_path, class_name = spec
+        try:
+            widget = getattr(importlib.import_module(module_path), class_name)()
+        except Exception as e:
+            print(f"错误: 加载模块 '{module_path}' 失败: {e}")
+            widget = QLabel(f"模块加载失败: {e}")
+        self.stacked_widget.insertWidget(index, widget)
+        self.stacked_widget.removeWidget(current_widget)
+        current_widget.deleteLater()
+        return widget
+
     def create_placeholder_widget(self, feature_name):
         """创建一个占位符页面，用于未开发的功能"""
         widget = QWidget()
@@ -70,10 +100,11 @@ class MainWindow(QMainWindow):
         当用户点击左侧菜单时，切换右侧显示的功能页面。
         同时，动态地将日志流重新连接到当前活动模块的日志接收方法。
         """
+        current_widget = self.ensure_module_loaded(index)
         self.stacked_widget.setCurrentIndex(index)
-        current_widget = self.stacked_widget.widget(index)
 
-        # 断开之前可能存在的连接，防止日志重复输出
+        # 先把缓冲区里属于上一个页面的日志发送出去，再断开之前可能存在的连接，防止日志重复输出
+        self.stream.flush_pending()
         try: 
             self.stream.newText.disconnect()
         except TypeError: 
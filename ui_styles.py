@@ -107,6 +107,13 @@ QListWidget::item:selected {
 QListWidget::item:hover:!selected {
     background-color: #F5F7FA;
 }
+/* 缩略图预览网格 */
+QListWidget#ThumbnailList {
+    border: 1px solid #E4E7ED;
+}
+QListWidget#ThumbnailList::item {
+    padding: 4px;
+}
 
 /* --- 分隔线 --- */
 QFrame[frameShape="4"] { /* QFrame.HLine */
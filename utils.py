@@ -1,34 +1,216 @@
 # 文件: utils.py
 
+import os
+import sys
+import inspect
+import threading
 import traceback
-from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QPlainTextEdit, QWidget, QHBoxLayout, QProgressBar, QLabel
+
+from core.progress import ProgressReporter, describe_progress
+from core import tracing, process_runner
+
+# 日志框最多保留的行数 (超出后自动丢弃最早的行)，可通过环境变量调整
+DEFAULT_LOG_MAX_LINES = int(os.environ.get("PDF_TOOLBOX_LOG_MAX_LINES", "5000"))
+DEFAULT_LOG_FLUSH_MS = 100
+
+def collapse_progress_lines(text, max_lines=DEFAULT_LOG_MAX_LINES):
+    """
+    压缩一批日志文本: 同一行内多次 '\r' 覆盖只保留最后一次 (仍以 '\r' 开头，提示界面覆盖当前行)，
+    行数超过上限时只保留最后 max_lines 行。
+    """
+    lines = text.split('\n')
+    lines = [('\r' + line.rsplit('\r', 1)[1]) if '\r' in line else line for line in lines]
+    if len(lines) > max_lines:
+        lines = lines[-max_lines:]
+    return '\n'.join(lines)
+
+# 线程 -> 日志接收对象 (带 on_update_text 方法的面板)。
+# 任务队列中的任务在各自线程里 print，输出会被送回提交该任务的面板，而不是当前显示的页面。
+_thread_log_targets = {}
+
+def bind_thread_log_target(target):
+    """把当前线程的 print 输出定向到 target.on_update_text"""
+    _thread_log_targets[threading.get_ident()] = target
+
+def unbind_thread_log_target():
+    _thread_log_targets.pop(threading.get_ident(), None)
+
+def flush_gui_logs():
+    """立即发送所有缓冲中的日志 (sys.stdout 被重定向到 Stream 时有效)"""
+    if isinstance(sys.stdout, Stream):
+        sys.stdout.flush_pending()
 
 class Stream(QObject):
-    """用于将 print 输出重定向到GUI的文本框"""
+    """
+    用于将 print 输出重定向到GUI的文本框。
+    后台线程的 write 只追加到缓冲区；主线程的定时器按固定间隔批量取出并发送一次信号，
+    避免每个 print 片段都产生一次跨线程信号。
+    """
     newText = pyqtSignal(str)
-    def write(self, text): self.newText.emit(str(text))
+
+    def __init__(self, flush_interval_ms=DEFAULT_LOG_FLUSH_MS, max_lines=DEFAULT_LOG_MAX_LINES):
+        super().__init__()
+        self.max_lines = max_lines
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush_pending)
+        self._timer.start(flush_interval_ms)
+
+    def write(self, text):
+        target = _thread_log_targets.get(threading.get_ident())
+        with self._lock:
+            if self._buffer and self._buffer[-1][0] is target:
+                self._buffer[-1][1].append(str(text))
+            else:
+                self._buffer.append((target, [str(text)]))
+
     def flush(self): pass
 
+    def flush_pending(self):
+        """立即把缓冲区中的内容发送给界面 (在主线程调用)"""
+        with self._lock:
+            if not self._buffer:
+                return
+            batches = self._buffer
+            self._buffer = []
+        for target, parts in batches:
+            text = collapse_progress_lines(''.join(parts), self.max_lines)
+            if target is None:
+                self.newText.emit(text)
+            else:
+                target.on_update_text(text)
+
+class LogConsole(QPlainTextEdit):
+    """
+    只读日志框。行数上限由 QPlainTextEdit 的 maximumBlockCount 实现 (环形缓冲，自动丢弃最早的行)；
+    以 '\r' 开头的片段会覆盖当前行，使进度信息显示为一行不断刷新的文本。
+    """
+    def __init__(self, max_lines=DEFAULT_LOG_MAX_LINES, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)
+
+    def append_text(self, text):
+        scrollbar = self.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+        cursor = self.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for i, line in enumerate(text.split('\n')):
+            if i > 0:
+                cursor.insertText('\n')
+            if '\r' in line:
+                line = line.rsplit('\r', 1)[1]
+                cursor.movePosition(QTextCursor.StartOfBlock, QTextCursor.KeepAnchor)
+                cursor.removeSelectedText()
+            cursor.insertText(line)
+        cursor.endEditBlock()
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+class ProgressPanel(QWidget):
+    """进度条 + 速度/剩余时间说明，由 Worker.progress 发出的 ProgressEvent 驱动"""
+    SCALE = 1000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.bar = QProgressBar(); self.bar.setRange(0, self.SCALE); self.bar.setTextVisible(True)
+        self.label = QLabel()
+        layout = QHBoxLayout(self); layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.bar, 3); layout.addWidget(self.label, 2)
+        self.reset()
+
+    def reset(self):
+        self.bar.setRange(0, self.SCALE); self.bar.setValue(0)
+        self.label.setText("")
+
+    def handle_event(self, event):
+        fraction = event.fraction
+        if fraction is None:
+            self.bar.setRange(0, 0)  # 总量未知时显示为忙碌状态
+        else:
+            self.bar.setRange(0, self.SCALE)
+            self.bar.setValue(int(fraction * self.SCALE))
+        self.label.setText(describe_progress(event))
+
 class Worker(QObject):
     """
     通用的后台工作线程。
     接收一个任务函数和其关键字参数，在后台执行。
+    任务函数带 progress 参数时会收到一个 ProgressReporter，其事件通过 progress 信号转发给界面。
+    开启性能追踪时，任务结束后在日志中输出各阶段耗时表，并为本次任务写出一个 trace 文件。
+    开启进程隔离时 (默认)，任务在独立的工作进程中执行，本线程只负责转发日志和进度；
+    工作进程崩溃或超时会作为普通的任务错误 (error 信号) 报告，运行中也可以 cancel()。
     """
     finished = pyqtSignal()
     error = pyqtSignal(str)
+    progress = pyqtSignal(object)
 
     def __init__(self, task_function, **kwargs):
         super().__init__()
         self.task_function = task_function
         self.kwargs = kwargs
+        # 由任务队列设置: 本任务的 print 输出发送到哪个面板
+        self.log_target = None
+        # 由任务队列设置: 放行本任务时预留的内存 (字节)，同一进程中运行的任务据此计算可用内存时不扣除自己
+        self.memory_reserved = 0
+        self.isolated = process_runner.is_enabled()
+        self.cancel_requested = False
+        self._cancel_event = threading.Event()
+
+    def can_cancel(self):
+        """运行中的任务只有在工作进程中执行时才能取消"""
+        return self.isolated
+
+    def cancel(self):
+        self.cancel_requested = True
+        self._cancel_event.set()
 
     def run(self):
         """执行任务"""
+        if self.log_target is not None:
+            bind_thread_log_target(self.log_target)
+        try:
+            if self.isolated:
+                self.run_isolated()
+            else:
+                self.run_in_thread()
+        finally:
+            unbind_thread_log_target()
+            self.finished.emit()
+
+    def run_isolated(self):
+        try:
+            process_runner.run_isolated(self.task_function, self.kwargs,
+                                        on_log=lambda text: print(text, end=""),
+                                        on_progress=self.progress.emit,
+                                        cancel_event=self._cancel_event)
+        except process_runner.TaskCancelled as e:
+            print(f"\n{e}")
+        except process_runner.TaskCrashed as e:
+            self.error.emit(str(e))
+        except process_runner.TaskError as e:
+            self.error.emit(f"发生了一个意外错误:\n{e}")
+        except Exception:
+            self.error.emit(f"无法在工作进程中启动任务:\n{traceback.format_exc()}")
+
+    def run_in_thread(self):
+        kwargs = dict(self.kwargs)
+        parameters = inspect.signature(self.task_function).parameters
+        if "progress" not in kwargs and "progress" in parameters:
+            kwargs["progress"] = ProgressReporter(callback=self.progress.emit)
+        if "memory_reserved" not in kwargs and "memory_reserved" in parameters:
+            kwargs["memory_reserved"] = self.memory_reserved
+        tracing.start_collecting(self.task_function.__name__)
         try:
             # 使用 **kwargs 解包关键字参数
-            self.task_function(**self.kwargs)
-        except Exception as e:
+            self.task_function(**kwargs)
+        except Exception:
             error_info = traceback.format_exc()
             self.error.emit(f"发生了一个意外错误:\n{error_info}")
         finally:
-            self.finished.emit()
\ No newline at end of file
+            tracing.finish_and_report(tracing.stop_collecting())